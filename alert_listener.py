@@ -0,0 +1,196 @@
+import imaplib
+import queue
+import select
+import ssl
+import threading
+import time
+from gmail_alert_reader import (connect_imap, fetch_alerts, load_uid_state, save_uid_state, log,
+                                IMAP_HOST, IMAP_PORT, EMAIL, APP_PASSWORD, UID_STATE_FILE)
+
+class IdleAlertListener(threading.Thread):
+    """
+    Hält eine angemeldete IMAP-Sitzung offen und wartet per IDLE auf neue Alerts.
+
+    Statt alle 5 Sekunden neu zu verbinden, meldet der Server neue Mails per Push
+    (``* n EXISTS``). Erkannte Alerts gehen an ``handler``; ohne Handler landen sie in
+    ``self.alerts`` (queue.Queue). Bei Verbindungsfehlern wird mit exponentiellem
+    Backoff neu verbunden.
+    """
+
+    def __init__(self, handler=None, host=IMAP_HOST, port=IMAP_PORT, user=EMAIL, password=APP_PASSWORD,
+                 use_ssl=True, state_path=UID_STATE_FILE, idle_timeout=25 * 60, min_backoff=1, max_backoff=60,
+                 poll_interval=1.0, retry_interval=5):
+        super().__init__(name="IdleAlertListener", daemon=True)
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.idle_timeout = idle_timeout  # Gmail beendet IDLE nach ~29 Minuten
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval  # wie oft das Stop-Flag geprüft wird
+        self.retry_interval = retry_interval  # nach einem Handler-Fehler erneut abholen statt bis zur nächsten Mail
+        self.state_path = state_path
+        self.uid_state = load_uid_state(state_path) if state_path else {"uidvalidity": None, "last_uid": 0}
+        self.alerts = queue.Queue()
+        self.connected = threading.Event()
+        self._stop_event = threading.Event()
+        self._tag_counter = 0
+        self._imap = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _next_tag(self):
+        self._tag_counter += 1
+        return b"IDLE%d" % self._tag_counter
+
+    def _dispatch(self, alerts):
+        """
+        Übergibt die Alerts der Reihe nach; beim ersten Handler-Fehler (z.B. alert_queue.put ohne
+        Plattenplatz) wird abgebrochen.
+
+        Returns:
+            int: Anzahl übergebener Alerts.
+        """
+        received_at = time.perf_counter()
+        for i, alert in enumerate(alerts):
+            if self.handler is None:
+                self.alerts.put(alert)  # nur ohne Handler, sonst leert niemand die Queue
+                continue
+            try:
+                self.handler(alert, received_at)
+            except Exception as e:
+                log(f"❗ Fehler im Alert-Handler: {e} – Mail wird erneut abgeholt")
+                return i
+        return len(alerts)
+
+    def _fetch_and_dispatch(self):
+        """
+        Holt neue Alerts und übergibt sie. Der UID-Zustand wird erst danach gespeichert: ein Absturz
+        dazwischen liefert die Mails erneut (Duplikate erkennt alert_queue an der Mail-ID), statt sie zu
+        verlieren. Schlägt der Handler fehl, bleibt der Zustand vor dieser Mail und sie wird wieder ungelesen.
+
+        Returns:
+            bool: False, wenn ein Alert nicht übergeben werden konnte.
+        """
+        uids = []
+        alerts = fetch_alerts(self._imap, self.uid_state, None, uids)
+        delivered = self._dispatch(alerts)
+        if delivered < len(alerts):
+            self.uid_state["last_uid"] = uids[delivered] - 1
+            # Beim ersten Abruf (UNSEEN-Suche) findet sie sonst niemand wieder
+            self._imap.uid("STORE", ",".join(str(uid) for uid in uids[delivered:]), "-FLAGS", "(\\Seen)")
+        if self.state_path:
+            save_uid_state(self.uid_state, self.state_path)
+        return delivered == len(alerts)
+
+    @staticmethod
+    def _buffered(imap):
+        """
+        True, wenn ohne Warten schon Daten lesbar sind: im gepufferten Reader von imaplib (liest
+        readline() mehrere Zeilen auf einmal, sieht select die übrigen nicht mehr) oder bei SSL bereits
+        entschlüsselt. peek() liest dafür kurz nicht blockierend vom Socket.
+        """
+        sock = imap.socket()
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return bool(imap.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(timeout)
+
+    def _idle_wait(self, imap, timeout):
+        """
+        Schickt IDLE und wartet, bis der Server neue Mails meldet oder ``timeout`` abläuft.
+
+        Returns:
+            bool: True, wenn der Server EXISTS/RECENT gemeldet hat.
+        """
+        tag = self._next_tag()
+        imap.send(tag + b" IDLE\r\n")
+        line = imap.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE vom Server abgelehnt: {line!r}")
+
+        sock = imap.socket()
+        deadline = time.monotonic() + timeout
+        got_mail = False
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Gepufferte Zeilen zuerst abarbeiten: select meldet nur neue Pakete auf dem Socket
+            if not self._buffered(imap):
+                ready, _, _ = select.select([sock], [], [], min(remaining, self.poll_interval))
+                if not ready:
+                    continue
+            line = imap.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Verbindung während IDLE geschlossen")
+            if line.startswith(b"*") and (b"EXISTS" in line or b"RECENT" in line):
+                got_mail = True
+                break
+            if line.startswith(b"* BYE"):
+                raise imaplib.IMAP4.abort(f"Server beendet Sitzung: {line!r}")
+
+        imap.send(b"DONE\r\n")
+        while True:
+            line = imap.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Verbindung nach DONE geschlossen")
+            if line.startswith(tag):
+                if not line.startswith(tag + b" OK"):
+                    raise imaplib.IMAP4.error(f"IDLE fehlgeschlagen: {line!r}")
+                break
+        return got_mail
+
+    def _session(self):
+        log(f"🔄 Verbinde zu {self.host}:{self.port} (IDLE)...")
+        self._imap = connect_imap(self.host, self.port, self.user, self.password, self.use_ssl)
+        self.connected.set()
+        log("✅ IMAP-Sitzung offen, warte auf Push-Benachrichtigungen.")
+        # Erst alles abholen, was während des Verbindungsaufbaus eingetroffen ist
+        delivered = self._fetch_and_dispatch()
+        while not self._stop_event.is_set():
+            self._idle_wait(self._imap, self.idle_timeout if delivered else self.retry_interval)
+            if self._stop_event.is_set():
+                break
+            # Auch nach einem IDLE-Timeout prüfen, falls eine Meldung verloren ging
+            delivered = self._fetch_and_dispatch()
+
+    def run(self):
+        backoff = self.min_backoff
+        while not self._stop_event.is_set():
+            try:
+                self._session()
+                backoff = self.min_backoff
+            except (imaplib.IMAP4.error, OSError) as e:
+                self.connected.clear()
+                log(f"❗ IMAP-Verbindung verloren: {e} – neuer Versuch in {backoff}s")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            finally:
+                self._close()
+
+    def _close(self):
+        if self._imap is not None:
+            try:
+                self._imap.logout()
+            except Exception:
+                pass
+            self._imap = None
+        self.connected.clear()
+
+if __name__ == "__main__":
+    listener = IdleAlertListener(handler=lambda alert, _: log(f"📨 Alert: {alert}"))
+    listener.start()
+    try:
+        while listener.is_alive():
+            listener.join(1)
+    except KeyboardInterrupt:
+        listener.stop()
@@ -0,0 +1,172 @@
+import html
+import json
+import re
+import sys
+import time
+from metrics import timed
+
+_ACTION_KEY = b'"action"'
+# Stufe 2: Snippet ohne Tags und mit aufgelösten HTML-Entities (z.B. &quot;action&quot;)
+_JSON_TEXT = re.compile(r'\{[^{}]*?"action"\s*:\s*"(?:LONG|SHORT)"[^{}]*\}', re.I)
+_TAG = re.compile(r"<[^>]*>")
+
+# Zusätzliche Felder, die ein Alert mitbringen darf (erster gefundener Schlüssel gewinnt)
+FIELD_ALIASES = {
+    "symbol": ("symbol", "ticker"),
+    "size": ("size", "amount", "qty"),
+    "tp": ("tp", "take_profit", "takeProfit"),
+    "sl": ("sl", "stop_loss", "stopLoss"),
+    "price": ("price", "close"),  # Kurs beim Auslösen (TradingView {{close}}), für die Slippage im Journal
+    "id": ("id", "alert_id", "alertId"),
+}
+
+def _to_alert(raw_json):
+    """Wandelt ein gefundenes JSON-Objekt in ein Alert-Dict um (oder None)."""
+    try:
+        payload = json.loads(raw_json)
+    except ValueError:
+        return None
+    return alert_from_dict(payload)
+
+def alert_from_dict(payload):
+    """Normalisiert ein bereits geparstes JSON-Objekt (Mail oder Webhook) zum Alert-Dict (oder None)."""
+    if not isinstance(payload, dict):
+        return None
+    action = str(payload.get("action", "")).upper()
+    if action not in ("LONG", "SHORT"):
+        return None
+    alert = {"action": action}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if payload.get(alias) not in (None, ""):
+                alert[field] = str(payload[alias])
+                break
+    if "symbol" in alert:
+        alert["symbol"] = alert["symbol"].upper().replace(".P", "")  # TradingView: "BTCUSDT.P"
+    return alert
+
+@timed("parse")
+def parse_alert(payload, charset="utf-8", html_part=False):
+    """
+    Sucht den Alert ({"action": "LONG|SHORT", ...}) in einem Mailteil.
+
+    Drei Stufen, die günstigste zuerst:
+      1. Byte-Suche nach '"action"' direkt auf der Rohnutzlast, nur das {...} wird dekodiert,
+      2. Tags entfernen + HTML-Entities auflösen (z.B. &quot;), nur im Umfeld jedes "action",
+      3. BeautifulSoup, nur wenn die ersten beiden Stufen nichts finden.
+
+    Args:
+        payload (bytes): Bereits von Base64/Quoted-Printable dekodierter Mailteil.
+        charset (str): Zeichensatz des Mailteils.
+        html_part (bool): True für text/html (aktiviert Stufe 3).
+
+    Returns:
+        dict: {"action": "LONG"|"SHORT", optional "symbol", "size", "tp", "sl", "id"} oder None.
+    """
+    # Stufe 1: '"action"' per bytes.find suchen und nur das umschließende {...} dekodieren
+    index = payload.find(_ACTION_KEY)
+    if index >= 0:
+        start = payload.rfind(b"{", 0, index)
+        end = payload.find(b"}", index)
+        if start >= 0 and end > 0:
+            alert = _to_alert(payload[start:end + 1].decode(charset, errors="replace"))
+            if alert:
+                return alert
+
+    # Stufe 2: "action" in beliebiger Kodierung, nur das Umfeld von Tags und Entities befreien
+    index = payload.find(b"action")
+    if index < 0:
+        return None
+    while index >= 0:
+        start = payload.rfind(b"{", 0, index)
+        end = payload.find(b"}", index)
+        if start >= 0 and end > 0:
+            snippet = html.unescape(_TAG.sub("", payload[start:end + 1].decode(charset, errors="replace")))
+            match = _JSON_TEXT.search(snippet)
+            if match:
+                alert = _to_alert(match.group(0))
+                if alert:
+                    return alert
+        index = payload.find(b"action", index + 6)
+
+    # Stufe 3: komplettes HTML mit BeautifulSoup (z.B. Payload über mehrere Elemente verteilt)
+    if html_part:
+        from gmail_alert_reader import extract_text_from_html  # BeautifulSoup nur bei Bedarf laden
+        match = _JSON_TEXT.search(extract_text_from_html(payload.decode(charset, errors="replace")))
+        if match:
+            return _to_alert(match.group(0))
+    return None
+
+def _legacy_parse(payload, charset, html_part):
+    """Bisheriger Weg (BeautifulSoup + Regex) als Vergleich für den Benchmark."""
+    from gmail_alert_reader import extract_text_from_html
+    body = payload.decode(charset)
+    if html_part:
+        body = extract_text_from_html(body)
+    match = re.search(r'{"action":\s*"(LONG|SHORT)"}', body)
+    return match.group(1).upper() if match else None
+
+def _synthetic_mail(i):
+    """TradingView-ähnliche Mail: viel HTML-Layout, Payload teils mit &quot; kodiert."""
+    from email.message import EmailMessage
+
+    action = "LONG" if i % 2 else "SHORT"
+    payload = '{"action": "%s", "symbol": "BTCUSDT.P", "size": "0.01", "tp": "%d", "sl": "%d"}' % (
+        action, 70000 + i, 69000 + i)
+    if i % 4 == 3:
+        payload = html.escape(payload)
+    layout = "".join(f'<tr><td style="padding:4px;color:#131722">Zeile {n}</td></tr>' for n in range(150))
+    msg = EmailMessage()
+    msg["From"] = "TradingView <noreply@tradingview.com>"
+    msg["Subject"] = f"Alarm: BTCUSDT.P {action}"
+    msg.set_content(payload)
+    msg.add_alternative(f"<html><head><style>td{{font-family:Arial}}</style></head><body><table>{layout}"
+                        f"</table><p>{payload}</p></body></html>", subtype="html")
+    return msg.as_bytes()
+
+def _load_corpus(mail_dir=None):
+    """Lädt .eml-Dateien aus ``mail_dir`` oder baut TradingView-ähnliche Test-Mails."""
+    import email
+    import glob
+    import os
+
+    if mail_dir:
+        raws = []
+        for path in sorted(glob.glob(os.path.join(mail_dir, "*.eml"))):
+            with open(path, "rb") as f:
+                raws.append(f.read())
+    else:
+        raws = [_synthetic_mail(i) for i in range(200)]
+
+    parts = []
+    for raw in raws:
+        for part in email.message_from_bytes(raw).walk():
+            if part.get_content_type() in ("text/plain", "text/html"):
+                parts.append((part.get_payload(decode=True), part.get_content_charset() or "utf-8",
+                              part.get_content_type() == "text/html"))
+    return parts
+
+def benchmark(mail_dir=None, repeat=20):
+    parts = _load_corpus(mail_dir)
+    if not parts:
+        print("Keine Mailteile gefunden.")
+        return
+    candidates = [("gestuft", parse_alert)]
+    try:
+        import bs4  # noqa: F401
+        candidates.append(("BeautifulSoup", _legacy_parse))
+    except ImportError:
+        print("bs4 nicht installiert – nur der gestufte Parser wird gemessen.")
+
+    print(f"Mailteile: {len(parts)}, Wiederholungen: {repeat}")
+    for name, parse in candidates:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for payload, charset, html_part in parts:
+                parse(payload, charset, html_part)
+        per_message = (time.perf_counter() - start) / (repeat * len(parts)) * 1e6
+        print(f"{name:>14}: {per_message:8.2f} µs pro Mailteil")
+
+if __name__ == "__main__":
+    # python alert_parser.py [ordner_mit_eml_dateien]
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,370 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+QUEUE_PATH = "alerts.db"
+WORKERS = 1  # >1 nur, wenn Alerts unabhängig voneinander gehandelt werden dürfen
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 0.5  # Sekunden, verdoppelt je Versuch
+ORDER_DETAIL_PATH = "/api/v2/mix/order/detail"
+ORDER_NOT_FOUND_CODES = ("40768", "40109")  # Bitget: Order existiert nicht
+
+# Zustände: pending -> inflight -> done | failed; inflight nach einem Absturz wieder pending
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_key TEXT NOT NULL UNIQUE,
+    client_oid TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_pending ON alerts (state, seq);
+"""
+
+def alert_key(alert):
+    """
+    Eindeutiger Schlüssel eines Alerts: die Alert-ID (Mail: UIDVALIDITY/UID, Webhook: "id"),
+    sonst eine zufällige (solche Alerts können nicht als doppelt erkannt werden).
+    """
+    alert_id = alert.get("id") if isinstance(alert, dict) else None
+    return f"id:{alert_id}" if alert_id else f"uuid:{uuid.uuid4().hex}"
+
+def client_oid_for(key):
+    """Deterministische clientOid: derselbe Alert ergibt bei jeder Wiederholung dieselbe Order-ID."""
+    return "sb" + hashlib.sha256(key.encode()).hexdigest()[:32]
+
+class QueuedAlert:
+    def __init__(self, seq, client_oid, alert, attempts):
+        self.seq = seq
+        self.client_oid = client_oid
+        self.alert = alert
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"QueuedAlert({self.seq}, {self.client_oid}, {self.alert}, Versuch {self.attempts})"
+
+class AlertQueue:
+    """
+    Dauerhafte Alert-Warteschlange in SQLite (WAL) zwischen Empfang und Ausführung.
+
+    put() ist erst nach dem Commit zurück, ein angenommener Alert überlebt also einen Absturz.
+    Jeder Alert bekommt beim Einreihen seine clientOid; Wiederholungen (Timeout, Absturz)
+    senden dieselbe, so dass die Börse eine zweite Order ablehnt.
+    """
+
+    def __init__(self, path=QUEUE_PATH, synchronous="NORMAL"):
+        self.path = path
+        self.synchronous = synchronous  # NORMAL übersteht Prozessabstürze, FULL auch Stromausfall
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def put(self, alert):
+        """
+        Reiht einen Alert ein (Duplikate mit gleicher ID werden ignoriert).
+
+        Returns:
+            tuple: (seq, client_oid, neu) – bei einem Duplikat die Werte des ersten Eintrags und neu=False.
+        """
+        key = alert_key(alert)
+        now = time.time()
+        conn = self._conn()
+        with self.write_lock:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO alerts (alert_key, client_oid, payload, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", (key, client_oid_for(key), json.dumps(alert, default=str), now, now))
+            inserted = cursor.rowcount == 1
+        seq, client_oid = conn.execute("SELECT seq, client_oid FROM alerts WHERE alert_key = ?", (key,)).fetchone()
+        if not inserted:
+            logging.info(f"Alert {key} ist bereits in der Warteschlange (#{seq}), wird ignoriert")
+        return seq, client_oid, inserted
+
+    def claim(self):
+        """Nimmt den ältesten fälligen Alert (pending -> inflight) oder gibt None zurück."""
+        now = time.time()
+        with self.write_lock:
+            row = self._conn().execute(
+                "UPDATE alerts SET state = 'inflight', attempts = attempts + 1, updated_at = ? "
+                "WHERE seq = (SELECT seq FROM alerts WHERE state = 'pending' AND not_before <= ? ORDER BY seq LIMIT 1) "
+                "RETURNING seq, client_oid, payload, attempts", (now, now)).fetchone()
+        if row is None:
+            return None
+        return QueuedAlert(row[0], row[1], json.loads(row[2]), row[3])
+
+    def _finish(self, seq, state, result=None, error=None, not_before=0):
+        with self.write_lock:
+            self._conn().execute(
+                "UPDATE alerts SET state = ?, result = ?, error = ?, not_before = ?, updated_at = ? WHERE seq = ?",
+                (state, result, error, not_before, time.time(), seq))
+
+    def complete(self, seq, result=None):
+        self._finish(seq, "done", result=json.dumps(result, default=str) if result is not None else None)
+
+    def retry(self, seq, error, delay):
+        self._finish(seq, "pending", error=str(error), not_before=time.time() + delay)
+
+    def fail(self, seq, error):
+        self._finish(seq, "failed", error=str(error))
+
+    def recover(self):
+        """
+        Nach einem Neustart: Alerts, die beim Absturz in Arbeit waren, wieder freigeben.
+
+        Returns:
+            int: Anzahl wieder eingereihter Alerts.
+        """
+        with self.write_lock:
+            count = self._conn().execute(
+                "UPDATE alerts SET state = 'pending', not_before = 0, updated_at = ? WHERE state = 'inflight'",
+                (time.time(),)).rowcount
+        if count:
+            logging.warning(f"♻️ {count} unterbrochene(r) Alert(s) wieder eingereiht")
+        return count
+
+    def counts(self):
+        return dict(self._conn().execute("SELECT state, COUNT(*) FROM alerts GROUP BY state").fetchall())
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+def settle(queue, item, result=None, error=None, max_attempts=MAX_ATTEMPTS, retry_backoff=RETRY_BACKOFF):
+    """
+    Vermerkt den Ausgang eines Versuchs: erledigt, später erneut (Backoff verdoppelt sich je Versuch)
+    oder aufgegeben – nach ``max_attempts`` Versuchen bzw. sofort bei ValueError (z.B. Orderwert unter dem Minimum).
+    """
+    if error is None:
+        queue.complete(item.seq, result)
+    elif isinstance(error, ValueError):
+        logging.error(f"Alert #{item.seq} verworfen: {error}")
+        queue.fail(item.seq, error)
+    elif item.attempts >= max_attempts:
+        logging.error(f"Alert #{item.seq} nach {item.attempts} Versuchen aufgegeben: {error}")
+        queue.fail(item.seq, error)
+    else:
+        delay = retry_backoff * 2 ** (item.attempts - 1)
+        logging.warning(f"Alert #{item.seq} fehlgeschlagen ({error}), neuer Versuch in {delay:.1f}s")
+        queue.retry(item.seq, error, delay)
+
+def make_order_lookup(client=None, symbol=None):
+    """
+    lookup(alert, client_oid) über /mix/order/detail: die Order-Daten, wenn die Börse die clientOid kennt,
+    sonst None. ``symbol`` fest vorgeben, wenn execute das Symbol des Alerts nicht nutzt.
+    """
+    from bitget_client import BitgetAPIError
+    from config import symbol as default_symbol, product_type
+
+    def lookup(alert, client_oid):
+        nonlocal client
+        if client is None:
+            from bitget_client import get_client
+            client = get_client()
+        params = {"symbol": symbol or alert.get("symbol", default_symbol), "productType": product_type,
+                  "clientOid": client_oid}
+        try:
+            return client.get(ORDER_DETAIL_PATH, params).data
+        except BitgetAPIError as e:
+            if e.code in ORDER_NOT_FOUND_CODES:
+                return None
+            raise
+
+    return lookup
+
+class AlertWorkers:
+    """
+    Arbeitet die AlertQueue mit ``concurrency`` Threads ab.
+
+    ``execute(alert, client_oid)`` handelt einen Alert. Ab dem zweiten Versuch fragt
+    ``lookup(alert, client_oid)`` zuerst die Börse, ob die Order schon existiert (Absturz
+    oder Timeout nach dem Senden) – dann gilt der Alert als erledigt, ohne erneut zu senden.
+    ValueError (z.B. Orderwert unter dem Minimum) wird nicht wiederholt.
+    """
+
+    def __init__(self, queue, execute, lookup=None, concurrency=WORKERS, max_attempts=MAX_ATTEMPTS,
+                 retry_backoff=RETRY_BACKOFF, idle_wait=0.05):
+        self.queue = queue
+        self.execute = execute
+        self.lookup = lookup
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.idle_wait = idle_wait
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def notify(self):
+        """Nach put() aufrufen, damit ein wartender Worker sofort weitermacht."""
+        self.wake.set()
+
+    def process(self, item):
+        try:
+            existing = self.lookup(item.alert, item.client_oid) if self.lookup and item.attempts > 1 else None
+            if existing is not None:
+                logging.info(f"Order {item.client_oid} existiert bereits, Alert #{item.seq} wird nicht erneut gesendet")
+                self.queue.complete(item.seq, existing)
+                return
+            self.queue.complete(item.seq, self.execute(item.alert, item.client_oid))
+        except Exception as e:
+            settle(self.queue, item, error=e, max_attempts=self.max_attempts, retry_backoff=self.retry_backoff)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            item = self.queue.claim()
+            if item is None:
+                self.wake.wait(self.idle_wait)
+                self.wake.clear()
+                continue
+            self.process(item)
+
+    def start(self):
+        self.queue.recover()
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"AlertWorker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+        for thread in self.threads:
+            thread.join(5)
+
+    def drain(self, timeout=60):
+        """Wartet, bis nichts mehr pending/inflight ist."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            counts = self.queue.counts()
+            if not counts.get("pending") and not counts.get("inflight"):
+                return True
+            time.sleep(0.01)
+        return False
+
+def _crash_worker(path, url, cert, crash_rate, seed):
+    """Kindprozess für crash_test: sendet Orders an den Stub und beendet sich zufällig hart direkt danach."""
+    import random
+    from bitget_client import BitgetClient
+    from rest_stub import STUB_KEY, STUB_SECRET, STUB_PASSPHRASE
+
+    logging.getLogger().setLevel(logging.ERROR)
+    random.seed(seed)
+    client = BitgetClient(STUB_KEY, STUB_SECRET, STUB_PASSPHRASE, base_url=url, verify=cert, limiter=None)
+
+    def execute(alert, client_oid):
+        response = client.post("/api/v2/mix/order/place-order", {
+            "symbol": alert.get("symbol", "BTCUSDT"), "side": "buy" if alert["action"] == "LONG" else "sell",
+            "size": "0.001", "clientOid": client_oid})
+        if random.random() < crash_rate:
+            os._exit(1)  # Absturz nach dem Senden, vor dem Vermerk in der Queue
+        return response.data
+
+    queue = AlertQueue(path)
+    started = time.perf_counter()
+    workers = AlertWorkers(queue, execute, lookup=make_order_lookup(client), retry_backoff=0.01).start()
+    print(f"recovered_in {time.perf_counter() - started:.6f}", flush=True)
+    workers.drain(120)
+    os._exit(0)
+
+def crash_test(alerts=300, crash_rate=0.05, directory=None):
+    """
+    Absturztest: ein Kindprozess arbeitet die Queue ab und beendet sich nach ~``crash_rate`` der Orders hart.
+    Nach jedem Absturz wird neu gestartet. Am Ende muss jeder Alert genau eine Order am Stub haben.
+
+    Returns:
+        dict: orders (clientOid -> Order am Stub), counts (Zustände der Queue), restarts, resent.
+    """
+    import subprocess
+    import sys
+    import tempfile
+    from rest_stub import RestStubServer
+
+    directory = directory or tempfile.mkdtemp()
+    path = os.path.join(directory, "crash_alerts.db")
+    stub = RestStubServer().start()
+    queue = AlertQueue(path)
+    for i in range(alerts):
+        queue.put({"action": "LONG" if i % 2 else "SHORT", "symbol": "BTCUSDT", "id": f"crash-{i}"})
+    queue.put({"action": "LONG", "symbol": "BTCUSDT", "id": "crash-0"})  # Duplikat
+
+    restarts, recovery = 0, []
+    while True:
+        counts = queue.counts()
+        if not counts.get("pending") and not counts.get("inflight"):
+            break
+        proc = subprocess.run([sys.executable, "-c", f"import alert_queue; alert_queue._crash_worker({path!r}, "
+                               f"{stub.url!r}, {stub.cert!r}, {crash_rate}, {restarts})"],
+                              capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        recovery += [float(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith("recovered_in")]
+        if proc.returncode != 0:
+            restarts += 1
+
+    placed = [body["clientOid"] for method, p, body in stub.calls if p.endswith("/place-order")]
+    counts = queue.counts()
+    assert len(stub.orders.orders) == alerts, (len(stub.orders.orders), alerts)
+    assert counts == {"done": alerts}, counts
+    print(f"✅ {alerts} Alerts, {restarts} harte Abstürze, {len(stub.orders.orders)} Orders an der Börse "
+          f"(genau eine je Alert, {len(placed) - alerts} erneut gesendete clientOid abgelehnt)")
+    print(f"Wiederanlauf (Öffnen + Recovery + Worker-Start) Mittel {sum(recovery) / len(recovery) * 1000:.2f} ms, "
+          f"max {max(recovery) * 1000:.2f} ms")
+    stub.close()
+    return {"orders": dict(stub.orders.orders), "counts": counts, "restarts": restarts, "resent": len(placed) - alerts}
+
+def benchmark(alerts=5000, concurrency=WORKERS, directory=None):
+    """Durchsatz: einreihen (Commit je Alert) und abarbeiten mit einem leeren execute."""
+    import tempfile
+
+    logging.getLogger().setLevel(logging.WARNING)
+    directory = directory or tempfile.mkdtemp()
+    queue = AlertQueue(os.path.join(directory, "bench_alerts.db"))
+    start = time.perf_counter()
+    for i in range(alerts):
+        queue.put({"action": "LONG", "symbol": "BTCUSDT", "id": f"bench-{i}"})
+    enqueue = time.perf_counter() - start
+
+    start = time.perf_counter()
+    workers = AlertWorkers(queue, lambda alert, client_oid: {"clientOid": client_oid}, concurrency=concurrency)
+    workers.start()
+    workers.drain(120)
+    dispatch = time.perf_counter() - start
+    workers.stop()
+    print(f"Einreihen:   {alerts / enqueue:8.0f} Alerts/s ({enqueue / alerts * 1e6:.0f} µs je Alert, "
+          f"WAL synchronous=NORMAL)")
+    print(f"Abarbeiten:  {alerts / dispatch:8.0f} Alerts/s mit {concurrency} Worker(n) (ohne Börsen-Roundtrip)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dauerhafte Alert-Warteschlange: Benchmark und Absturztest.")
+    parser.add_argument("--crash-test", action="store_true", help="Harte Abstürze gegen den HTTPS-Stub simulieren")
+    parser.add_argument("--alerts", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    if args.crash_test:
+        crash_test(args.alerts or 300)
+    else:
+        benchmark(args.alerts or 5000, args.workers)
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import time
+from decimal import Decimal
+from config import symbol as default_symbol, product_type
+import Balance
+from bitget_client import create_async_client as create_rest_client
+from market_store import market_store
+from rate_limiter import scheduler
+from ledger import ledger
+from logik import count_positions, calculate_trade_amount
+from risk import risk_engine
+import tpsl
+from trade import (calculate_contracts, build_order_params, market_cache, leverage_state, record_rate_limit,
+                   record_entry, api_credentials, PLACE_ORDER_PATH, SET_LEVERAGE_PATH, TICKER_PATH, LEVERAGE,
+                   MARGIN_MODE, ATTACH_TPSL)
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+def create_async_client(key=None, secret=None, passphrase=None):
+    """Asynchroner Bitget-Client mit denselben Einstellungen wie trade.client (Standard: Zugang aus api.py)."""
+    import ccxt.async_support as ccxt_async
+
+    api_key, api_secret, api_passphrase = (None, None, None) if key and secret and passphrase else api_credentials()
+    return ccxt_async.bitget({
+        'apiKey': key or api_key,
+        'secret': secret or api_secret,
+        'password': passphrase or api_passphrase,
+        # Drosselung übernimmt rate_limiter.scheduler wie in trade.get_exchange; zwei Throttles
+        # wüssten nichts voneinander
+        'enableRateLimit': False,
+        'options': {'defaultType': 'future'},
+    })
+
+async def async_get_usdt_balance(rest, account_ledger=ledger, symbol=default_symbol):
+    """Wie Balance.get_usdt_balance, aber über den gepoolten AsyncBitgetClient (oder aus dem Ledger)."""
+    if account_ledger.ready.is_set() and account_ledger.available_usdt() is not None:
+        return account_ledger.available_usdt()
+    response = await rest.get(Balance.ENDPOINT, Balance.balance_params(symbol))
+    return Decimal(str(response.data['available']))
+
+async def async_get_open_positions_count(client, symbol, direction, account_ledger=ledger):
+    if account_ledger.ready.is_set():
+        return account_ledger.open_positions_count(symbol, direction)
+    path = '/api/v2/mix/position/all-position'
+    try:
+        await scheduler.acquire_async(path)
+        positions = await client.fetch_positions([symbol], params={'productType': product_type})
+    except Exception as e:
+        record_rate_limit(path, e)
+        raise
+    record_rate_limit(path)
+    count = count_positions(positions, direction)
+    logging.info(f"Anzahl offener {direction}-Positionen für {symbol}: {count}")
+    return count
+
+async def async_fetch_market_precision(client, symbol):
+    precision = market_cache.get(symbol)
+    if precision is None:
+        path = '/api/v2/mix/market/contracts'
+        try:
+            await scheduler.acquire_async(path)
+            markets = await client.load_markets(reload=True)
+        except Exception as e:
+            record_rate_limit(path, e)
+            raise
+        record_rate_limit(path)
+        market_cache.update(markets)
+        precision = market_cache.get(symbol)
+        if precision is None:
+            raise KeyError(f"Keine Marktdaten für {symbol}")
+    return precision
+
+async def async_set_leverage(client, leverage, symbol, state=leverage_state):
+    if not state.needs_update(symbol, leverage, MARGIN_MODE):
+        return
+    logging.info(f"Setze Hebel auf {leverage}x für {symbol}")
+    try:
+        await scheduler.acquire_async(SET_LEVERAGE_PATH)
+        await client.set_leverage(leverage, symbol, params={'marginMode': MARGIN_MODE})
+    except Exception as e:
+        state.invalidate(symbol)
+        record_rate_limit(SET_LEVERAGE_PATH, e)
+        raise
+    record_rate_limit(SET_LEVERAGE_PATH)
+    state.mark(symbol, leverage, MARGIN_MODE)
+
+async def async_get_price(client, symbol):
+    price = market_store.last_price(symbol)  # vom WebSocket-Feed, ohne Netzwerk
+    if price is None:
+        try:
+            await scheduler.acquire_async(TICKER_PATH)
+            price = (await client.fetch_ticker(symbol))['last']
+        except Exception as e:
+            record_rate_limit(TICKER_PATH, e)
+            raise
+        record_rate_limit(TICKER_PATH)
+    return price
+
+async def async_execute_trade(client, rest, direction, symbol=default_symbol, account_ledger=ledger,
+                              state=leverage_state, leverage=LEVERAGE, max_positions=None, risk_fraction=None,
+                              risk=risk_engine, client_oid=None, trailing=None):
+    """
+    Asynchrone Variante von logik.execute_trade.
+
+    Positionen, Saldo, Hebel, Marktpräzision und Ticker sind voneinander unabhängig und
+    werden gleichzeitig abgefragt; danach folgt nur noch create_order. Die Dauer pro Signal
+    entspricht damit ungefähr dem langsamsten Aufruf statt der Summe aller Aufrufe.
+    ``account_ledger``, ``state``, ``leverage``, die Risikolimits und ``risk`` (risk.RiskEngine)
+    erlauben mehrere Konten in einem Prozess (engine.py); ohne Angabe gelten die globalen Standardwerte.
+    ``client_oid`` kommt aus alert_queue: eine Wiederholung sendet dieselbe, die Börse lehnt eine zweite Order ab.
+    Wie trade.place_market_order trägt die Order mit ATTACH_TPSL TP/SL als Preset; die Position wird bei
+    ``trailing`` (tpsl.TrailingManager des Kontos, Standard: der laufende) angemeldet.
+
+    Returns:
+        dict: Platzierte Order oder None, wenn kein Trade ausgeführt wurde.
+    """
+    start = time.perf_counter()
+    logging.info(f"Starte Trade-Ausführung: {direction} ({symbol})")
+    open_positions, available_usdt, _, precision, price = await asyncio.gather(
+        async_get_open_positions_count(client, symbol, direction, account_ledger),
+        async_get_usdt_balance(rest, account_ledger, symbol),
+        async_set_leverage(client, leverage, symbol, state),
+        async_fetch_market_precision(client, symbol),
+        async_get_price(client, symbol),
+    )
+    logging.info(f"Vorabprüfungen in {(time.perf_counter() - start) * 1000:.1f} ms abgeschlossen")
+
+    usdt_amount = calculate_trade_amount(direction, open_positions, available_usdt, max_positions, risk_fraction)
+    if usdt_amount is None:
+        return None
+    if available_usdt is not None and not account_ledger.ready.is_set():
+        risk.on_account(available_usdt)  # ohne privaten Kanal kennt die Risiko-Engine sonst keinen Saldo
+    allowed, reason = risk.check(symbol, direction, usdt_amount, leverage)
+    if not allowed:
+        logging.warning(f"Risiko-Check: {reason}. Trade wird übersprungen.")
+        return None
+
+    side = 'buy' if direction == 'LONG' else 'sell'
+    contracts = calculate_contracts(usdt_amount, price, precision)
+    params = build_order_params(side, contracts)
+    if ATTACH_TPSL:
+        params.update(tpsl.preset_params(direction, symbol, price, precision, leverage))
+    if client_oid:
+        params['clientOid'] = client_oid
+    try:
+        await scheduler.acquire_async(PLACE_ORDER_PATH)
+        order = await client.create_order(symbol, 'market', side, contracts, params=params)
+    except Exception as e:
+        state.invalidate(symbol)
+        record_rate_limit(PLACE_ORDER_PATH, e)
+        raise
+    record_rate_limit(PLACE_ORDER_PATH)
+    risk.commit(symbol, direction, usdt_amount, leverage)
+    record_entry(symbol, side, contracts, price, params, client_oid, trailing)
+    logging.info(f"Order platziert: {order} (gesamt {(time.perf_counter() - start) * 1000:.1f} ms)")
+    return order
+
+class SignalPipeline:
+    """
+    Verteilt Signale auf einen Worker pro Symbol.
+
+    Signale für dasselbe Symbol werden strikt nacheinander in Eingangsreihenfolge
+    ausgeführt (sonst könnte das Positionslimit überschritten werden), verschiedene
+    Symbole laufen parallel.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler  # async def handler(alert)
+        self.queues = {}
+        self.workers = {}
+
+    def submit(self, alert):
+        """
+        Reiht ``alert`` beim Worker seines Symbols ein.
+
+        Returns:
+            asyncio.Future: Ergebnis bzw. Ausnahme des Handlers.
+        """
+        symbol = (alert.get("symbol") if isinstance(alert, dict) else None) or default_symbol
+        if symbol not in self.queues:
+            self.queues[symbol] = asyncio.Queue()
+            self.workers[symbol] = asyncio.create_task(self._worker(symbol), name=f"signal-{symbol}")
+        future = asyncio.get_running_loop().create_future()
+        self.queues[symbol].put_nowait((alert, future))
+        return future
+
+    async def _worker(self, symbol):
+        queue = self.queues[symbol]
+        while True:
+            alert, future = await queue.get()
+            try:
+                result = await self.handler(alert)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                logging.error(f"Fehler bei der Trade-Ausführung für {symbol}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()  # abgerufen: ohne Abnehmer keine "never retrieved"-Warnung
+            finally:
+                queue.task_done()
+
+    async def join(self):
+        for queue in list(self.queues.values()):
+            await queue.join()
+
+    async def close(self):
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+
+async def run_pipeline(alert_source):
+    """
+    Async-Laufzeit: nimmt Alerts aus ``alert_source`` (asyncio.Queue) und führt sie pro Symbol geordnet aus.
+    """
+    client = create_async_client()
+    rest = create_rest_client()
+
+    async def handle(alert):
+        direction = alert["action"] if isinstance(alert, dict) else alert
+        symbol = (alert.get("symbol") if isinstance(alert, dict) else None) or default_symbol
+        await async_execute_trade(client, rest, direction, symbol)
+
+    pipeline = SignalPipeline(handle)
+    try:
+        while True:
+            pipeline.submit(await alert_source.get())
+    finally:
+        await pipeline.close()
+        await rest.close()
+        await client.close()
@@ -0,0 +1,298 @@
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import numpy as np
+from logik import calculate_trade_amount, MAX_POSITIONS_PER_SIDE, RISK_FRACTION
+from trade import calculate_contracts, LEVERAGE
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+# Präzision von BTCUSDT (pricePlace, volumePlace, sizeMultiplier), wie sie fetch_market_precision liefert
+DEFAULT_PRECISION = {'price_precision': 1, 'amount_precision': 3, 'size_multiplier': 0.001}
+
+DEFAULT_PARAMS = {
+    'start_balance': 1000.0,
+    'max_positions': MAX_POSITIONS_PER_SIDE,
+    'risk_fraction': float(RISK_FRACTION),
+    'leverage': LEVERAGE,
+    'fee_rate': 0.0006,          # Taker-Gebühr USDT-Futures
+    'slippage_bps': 2.0,         # Aufschlag auf jede Marktorder in Basispunkten
+    'maintenance_margin': 0.004,  # Wartungsmarge Stufe 1 (BTCUSDT)
+    'tp_pct': None,               # Take-Profit in % vom Einstieg (None = keiner, wie im Live-Bot)
+    'sl_pct': None,               # Stop-Loss in % vom Einstieg
+}
+
+LONG, SHORT = 1, -1
+
+class SimExchange:
+    """
+    Simulierte Börse mit isolierter Margin.
+
+    Positionen liegen als NumPy-Spalten vor (Seite, Einstieg, Menge, Margin, Liquidations-/TP-/SL-Preis).
+    Beim Eröffnen wird der Ausstieg (TP, SL oder Liquidation) einmal vektorisiert über die
+    folgenden Kerzen gesucht, so dass pro Kerze keine Python-Schleife nötig ist.
+    """
+
+    def __init__(self, candles, params, capacity=64):
+        self.open_ = candles['open']
+        self.high = candles['high']
+        self.low = candles['low']
+        self.close = candles['close']
+        self.p = params
+        self.balance = float(params['start_balance'])  # verfügbare Margin (wie "available" bei Bitget)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.entry = np.zeros(capacity)
+        self.qty = np.zeros(capacity)
+        self.margin = np.zeros(capacity)
+        self.liq = np.zeros(capacity)
+        self.tp = np.full(capacity, np.nan)
+        self.sl = np.full(capacity, np.nan)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.exits = []  # Heap aus (kerzen_index, slot, preis, grund)
+        self.stats = {'trades': 0, 'wins': 0, 'losses': 0, 'liquidations': 0, 'take_profits': 0,
+                      'stop_losses': 0, 'fees': 0.0, 'skipped': 0}
+        self.equity = [self.balance]
+
+    def count(self, side):
+        return int(np.count_nonzero(self.active & (self.side == side)))
+
+    def _slip(self, price, side, opening):
+        direction = side if opening else -side
+        return price * (1 + direction * self.p['slippage_bps'] / 10_000)
+
+    def open(self, index, side, contracts, size_multiplier):
+        price = self._slip(self.open_[index], side, opening=True)
+        qty = contracts * size_multiplier
+        notional = qty * price
+        margin = notional / self.p['leverage']
+        fee = notional * self.p['fee_rate']
+        if margin + fee > self.balance:
+            self.stats['skipped'] += 1
+            return None
+        free = np.flatnonzero(~self.active)
+        if not len(free):
+            self.stats['skipped'] += 1
+            return None
+        slot = free[0]
+        self.balance -= float(margin + fee)
+        self.stats['fees'] += fee
+        self.side[slot] = side
+        self.entry[slot] = price
+        self.qty[slot] = qty
+        self.margin[slot] = margin
+        self.liq[slot] = price * (1 - side * (1 / self.p['leverage'] - self.p['maintenance_margin']))
+        self.tp[slot] = price * (1 + side * self.p['tp_pct'] / 100) if self.p['tp_pct'] else np.nan
+        self.sl[slot] = price * (1 - side * self.p['sl_pct'] / 100) if self.p['sl_pct'] else np.nan
+        self.active[slot] = True
+        self.stats['trades'] += 1
+        exit_index, exit_price, reason = self._find_exit(slot, index)
+        if exit_index is not None:
+            heapq.heappush(self.exits, (exit_index, slot, exit_price, reason))
+        return slot
+
+    def _find_exit(self, slot, start):
+        """Sucht die erste Kerze ab ``start``, in der Liquidation, SL oder TP greift (blockweise vektorisiert)."""
+        side = self.side[slot]
+        liq, tp, sl = self.liq[slot], self.tp[slot], self.sl[slot]
+        # Stop = der Preis, der auf dem Weg gegen die Position zuerst erreicht wird
+        if np.isnan(sl):
+            stop, stop_reason = liq, 'liquidation'
+        elif side == LONG:
+            stop, stop_reason = (sl, 'sl') if sl > liq else (liq, 'liquidation')
+        else:
+            stop, stop_reason = (sl, 'sl') if sl < liq else (liq, 'liquidation')
+        n = len(self.high)
+        i, chunk = start, 256
+        while i < n:
+            j = min(n, i + chunk)
+            if side == LONG:
+                stop_hit = self.low[i:j] <= stop
+                tp_hit = self.high[i:j] >= tp if not np.isnan(tp) else np.zeros(j - i, dtype=bool)
+            else:
+                stop_hit = self.high[i:j] >= stop
+                tp_hit = self.low[i:j] <= tp if not np.isnan(tp) else np.zeros(j - i, dtype=bool)
+            hits = stop_hit | tp_hit
+            if hits.any():
+                k = int(np.argmax(hits))
+                index = i + k
+                gap_open = self.open_[index] if index > start else stop
+                if stop_hit[k]:  # bei TP und SL in derselben Kerze konservativ den Stop annehmen
+                    price = min(stop, gap_open) if side == LONG else max(stop, gap_open)
+                    return index, price, stop_reason
+                return index, tp, 'tp'
+            i = j
+            chunk *= 2
+        return None, None, None
+
+    def close_slot(self, slot, price, reason):
+        side = self.side[slot]
+        if reason == 'liquidation':
+            pnl = -self.margin[slot]  # isolierte Margin ist komplett weg
+            fee = 0.0
+            self.stats['liquidations'] += 1
+        else:
+            price = self._slip(price, side, opening=False)
+            pnl = side * (price - self.entry[slot]) * self.qty[slot]
+            fee = price * self.qty[slot] * self.p['fee_rate']
+            self.balance += float(self.margin[slot] + pnl - fee)
+            if reason == 'tp':
+                self.stats['take_profits'] += 1
+            elif reason == 'sl':
+                self.stats['stop_losses'] += 1
+        self.stats['fees'] += fee
+        self.stats['wins' if pnl - fee > 0 else 'losses'] += 1
+        self.active[slot] = False
+        self.equity.append(self.balance + float(self.margin[self.active].sum()))
+
+    def process_exits_before(self, index):
+        """Schließt alle Positionen, deren Ausstieg vor Kerze ``index`` liegt."""
+        while self.exits and self.exits[0][0] < index:
+            _, slot, price, reason = heapq.heappop(self.exits)
+            self.close_slot(slot, price, reason)
+
+    def close_all(self, index):
+        self.process_exits_before(index + 1)
+        for slot in np.flatnonzero(self.active):
+            self.close_slot(slot, self.close[index], 'end')
+        self.exits.clear()
+
+def run_backtest(candles, alerts, params=None, precision=DEFAULT_PRECISION, quiet=True):
+    """
+    Spielt Alerts gegen historische Kerzen ab und nutzt dabei dieselben Regeln wie der Live-Bot
+    (logik.calculate_trade_amount und trade.calculate_contracts).
+
+    Args:
+        candles (dict): NumPy-Arrays 'ts' (ms, aufsteigend), 'open', 'high', 'low', 'close'.
+        alerts (list): (ts_ms, "LONG"|"SHORT"); gefüllt wird zum Open der Kerze, in die der Alert fällt.
+        params (dict): Überschreibt DEFAULT_PARAMS.
+
+    Returns:
+        dict: Kennzahlen (Endsaldo, Rendite, Trades, Liquidationen, max. Drawdown, ...).
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    exchange = SimExchange(candles, p)
+    alert_ts = np.array([a[0] for a in alerts], dtype=np.int64)
+    alert_index = np.searchsorted(candles['ts'], alert_ts, side='right') - 1
+
+    previous_level = logging.root.manager.disable
+    if quiet:
+        logging.disable(logging.CRITICAL)  # die Regeln loggen jeden Aufruf
+    try:
+        for (_, direction), index in zip(alerts, alert_index):
+            if index < 0:
+                continue
+            exchange.process_exits_before(index)
+            side = LONG if direction == 'LONG' else SHORT
+            try:
+                amount = calculate_trade_amount(direction, exchange.count(side), Decimal(str(float(exchange.balance))),
+                                                p['max_positions'], p['risk_fraction'])
+                if amount is None:
+                    continue
+                contracts = calculate_contracts(amount, candles['open'][index], precision)
+            except ValueError:
+                exchange.stats['skipped'] += 1
+                continue
+            exchange.open(index, side, contracts, precision['size_multiplier'])
+        exchange.close_all(len(candles['ts']) - 1)
+    finally:
+        logging.disable(previous_level)
+
+    equity = np.array(exchange.equity)
+    peak = np.maximum.accumulate(equity)
+    result = dict(exchange.stats)
+    result.update({
+        'final_balance': round(exchange.balance, 4),
+        'return_pct': round((exchange.balance / p['start_balance'] - 1) * 100, 3),
+        'max_drawdown_pct': round(float(((peak - equity) / peak).max() * 100), 3) if len(equity) else 0.0,
+        'fees': round(float(result['fees']), 4),
+    })
+    return result
+
+_worker_data = {}
+
+def _init_worker(candles, alerts, precision):
+    _worker_data.update(candles=candles, alerts=alerts, precision=precision)
+    logging.disable(logging.CRITICAL)
+
+def _run_worker(params):
+    return params, run_backtest(_worker_data['candles'], _worker_data['alerts'], params, _worker_data['precision'])
+
+def sweep(candles, alerts, grid, precision=DEFAULT_PRECISION, processes=None):
+    """
+    Rechnet alle Kombinationen aus ``grid`` (z.B. {'leverage': [20, 50, 100], 'sl_pct': [None, 0.3]})
+    parallel in einem Prozess-Pool durch. Die Daten werden nur einmal pro Prozess übertragen.
+
+    Returns:
+        list: (params, ergebnis) absteigend nach Endsaldo sortiert.
+    """
+    names = list(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(candles, alerts, precision)) as pool:
+        results = list(pool.map(_run_worker, combinations, chunksize=max(1, len(combinations) // 64)))
+    return sorted(results, key=lambda item: item[1]['final_balance'], reverse=True)
+
+def load_candles(symbol, granularity='1m', start=None, end=None):
+    """Kerzen aus candle_store als Dict von NumPy-Arrays."""
+    from candle_store import CandleStore
+    view = CandleStore(symbol, granularity).range(start, end)
+    return {name: np.array(view[name]) for name in ('ts', 'open', 'high', 'low', 'close')}
+
+def load_alerts(path):
+    """Alerts aus einer JSON-Zeilen-Datei: {"ts": ms, "action": "LONG"|"SHORT"} pro Zeile."""
+    alerts = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                alerts.append((int(record['ts']), record['action'].upper()))
+    return sorted(alerts)
+
+def demo_data(days=365, alert_every_minutes=90, seed=7):
+    """Zufallsdaten (1m-Kerzen) zum Testen der Laufzeit ohne echte Historie."""
+    rng = np.random.default_rng(seed)
+    n = days * 1440
+    ts = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 60_000
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0005, n)) * close
+    candles = {'ts': ts, 'open': open_, 'high': np.maximum(open_, close) + spread,
+               'low': np.minimum(open_, close) - spread, 'close': close}
+    alert_times = ts[::alert_every_minutes] + rng.integers(0, 60_000, len(ts[::alert_every_minutes]))
+    alerts = [(int(t), 'LONG' if rng.random() < 0.5 else 'SHORT') for t in alert_times]
+    return candles, alerts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest der LONG/SHORT-Alerts mit den Regeln aus logik.py.")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--granularity', default='1m')
+    parser.add_argument('--alerts', help="JSON-Zeilen-Datei mit ts/action")
+    parser.add_argument('--demo', action='store_true', help="Ein Jahr Zufallsdaten statt candle_store/alerts")
+    parser.add_argument('--sweep', action='store_true', help="Parameter-Raster über alle Kerne rechnen")
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.demo:
+        candles, alerts = demo_data()
+    else:
+        if not args.alerts:
+            parser.error("--alerts oder --demo angeben")
+        candles, alerts = load_candles(args.symbol, args.granularity), load_alerts(args.alerts)
+    logging.info(f"{len(candles['ts'])} Kerzen, {len(alerts)} Alerts")
+
+    start = time.perf_counter()
+    if args.sweep:
+        grid = {'leverage': [10, 25, 50, 100], 'risk_fraction': [0.005, 0.01, 0.02],
+                'tp_pct': [None, 0.3, 0.6], 'sl_pct': [None, 0.2, 0.4]}
+        results = sweep(candles, alerts, grid, processes=args.processes)
+        for params, result in results[:10]:
+            print(params, result)
+        logging.info(f"{len(results)} Kombinationen in {time.perf_counter() - start:.2f}s")
+    else:
+        print(run_backtest(candles, alerts))
+        logging.info(f"Backtest in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,284 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import scheduler
+from config import rest_base_url, ca_file
+from metrics import observe, inc, REST_SECONDS, REST_ERRORS
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+BASE_URL = rest_base_url  # Standard https://api.bitget.com
+VERIFY = ca_file or True
+SERVER_TIME_PATH = '/api/v2/public/time'
+SUCCESS_CODE = '00000'
+TIMESTAMP_ERROR_CODES = ('40008', '40005')  # Zeitstempel abgelaufen/ungültig -> Uhr neu abgleichen
+POOL_SIZE = 10
+TIMEOUT = 10
+
+class BitgetAPIError(Exception):
+    """Fehlerantwort der Bitget-API (HTTP-Status != 200 oder code != "00000")."""
+
+    def __init__(self, code, msg, status=None, path=None):
+        super().__init__(f"{path}: [{code}] {msg} (HTTP {status})")
+        self.code = code
+        self.msg = msg
+        self.status = status
+        self.path = path
+
+@dataclass
+class BitgetResponse:
+    """Erfolgreiche Antwort der Bitget-API."""
+    code: str
+    msg: str
+    data: Any
+    request_time: Optional[int] = None  # requestTime der Börse (ms)
+    status: int = 200
+    elapsed_ms: float = 0.0
+    raw: dict = field(default_factory=dict, repr=False)
+
+def sign(secret, timestamp, method, request_path, query_string='', body=''):
+    """
+    Bitget-Signatur: Base64(HMAC-SHA256(secret, timestamp + METHOD + path[?query] + body)).
+
+    Args:
+        secret (str): API-Secret.
+        timestamp (str): Millisekunden-Zeitstempel, identisch mit dem Header ACCESS-TIMESTAMP.
+        method (str): HTTP-Methode.
+        request_path (str): Pfad ohne Query, z.B. "/api/v2/mix/account/account".
+        query_string (str): Query ohne "?" (nur bei GET).
+        body (str): JSON-Body (nur bei POST).
+
+    Returns:
+        str: Signatur für den Header ACCESS-SIGN.
+    """
+    if query_string:
+        request_path += '?' + query_string
+    pre_hash = timestamp + method.upper() + request_path + (body or '')
+    signature = hmac.new(secret.encode('utf-8'), pre_hash.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(signature).decode()
+
+def _parse(status, text, path, elapsed_ms):
+    """Wandelt eine HTTP-Antwort in BitgetResponse um oder wirft BitgetAPIError."""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        raise BitgetAPIError(None, text[:200], status, path)
+    code = str(payload.get('code'))
+    if status != 200 or code != SUCCESS_CODE:
+        raise BitgetAPIError(code, payload.get('msg'), status, path)
+    return BitgetResponse(code, payload.get('msg'), payload.get('data'), payload.get('requestTime'),
+                          status, elapsed_ms, payload)
+
+class _SigningMixin:
+    """Gemeinsame Header-, Zeit- und Query-Logik für den synchronen und den asynchronen Client."""
+
+    def _init_signing(self, api_key, api_secret, passphrase, base_url, limiter):
+        self.limiter = limiter  # rate_limiter.RateLimiter; None schaltet die Drosselung ab
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.passphrase = passphrase
+        self.base_url = base_url.rstrip('/')
+        self.time_offset = 0  # Serverzeit - lokale Zeit in ms
+
+    def timestamp(self):
+        return str(int(time.time() * 1000) + self.time_offset)
+
+    def _prepare(self, method, path, params, body, signed):
+        query = urlencode(params) if params else ''
+        body_str = json.dumps(body) if body is not None else ''
+        headers = {'Content-Type': 'application/json', 'locale': 'en-US'}
+        if signed:
+            timestamp = self.timestamp()
+            headers.update({
+                'ACCESS-KEY': self.api_key,
+                'ACCESS-SIGN': sign(self.api_secret, timestamp, method, path, query, body_str),
+                'ACCESS-TIMESTAMP': timestamp,
+                'ACCESS-PASSPHRASE': self.passphrase,
+            })
+        url = f'{self.base_url}{path}' + (f'?{query}' if query else '')
+        return url, headers, body_str
+
+    def _record(self, path, elapsed_ms, status=200, code=None):
+        observe(REST_SECONDS, elapsed_ms / 1000, path=path)
+        if status != 200 or code is not None:
+            inc(REST_ERRORS, path=path, code=code or status)
+        if self.limiter is not None:
+            self.limiter.record(path, status, code)
+
+    def _apply_server_time(self, server_time, sent, received):
+        # Mitte der Anfrage als lokalen Bezugspunkt nehmen (halbe Round-Trip-Zeit)
+        self.time_offset = int(server_time) - int((sent + received) / 2 * 1000)
+        logging.info(f"Serverzeit abgeglichen: Offset {self.time_offset} ms")
+
+class BitgetClient(_SigningMixin):
+    """
+    Synchroner Bitget-REST-Client mit Keep-Alive-Session (Connection-Pool).
+
+    Alle Aufrufe teilen sich eine requests.Session, so dass nur die erste Anfrage je
+    Verbindung TCP- und TLS-Handshake bezahlt.
+    """
+
+    def __init__(self, api_key=None, api_secret=None, passphrase=None, base_url=BASE_URL, timeout=TIMEOUT,
+                 pool_size=POOL_SIZE, verify=VERIFY, limiter=scheduler):
+        self._init_signing(api_key, api_secret, passphrase, base_url, limiter)
+        self.timeout = timeout
+        self.verify = verify  # True, False oder Pfad zu einem CA-/Zertifikat (z.B. rest_stub)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def sync_time(self):
+        """Gleicht die lokale Uhr mit /api/v2/public/time ab (ACCESS-TIMESTAMP muss auf ±30 s stimmen)."""
+        sent = time.time()
+        response = self.request('GET', SERVER_TIME_PATH, signed=False)
+        self._apply_server_time(response.data['serverTime'], sent, time.time())
+        return self.time_offset
+
+    def request(self, method, path, params=None, body=None, signed=True, retry_on_timestamp=True, lane=None):
+        """
+        Führt eine (signierte) Anfrage aus, sobald der Rate-Limiter sie freigibt.
+
+        ``lane`` überschreibt die Spur des Endpunkts (rate_limiter.ORDER/ACCOUNT/POLL).
+
+        Returns:
+            BitgetResponse: Antwort mit ``data`` aus dem Bitget-Umschlag.
+
+        Raises:
+            BitgetAPIError: Bei HTTP-Fehlern oder code != "00000".
+        """
+        if self.limiter is not None:
+            self.limiter.acquire(path, lane)
+        url, headers, body_str = self._prepare(method, path, params, body, signed)
+        start = time.perf_counter()
+        # verify je Anfrage übergeben: Session.verify würde von REQUESTS_CA_BUNDLE überschrieben
+        response = self.session.request(method, url, headers=headers, data=body_str or None, timeout=self.timeout,
+                                        verify=self.verify)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        try:
+            result = _parse(response.status_code, response.text, path, elapsed_ms)
+        except BitgetAPIError as e:
+            self._record(path, elapsed_ms, e.status, e.code)
+            if signed and retry_on_timestamp and e.code in TIMESTAMP_ERROR_CODES:
+                self.sync_time()
+                return self.request(method, path, params, body, signed, retry_on_timestamp=False, lane=lane)
+            raise
+        self._record(path, elapsed_ms)
+        return result
+
+    def get(self, path, params=None, signed=True, lane=None):
+        return self.request('GET', path, params=params, signed=signed, lane=lane)
+
+    def post(self, path, body=None, signed=True, lane=None):
+        return self.request('POST', path, body=body, signed=signed, lane=lane)
+
+    def close(self):
+        self.session.close()
+
+class AsyncBitgetClient(_SigningMixin):
+    """
+    Asynchrone Variante von BitgetClient auf Basis einer aiohttp.ClientSession mit Connection-Pool.
+
+    Die Session wird beim ersten Aufruf im laufenden Event-Loop angelegt.
+    """
+
+    def __init__(self, api_key=None, api_secret=None, passphrase=None, base_url=BASE_URL, timeout=TIMEOUT,
+                 pool_size=POOL_SIZE, verify=VERIFY, limiter=scheduler):
+        self._init_signing(api_key, api_secret, passphrase, base_url, limiter)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        if isinstance(verify, str):
+            self.ssl = ssl.create_default_context(cafile=verify)
+        else:
+            self.ssl = None if verify else False
+        self.session = None
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            import aiohttp
+
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ssl=self.ssl),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def sync_time(self):
+        sent = time.time()
+        response = await self.request('GET', SERVER_TIME_PATH, signed=False)
+        self._apply_server_time(response.data['serverTime'], sent, time.time())
+        return self.time_offset
+
+    async def request(self, method, path, params=None, body=None, signed=True, retry_on_timestamp=True, lane=None):
+        if self.limiter is not None:
+            await self.limiter.acquire_async(path, lane)
+        url, headers, body_str = self._prepare(method, path, params, body, signed)
+        start = time.perf_counter()
+        async with self._session().request(method, url, headers=headers, data=body_str or None) as response:
+            text = await response.text()
+            status = response.status
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        try:
+            result = _parse(status, text, path, elapsed_ms)
+        except BitgetAPIError as e:
+            self._record(path, elapsed_ms, e.status, e.code)
+            if signed and retry_on_timestamp and e.code in TIMESTAMP_ERROR_CODES:
+                await self.sync_time()
+                return await self.request(method, path, params, body, signed, retry_on_timestamp=False, lane=lane)
+            raise
+        self._record(path, elapsed_ms)
+        return result
+
+    async def get(self, path, params=None, signed=True, lane=None):
+        return await self.request('GET', path, params=params, signed=signed, lane=lane)
+
+    async def post(self, path, body=None, signed=True, lane=None):
+        return await self.request('POST', path, body=body, signed=signed, lane=lane)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key=None, api_secret=None, passphrase=None, base_url=BASE_URL):
+    """
+    Liefert einen prozessweit geteilten BitgetClient je API-Key (Standard: Zugangsdaten aus api.py).
+    """
+    if api_key is None:
+        from api import api_key, api_secret, api_passphrase as passphrase
+    key = (api_key, base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = BitgetClient(api_key, api_secret, passphrase, base_url)
+        return _clients[key]
+
+def create_async_client(api_key=None, api_secret=None, passphrase=None, base_url=BASE_URL):
+    """Neuer AsyncBitgetClient (Standard: Zugangsdaten aus api.py); mit ``close()`` schließen."""
+    if api_key is None:
+        from api import api_key, api_secret, api_passphrase as passphrase
+    return AsyncBitgetClient(api_key, api_secret, passphrase, base_url)
+
+if __name__ == "__main__":
+    # Serverzeit-Offset zur echten Börse anzeigen (ohne Zugangsdaten)
+    client = BitgetClient()
+    for _ in range(3):
+        client.sync_time()
+        print(f"⏱️ Round-Trip {client.request('GET', SERVER_TIME_PATH, signed=False).elapsed_ms:.1f} ms")
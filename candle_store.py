@@ -0,0 +1,177 @@
+import argparse
+import logging
+import os
+import threading
+import time
+import numpy as np
+from data import fetch_bitget_candles, HISTORY_CANDLES_URL
+from market_store import GRANULARITY_MS
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+STORE_DIR = "candles"
+HISTORY_PAGE_LIMIT = 200  # Maximum von /history-candles pro Anfrage
+HISTORY_PAGE_PAUSE = 0.06  # ~16 Anfragen/s, unter dem Limit von 20/s
+
+# Feste Satzbreite (48 Byte): Datei = lückenlose Folge dieser Sätze, aufsteigend nach ts
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+
+class CandleStore:
+    """
+    Persistenter Kerzenspeicher je Symbol/Granularität als Datei fester Satzbreite.
+
+    Neue Kerzen werden nur angehängt (die letzte darf überschrieben werden, solange sie
+    läuft), doppelte Zeitstempel werden verworfen. Lesen geht über np.memmap, so dass
+    Bereichsabfragen Views auf die Datei liefern statt Kopien.
+    """
+
+    def __init__(self, symbol, granularity="1m", directory=STORE_DIR):
+        self.symbol = symbol
+        self.granularity = granularity
+        self.interval = GRANULARITY_MS[granularity]
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{symbol}_{granularity}.bin")
+        self._lock = threading.Lock()
+        self._map = None
+        self._map_rows = -1
+
+    def __len__(self):
+        return os.path.getsize(self.path) // CANDLE_DTYPE.itemsize if os.path.exists(self.path) else 0
+
+    def _view(self):
+        """Memory-Map der Datei; wird nur neu angelegt, wenn die Datei gewachsen ist."""
+        rows = len(self)
+        if rows == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        if self._map is None or self._map_rows != rows:
+            self._map = np.memmap(self.path, dtype=CANDLE_DTYPE, mode="r", shape=(rows,))
+            self._map_rows = rows
+        return self._map
+
+    @property
+    def first_ts(self):
+        view = self._view()
+        return int(view["ts"][0]) if len(view) else None
+
+    @property
+    def last_ts(self):
+        view = self._view()
+        return int(view["ts"][-1]) if len(view) else None
+
+    def append(self, rows):
+        """
+        Hängt Kerzen (ts, o, h, l, c, v) an. Bereits gespeicherte Zeitstempel werden übersprungen,
+        außer der letzten Kerze, die aktualisiert wird. Ältere, noch fehlende Kerzen (Backfill)
+        werden per merge() einsortiert.
+
+        Returns:
+            int: Anzahl neu geschriebener Kerzen.
+        """
+        rows = sorted({int(row[0]): tuple(row) for row in rows}.values())
+        if not rows:
+            return 0
+        with self._lock:
+            last_ts = self.last_ts
+            if last_ts is not None and rows[0][0] < last_ts:
+                return self._merge(rows)
+            new = np.array([row for row in rows if last_ts is None or row[0] > last_ts], dtype=CANDLE_DTYPE)
+            if last_ts is not None and rows[0][0] == last_ts:
+                with open(self.path, "r+b") as f:
+                    f.seek(-CANDLE_DTYPE.itemsize, os.SEEK_END)
+                    f.write(np.array([rows[0]], dtype=CANDLE_DTYPE).tobytes())
+            with open(self.path, "ab") as f:
+                f.write(new.tobytes())
+            return len(new)
+
+    def _merge(self, rows):
+        """Sortiert ältere Kerzen ein; schreibt die Datei einmal neu (nur beim Backfill nötig)."""
+        existing = np.array(self._view())
+        incoming = np.array(rows, dtype=CANDLE_DTYPE)
+        incoming = incoming[~np.isin(incoming["ts"], existing["ts"][:-1])]  # letzte Kerze darf ersetzt werden
+        merged = np.concatenate((existing, incoming))
+        # stabile Sortierung + letzter Eintrag je ts gewinnt
+        order = np.argsort(merged["ts"], kind="stable")
+        merged = merged[order]
+        keep = np.append(merged["ts"][1:] != merged["ts"][:-1], True)
+        merged = merged[keep]
+        tmp_path = self.path + ".tmp"
+        merged.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+        self._map = None
+        return len(merged) - len(existing)
+
+    def range(self, start=None, end=None):
+        """
+        Kerzen mit start <= ts < end (ms) als strukturierter View auf die Datei (keine Kopie).
+        """
+        view = self._view()
+        lo = 0 if start is None else int(np.searchsorted(view["ts"], start, side="left"))
+        hi = len(view) if end is None else int(np.searchsorted(view["ts"], end, side="left"))
+        return view[lo:hi]
+
+    def last(self, n):
+        view = self._view()
+        return view[max(0, len(view) - n):]
+
+    def to_dataframe(self, start=None, end=None):
+        """DataFrame im Format von data.fetch_bitget_klines; die Spalten zeigen auf die Memory-Map."""
+        import pandas as pd
+
+        view = self.range(start, end)
+        df = pd.DataFrame({
+            "Open": view["open"], "High": view["high"], "Low": view["low"],
+            "Close": view["close"], "Volume": view["volume"],
+        }, index=pd.to_datetime(view["ts"], unit="ms", utc=True), copy=False)
+        df.index.name = "Timestamp"
+        return df
+
+    def backfill(self, start_ms, end_ms=None, fetch=fetch_bitget_candles):
+        """
+        Lädt fehlende Historie seitenweise (rückwärts ab ``end_ms``) von /history-candles nach.
+
+        Returns:
+            int: Anzahl neu gespeicherter Kerzen.
+        """
+        end_ms = end_ms or int(time.time() * 1000)
+        end_ms -= end_ms % self.interval
+        first_ts, last_ts = self.first_ts, self.last_ts
+        added = 0
+        # Bereits vorhandene Strecke überspringen: nur vor first_ts und nach last_ts laden
+        spans = [(start_ms, end_ms)] if first_ts is None else [
+            (last_ts + self.interval, end_ms), (start_ms, first_ts - self.interval)]
+        for span_start, span_end in spans:
+            cursor = span_end
+            while cursor >= span_start:
+                rows = fetch(self.symbol, self.granularity, HISTORY_PAGE_LIMIT,
+                             max(span_start, cursor - (HISTORY_PAGE_LIMIT - 1) * self.interval),
+                             cursor + self.interval, url=HISTORY_CANDLES_URL)
+                rows = [row for row in rows if span_start <= row[0] <= cursor]
+                if not rows:
+                    break
+                added += self.append(rows)
+                cursor = rows[0][0] - self.interval
+                time.sleep(HISTORY_PAGE_PAUSE)
+        logging.info(f"Backfill {self.symbol} {self.granularity}: {added} neue Kerzen, gesamt {len(self)}")
+        return added
+
+    def warm(self, window):
+        """Füllt ein market_store.CandleWindow aus der Datei (z.B. nach einem Neustart)."""
+        rows = self.last(window.capacity)
+        window.merge([tuple(row) for row in rows.tolist()])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kerzen-Historie von Bitget lokal speichern.")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--granularity", default="1m")
+    parser.add_argument("--days", type=float, default=7, help="Wie viele Tage zurück geladen werden")
+    args = parser.parse_args()
+
+    store = CandleStore(args.symbol, args.granularity)
+    now = int(time.time() * 1000)
+    store.backfill(now - int(args.days * 86_400_000), now)
+    start = time.perf_counter()
+    df = store.to_dataframe(now - 86_400_000, now)
+    logging.info(f"Letzte 24h: {len(df)} Kerzen in {(time.perf_counter() - start) * 1000:.2f} ms gelesen")
@@ -1,17 +1,12 @@
 import argparse
-import requests
-import time
-import hashlib
-import hmac
 import uuid
-import json
+from bitget_client import get_client, BitgetAPIError
 
-def generate_signature(secret, timestamp, method, request_path, body):
-    string_to_sign = f"{timestamp}{method.upper()}{request_path}{body}"
-    sign = hmac.new(secret.encode('utf-8'), string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
-    return sign
+MODIFY_ORDER_PATH = "/api/v2/mix/order/modify-order"
 
-def modify_order(api_key, api_secret, passphrase, order_id=None, client_oid=None, symbol=None, product_type=None, new_tp=None, new_client_oid=None):
+def build_modify_body(order_id=None, client_oid=None, symbol=None, product_type=None, new_tp=None, new_sl=None,
+                      new_client_oid=None):
+    """Body für modify-order (auch von tp_manager genutzt)."""
     # Validate that either order_id or client_oid is provided
     if order_id is None and client_oid is None:
         raise ValueError("Either order_id or client_oid must be provided.")
@@ -25,57 +20,54 @@ def modify_order(api_key, api_secret, passphrase, order_id=None, client_oid=None
         "symbol": symbol,
         "productType": product_type,
         "newClientOid": new_client_oid,
-        "newPresetStopSurplusPrice": new_tp
     }
+    if new_tp is not None:
+        body["newPresetStopSurplusPrice"] = str(new_tp)
+    if new_sl is not None:
+        body["newPresetStopLossPrice"] = str(new_sl)
     if order_id:
         body["orderId"] = order_id
     if client_oid:
         body["clientOid"] = client_oid
-    
-    body_str = json.dumps(body)
-    
-    # Prepare API request
-    timestamp = str(int(time.time() * 1000))
-    method = "POST"
-    request_path = "/api/v2/mix/order/modify-order"
-    sign = generate_signature(api_secret, timestamp, method, request_path, body_str)
-    
-    headers = {
-        "ACCESS-KEY": api_key,
-        "ACCESS-SIGN": sign,
-        "ACCESS-PASSPHRASE": passphrase,
-        "ACCESS-TIMESTAMP": timestamp,
-        "Content-Type": "application/json",
-        "locale": "en-US"
-    }
-    
-    url = "https://api.bitget.com/api/v2/mix/order/modify-order"
-    response = requests.post(url, headers=headers, data=body_str)
-    
-    # Handle response
-    if response.status_code == 200:
-        result = response.json()
-        return result
-    else:
-        raise Exception(f"API request failed with status code {response.status_code}: {response.text}")
+    return body
+
+def modify_order(api_key, api_secret, passphrase, order_id=None, client_oid=None, symbol=None, product_type=None, new_tp=None, new_client_oid=None, new_sl=None, client=None):
+    body = build_modify_body(order_id, client_oid, symbol, product_type, new_tp, new_sl, new_client_oid)
+    # Signierter POST über den geteilten Client (Base64-Signatur, Keep-Alive)
+    client = client or get_client(api_key, api_secret, passphrase)
+    return client.post(MODIFY_ORDER_PATH, body)
 
 def main():
     parser = argparse.ArgumentParser(description="Modify the take-profit (TP) of a pending order on Bitget.")
-    parser.add_argument('--api-key', required=True, help="API key")
-    parser.add_argument('--api-secret', required=True, help="API secret")
-    parser.add_argument('--passphrase', required=True, help="API passphrase")
+    parser.add_argument('--api-key', required=False, help="API key (required unless --dry-run)")
+    parser.add_argument('--api-secret', required=False, help="API secret (required unless --dry-run)")
+    parser.add_argument('--passphrase', required=False, help="API passphrase (required unless --dry-run)")
     parser.add_argument('--order-id', required=False, help="Order ID")
     parser.add_argument('--client-oid', required=False, help="Client Order ID")
     parser.add_argument('--symbol', required=True, help="Trading pair, e.g., ETHUSDT")
     parser.add_argument('--product-type', required=True, help="Product type, e.g., usdt-futures")
-    parser.add_argument('--new-tp', required=True, help="New take-profit price, e.g., 2000.00")
+    parser.add_argument('--new-tp', required=False, help="New take-profit price, e.g., 2000.00")
+    parser.add_argument('--new-sl', required=False, help="New stop-loss price (optional)")
     parser.add_argument('--new-client-oid', required=False, help="New client order ID (optional)")
+    parser.add_argument('--dry-run', action='store_true', help="Send to a local HTTPS stub instead of Bitget")
 
     args = parser.parse_args()
 
     if not args.order_id and not args.client_oid:
         print("Error: Either --order-id or --client-oid must be provided.")
         exit(1)
+    if args.new_tp is None and args.new_sl is None:
+        print("Error: Either --new-tp or --new-sl must be provided.")
+        exit(1)
+
+    client = None
+    if args.dry_run:
+        from rest_stub import RestStubServer
+        stub = RestStubServer().start()
+        client = stub.client()
+    elif not (args.api_key and args.api_secret and args.passphrase):
+        print("Error: --api-key, --api-secret and --passphrase are required without --dry-run.")
+        exit(1)
 
     try:
         result = modify_order(
@@ -87,14 +79,17 @@ def main():
             symbol=args.symbol,
             product_type=args.product_type,
             new_tp=args.new_tp,
-            new_client_oid=args.new_client_oid
+            new_client_oid=args.new_client_oid,
+            new_sl=args.new_sl,
+            client=client
         )
-        if result["code"] == "00000":
-            print("Order TP modified successfully.")
-            print(f"Order ID: {result['data']['orderId']}")
-            print(f"Client OID: {result['data']['clientOid']}")
-        else:
-            print(f"API Error: {result['msg']}")
+        if args.dry_run:
+            print(f"Dry run: {stub.calls[-1][0]} {stub.calls[-1][1]} {stub.calls[-1][2]}")
+        print("Order TP modified successfully.")
+        print(f"Order ID: {result.data['orderId']}")
+        print(f"Client OID: {result.data['clientOid']}")
+    except BitgetAPIError as e:
+        print(f"API Error: {e.msg}")
     except Exception as e:
         print(f"Error: {str(e)}")
 
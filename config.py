@@ -1,3 +1,24 @@
+import os
+
 symbol = "BTCUSDT"
 product_type = "USDT-FUTURES"
 margin_coin = "USDT"
+
+# Mehrere Märkte und (Unter-)Konten in einem Prozess (engine.py).
+# "credentials": Modul mit api_key/api_secret/api_passphrase (wie api.py).
+# Je Symbol eigene Risikolimits; fehlende Werte kommen aus den Standardwerten in logik.py.
+accounts = [
+    {
+        "name": "main",
+        "credentials": "api",
+        "symbols": {
+            symbol: {"max_positions": 3, "risk_fraction": "0.01", "leverage": 100},
+        },
+    },
+]
+
+# Börsen-Endpunkte; für den lokalen Simulator (exchange_sim.py) per Umgebungsvariablen umleiten
+rest_base_url = os.environ.get("BITGET_REST_URL", "https://api.bitget.com")
+ws_public_url = os.environ.get("BITGET_WS_PUBLIC", "wss://ws.bitget.com/v2/ws/public")
+ws_private_url = os.environ.get("BITGET_WS_PRIVATE", "wss://ws.bitget.com/v2/ws/private")
+ca_file = os.environ.get("BITGET_CA_FILE")  # Zertifikat des Simulators (selbstsigniert)
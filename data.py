@@ -1,8 +1,10 @@
-import pandas as pd
 import requests
 import time
 from datetime import datetime, timedelta, UTC
 import logging
+from urllib.parse import urlsplit
+from rate_limiter import scheduler
+from config import rest_base_url, ca_file
 
 # Logging einrichten
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -40,6 +42,50 @@ def calculate_vwap_last_60(df):
     vwap = df_last_60['TPV'].sum() / df_last_60['Volume'].sum()
     return float(vwap)  # Optional: Rückgabe als float oder Decimal
 
+CANDLES_URL = f"{rest_base_url}/api/v2/mix/market/candles"
+HISTORY_CANDLES_URL = f"{rest_base_url}/api/v2/mix/market/history-candles"
+
+def fetch_bitget_candles(symbol="BTCUSDT", granularity="1m", limit=200, start_time=None, end_time=None,
+                         url=CANDLES_URL):
+    """
+    Ruft Kerzen als Rohdaten ab (ohne pandas), z.B. für den Backfill des Kerzenspeichers.
+
+    Parameter:
+    - start_time / end_time (int): Zeitraum in Millisekunden (optional).
+
+    Rückgabe:
+    - list: Tupel (ts_ms, open, high, low, close, volume), aufsteigend sortiert.
+    """
+    params = {
+        "symbol": symbol,
+        "granularity": granularity,
+        "productType": "usdt-futures",
+        "limit": limit
+    }
+    if start_time is not None:
+        params["startTime"] = int(start_time)
+    if end_time is not None:
+        params["endTime"] = int(end_time)
+
+    path = urlsplit(url).path
+    scheduler.acquire(path)  # Spur POLL: Orders haben Vorrang
+    response = requests.get(url, params=params, verify=ca_file or True)
+    scheduler.record(path, response.status_code)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") != "00000":
+        raise Exception(f"API-Fehler: {data.get('msg')}")
+    rows = [(int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]))
+            for k in data.get("data", [])]
+    rows.sort()
+    return rows
+
+def calculate_vwap_from_store(symbol="BTCUSDT", granularity="1m"):
+    """VWAP der letzten 60 Kerzen aus dem WebSocket-Kerzenspeicher, ohne Netzwerkzugriff."""
+    from market_store import market_store
+    from vwap import calculate_vwap
+    return calculate_vwap(market_store.candles(symbol, granularity).to_dataframe(last=60), window=60)
+
 def fetch_bitget_klines(symbol="BTCUSDT", granularity="1m", num_candles=60):
     """
     Ruft die neuesten historischen Kerzendaten von der Bitget API ab.
@@ -52,40 +98,24 @@ def fetch_bitget_klines(symbol="BTCUSDT", granularity="1m", num_candles=60):
     Rückgabe:
     - pd.DataFrame: DataFrame mit den Spalten 'Open', 'High', 'Low', 'Close', 'Volume'.
     """
-    base_url = "https://api.bitget.com/api/v2/mix/market/candles"
-    
     # Aktuelle Zeit in UTC
     current_time = datetime.now(UTC)
     
     logging.info(f"Fetching {num_candles} candles, current time: {current_time}")
     
-    params = {
-        "symbol": symbol,
-        "granularity": granularity,
-        "productType": "usdt-futures",
-        "limit": num_candles
-    }
-    
     try:
-        logging.info(f"Making API request: {params}")
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get("code") != "00000":
-            raise Exception(f"API-Fehler: {data.get('msg')}")
-        
-        klines = data.get("data", [])
+        logging.info(f"Making API request: {symbol} {granularity} limit={num_candles}")
+        klines = fetch_bitget_candles(symbol, granularity, num_candles)
         if not klines:
             raise Exception("Keine Daten von der API erhalten.")
         
-        # In DataFrame umwandeln
-        df = pd.DataFrame(klines, columns=["Timestamp", "Open", "High", "Low", "Close", "Volume", "QuoteVolume"])
-        df["Timestamp"] = pd.to_datetime(df["Timestamp"].astype(float), unit="ms", utc=True)
-        df[["Open", "High", "Low", "Close", "Volume"]] = df[["Open", "High", "Low", "Close", "Volume"]].astype(float)
+        # In DataFrame umwandeln (pandas erst hier laden, der Markt-Feed braucht es nicht)
+        import pandas as pd
+
+        df = pd.DataFrame(klines, columns=["Timestamp", "Open", "High", "Low", "Close", "Volume"])
+        df["Timestamp"] = pd.to_datetime(df["Timestamp"], unit="ms", utc=True)
         df.set_index("Timestamp", inplace=True)
         df.sort_index(inplace=True)
-        df.drop(columns=["QuoteVolume"], inplace=True)
         
         # Überprüfen, ob die Daten aktuell sind (max. 2 Minuten Verzögerung)
         latest_candle_time = df.index[-1]
@@ -0,0 +1,454 @@
+import argparse
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import time
+from decimal import Decimal
+from functools import partial
+from alert_queue import MAX_ATTEMPTS, RETRY_BACKOFF, ORDER_DETAIL_PATH, ORDER_NOT_FOUND_CODES, settle
+from config import accounts as configured_accounts, symbol as default_symbol
+from logik import MAX_POSITIONS_PER_SIDE, RISK_FRACTION, calculate_trade_amount
+from market_store import market_store
+from ledger import Ledger, PrivateStream, ledger as default_ledger
+from trade import LeverageState, LEVERAGE, calculate_contracts, build_order_params
+from risk import RiskEngine, risk_engine
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+# Präzision für den Dry-Run, wenn keine Marktdaten geladen sind (BTCUSDT-Perpetual)
+DRY_RUN_PRECISION = {'price_precision': 1, 'amount_precision': 3, 'size_multiplier': 0.001}
+DRY_RUN_BALANCE = Decimal('1000')
+
+def direction_and_symbol(alert):
+    if isinstance(alert, dict):
+        return alert["action"], alert.get("symbol") or default_symbol
+    return alert, default_symbol
+
+class RiskLimits:
+    """Risikolimits eines Symbols in einem Konto (ersetzt die festen 3 Positionen / 1% aus logik.py)."""
+
+    def __init__(self, max_positions=MAX_POSITIONS_PER_SIDE, risk_fraction=RISK_FRACTION, leverage=LEVERAGE):
+        self.max_positions = int(max_positions)
+        self.risk_fraction = Decimal(str(risk_fraction))
+        self.leverage = int(leverage)
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(**(cfg or {}))
+
+    def __repr__(self):
+        return f"RiskLimits({self.max_positions}, {self.risk_fraction}, {self.leverage}x)"
+
+class Account:
+    """
+    Ein (Unter-)Konto mit eigenen Zugangsdaten, Ledger, Hebel-Stand und Risikolimits je Symbol.
+
+    Im Dry-Run wird nichts gesendet: Saldo und Positionen kommen aus einem lokalen Ledger,
+    die berechnete Order wird nur zurückgegeben.
+    """
+
+    def __init__(self, name, credentials="api", symbols=None, dry_run=False):
+        self.name = name
+        self.credentials = credentials
+        self.limits = {symbol: RiskLimits.from_config(cfg) for symbol, cfg in (symbols or {}).items()}
+        self.dry_run = dry_run
+        # Das Standardkonto teilt sich das Ledger mit logik.py
+        self.ledger = default_ledger if credentials == "api" and not dry_run else Ledger()
+        self.leverage_state = LeverageState()
+        self.risk = risk_engine if self.ledger is default_ledger else RiskEngine().attach(self.ledger)
+        self.client = None
+        self.rest = None
+        self.stream = None
+        self.trailing = None  # tpsl.TrailingManager dieses Kontos (nur mit trade.ATTACH_TPSL)
+        self._stream_task = None
+        self.executed = 0
+
+    @classmethod
+    def from_config(cls, cfg, dry_run=False):
+        return cls(cfg["name"], cfg.get("credentials", "api"), cfg.get("symbols"), dry_run)
+
+    def load_credentials(self):
+        module = importlib.import_module(self.credentials)
+        return module.api_key, module.api_secret, module.api_passphrase
+
+    async def start(self):
+        if self.dry_run:
+            self.ledger.available = DRY_RUN_BALANCE
+            self.ledger.ready.set()
+            return
+        from async_trade import create_async_client
+        from bitget_client import create_async_client as create_rest_client, get_client
+        from tp_manager import TPSLService
+        from tpsl import TrailingManager
+        from trade import create_exchange, ATTACH_TPSL
+
+        key, secret, passphrase = self.load_credentials()
+        self.client = create_async_client(key, secret, passphrase)
+        self.rest = create_rest_client(key, secret, passphrase)
+        # Der REST-Abgleich des Ledgers muss dieses Konto abfragen, nicht api.py
+        self.stream = PrivateStream(self.ledger, key, secret, passphrase,
+                                    exchange=create_exchange(key, secret, passphrase),
+                                    balance_client=get_client(key, secret, passphrase))
+        self._stream_task = asyncio.create_task(self.stream.run(), name=f"private-{self.name}")
+        if ATTACH_TPSL:
+            # SL offener Positionen nachziehen, über dieses Konto statt über api.py
+            service = TPSLService(partial(create_rest_client, key, secret, passphrase)).start()
+            self.trailing = TrailingManager(service, self.ledger).start()
+
+    async def existing_order(self, symbol, client_oid):
+        """Die Order mit ``client_oid``, wenn dieses Konto sie schon hat (sonst None)."""
+        from bitget_client import BitgetAPIError
+        from config import product_type
+
+        try:
+            response = await self.rest.get(ORDER_DETAIL_PATH, {"symbol": symbol, "productType": product_type,
+                                                               "clientOid": client_oid})
+        except BitgetAPIError as e:
+            if e.code in ORDER_NOT_FOUND_CODES:
+                return None
+            raise
+        return response.data
+
+    async def execute(self, alert):
+        """
+        Führt einen Alert mit den Limits dieses Kontos aus (Aufruf aus dem Worker des Symbols).
+        Alerts aus der alert_queue tragen "client_oid" und "attempt"; ab dem zweiten Versuch wird
+        zuerst geprüft, ob die Order schon angekommen ist.
+        """
+        direction, symbol = direction_and_symbol(alert)
+        limits = self.limits[symbol]
+        client_oid = alert.get("client_oid") if isinstance(alert, dict) else None
+        if self.dry_run:
+            order = self._dry_run_order(direction, symbol, limits, alert, client_oid)
+        else:
+            from async_trade import async_execute_trade
+
+            if client_oid and alert.get("attempt", 1) > 1:
+                existing = await self.existing_order(symbol, client_oid)
+                if existing is not None:
+                    logging.info(f"[{self.name}] Order {client_oid} existiert bereits, wird nicht erneut gesendet")
+                    return existing
+            order = await async_execute_trade(self.client, self.rest, direction, symbol, self.ledger,
+                                              self.leverage_state, limits.leverage, limits.max_positions,
+                                              limits.risk_fraction, self.risk, client_oid, self.trailing)
+        if order is not None:
+            self.executed += 1
+        return order
+
+    def _dry_run_order(self, direction, symbol, limits, alert, client_oid=None):
+        open_positions = self.ledger.open_positions_count(symbol, direction)
+        amount = calculate_trade_amount(direction, open_positions, self.ledger.available_usdt(),
+                                        limits.max_positions, limits.risk_fraction)
+        if amount is None:
+            return None
+        price = market_store.last_price(symbol) or float((alert.get("price") if isinstance(alert, dict) else None)
+                                                         or 80000)
+        side = 'buy' if direction == 'LONG' else 'sell'
+        contracts = calculate_contracts(amount, price, DRY_RUN_PRECISION)
+        params = build_order_params(side, contracts)
+        if client_oid:
+            params["clientOid"] = client_oid
+        return {"account": self.name, "symbol": symbol, "side": side, "params": params}
+
+    async def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self._stream_task.cancel()
+        if self.trailing is not None:
+            self.trailing.stop()
+            await asyncio.get_running_loop().run_in_executor(None, self.trailing.service.stop)
+        for client in (self.client, self.rest):
+            if client is not None:
+                await client.close()
+
+class TradingEngine:
+    """
+    Mehrere Symbole und Konten in einem Prozess.
+
+    Alerts werden nach Symbol (und optional "account") an die Konten verteilt, die das Symbol
+    handeln. Jedes Konto hat eine SignalPipeline mit einem Worker je Symbol: dasselbe Symbol
+    läuft geordnet, alles andere parallel. Marktdaten (Ticker/Kerzen) kommen aus einem
+    gemeinsamen BitgetMarketFeed für alle Symbole.
+    """
+
+    def __init__(self, accounts, market_feed=True):
+        from async_trade import SignalPipeline
+
+        self.accounts = {account.name: account for account in accounts}
+        self.routes = {}  # symbol -> [Account]
+        for account in accounts:
+            for symbol in account.limits:
+                self.routes.setdefault(symbol, []).append(account)
+        self.pipelines = {name: SignalPipeline(account.execute) for name, account in self.accounts.items()}
+        self.market_feed = market_feed
+        self.feed = None
+        self._feed_task = None
+        self.routed = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_config(cls, accounts_cfg=None, dry_run=False, market_feed=True):
+        return cls([Account.from_config(cfg, dry_run) for cfg in (accounts_cfg or configured_accounts)], market_feed)
+
+    @property
+    def symbols(self):
+        return sorted(self.routes)
+
+    def route(self, alert):
+        """Konten, die den Alert ausführen sollen."""
+        _, symbol = direction_and_symbol(alert)
+        targets = self.routes.get(symbol, [])
+        account = alert.get("account") if isinstance(alert, dict) else None
+        if account is not None:
+            targets = [a for a in targets if a.name == account]
+        return targets
+
+    def submit(self, alert):
+        targets = self.route(alert)
+        if not targets:
+            self.dropped += 1
+            logging.warning(f"Kein Konto handelt {direction_and_symbol(alert)[1]} – Alert verworfen: {alert}")
+            return 0
+        if isinstance(alert, str):
+            alert = {"action": alert, "symbol": default_symbol}
+        for account in targets:
+            self.pipelines[account.name].submit(alert)
+        self.routed += 1
+        return len(targets)
+
+    def submit_queued(self, item):
+        """
+        Verteilt einen alert_queue.QueuedAlert mit seiner clientOid an die Konten.
+
+        Returns:
+            list: Ein asyncio.Future je Konto (leer, wenn kein Konto das Symbol handelt).
+        """
+        alert = item.alert
+        if isinstance(alert, str):
+            alert = {"action": alert, "symbol": default_symbol}
+        alert = dict(alert, client_oid=item.client_oid, attempt=item.attempts)
+        targets = self.route(alert)
+        if not targets:
+            self.dropped += 1
+            return []
+        self.routed += 1
+        return [self.pipelines[account.name].submit(alert) for account in targets]
+
+    async def _settle(self, queue, item, futures, max_attempts, retry_backoff):
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if not futures:
+            errors = [ValueError(f"Kein Konto handelt {direction_and_symbol(item.alert)[1]}")]
+        await asyncio.get_running_loop().run_in_executor(
+            None, partial(settle, queue, item, results, errors[0] if errors else None, max_attempts, retry_backoff))
+
+    async def run_queue(self, queue, wake, idle_wait=0.05, max_attempts=MAX_ATTEMPTS, retry_backoff=RETRY_BACKOFF):
+        """
+        Wie run(), aber aus der dauerhaften alert_queue.AlertQueue; ``wake`` (asyncio.Event) nach jedem put() setzen.
+
+        Beim Start werden beim Absturz unterbrochene Alerts wieder eingereiht. Ein Alert gilt erst als
+        erledigt, wenn alle Konten fertig sind; sonst wird er mit derselben clientOid wiederholt
+        (alert_queue.settle), bereits angekommene Orders erkennt Account.execute und sendet sie nicht erneut.
+        """
+        loop = asyncio.get_running_loop()
+        await self.start()
+        await loop.run_in_executor(None, queue.recover)
+        settling = set()
+        try:
+            while True:
+                item = await loop.run_in_executor(None, queue.claim)
+                if item is None:
+                    wake.clear()
+                    try:
+                        await asyncio.wait_for(wake.wait(), idle_wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                task = asyncio.create_task(self._settle(queue, item, self.submit_queued(item), max_attempts,
+                                                        retry_backoff))
+                settling.add(task)
+                task.add_done_callback(settling.discard)
+        finally:
+            await self.close()
+
+    async def start(self):
+        for account in self.accounts.values():
+            await account.start()
+        if self.market_feed and self.symbols:
+            from market_feed import BitgetMarketFeed
+
+            self.feed = BitgetMarketFeed(self.symbols)
+            self._feed_task = asyncio.create_task(self.feed.run(), name="market-feed")
+        logging.info(f"✅ Engine gestartet: {len(self.accounts)} Konto/Konten, Symbole {', '.join(self.symbols)}")
+
+    async def join(self):
+        for pipeline in self.pipelines.values():
+            await pipeline.join()
+
+    async def run(self, alert_source):
+        """Nimmt Alerts aus ``alert_source`` (asyncio.Queue; None beendet) und verteilt sie."""
+        await self.start()
+        try:
+            while True:
+                alert = await alert_source.get()
+                if alert is None:
+                    await self.join()
+                    break
+                self.submit(alert)
+        finally:
+            await self.close()
+
+    async def close(self):
+        for pipeline in self.pipelines.values():
+            await pipeline.close()
+        if self.feed is not None:
+            self.feed.stop()
+            self._feed_task.cancel()
+        for account in self.accounts.values():
+            await account.close()
+
+# --- Verteilung auf mehrere Prozesse ---
+
+def account_groups(accounts_cfg):
+    """Konten mit denselben Zugangsdaten (gleiche UID) gehören zusammen, in Konfigurationsreihenfolge."""
+    names = [cfg["name"] for cfg in accounts_cfg]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Kontonamen müssen eindeutig sein: {names}")
+    groups = {}
+    for cfg in accounts_cfg:
+        groups.setdefault(cfg.get("credentials", "api"), []).append(cfg)
+    return list(groups.values())
+
+def split_accounts(accounts_cfg, shards):
+    """
+    Verteilt die Konten reihum auf ``shards`` Prozesse, jedes Konto (bzw. jede UID) mit allen Symbolen in
+    genau einen. Ledger, RiskEngine und Rate-Limiter gibt es je Prozess; ein Konto in mehreren Prozessen
+    hätte dort je eigene Positionslimits und ein eigenes Anfragebudget, zusammen also ein Vielfaches.
+    """
+    parts = [[] for _ in range(shards)]
+    for i, group in enumerate(account_groups(accounts_cfg)):
+        parts[i % shards].extend(group)
+    return parts
+
+def _shard_main(accounts_cfg, inbox, outbox, dry_run, market_feed, log_level):
+    logging.getLogger().setLevel(log_level)
+
+    async def main():
+        engine = TradingEngine.from_config(accounts_cfg, dry_run, market_feed)
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        async def pump():
+            while True:
+                batch = await loop.run_in_executor(None, inbox.get)
+                for alert in batch:
+                    queue.put_nowait(alert)
+                if None in batch:
+                    break
+
+        pump_task = asyncio.create_task(pump())
+        await engine.run(queue)
+        pump_task.cancel()
+        outbox.put({name: account.executed for name, account in engine.accounts.items()})
+
+    asyncio.run(main())
+
+class ShardedEngine:
+    """
+    Verteilt die Konten auf ``processes`` Prozesse mit je eigener TradingEngine und eigenem
+    Event-Loop, damit der Durchsatz mit den Kernen skaliert. Jedes Konto läuft in genau einem
+    Prozess (split_accounts); mehr Prozesse als Konten-Gruppen bringen nichts. Alerts gehen
+    gebündelt per Queue an die Prozesse der Konten, die ihr Symbol handeln.
+    """
+
+    def __init__(self, accounts_cfg=None, processes=None, dry_run=False, market_feed=True, log_level=logging.INFO):
+        accounts_cfg = accounts_cfg or configured_accounts
+        self.processes = max(1, min(processes or multiprocessing.cpu_count(), len(account_groups(accounts_cfg))))
+        self.parts = split_accounts(accounts_cfg, self.processes)
+        self.account_shard = {cfg["name"]: shard for shard, part in enumerate(self.parts) for cfg in part}
+        self.symbol_shards = {}  # symbol -> Prozesse mit einem Konto, das es handelt
+        for shard, part in enumerate(self.parts):
+            for cfg in part:
+                for symbol in cfg.get("symbols", {}):
+                    self.symbol_shards.setdefault(symbol, []).append(shard)
+        self.dry_run = dry_run
+        self.market_feed = market_feed
+        self.log_level = log_level
+        self.inboxes = []
+        self.outbox = None
+        self.workers = []
+        self._buffers = []
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.outbox = ctx.Queue()
+        for part in self.parts:
+            inbox = ctx.Queue()
+            worker = ctx.Process(target=_shard_main, args=(part, inbox, self.outbox, self.dry_run, self.market_feed,
+                                                             self.log_level),
+                                 daemon=True)
+            worker.start()
+            self.inboxes.append(inbox)
+            self.workers.append(worker)
+            self._buffers.append([])
+        return self
+
+    def submit(self, alert, flush=True):
+        _, symbol = direction_and_symbol(alert)
+        account = alert.get("account") if isinstance(alert, dict) else None
+        shards = [self.account_shard[account]] if account in self.account_shard else self.symbol_shards.get(symbol)
+        if not shards:
+            logging.warning(f"Kein Konto handelt {symbol} – Alert verworfen: {alert}")
+            return
+        for shard in sorted(set(shards)):
+            self._buffers[shard].append(alert)
+        if flush:
+            self.flush()
+
+    def flush(self):
+        for inbox, buffer in zip(self.inboxes, self._buffers):
+            if buffer:
+                inbox.put(list(buffer))
+                buffer.clear()
+
+    def stop(self, timeout=60):
+        """Beendet alle Prozesse nach Abarbeitung und liefert die ausgeführten Trades je Konto."""
+        for buffer in self._buffers:
+            buffer.append(None)
+        self.flush()
+        executed = {}
+        for _ in self.workers:
+            for name, count in self.outbox.get(timeout=timeout).items():
+                executed[name] = executed.get(name, 0) + count
+        for worker in self.workers:
+            worker.join(timeout)
+        return executed
+
+def benchmark(symbols=32, alerts=200_000, processes=(1, 2, 4), accounts=8):
+    """Dry-Run-Durchsatz (Routing, Limits, Sizing) mit 1..n Prozessen; die Symbole verteilen sich auf ``accounts`` Konten."""
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    accounts_cfg = [{"name": f"bench{a}", "credentials": f"bench{a}",
+                     "symbols": {s: {"max_positions": 10 ** 9} for s in names[a::accounts]}} for a in range(accounts)]
+    for n in processes:
+        engine = ShardedEngine(accounts_cfg, n, dry_run=True, market_feed=False, log_level=logging.WARNING).start()
+        time.sleep(1.5)  # Prozessstart nicht mitmessen
+        start = time.perf_counter()
+        for i in range(alerts):
+            engine.submit({"action": "LONG" if i % 2 else "SHORT", "symbol": names[i % symbols]}, flush=False)
+            if i % 1000 == 999:
+                engine.flush()
+        executed = engine.stop()
+        elapsed = time.perf_counter() - start
+        print(f"{engine.processes} Prozess(e): {sum(executed.values())} Alerts in {elapsed:.2f}s "
+              f"= {sum(executed.values()) / elapsed:,.0f} Alerts/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-Symbol-/Multi-Konto-Engine (Dry-Run-Benchmark).")
+    parser.add_argument("--benchmark", action="store_true", help="Durchsatz mit 1, 2 und 4 Prozessen messen")
+    parser.add_argument("--alerts", type=int, default=200_000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(alerts=args.alerts)
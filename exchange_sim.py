@@ -0,0 +1,804 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+import websockets
+from bitget_client import BitgetClient, AsyncBitgetClient, sign
+from market_store import GRANULARITY_MS
+from rate_limiter import TokenBucket, ENDPOINT_LIMITS
+from rest_stub import RestStubServer, StubError, STUB_KEY, STUB_SECRET, STUB_PASSPHRASE
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+INST_TYPE = "USDT-FUTURES"
+STARTING_BALANCE = 10000.0
+DEFAULT_LEVERAGE = 20
+TAKER_FEE = 0.0006
+SLIPPAGE_BPS = 1.0  # Marktorders füllen 0,01 % schlechter als der letzte Preis
+# Symbol -> (pricePlace, volumePlace, sizeMultiplier, minTradeNum), Werte wie bei Bitget
+CONTRACTS = {
+    "BTCUSDT": (1, 3, "0.001", "0.001"),
+    "ETHUSDT": (2, 2, "0.01", "0.01"),
+    "SOLUSDT": (3, 1, "0.1", "0.1"),
+}
+START_PRICES = {"BTCUSDT": 80000.0, "ETHUSDT": 3000.0, "SOLUSDT": 150.0}
+PRIVATE_CHANNELS = ("positions", "orders", "account")
+PUBLIC_PATHS = (
+    "/api/v2/mix/market/contracts",
+    "/api/v2/mix/market/ticker",
+    "/api/v2/mix/market/candles",
+    "/api/v2/mix/market/history-candles",
+    "/api/v2/spot/public/symbols",
+    "/api/v2/spot/public/coins",
+    "/api/v2/margin/currencies",
+)
+
+def _num(value, places=8):
+    return format(round(float(value), places), "f").rstrip("0").rstrip(".") or "0"
+
+class MatchingEngine:
+    """
+    Vereinfachte Bitget-Futures-Börse (One-Way-Modus, isolierte Margin) für ein Konto.
+
+    Marktorders füllen sofort zum letzten Preis plus Slippage, Limit-Orders sobald der
+    Preis sie kreuzt; TP/SL einer Position lösen beim Ticker aus. Jede Änderung wird über
+    ``emit(channel, data)`` an die privaten WebSocket-Kanäle gemeldet.
+    """
+
+    def __init__(self, balance=STARTING_BALANCE, fee_rate=TAKER_FEE, slippage_bps=SLIPPAGE_BPS, contracts=None,
+                 emit=None):
+        self.available = float(balance)
+        self.fee_rate = fee_rate
+        self.slippage_bps = slippage_bps
+        self.contracts = dict(contracts or CONTRACTS)
+        self.emit = emit or (lambda channel, data: None)
+        self.prices = {}  # symbol -> letzter Preis
+        self.candles = {}  # (symbol, granularity) -> {ts: [ts, o, h, l, c, v]}
+        self.leverage = {}
+        self.positions = {}  # symbol -> {"size" (mit Vorzeichen), "entry", "margin", "tp", "sl", ...}
+        self.orders = {}  # orderId -> Order im Format von /mix/order/detail
+        self.by_client_oid = {}
+        self.stats = {"orders": 0, "fills": 0, "rejected": 0, "triggers": 0}
+        self.lock = threading.RLock()
+
+    # --- Marktdaten ---
+
+    def on_tick(self, symbol, price):
+        with self.lock:
+            self.prices[symbol] = price
+            self._check_triggers(symbol, price)
+
+    def on_candle(self, symbol, granularity, row):
+        with self.lock:
+            self.candles.setdefault((symbol, granularity), {})[int(row[0])] = [float(v) for v in row[:6]]
+
+    def _price(self, symbol):
+        price = self.prices.get(symbol)
+        if price is None:
+            raise StubError(400, "40034", f"No market price for {symbol}")
+        return price
+
+    # --- Orders ---
+
+    def _order_lookup(self, order_id=None, client_oid=None):
+        order = self.orders.get(order_id) if order_id else self.by_client_oid.get(client_oid)
+        if order is None:
+            raise StubError(400, "40768", "Order does not exist")
+        return order
+
+    def place(self, params, body):
+        symbol = body.get("symbol")
+        if symbol not in self.contracts:
+            raise StubError(400, "40034", f"Parameter symbol {symbol} does not exist")
+        size = float(body.get("size") or 0)
+        # Schließende Orders (reduceOnly, z.B. TP/SL-Auslösung) dürfen wie bei Bitget unter dem Minimum liegen
+        if size <= 0 or (size < float(self.contracts[symbol][3]) and body.get("reduceOnly") != "YES"):
+            self.stats["rejected"] += 1
+            raise StubError(400, "45110", "less than the minimum order quantity")
+        client_oid = body.get("clientOid") or str(uuid.uuid4())
+        with self.lock:
+            if client_oid in self.by_client_oid:
+                self.stats["rejected"] += 1
+                raise StubError(400, "40786", "Duplicate clientOid")
+            price = self._price(symbol)
+            now = str(int(time.time() * 1000))
+            order = {"symbol": symbol, "size": body["size"], "orderId": str(uuid.uuid4().int)[:18],
+                     "clientOid": client_oid, "baseVolume": "0", "fee": "0", "price": body.get("price", ""),
+                     "priceAvg": "", "state": "live", "status": "live", "side": body.get("side"),
+                     "orderType": body.get("orderType", "market"), "marginMode": body.get("marginMode", "isolated"),
+                     "marginCoin": body.get("marginCoin", "USDT"), "reduceOnly": body.get("reduceOnly", "NO"),
+                     "presetStopSurplusPrice": body.get("presetStopSurplusPrice", ""),
+                     "presetStopLossPrice": body.get("presetStopLossPrice", ""), "cTime": now, "uTime": now}
+            if order["orderType"] == "market":
+                slip = self.slippage_bps / 10000 * (1 if order["side"] == "buy" else -1)
+                self._fill(order, price * (1 + slip))
+            else:
+                self.emit("orders", [self._ws_order(order)])
+            self.orders[order["orderId"]] = order
+            self.by_client_oid[client_oid] = order
+            self.stats["orders"] += 1
+        return {"orderId": order["orderId"], "clientOid": client_oid}
+
+    def _fill(self, order, price):
+        symbol = order["symbol"]
+        size = float(order["size"])
+        qty = size if order["side"] == "buy" else -size
+        position = self.positions.get(symbol)
+        current = position["size"] if position else 0.0
+        leverage = self.leverage.get(symbol, DEFAULT_LEVERAGE)
+        notional = size * price
+        if order.get("reduceOnly") == "YES" and (current == 0 or current * qty > 0):
+            order.update(state="canceled", status="canceled")
+            self.emit("orders", [self._ws_order(order)])
+            return
+        opening = abs(qty) if current == 0 or current * qty > 0 else max(0.0, abs(qty) - abs(current))
+        required = opening * price / leverage + notional * self.fee_rate
+        if required > self.available + self._releasable(position, qty, price):
+            self.stats["rejected"] += 1
+            raise StubError(400, "40762", "The order amount exceeds the balance")
+        fee = notional * self.fee_rate
+        self.available -= fee
+        pnl = 0.0
+        if position is not None and current * qty < 0:
+            closing = min(abs(qty), abs(current))
+            pnl = (price - position["entry"]) * closing * (1 if current > 0 else -1)
+            released = position["margin"] * closing / abs(current)
+            self.available += released + pnl
+            position["margin"] -= released
+            position["size"] = current + (closing if current < 0 else -closing)
+            position["realized"] += pnl
+            if abs(position["size"]) < 1e-9:  # Float-Rest nach dem Schließen
+                del self.positions[symbol]
+                position = None
+            qty = qty + (closing if qty < 0 else -closing)
+        if abs(qty) >= 1e-9:
+            margin = abs(qty) * price / leverage
+            self.available -= margin
+            if position is None:
+                position = self.positions[symbol] = {"size": 0.0, "entry": price, "margin": 0.0, "tp": None,
+                                                     "sl": None, "leverage": leverage, "realized": 0.0,
+                                                     "cTime": str(int(time.time() * 1000))}
+            total = abs(position["size"]) + abs(qty)
+            position["entry"] = (position["entry"] * abs(position["size"]) + price * abs(qty)) / total
+            position["size"] += qty
+            position["margin"] += margin
+        if position is not None:
+            if order.get("presetStopSurplusPrice"):
+                position["tp"] = float(order["presetStopSurplusPrice"])
+            if order.get("presetStopLossPrice"):
+                position["sl"] = float(order["presetStopLossPrice"])
+        order.update(state="filled", status="filled", baseVolume=order["size"], priceAvg=_num(price),
+                     fee=_num(-fee), totalProfits=_num(pnl), uTime=str(int(time.time() * 1000)))
+        self.stats["fills"] += 1
+        self.emit("orders", [self._ws_order(order)])
+        self.emit("positions", self.position_list())
+        self.emit("account", [self.account()])
+
+    def _releasable(self, position, qty, price):
+        """Margin + PnL, die eine Gegenorder freisetzt (für die Saldoprüfung)."""
+        if position is None or position["size"] * qty >= 0:
+            return 0.0
+        share = min(1.0, abs(qty) / abs(position["size"]))
+        pnl = (price - position["entry"]) * position["size"]
+        return (position["margin"] + pnl) * share
+
+    def _check_triggers(self, symbol, price):
+        for order in [o for o in self.orders.values() if o["state"] == "live" and o["symbol"] == symbol]:
+            limit = float(order["price"] or 0)
+            if (order["side"] == "buy" and price <= limit) or (order["side"] == "sell" and price >= limit):
+                try:
+                    self._fill(order, limit)
+                except StubError:
+                    order.update(state="canceled", status="canceled")
+                    self.emit("orders", [self._ws_order(order)])
+        position = self.positions.get(symbol)
+        if position is None:
+            return
+        long = position["size"] > 0
+        hit_tp = position["tp"] is not None and (price >= position["tp"] if long else price <= position["tp"])
+        hit_sl = position["sl"] is not None and (price <= position["sl"] if long else price >= position["sl"])
+        if hit_tp or hit_sl:
+            self.stats["triggers"] += 1
+            size = _num(abs(position["size"]))
+            try:
+                self.place({}, {"symbol": symbol, "side": "sell" if long else "buy", "size": size,
+                                "orderType": "market", "reduceOnly": "YES",
+                                "clientOid": f"{'tp' if hit_tp else 'sl'}-{uuid.uuid4().hex[:16]}"})
+            except StubError as e:
+                # Der Replay-Loop darf an einer abgelehnten Auslösung nicht sterben
+                logging.warning(f"TP/SL-Auslösung für {symbol} abgelehnt: {e}")
+                position["tp"] = position["sl"] = None
+
+    def modify(self, params, body):
+        with self.lock:
+            order = self._order_lookup(body.get("orderId"), body.get("clientOid"))
+            tp, sl = body.get("newPresetStopSurplusPrice"), body.get("newPresetStopLossPrice")
+            if order["state"] == "live":
+                if tp is not None:
+                    order["presetStopSurplusPrice"] = tp
+                if sl is not None:
+                    order["presetStopLossPrice"] = sl
+                if body.get("newSize"):
+                    order["size"] = body["newSize"]
+                if body.get("newPrice"):
+                    order["price"] = body["newPrice"]
+            else:
+                # Gefüllte Einstiegsorder: TP/SL gilt für die daraus entstandene Position
+                position = self.positions.get(order["symbol"])
+                if position is None:
+                    raise StubError(400, "40768", "Order does not exist")
+                if tp is not None:
+                    position["tp"] = float(tp) if tp else None
+                if sl is not None:
+                    position["sl"] = float(sl) if sl else None
+                self.emit("positions", self.position_list())
+            if body.get("newClientOid"):
+                self.by_client_oid[body["newClientOid"]] = order
+        return {"orderId": order["orderId"], "clientOid": body.get("newClientOid") or order["clientOid"]}
+
+    def cancel(self, params, body):
+        with self.lock:
+            order = self._order_lookup(body.get("orderId"), body.get("clientOid"))
+            if order["state"] != "live":
+                raise StubError(400, "40768", "Order does not exist")
+            order.update(state="canceled", status="canceled", uTime=str(int(time.time() * 1000)))
+            self.emit("orders", [self._ws_order(order)])
+        return {"orderId": order["orderId"], "clientOid": order["clientOid"]}
+
+    def place_pos_tpsl(self, params, body):
+        with self.lock:
+            position = self.positions.get(body.get("symbol"))
+            side = "long" if position and position["size"] > 0 else "short"
+            if position is None or body.get("holdSide", side) != side:
+                raise StubError(400, "22002", "No position to close")
+            if body.get("stopSurplusTriggerPrice"):
+                position["tp"] = float(body["stopSurplusTriggerPrice"])
+            if body.get("stopLossTriggerPrice"):
+                position["sl"] = float(body["stopLossTriggerPrice"])
+            self.emit("positions", self.position_list())
+        return [{"orderId": str(uuid.uuid4().int)[:18], "clientOid": str(uuid.uuid4())}]
+
+    def detail(self, params, body):
+        with self.lock:
+            return dict(self._order_lookup(params.get("orderId"), params.get("clientOid")))
+
+    def orders_pending(self, params, body):
+        with self.lock:
+            live = [dict(o) for o in self.orders.values() if o["state"] == "live"
+                    and params.get("symbol", o["symbol"]) == o["symbol"]]
+        return {"entrustedList": live or None, "endId": live[-1]["orderId"] if live else None}
+
+    @staticmethod
+    def _ws_order(order):
+        return dict(order, instId=order["symbol"], accBaseVolume=order["baseVolume"])
+
+    # --- Konto und Positionen ---
+
+    def position_list(self, symbol=None):
+        result = []
+        for sym, p in self.positions.items():
+            if symbol and sym != symbol:
+                continue
+            mark = self.prices.get(sym, p["entry"])
+            size = _num(abs(p["size"]))
+            result.append({"symbol": sym, "instId": sym, "marginCoin": "USDT",
+                           "holdSide": "long" if p["size"] > 0 else "short", "total": size, "available": size,
+                           "locked": "0", "openDelegateSize": "0", "openPriceAvg": _num(p["entry"]),
+                           "leverage": str(p["leverage"]), "marginMode": "isolated", "posMode": "one_way_mode",
+                           "marginSize": _num(p["margin"]), "unrealizedPL": _num((mark - p["entry"]) * p["size"]),
+                           "achievedProfits": _num(p["realized"]), "markPrice": _num(mark),
+                           "takeProfit": _num(p["tp"]) if p["tp"] else "", "stopLoss": _num(p["sl"]) if p["sl"] else "",
+                           "liquidationPrice": "0", "keepMarginRate": "0.004", "cTime": p["cTime"],
+                           "uTime": str(int(time.time() * 1000))})
+        return result
+
+    def account(self, params=None, body=None):
+        with self.lock:
+            in_positions = sum(p["margin"] + (self.prices.get(s, p["entry"]) - p["entry"]) * p["size"]
+                               for s, p in self.positions.items())
+            upnl = sum((self.prices.get(s, p["entry"]) - p["entry"]) * p["size"] for s, p in self.positions.items())
+            equity = self.available + in_positions
+            return {"marginCoin": "USDT", "locked": "0", "available": _num(self.available),
+                    "crossedMaxAvailable": _num(self.available), "isolatedMaxAvailable": _num(self.available),
+                    "maxTransferOut": _num(self.available), "accountEquity": _num(equity),
+                    "usdtEquity": _num(equity), "btcEquity": "0", "unrealizedPL": _num(upnl)}
+
+    def all_positions(self, params, body):
+        with self.lock:
+            return self.position_list()
+
+    def single_position(self, params, body):
+        with self.lock:
+            return self.position_list(params.get("symbol"))
+
+    def set_leverage(self, params, body):
+        symbol = body.get("symbol")
+        with self.lock:
+            self.leverage[symbol] = int(body.get("leverage", DEFAULT_LEVERAGE))
+        leverage = str(self.leverage[symbol])
+        return {"symbol": symbol, "marginCoin": "USDT", "longLeverage": leverage, "shortLeverage": leverage,
+                "crossMarginLeverage": leverage, "marginMode": body.get("marginMode", "isolated")}
+
+    # --- Öffentliche Marktdaten ---
+
+    def contract_list(self, params, body):
+        if params.get("productType", INST_TYPE).upper() != INST_TYPE:
+            return []
+        return [{"symbol": symbol, "baseCoin": symbol[:-4], "quoteCoin": "USDT", "supportMarginCoins": ["USDT"],
+                 "pricePlace": str(pp), "volumePlace": str(vp), "sizeMultiplier": mult, "minTradeNum": min_num,
+                 "minTradeUSDT": "5", "makerFeeRate": "0.0002", "takerFeeRate": str(self.fee_rate),
+                 "symbolType": "perpetual", "symbolStatus": "normal", "maxLever": "125", "minLever": "1",
+                 "fundInterval": "8", "priceEndStep": "1", "openCostUpRatio": "0.01", "feeRateUpRatio": "0.005",
+                 "limitOpenTime": "-1", "deliveryTime": "", "deliveryStartTime": "", "launchTime": "",
+                 "maintainTime": "", "offTime": "-1"}
+                for symbol, (pp, vp, mult, min_num) in self.contracts.items()]
+
+    def ticker(self, params, body):
+        symbol = params.get("symbol")
+        with self.lock:
+            symbols = [symbol] if symbol else list(self.prices)
+            ts = str(int(time.time() * 1000))
+            return [{"symbol": s, "lastPr": _num(self.prices[s]), "bidPr": _num(self.prices[s]),
+                     "askPr": _num(self.prices[s]), "bidSz": "1", "askSz": "1", "markPrice": _num(self.prices[s]),
+                     "indexPrice": _num(self.prices[s]), "high24h": _num(self.prices[s]),
+                     "low24h": _num(self.prices[s]), "open24h": _num(self.prices[s]), "change24h": "0",
+                     "baseVolume": "0", "quoteVolume": "0", "usdtVolume": "0", "fundingRate": "0",
+                     "holdingAmount": "0", "ts": ts} for s in symbols if s in self.prices]
+
+    def candle_list(self, params, body):
+        """/mix/market/candles: 1m aus dem Replay, größere Intervalle daraus zusammengesetzt."""
+        symbol = params.get("symbol")
+        granularity = params.get("granularity", "1m")
+        interval = GRANULARITY_MS.get(granularity)
+        if interval is None:
+            raise StubError(400, "40034", f"Parameter granularity {granularity} does not exist")
+        with self.lock:
+            rows = self.candles.get((symbol, granularity))
+            if rows is None:
+                rows = {}
+                for ts, (_, o, h, l, c, v) in sorted(self.candles.get((symbol, "1m"), {}).items()):
+                    bucket = ts - ts % interval
+                    if bucket in rows:
+                        row = rows[bucket]
+                        row[2], row[3], row[4], row[5] = max(row[2], h), min(row[3], l), c, row[5] + v
+                    else:
+                        rows[bucket] = [bucket, o, h, l, c, v]
+            rows = sorted(rows.values())
+        start, end = params.get("startTime"), params.get("endTime")
+        if start:
+            rows = [r for r in rows if r[0] >= int(start)]
+        if end:
+            rows = [r for r in rows if r[0] < int(end)]
+        rows = rows[-int(params.get("limit", 100)):]
+        return [[str(int(r[0]))] + [_num(v) for v in r[1:6]] + [_num(r[4] * r[5])] for r in rows]
+
+def synthetic_records(symbols=("BTCUSDT",), seconds=600, ticks_per_second=10, volatility=0.0002, seed=1,
+                      start_ms=None):
+    """
+    Zufallspfad als Replay-Daten im Format von ws_replay: (t, roher_text) mit ticker- und candle1m-Nachrichten.
+    """
+    rng = random.Random(seed)
+    start_ms = start_ms or int(time.time() * 1000)
+    prices = {symbol: START_PRICES.get(symbol, 100.0) for symbol in symbols}
+    candles = {}
+    records = []
+    for n in range(seconds * ticks_per_second):
+        t = n / ticks_per_second
+        ts = start_ms + int(t * 1000)
+        for symbol in symbols:
+            price = prices[symbol] = prices[symbol] * (1 + rng.gauss(0, volatility))
+            volume = rng.expovariate(1 / 0.5)
+            spread = price * 0.00001
+            tick = {"instId": symbol, "lastPr": _num(price, 4), "bidPr": _num(price - spread, 4),
+                    "askPr": _num(price + spread, 4), "bidSz": _num(rng.expovariate(1), 3),
+                    "askSz": _num(rng.expovariate(1), 3), "ts": str(ts)}
+            records.append((t, json.dumps({"action": "snapshot", "arg": {"instType": INST_TYPE, "channel": "ticker",
+                                                                          "instId": symbol},
+                                           "data": [tick], "ts": ts})))
+            bucket = ts - ts % 60_000
+            candle = candles.get(symbol)
+            if candle is None or candle[0] != bucket:
+                candle = candles[symbol] = [bucket, price, price, price, price, 0.0]
+            candle[2], candle[3], candle[4] = max(candle[2], price), min(candle[3], price), price
+            candle[5] += volume
+            if n % ticks_per_second == 0:
+                row = [str(candle[0])] + [_num(v, 4) for v in candle[1:]] + [_num(candle[4] * candle[5], 2)]
+                records.append((t, json.dumps({"action": "update", "arg": {"instType": INST_TYPE, "channel": "candle1m",
+                                                                            "instId": symbol},
+                                               "data": [row], "ts": ts})))
+    return records
+
+class _Subscriber:
+    """Eine WebSocket-Verbindung mit ihren Abos (öffentlich: (Kanal, instId), privat: Kanal)."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.subs = set()
+        self.private_subs = set()
+        self.private = False
+
+class ExchangeSim:
+    """
+    Lokale Bitget-Stand-in: HTTPS-REST (rest_stub) plus öffentliche und private WebSocket-Kanäle.
+
+    Marktdaten kommen aus einer Aufzeichnung (ws_replay.load_recording) oder synthetic_records()
+    und treiben die MatchingEngine. Injektion:
+      - ``latency_ms``/``jitter_ms``: Verzögerung jeder REST-Antwort, ``ws_latency_ms`` für Pushes,
+      - ``error_rate``: Anteil der REST-Aufrufe, die mit HTTP 500 scheitern,
+      - ``rate_limits``: die veröffentlichten Limits je Endpunkt; darüber antwortet die Börse mit 429.
+    """
+
+    def __init__(self, records=None, symbols=("BTCUSDT",), host="127.0.0.1", rest_port=0, ws_port=0, speed=1.0,
+                 loop_replay=True, latency_ms=0, jitter_ms=0, ws_latency_ms=0, error_rate=0.0, rate_limits=True,
+                 seed=None, api_key=STUB_KEY, api_secret=STUB_SECRET, passphrase=STUB_PASSPHRASE,
+                 balance=STARTING_BALANCE, slippage_bps=SLIPPAGE_BPS, cert=None):
+        self.records = records if records is not None else synthetic_records(symbols)
+        self.host = host
+        self.rest_port = rest_port
+        self.ws_port = ws_port
+        self.speed = speed
+        self.loop_replay = loop_replay
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ws_latency_ms = ws_latency_ms
+        self.error_rate = error_rate
+        self.rate_limits = rate_limits
+        self.random = random.Random(seed)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.passphrase = passphrase
+        self.cert = cert
+        self.engine = MatchingEngine(balance, slippage_bps=slippage_bps, emit=self._emit)
+        self.buckets = {}
+        self.bucket_lock = threading.Lock()
+        self.injected = {"errors": 0, "rate_limited": 0}
+        self.connections = set()
+        self.replayed = 0
+        self.rest = None
+        self.loop = None
+        self.ready = threading.Event()
+        self._server = None
+        self._main_task = None
+        self._thread = None
+
+    # --- REST ---
+
+    def _inject(self, path, route):
+        def handler(params, body):
+            if self.latency_ms or self.jitter_ms:
+                time.sleep(max(0.0, self.latency_ms + self.random.uniform(-1, 1) * self.jitter_ms) / 1000)
+            if self.rate_limits:
+                with self.bucket_lock:
+                    bucket = self.buckets.get(path)
+                    if bucket is None:
+                        bucket = self.buckets[path] = TokenBucket(ENDPOINT_LIMITS.get(path, (20,))[0])
+                    if bucket.delay(time.monotonic()) > 0:
+                        self.injected["rate_limited"] += 1
+                        raise StubError(429, "429", "Too Many Requests")
+                    bucket.take()
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.injected["errors"] += 1
+                raise StubError(500, "50000", "Simulated server error")
+            return route(params, body)
+        return handler
+
+    def routes(self):
+        e = self.engine
+        table = {
+            ("GET", "/api/v2/mix/market/contracts"): e.contract_list,
+            ("GET", "/api/v2/mix/market/ticker"): e.ticker,
+            ("GET", "/api/v2/mix/market/candles"): e.candle_list,
+            ("GET", "/api/v2/mix/market/history-candles"): e.candle_list,
+            ("GET", "/api/v2/spot/public/symbols"): lambda params, body: [],
+            ("GET", "/api/v2/spot/public/coins"): lambda params, body: [],
+            ("GET", "/api/v2/margin/currencies"): lambda params, body: [],
+            ("GET", "/api/v2/mix/account/account"): e.account,
+            ("GET", "/api/v2/mix/position/all-position"): e.all_positions,
+            ("GET", "/api/v2/mix/position/single-position"): e.single_position,
+            ("POST", "/api/v2/mix/account/set-leverage"): e.set_leverage,
+            ("POST", "/api/v2/mix/order/place-order"): e.place,
+            ("POST", "/api/v2/mix/order/modify-order"): e.modify,
+            ("POST", "/api/v2/mix/order/cancel-order"): e.cancel,
+            ("POST", "/api/v2/mix/order/place-pos-tpsl"): e.place_pos_tpsl,
+            ("GET", "/api/v2/mix/order/detail"): e.detail,
+            ("GET", "/api/v2/mix/order/orders-pending"): e.orders_pending,
+        }
+        return {key: self._inject(key[1], route) for key, route in table.items()}
+
+    # --- WebSocket ---
+
+    def _send(self, ws, text):
+        if self.ws_latency_ms:
+            self.loop.call_later(self.ws_latency_ms / 1000, lambda: asyncio.ensure_future(ws.send(text)))
+        else:
+            asyncio.ensure_future(ws.send(text))
+
+    def _emit(self, channel, data):
+        """Von der MatchingEngine (beliebiger Thread): Push an alle eingeloggten Abonnenten des Kanals."""
+        message = json.dumps({"action": "snapshot", "arg": {"instType": INST_TYPE, "channel": channel,
+                                                            "instId": "default"},
+                              "data": data, "ts": int(time.time() * 1000)})
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._push_private, channel, message)
+
+    def _push_private(self, channel, message):
+        for conn in list(self.connections):
+            if conn.private and channel in conn.private_subs:
+                self._send(conn.ws, message)
+
+    def _snapshot(self, channel):
+        with self.engine.lock:
+            if channel == "positions":
+                data = self.engine.position_list()
+            elif channel == "account":
+                data = [self.engine.account()]
+            else:
+                data = [MatchingEngine._ws_order(o) for o in self.engine.orders.values() if o["state"] == "live"]
+        return json.dumps({"action": "snapshot", "arg": {"instType": INST_TYPE, "channel": channel,
+                                                         "instId": "default"}, "data": data,
+                           "ts": int(time.time() * 1000)})
+
+    async def _handler(self, ws, path=None):
+        conn = _Subscriber(ws)
+        self.connections.add(conn)
+        try:
+            async for message in ws:
+                if message == "ping":
+                    await ws.send("pong")
+                    continue
+                request = json.loads(message)
+                op = request.get("op")
+                args = request.get("args", [])
+                if op == "login":
+                    arg = args[0] if args else {}
+                    expected = sign(self.api_secret, str(arg.get("timestamp")), "GET", "/user/verify")
+                    conn.private = (arg.get("apiKey") == self.api_key and arg.get("sign") == expected
+                                       and arg.get("passphrase") == self.passphrase)
+                    await ws.send(json.dumps({"event": "login", "code": 0, "msg": ""} if conn.private else
+                                             {"event": "error", "code": 30005, "msg": "Login failed"}))
+                elif op in ("subscribe", "unsubscribe"):
+                    for arg in args:
+                        channel = arg.get("channel")
+                        if channel in PRIVATE_CHANNELS:
+                            if not conn.private:
+                                await ws.send(json.dumps({"event": "error", "arg": arg, "code": 30004,
+                                                          "msg": "User needs to log in"}))
+                                continue
+                            target, key = conn.private_subs, channel
+                        else:
+                            target, key = conn.subs, (channel, arg.get("instId"))
+                        if op == "subscribe":
+                            target.add(key)
+                        else:
+                            target.discard(key)
+                        await ws.send(json.dumps({"event": op, "arg": arg}))
+                        if op == "subscribe" and channel in PRIVATE_CHANNELS:
+                            await ws.send(self._snapshot(channel))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(conn)
+
+    async def _replay(self):
+        while True:
+            previous = None
+            for t, message in self.records:
+                if self.speed and previous is not None and t > previous:
+                    await asyncio.sleep((t - previous) / self.speed)
+                elif not self.speed and self.replayed % 100 == 0:
+                    await asyncio.sleep(0)
+                previous = t
+                payload = json.loads(message)
+                arg = payload.get("arg", {})
+                channel, symbol = arg.get("channel", ""), arg.get("instId")
+                if channel == "ticker":
+                    for tick in payload.get("data", []):
+                        self.engine.on_tick(symbol, float(tick["lastPr"]))
+                elif channel.startswith("candle"):
+                    for row in payload.get("data", []):
+                        self.engine.on_candle(symbol, channel[len("candle"):], row)
+                for conn in list(self.connections):
+                    if (channel, symbol) in conn.subs:
+                        self._send(conn.ws, message)
+                self.replayed += 1
+            if not self.loop_replay:
+                break
+
+    async def _main(self):
+        self._server = await websockets.serve(self._handler, self.host, self.ws_port)
+        self.ws_port = self._server.sockets[0].getsockname()[1]
+        replay = asyncio.create_task(self._replay())
+        self.ready.set()
+        try:
+            await asyncio.Future()
+        finally:
+            replay.cancel()
+            self._server.close()
+            await self._server.wait_closed()
+
+    # --- Steuerung ---
+
+    def start(self):
+        """Startet REST (eigene Threads) und WebSocket + Replay (eigener Event-Loop-Thread)."""
+        cert = (self.cert, self.cert.replace("cert.pem", "key.pem")) if self.cert else None
+        self.rest = RestStubServer(self.host, self.rest_port, routes=self.routes(), api_key=self.api_key,
+                                   secret=self.api_secret, cert=cert, public=PUBLIC_PATHS).start()
+        self.cert = self.rest.cert
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self._main_task = self.loop.create_task(self._main())
+            try:
+                self.loop.run_until_complete(self._main_task)
+            except asyncio.CancelledError:
+                pass
+
+        self._thread = threading.Thread(target=run, name="ExchangeSim", daemon=True)
+        self._thread.start()
+        self.ready.wait(10)
+        return self
+
+    def wait_for_price(self, symbol, timeout=10):
+        deadline = time.monotonic() + timeout
+        while symbol not in self.engine.prices and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.engine.prices.get(symbol)
+
+    def close(self):
+        if self.loop is not None and self._main_task is not None:
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+            self._thread.join(5)
+        if self.rest is not None:
+            self.rest.close()
+
+    @property
+    def rest_url(self):
+        return self.rest.url
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.ws_port}"
+
+    def env(self):
+        """Umgebungsvariablen, mit denen der Bot (config.py) den Simulator statt Bitget nutzt."""
+        return {"BITGET_REST_URL": self.rest_url, "BITGET_CA_FILE": self.cert,
+                "BITGET_WS_PUBLIC": self.ws_url, "BITGET_WS_PRIVATE": self.ws_url}
+
+    def client(self, **kwargs):
+        kwargs.setdefault("limiter", None)
+        return BitgetClient(self.api_key, self.api_secret, self.passphrase, base_url=self.rest_url, verify=self.cert,
+                            **kwargs)
+
+    def async_client(self, **kwargs):
+        kwargs.setdefault("limiter", None)
+        return AsyncBitgetClient(self.api_key, self.api_secret, self.passphrase, base_url=self.rest_url,
+                                 verify=self.cert, **kwargs)
+
+    def ccxt_client(self):
+        """ccxt.bitget gegen den Simulator, wie trade.client mit BITGET_REST_URL/BITGET_CA_FILE."""
+        import ccxt
+
+        client = ccxt.bitget({"apiKey": self.api_key, "secret": self.api_secret, "password": self.passphrase,
+                              "options": {"defaultType": "future", "fetchMarkets": {"types": ["swap"]}}})
+        client.urls["api"] = {name: self.rest_url for name in client.urls["api"]}
+        client.validateServerSsl = self.cert
+        return client
+
+def benchmark(alerts=40, duration=None, latency_ms=20, jitter_ms=5):
+    """
+    End-to-End ohne Netzwerk: Markt-Feed, privater Kanal, vorbereitete Orders (hot_order) und
+    OrderTracker gegen den Simulator. Misst Alert→Fill (Push im privaten Kanal) und prüft den ccxt-Pfad.
+    Danach ein Burst ohne Rate-Limiter, um die 429-Injektion zu zeigen.
+    """
+    import statistics
+    from hot_order import HotOrderBook
+    from ledger import Ledger, PrivateStream
+    from market_feed import BitgetMarketFeed
+    from market_store import MarketStore
+    from order_tracker import OrderTracker
+    from rate_limiter import RateLimiter
+
+    logging.getLogger().setLevel(logging.WARNING)
+    sim = ExchangeSim(latency_ms=latency_ms, jitter_ms=jitter_ms, seed=1).start()
+    sim.wait_for_price("BTCUSDT")
+
+    # ccxt wie in trade.py: Märkte laden, Hebel setzen, Order, Positionen
+    exchange = sim.ccxt_client()
+    market = exchange.load_markets()["BTC/USDT:USDT"]
+    exchange.set_leverage(50, "BTC/USDT:USDT", params={"marginMode": "isolated"})
+    order = exchange.create_order("BTC/USDT:USDT", "market", "buy", 0.01,
+                                  params={"marginMode": "isolated", "marginCoin": "USDT"})
+    positions = exchange.fetch_positions(["BTC/USDT:USDT"], params={"productType": INST_TYPE})
+    exchange.create_order("BTC/USDT:USDT", "market", "sell", 0.01, params={"marginMode": "isolated"})
+    print(f"ccxt: load_markets (pricePlace {market['info']['pricePlace']}), set_leverage, create_order "
+          f"{order['id']}, fetch_positions {[(p['side'], p['contracts']) for p in positions]} ✅")
+
+    store = MarketStore()
+    ledger = Ledger()
+    feed = BitgetMarketFeed(["BTCUSDT"], store=store, url=sim.ws_url, backfill=None)
+    feed.start_in_thread()
+    stream = PrivateStream(ledger, sim.api_key, sim.api_secret, sim.passphrase, url=sim.ws_url, seed=False)
+    stream.start_in_thread()
+    stream.connected.wait(10)
+    ledger.ready.wait(10)
+    deadline = time.monotonic() + 10
+    while store.last_price("BTCUSDT") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    tracker = OrderTracker(ledger, stream=stream, client=sim.client(), poll_interval=3600)
+    precision = {"price_precision": 1, "amount_precision": 3, "size_multiplier": 0.001}
+    book = HotOrderBook(["BTCUSDT"], sim.api_key, sim.api_secret, sim.passphrase, base_url=sim.rest_url,
+                        verify=sim.cert, ledger=ledger, store=store, precision_source=lambda s: precision,
+                        leverage=None, limiter=RateLimiter()).start()
+
+    fills = []
+    for i in range(alerts):
+        received_at = time.perf_counter()
+        client_oid = f"e2e-{i}"
+        done = tracker.track("BTCUSDT", client_oid=client_oid,
+                             callback=lambda raw, t0=received_at: fills.append(time.perf_counter() - t0))
+        book.fire("LONG" if i % 2 == 0 else "SHORT", "BTCUSDT", received_at, client_oid=client_oid)
+        done.result(10)
+        time.sleep(0.15)  # unter dem Order-Limit von 10/s bleiben, die Börse zählt mit Jitter
+    fills.sort()
+    print(f"Alert→Fill-Push ({alerts} Orders, REST-Latenz {latency_ms}±{jitter_ms} ms): "
+          f"p50 {statistics.median(fills) * 1000:.1f} ms, p99 {fills[int(len(fills) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"Ledger: verfügbar {ledger.available_usdt()} USDT, Equity {ledger.equity}; "
+          f"Engine: {sim.engine.stats}")
+
+    async def burst(n=60):
+        client = sim.async_client()
+        results = await asyncio.gather(*(client.get("/api/v2/mix/account/account") for _ in range(n)),
+                                       return_exceptions=True)
+        await client.close()
+        return sum(1 for r in results if getattr(r, "status", None) == 429)
+
+    time.sleep(1.1)  # Buckets auffüllen
+    limited = asyncio.run(burst())
+    print(f"Burst ohne Rate-Limiter: 60 Kontoabfragen, {limited} mit 429 abgelehnt (Limit 10/s)")
+    book.stop()
+    feed.stop()
+    stream.stop()
+    sim.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Bitget-Simulator (REST + WebSocket) mit Matching-Engine.")
+    parser.add_argument("--benchmark", action="store_true", help="End-to-End-Messung gegen den Simulator")
+    parser.add_argument("--recording", help="Marktdaten aus market_feed.py --record statt Zufallspfad")
+    parser.add_argument("--symbol", action="append", default=None)
+    parser.add_argument("--rest-port", type=int, default=8443)
+    parser.add_argument("--ws-port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = Echtzeit, 0 = so schnell wie möglich")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--ws-latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-rate-limits", action="store_true")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        raise SystemExit
+    records = None
+    if args.recording:
+        from ws_replay import load_recording
+        records = load_recording(args.recording)
+    sim = ExchangeSim(records, symbols=args.symbol or ["BTCUSDT"], rest_port=args.rest_port, ws_port=args.ws_port,
+                      speed=args.speed, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                      ws_latency_ms=args.ws_latency_ms, error_rate=args.error_rate,
+                      rate_limits=not args.no_rate_limits).start()
+    print("🧪 Simulator läuft. Bot darauf umleiten mit:")
+    for name, value in sim.env().items():
+        print(f"export {name}={value}")
+    print(f"Zugangsdaten: api_key={sim.api_key} api_secret={sim.api_secret} api_passphrase={sim.passphrase}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Engine: {sim.engine.stats}, Konto: {sim.engine.account()['usdtEquity']} USDT")
+    except KeyboardInterrupt:
+        sim.close()
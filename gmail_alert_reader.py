@@ -0,0 +1,258 @@
+import imaplib
+import email
+import base64
+import json
+import os
+import quopri
+import re
+import time
+from datetime import datetime
+from alert_parser import parse_alert
+from metrics import timed
+
+EMAIL = "////"
+APP_PASSWORD = "/////"
+IMAP_HOST = "imap.gmail.com"
+IMAP_PORT = 993
+UID_STATE_FILE = "alert_state.json"
+MAX_PART_BYTES = 16384  # Alerts sind klein, mehr wird pro Mail nie geladen
+
+def log(message):
+    timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+    print(f"{timestamp} {message}")
+
+def extract_text_from_html(html):
+    from bs4 import BeautifulSoup  # teuer; alert_parser nutzt es nur als letzte Stufe
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.get_text()
+
+def connect_imap(host=IMAP_HOST, port=IMAP_PORT, user=EMAIL, password=APP_PASSWORD, use_ssl=True):
+    """
+    Baut eine angemeldete IMAP-Sitzung auf und wählt die Inbox aus.
+
+    Args:
+        host (str): IMAP-Server, z.B. "imap.gmail.com".
+        port (int): Port (993 für SSL).
+        user (str): Login.
+        password (str): App-Passwort.
+        use_ssl (bool): False für lokale Test-Server ohne TLS.
+
+    Returns:
+        imaplib.IMAP4: Angemeldete Verbindung mit ausgewählter Inbox.
+    """
+    if use_ssl:
+        imap = imaplib.IMAP4_SSL(host, port)
+    else:
+        imap = imaplib.IMAP4(host, port)
+    imap.login(user, password)
+    imap.select("inbox")
+    _, data = imap.response("UIDVALIDITY")
+    imap.uidvalidity = int(data[0]) if data and data[0] else None
+    return imap
+
+def load_uid_state(path=UID_STATE_FILE):
+    """Lädt die zuletzt verarbeitete UIDVALIDITY/UID (oder einen leeren Zustand)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"uidvalidity": None, "last_uid": 0}
+
+def save_uid_state(state, path=UID_STATE_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)  # atomar, damit ein Absturz keinen halben Zustand hinterlässt
+
+_FETCH_TOKEN = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"\[]+(?:\[[^\]]*\])?(?:<\d+>)?')
+
+class _Literal(bytes):
+    """Markiert ein IMAP-Literal ({n}), damit es nicht weiter zerlegt wird."""
+
+def _tokenize_fetch(data):
+    for item in data:
+        if isinstance(item, tuple):
+            prefix, literal = item
+            yield from _tokenize_fetch([re.sub(rb"\{\d+\}$", b"", prefix)])
+            yield _Literal(literal)
+        elif isinstance(item, bytes):
+            for match in _FETCH_TOKEN.finditer(item):
+                yield match.group(0)
+
+def _parse_list(tokens):
+    result = []
+    for token in tokens:
+        if isinstance(token, _Literal):
+            result.append(bytes(token))
+        elif token == b"(":
+            result.append(_parse_list(tokens))
+        elif token == b")":
+            return result
+        elif token.startswith(b'"'):
+            result.append(re.sub(rb'\\(.)', rb'\1', token[1:-1]))
+        elif token.upper() == b"NIL":
+            result.append(None)
+        else:
+            result.append(token)
+    return result
+
+def parse_fetch_response(data):
+    """
+    Zerlegt die Rohantwort von ``imap.uid('FETCH', ...)`` in ein Dict je UID.
+
+    Returns:
+        dict: {uid (int): {item (str, z.B. "BODY[1]"): wert}}
+    """
+    tokens = _tokenize_fetch(data)
+    messages = {}
+    for token in tokens:
+        if token == b"(":
+            items = _parse_list(tokens)
+            fields = {items[i].decode().upper(): items[i + 1] for i in range(0, len(items) - 1, 2)}
+            if "UID" in fields:
+                messages[int(fields["UID"])] = fields
+    return messages
+
+def find_text_part(structure, prefix=""):
+    """
+    Sucht in einer BODYSTRUCTURE den Textteil mit dem Alert (text/plain bevorzugt, sonst text/html).
+
+    Returns:
+        tuple: (section, subtype, encoding, charset) oder None.
+    """
+    if structure and isinstance(structure[0], list):
+        # multipart: Unterteile gefolgt vom Subtyp
+        candidates = []
+        for index, child in enumerate(item for item in structure if isinstance(item, list)):
+            found = find_text_part(child, f"{prefix}{index + 1}.")
+            if found:
+                candidates.append(found)
+        candidates.sort(key=lambda part: part[1] != "plain")
+        return candidates[0] if candidates else None
+    if len(structure) < 6 or (structure[0] or b"").lower() != b"text":
+        return None
+    subtype = structure[1].decode().lower()
+    if subtype not in ("plain", "html"):
+        return None
+    params = structure[2] or []
+    charset = "utf-8"
+    for i in range(0, len(params) - 1, 2):
+        if params[i].lower() == b"charset":
+            charset = params[i + 1].decode()
+    encoding = (structure[5] or b"7BIT").decode().upper()
+    section = prefix + "1" if not prefix else prefix.rstrip(".")
+    return section, subtype, encoding, charset
+
+def decode_part(payload, encoding):
+    """Entfernt die Transfer-Kodierung (Base64/Quoted-Printable); der Zeichensatz bleibt unangetastet."""
+    if encoding == "BASE64":
+        compact = re.sub(rb"[^A-Za-z0-9+/=]", b"", payload)
+        return base64.b64decode(compact[:len(compact) - len(compact) % 4])  # Teil-Fetch kann mitten im Block enden
+    if encoding == "QUOTED-PRINTABLE":
+        return quopri.decodestring(payload)
+    return payload
+
+@timed("mail_fetch")
+def fetch_alerts(imap, state=None, state_path=UID_STATE_FILE, uids_out=None):
+    """
+    Holt nur neue Mails (UID > zuletzt verarbeitete UID) in zwei gebündelten FETCH-Aufrufen
+    und lädt dabei nur den Textteil mit dem Alert statt der kompletten RFC822-Nachricht.
+
+    Args:
+        imap (imaplib.IMAP4): Angemeldete Sitzung mit ausgewählter Inbox.
+        state (dict): UIDVALIDITY/UID-Zustand; None lädt ihn aus ``state_path``.
+        state_path (str): Datei, in der der Zustand nach jedem Abruf gespeichert wird (None = nicht speichern).
+        uids_out (list): Bekommt die Mail-UID zu jedem zurückgegebenen Alert (gleiche Reihenfolge).
+
+    Returns:
+        list: Erkannte Alerts als Dicts ({"action": "LONG"|"SHORT", optional "symbol", "size", "tp", "sl"}).
+    """
+    alerts = []
+    if state is None:
+        state = load_uid_state(state_path)
+
+    uidvalidity = getattr(imap, "uidvalidity", None)
+    if state.get("uidvalidity") != uidvalidity or not state.get("last_uid"):
+        # Erster Start oder Postfach neu nummeriert: wie bisher nur ungelesene Mails
+        log("📥 Suche nach ungelesenen E-Mails...")
+        status, messages = imap.uid("SEARCH", "UNSEEN")
+        state["uidvalidity"] = uidvalidity
+        state["last_uid"] = 0
+    else:
+        status, messages = imap.uid("SEARCH", "UID", f"{state['last_uid'] + 1}:*")
+
+    if status != "OK":
+        log("⚠️ Keine E-Mails gefunden oder Fehler beim Abruf.")
+        return alerts
+
+    # "n:*" liefert immer mindestens die höchste UID, auch wenn sie schon verarbeitet ist
+    uids = sorted(int(uid) for uid in (messages[0] or b"").split() if int(uid) > state["last_uid"])
+    if not uids:
+        log("📭 Keine neuen Mails.")
+        return alerts
+
+    log(f"📬 {len(uids)} neue Mail(s) gefunden.")
+    uid_set = ",".join(str(uid) for uid in uids)
+
+    status, data = imap.uid("FETCH", uid_set, "(UID BODYSTRUCTURE)")
+    if status != "OK":
+        log(f"⚠️ Fehler beim Abrufen der BODYSTRUCTURE für {uid_set}")
+        return alerts
+
+    # Mails nach Textteil gruppieren, damit jede Gruppe mit einem FETCH geladen wird
+    groups = {}
+    for uid, fields in parse_fetch_response(data).items():
+        part = find_text_part(fields.get("BODYSTRUCTURE") or [])
+        if part is None:
+            log(f"⚠️ Kein Textteil in Mail-UID {uid}")
+            continue
+        groups.setdefault(part, []).append(uid)
+
+    found = {}
+    for (section, subtype, encoding, charset), group_uids in groups.items():
+        status, data = imap.uid(
+            "FETCH", ",".join(str(uid) for uid in group_uids),
+            f"(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)] BODY.PEEK[{section}]<0.{MAX_PART_BYTES}>)"
+        )
+        if status != "OK":
+            log(f"⚠️ Fehler beim Abrufen der Mail-UIDs {group_uids}")
+            continue
+        for uid, fields in parse_fetch_response(data).items():
+            headers = email.message_from_bytes(next((v for k, v in fields.items() if "HEADER" in k), b""))
+            log(f"✉️ Mail von: {headers['From']}, Betreff: {headers['Subject']}")
+            payload = next((v for k, v in fields.items() if k.startswith(f"BODY[{section}]")), None) or b""
+            try:
+                alert = parse_alert(decode_part(payload, encoding), charset, subtype == "html")
+                if alert:
+                    # Ohne eigene ID identifiziert die Mail-UID den Alert (Duplikaterkennung in alert_queue)
+                    alert.setdefault("id", f"mail-{uidvalidity}-{uid}")
+                    log(f"✅ Neuer Alert erkannt: {alert}")
+                    found[uid] = alert
+            except Exception as decode_err:
+                log(f"❗ Fehler beim Parsen: {decode_err}")
+
+    alerts = [found[uid] for uid in sorted(found)]
+    if uids_out is not None:
+        uids_out.extend(sorted(found))
+    imap.uid("STORE", uid_set, "+FLAGS", "(\\Seen)")
+    state["last_uid"] = uids[-1]
+    if state_path:
+        save_uid_state(state, state_path)
+    return alerts
+
+def check_email_for_alerts():
+    alerts = []  # hier sammeln wir die erkannten Aktionen
+    try:
+        log("🔄 Verbinde zu Gmail...")
+        imap = connect_imap()
+        alerts = fetch_alerts(imap)
+        imap.logout()
+        return alerts
+
+    except Exception as e:
+        log(f"❗ Fehler beim E-Mail-Check: {e}")
+        return alerts
+if __name__ == "__main__":
+    while True:
+        check_email_for_alerts()
+        time.sleep(5)
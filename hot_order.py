@@ -0,0 +1,355 @@
+import argparse
+import hashlib
+import hmac
+import base64
+import http.client
+import json
+import logging
+import socket
+import ssl
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from urllib.parse import urlsplit
+from config import product_type, margin_coin
+from logik import MAX_POSITIONS_PER_SIDE, RISK_FRACTION
+from ledger import ledger as default_ledger
+from market_store import market_store
+from rate_limiter import scheduler
+from trade import (fetch_market_precision, calculate_contracts, ensure_leverage, record_entry, LEVERAGE, MARGIN_MODE,
+                   PLACE_ORDER_PATH, ATTACH_TPSL)
+from tpsl import entry_levels, volatility
+from risk import risk_engine
+from bitget_client import BASE_URL, VERIFY, SERVER_TIME_PATH, _parse
+from metrics import observe, ALERT_TO_WIRE
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+REFRESH_INTERVAL = 0.1  # Sekunden zwischen zwei Neuberechnungen der Ordergröße
+KEEPALIVE_INTERVAL = 15  # Verbindung warm halten und Serverzeit abgleichen
+TIMING_SAMPLES = 4096
+
+class WireTimer:
+    """Sammelt Zeiten je Phase (Sekunden) für report()."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, phase, seconds):
+        self.samples.setdefault(phase, deque(maxlen=TIMING_SAMPLES)).append(seconds)
+
+    def report(self):
+        """
+        Returns:
+            dict: Je Phase Anzahl sowie p50/p99/max in Mikrosekunden.
+        """
+        result = {}
+        for phase, values in self.samples.items():
+            values = sorted(values)
+            result[phase] = {"count": len(values), "p50_us": statistics.median(values) * 1e6,
+                             "p99_us": values[min(len(values) - 1, int(len(values) * 0.99))] * 1e6,
+                             "max_us": values[-1] * 1e6}
+        return result
+
+class OrderTemplate:
+    """
+    Vorgefertigte Marktorder für ein Symbol/eine Seite.
+
+    Body-Anfang, Header und der HMAC-Schlüssel (als vorinitialisiertes hmac-Objekt) stehen fest;
+    beim Senden werden nur Größe, clientOid, Zeitstempel und (optional) die vorberechneten
+    TP/SL-Felder eingesetzt und signiert.
+    """
+
+    def __init__(self, symbol, side, api_key, secret_mac, passphrase):
+        self.symbol = symbol
+        self.side = side
+        fixed = json.dumps({"symbol": symbol, "productType": product_type, "marginMode": MARGIN_MODE,
+                            "marginCoin": margin_coin, "side": side, "orderType": "market"})
+        self._body_head = fixed[:-1] + ', "size": "'
+        self._pre_hash_head = ("POST" + PLACE_ORDER_PATH).encode()
+        self._mac = secret_mac
+        self._headers = {"ACCESS-KEY": api_key, "ACCESS-PASSPHRASE": passphrase,
+                         "Content-Type": "application/json", "locale": "en-US"}
+
+    def render(self, size, client_oid, timestamp, extra=""):
+        """
+        Args:
+            extra (str): Weitere fertige JSON-Felder mit führendem Komma (z.B. Preset-TP/SL).
+
+        Returns:
+            tuple: (body_bytes, headers) fertig zum Senden.
+        """
+        body = f'{self._body_head}{size}", "clientOid": "{client_oid}"{extra}}}'.encode()
+        mac = self._mac.copy()
+        mac.update(timestamp.encode() + self._pre_hash_head + body)
+        headers = dict(self._headers)
+        headers["ACCESS-SIGN"] = base64.b64encode(mac.digest()).decode()
+        headers["ACCESS-TIMESTAMP"] = timestamp
+        headers["Content-Length"] = str(len(body))
+        return body, headers
+
+class HotConnection:
+    """Eine dauerhaft offene HTTPS-Verbindung (TCP_NODELAY) nur für den Order-Pfad."""
+
+    def __init__(self, base_url=BASE_URL, verify=VERIFY, timeout=10):
+        split = urlsplit(base_url)
+        self.host = split.hostname
+        self.port = split.port or 443
+        if isinstance(verify, str):
+            self.context = ssl.create_default_context(cafile=verify)
+        elif verify:
+            self.context = ssl.create_default_context()
+        else:
+            self.context = ssl._create_unverified_context()
+        self.timeout = timeout
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        self.conn = http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.context)
+        self.conn.connect()
+        self.conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, method, path, body, headers):
+        """Schreibt die Anfrage auf den Socket. Returns: perf_counter direkt nach dem Senden."""
+        if self.conn is None:
+            self._connect()
+        self.conn.request(method, path, body=body, headers=headers)
+        return time.perf_counter()
+
+    def receive(self):
+        response = self.conn.getresponse()
+        return response.status, response.read().decode()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class HotOrderBook:
+    """
+    Hält je Symbol/Seite eine sendefertige Marktorder bereit.
+
+    Ein Hintergrund-Thread rechnet alle ``refresh_interval`` Sekunden die Kontraktzahl aus
+    Saldo (Ledger), Preis (market_store) und Präzision (market_cache) neu – mit ``attach_tpsl``
+    auch TP/SL aus ATR/VWAP (tpsl.entry_levels) – und hält die Verbindung warm. Beim Alert
+    bleiben Positionslimit- und Risiko-Prüfung (risk_engine), Einsetzen von Größe und
+    Zeitstempel, Signieren und Senden.
+    """
+
+    def __init__(self, symbols, api_key, api_secret, passphrase, base_url=BASE_URL, verify=VERIFY,
+                 ledger=default_ledger, store=market_store, precision_source=fetch_market_precision,
+                 leverage=LEVERAGE, max_positions=MAX_POSITIONS_PER_SIDE,
+                 risk_fraction=RISK_FRACTION, refresh_interval=REFRESH_INTERVAL, limiter=scheduler,
+                 attach_tpsl=ATTACH_TPSL, indicators=None, risk=risk_engine):
+        self.symbols = list(symbols)
+        self.ledger = ledger
+        self.store = store
+        self.precision_source = precision_source
+        self.leverage = leverage  # None = Hebel nicht vorab setzen
+        self.max_positions = max_positions
+        self.risk_fraction = risk_fraction
+        self.refresh_interval = refresh_interval
+        self.limiter = limiter  # rate_limiter.RateLimiter; None schaltet die Drosselung ab
+        self.attach_tpsl = attach_tpsl
+        self.indicators = indicators  # indicators.IndicatorEngine für ATR/VWAP; None = aus market_store
+        self.risk = risk  # risk.RiskEngine; None schaltet die Vorab-Prüfung ab
+        secret_mac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256)
+        self.templates = {(s, side): OrderTemplate(s, side, api_key, secret_mac, passphrase)
+                          for s in self.symbols for side in ("buy", "sell")}
+        self.sizes = {}  # symbol -> Kontrakte als String (gleich für buy/sell)
+        self.notionals = {}  # symbol -> Orderwert in USDT (für die Risiko-Prüfung)
+        self.presets = {}  # (symbol, side) -> (JSON-Suffix, Preset-Parameter, Preis bei der Berechnung)
+        self.connection = HotConnection(base_url, verify)
+        self.time_offset = 0
+        self.timer = WireTimer()
+        self._stopped = threading.Event()
+        self._last_keepalive = 0.0
+
+    def refresh(self):
+        """Berechnet Ordergröße und TP/SL je Symbol neu (ohne Netzwerk)."""
+        available = self.ledger.available_usdt()
+        for symbol in self.symbols:
+            price = self.store.last_price(symbol)
+            try:
+                precision = self.precision_source(symbol)
+            except Exception as e:
+                logging.warning(f"Präzision für {symbol} nicht verfügbar: {e}")
+                precision = None
+            if available is None or price is None or precision is None:
+                self.sizes.pop(symbol, None)
+                continue
+            try:
+                contracts = calculate_contracts(available * self.risk_fraction, price, precision)
+            except ValueError:
+                self.sizes.pop(symbol, None)  # unter dem Mindestwert: kein heißer Pfad
+                continue
+            self.sizes[symbol] = format(contracts, f".{precision['amount_precision']}f")
+            self.notionals[symbol] = contracts * precision['size_multiplier'] * price
+            if self.attach_tpsl:
+                vol = volatility(symbol, self.indicators, self.store)
+                for side, direction in (("buy", "LONG"), ("sell", "SHORT")):
+                    tp, sl = entry_levels(direction, price, precision['price_precision'], self.leverage or LEVERAGE, vol)
+                    self.presets[(symbol, side)] = (f', "presetStopSurplusPrice": "{tp}", "presetStopLossPrice": "{sl}"',
+                                                    {"presetStopSurplusPrice": tp, "presetStopLossPrice": sl}, price)
+
+    def keepalive(self):
+        """Serverzeit über die heiße Verbindung abfragen: hält sie offen und aktualisiert den Offset."""
+        with self.connection.lock:
+            try:
+                sent = time.time()
+                self.connection.send("GET", SERVER_TIME_PATH, None, {"locale": "en-US"})
+                status, text = self.connection.receive()
+                server_time = int(_parse(status, text, SERVER_TIME_PATH, 0).data["serverTime"])
+                self.time_offset = server_time - int((sent + time.time()) / 2 * 1000)
+            except Exception as e:
+                logging.warning(f"Keepalive der Order-Verbindung fehlgeschlagen: {e}")
+                self.connection.close()
+        self._last_keepalive = time.monotonic()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self.refresh()
+            if time.monotonic() - self._last_keepalive > KEEPALIVE_INTERVAL:
+                self.keepalive()
+            self._stopped.wait(self.refresh_interval)
+
+    def start(self):
+        if self.leverage is not None:
+            for symbol in self.symbols:
+                try:
+                    ensure_leverage(self.leverage, symbol)  # auf dem heißen Pfad nicht mehr nötig
+                except Exception as e:
+                    logging.warning(f"Hebel für {symbol} konnte nicht gesetzt werden: {e}")
+        self.keepalive()
+        self.refresh()
+        threading.Thread(target=self._loop, name="HotOrderBook", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.connection.close()
+
+    def ready(self, symbol):
+        return symbol in self.sizes
+
+    def fire(self, direction, symbol, received_at=None, client_oid=None):
+        """
+        Sendet die vorbereitete Marktorder.
+
+        Args:
+            direction (str): "LONG" oder "SHORT".
+            symbol (str): Handelspaar.
+            received_at (float): perf_counter beim Eingang des Alerts (z.B. von IdleAlertListener).
+            client_oid (str): Eigene Order-ID; Standard ist eine zufällige.
+
+        Returns:
+            BitgetResponse: Antwort der Börse, oder None wenn Positionslimit oder Risiko-Check greifen.
+
+        Raises:
+            KeyError: Wenn für das Symbol (noch) keine Größe vorberechnet ist.
+        """
+        t0 = received_at if received_at is not None else time.perf_counter()
+        if self.ledger.open_positions_count(symbol, direction) >= self.max_positions:
+            logging.warning(f"Maximal {self.max_positions} {direction}-Positionen erlaubt. Trade wird übersprungen.")
+            return None
+        if self.risk is not None:
+            allowed, reason = self.risk.check(symbol, direction, self.notionals[symbol], self.leverage)
+            if not allowed:
+                logging.warning(f"Risiko-Check: {reason}. Trade wird übersprungen.")
+                return None
+        side = 'buy' if direction == 'LONG' else 'sell'
+        size = self.sizes[symbol]
+        preset = self.presets.get((symbol, side)) if self.attach_tpsl else None
+        extra = preset[0] if preset else ""
+        client_oid = client_oid or uuid.uuid4().hex
+        if self.limiter is not None:
+            self.limiter.acquire(PLACE_ORDER_PATH)
+        with self.connection.lock:
+            timestamp = str(int(time.time() * 1000) + self.time_offset)
+            body, headers = self.templates[(symbol, side)].render(size, client_oid, timestamp, extra)
+            t_ready = time.perf_counter()
+            try:
+                t_wire = self.connection.send("POST", PLACE_ORDER_PATH, body, headers)
+                status, text = self.connection.receive()
+            except (http.client.HTTPException, OSError):
+                # Verbindung war tot: einmal neu senden; gleiche clientOid verhindert eine Doppel-Order
+                self.connection.close()
+                timestamp = str(int(time.time() * 1000) + self.time_offset)
+                body, headers = self.templates[(symbol, side)].render(size, client_oid, timestamp, extra)
+                t_wire = self.connection.send("POST", PLACE_ORDER_PATH, body, headers)
+                status, text = self.connection.receive()
+        t_done = time.perf_counter()
+        self.timer.add("alert_to_ready", t_ready - t0)
+        self.timer.add("alert_to_wire", t_wire - t0)
+        observe(ALERT_TO_WIRE, t_wire - t0, symbol=symbol)
+        self.timer.add("round_trip", t_done - t_wire)
+        self.timer.add("alert_to_response", t_done - t0)
+        if self.limiter is not None:
+            self.limiter.record(PLACE_ORDER_PATH, status)
+        response = _parse(status, text, PLACE_ORDER_PATH, (t_done - t_wire) * 1000)
+        if self.risk is not None:
+            self.risk.commit(symbol, direction, self.notionals[symbol], self.leverage)
+        logging.info(f"⚡ Order {symbol} {side} {size} gesendet, Alert→Wire {(t_wire - t0) * 1e6:.0f} µs")
+        # Die Order ist raus: Journal-/Trailing-Fehler nur loggen (trade.record_entry), nicht als Fehlschlag melden
+        price = self.store.last_price(symbol) or (preset[2] if preset else None)
+        record_entry(symbol, side, size, price, preset[1] if preset else {}, client_oid)
+        return response
+
+def benchmark(rounds=500):
+    """Alert→Wire gegen rest_stub: heißer Pfad gegen kalte Berechnung + BitgetClient.post."""
+    from decimal import Decimal
+    from ledger import Ledger
+    from market_store import MarketStore
+    from rest_stub import RestStubServer, STUB_KEY, STUB_SECRET, STUB_PASSPHRASE
+    from trade import build_order_params
+
+    logging.getLogger().setLevel(logging.WARNING)
+    stub = RestStubServer().start()
+    precision = {'price_precision': 1, 'amount_precision': 3, 'size_multiplier': 0.001}
+    bench_ledger = Ledger()
+    bench_ledger.available = Decimal("10000")
+    store = MarketStore()
+    store.set_price("BTCUSDT", 80000.0)
+    book = HotOrderBook(["BTCUSDT"], STUB_KEY, STUB_SECRET, STUB_PASSPHRASE, base_url=stub.url, verify=stub.cert,
+                        ledger=bench_ledger, store=store, precision_source=lambda s: precision, leverage=None,
+                        limiter=None).start()
+
+    for _ in range(rounds):
+        book.fire("LONG", "BTCUSDT")
+    hot = book.timer.report()
+
+    client = stub.client()
+    client.get("/api/v2/mix/account/account")  # Verbindung aufbauen
+    cold_ready, cold_total = [], []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        contracts = calculate_contracts(bench_ledger.available * RISK_FRACTION, store.last_price("BTCUSDT"), precision)
+        body = dict(build_order_params("buy", contracts), symbol="BTCUSDT", clientOid=uuid.uuid4().hex)
+        url, headers, body_str = client._prepare("POST", PLACE_ORDER_PATH, None, body, True)
+        cold_ready.append(time.perf_counter() - t0)
+        client.session.post(url, headers=headers, data=body_str, verify=client.verify)
+        cold_total.append(time.perf_counter() - t0)
+
+    def line(label, p50, p99):
+        print(f"{label:<34} p50 {p50:8.1f} µs  p99 {p99:8.1f} µs")
+
+    def pct(samples, p):
+        return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))] * 1e6
+
+    line("Heißer Pfad  Alert→sendebereit", hot["alert_to_ready"]["p50_us"], hot["alert_to_ready"]["p99_us"])
+    line("Kalter Pfad  Alert→sendebereit", pct(cold_ready, 0.5), pct(cold_ready, 0.99))
+    line("Heißer Pfad  Alert→Bytes im Socket", hot["alert_to_wire"]["p50_us"], hot["alert_to_wire"]["p99_us"])
+    line("Heißer Pfad  Alert→Antwort", hot["alert_to_response"]["p50_us"], hot["alert_to_response"]["p99_us"])
+    line("Kalter Pfad  Alert→Antwort", pct(cold_total, 0.5), pct(cold_total, 0.99))
+    book.stop()
+    stub.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Heißer Order-Pfad: Benchmark gegen den lokalen HTTPS-Stub.")
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.rounds)
@@ -0,0 +1,283 @@
+import argparse
+import re
+import socket
+import socketserver
+import statistics
+import threading
+import time
+import email
+from email.message import EmailMessage
+
+class Mailbox:
+    """Einfache In-Memory-Inbox für den lokalen IMAP-Ersatzserver."""
+
+    def __init__(self, uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.messages = []  # dicts mit uid, raw, seen
+        self.next_uid = 1
+        self.lock = threading.Lock()
+        self.idlers = set()
+        self.delivered_at = {}  # uid -> perf_counter beim Einliefern
+
+    def deliver(self, raw):
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages.append({"uid": uid, "raw": raw, "seen": False})
+            count = len(self.messages)
+            idlers = list(self.idlers)
+            self.delivered_at[uid] = time.perf_counter()
+        for handler in idlers:
+            handler.notify(b"* %d EXISTS\r\n" % count)
+        return uid
+
+class IMAPStubHandler(socketserver.StreamRequestHandler):
+    """Versteht die IMAP-Befehle, die der Bot benutzt (LOGIN, SELECT, SEARCH, FETCH, IDLE, ...)."""
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.write_lock = threading.Lock()
+        self.mailbox = self.server.mailbox
+
+    def notify(self, data):
+        with self.write_lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except OSError:
+                pass
+
+    def send(self, line):
+        self.notify(line.encode() + b"\r\n" if isinstance(line, str) else line)
+
+    def handle(self):
+        self.send("* OK IMAP stub ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            parts = line.decode().rstrip("\r\n").split(" ", 2)
+            tag = parts[0]
+            command = parts[1].upper() if len(parts) > 1 else ""
+            args = parts[2] if len(parts) > 2 else ""
+            if command == "CAPABILITY":
+                self.send("* CAPABILITY IMAP4rev1 IDLE UIDPLUS")
+                self.send(f"{tag} OK CAPABILITY completed")
+            elif command == "LOGIN":
+                self.send(f"{tag} OK LOGIN completed")
+            elif command in ("SELECT", "EXAMINE"):
+                with self.mailbox.lock:
+                    count = len(self.mailbox.messages)
+                    next_uid = self.mailbox.next_uid
+                self.send(f"* {count} EXISTS")
+                self.send(f"* OK [UIDVALIDITY {self.mailbox.uidvalidity}] UIDs valid")
+                self.send(f"* OK [UIDNEXT {next_uid}] Predicted next UID")
+                self.send(f"{tag} OK [READ-WRITE] SELECT completed")
+            elif command == "SEARCH":
+                self.send("* SEARCH " + " ".join(str(seq) for seq, _ in self._select(args)))
+                self.send(f"{tag} OK SEARCH completed")
+            elif command == "UID":
+                self._uid(tag, args)
+            elif command == "FETCH":
+                seq_set, _, items = args.partition(" ")
+                for seq, msg in self._by_seq(seq_set):
+                    self._fetch(seq, msg, items, mark_seen=True)
+                self.send(f"{tag} OK FETCH completed")
+            elif command == "IDLE":
+                self._idle(tag)
+            elif command == "NOOP":
+                self.send(f"{tag} OK NOOP completed")
+            elif command == "LOGOUT":
+                self.send("* BYE logging out")
+                self.send(f"{tag} OK LOGOUT completed")
+                break
+            else:
+                self.send(f"{tag} BAD unknown command {command}")
+
+    def _idle(self, tag):
+        self.send("+ idling")
+        with self.mailbox.lock:
+            self.mailbox.idlers.add(self)
+        try:
+            line = self.rfile.readline()
+        finally:
+            with self.mailbox.lock:
+                self.mailbox.idlers.discard(self)
+        if line.strip().upper() == b"DONE":
+            self.send(f"{tag} OK IDLE terminated")
+        else:
+            self.send(f"{tag} BAD expected DONE")
+
+    def _select(self, criteria):
+        with self.mailbox.lock:
+            numbered = list(enumerate(self.mailbox.messages, start=1))
+        if "UNSEEN" in criteria.upper():
+            numbered = [(seq, msg) for seq, msg in numbered if not msg["seen"]]
+        match = re.search(r"UID (\S+)", criteria, re.I)
+        if match:
+            uids = self._uid_set(match.group(1), [msg for _, msg in numbered])
+            numbered = [(seq, msg) for seq, msg in numbered if msg["uid"] in uids]
+        return numbered
+
+    def _uid_set(self, uid_set, messages):
+        highest = max((msg["uid"] for msg in messages), default=0)
+        wanted = set()
+        for item in uid_set.split(","):
+            start, _, end = item.partition(":")
+            start = highest if start == "*" else int(start)
+            end = highest if end == "*" else int(end or start)
+            wanted.update(range(min(start, end), max(start, end) + 1))
+        return wanted
+
+    def _uid(self, tag, args):
+        command, _, rest = args.partition(" ")
+        command = command.upper()
+        if command == "SEARCH":
+            self.send("* SEARCH " + " ".join(str(msg["uid"]) for _, msg in self._select(rest)))
+        elif command in ("FETCH", "STORE"):
+            uid_set, _, items = rest.partition(" ")
+            numbered = self._select("ALL")
+            uids = self._uid_set(uid_set, [msg for _, msg in numbered])
+            for seq, msg in numbered:
+                if msg["uid"] not in uids:
+                    continue
+                if command == "FETCH":
+                    self._fetch(seq, msg, items, mark_seen=True)
+                elif "\\SEEN" in items.upper():
+                    msg["seen"] = not items.startswith("-")
+        else:
+            self.send(f"{tag} BAD unknown UID command {command}")
+            return
+        self.send(f"{tag} OK UID {command} completed")
+
+    def _by_seq(self, seq_set):
+        with self.mailbox.lock:
+            messages = list(self.mailbox.messages)
+        wanted = set()
+        for item in seq_set.split(","):
+            start, _, end = item.partition(":")
+            last = len(messages) if end == "*" else int(end or start)
+            wanted.update(range(int(start), last + 1))
+        return [(seq, messages[seq - 1]) for seq in sorted(wanted) if 0 < seq <= len(messages)]
+
+    def _fetch(self, seq, msg, items, mark_seen):
+        raw = msg["raw"]
+        parsed = email.message_from_bytes(raw)
+        if mark_seen and re.search(r"RFC822|BODY\[", items, re.I) and "PEEK" not in items.upper():
+            msg["seen"] = True
+        out = b"* %d FETCH (UID %d" % (seq, msg["uid"])
+        if "BODYSTRUCTURE" in items.upper():
+            out += b" BODYSTRUCTURE " + _bodystructure(parsed).encode()
+        for match in re.finditer(r"BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", items, re.I):
+            section, offset, length = match.groups()
+            if section.upper().startswith("HEADER.FIELDS"):
+                names = re.findall(r"[\w-]+", section[len("HEADER.FIELDS"):])
+                data = b"".join(f"{name}: {parsed[name]}\r\n".encode() for name in names if parsed[name]) + b"\r\n"
+            else:
+                data = _section_payload(parsed, section)
+            key = f"BODY[{section}]".encode()
+            if offset is not None:
+                data = data[int(offset):int(offset) + int(length)]
+                key += f"<{offset}>".encode()
+            out += b" " + key + b" {%d}\r\n" % len(data) + data
+        if "RFC822" in items.upper():
+            out += b" RFC822 {%d}\r\n" % len(raw) + raw
+        self.notify(out + b")\r\n")
+
+def _quote(value):
+    return "NIL" if value is None else '"%s"' % str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def _bodystructure(part):
+    """Baut eine (vereinfachte) IMAP-BODYSTRUCTURE aus einer email.message."""
+    if part.is_multipart():
+        children = "".join(_bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())})"
+    payload = part.get_payload(decode=False)
+    params = " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in part.get_params()[1:]) or None
+    encoding = part.get("Content-Transfer-Encoding", "7BIT").upper()
+    return "({} {} {} NIL NIL {} {} {})".format(
+        _quote(part.get_content_maintype().upper()), _quote(part.get_content_subtype().upper()),
+        f"({params})" if params else "NIL", _quote(encoding), len(payload.encode()), payload.count("\n"))
+
+def _section_payload(msg, section):
+    part = msg
+    for index in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+    return part.get_payload(decode=False).encode()
+
+class IMAPStubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), mailbox=None):
+        super().__init__(address, IMAPStubHandler)
+        self.mailbox = mailbox or Mailbox()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="IMAPStubServer", daemon=True)
+        thread.start()
+        return thread
+
+def make_alert_mail(action="LONG", html=True):
+    """Baut eine Mail im Format der TradingView-Alerts."""
+    msg = EmailMessage()
+    msg["From"] = "TradingView <noreply@tradingview.com>"
+    msg["To"] = "bot@example.com"
+    msg["Subject"] = f"Alarm: BTCUSDT {action}"
+    payload = '{"action": "%s"}' % action
+    msg.set_content(payload)
+    if html:
+        msg.add_alternative(f"<html><body><p>{payload}</p></body></html>", subtype="html")
+    return msg.as_bytes()
+
+def measure_idle_latency(rounds=50, pause=0.05):
+    """
+    Misst die Zeit vom Einliefern einer Mail bis zum Aufruf des Alert-Handlers.
+
+    Returns:
+        list[float]: Latenzen in Millisekunden.
+    """
+    from alert_listener import IdleAlertListener
+
+    server = IMAPStubServer()
+    server.start()
+    latencies = []
+    done = threading.Event()
+    pending = {}
+
+    def handler(alert, received_at):
+        uid = pending.pop("uid")
+        latencies.append((received_at - server.mailbox.delivered_at[uid]) * 1000)
+        done.set()
+
+    listener = IdleAlertListener(handler=handler, host="127.0.0.1", port=server.port,
+                                 use_ssl=False, state_path=None, poll_interval=0.2)
+    listener.start()
+    listener.connected.wait(5)
+    for i in range(rounds):
+        done.clear()
+        time.sleep(pause)  # Listener soll wieder im IDLE sein
+        pending["uid"] = server.mailbox.deliver(make_alert_mail("LONG" if i % 2 == 0 else "SHORT"))
+        if not done.wait(5):
+            raise TimeoutError("Alert wurde nicht zugestellt")
+    listener.stop()
+    server.shutdown()
+    return latencies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler IMAP-Ersatzserver: misst Alert-Latenz per IDLE.")
+    parser.add_argument("--rounds", type=int, default=50, help="Anzahl zugestellter Test-Mails")
+    args = parser.parse_args()
+
+    results = measure_idle_latency(args.rounds)
+    results.sort()
+    print(f"Mails: {len(results)}")
+    print(f"p50: {statistics.median(results):.2f} ms")
+    print(f"p99: {results[int(len(results) * 0.99) - 1]:.2f} ms")
+    print(f"max: {results[-1]:.2f} ms")
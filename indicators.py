@@ -0,0 +1,455 @@
+"""
+Streaming-Indikatoren für viele Symbole/Zeitebenen gleichzeitig: EMA, ATR, RSI, VWAP-Bänder und Order-Flow-Imbalance.
+
+Jede Kombination (Symbol, Granularität) belegt einen Slot; der Zustand aller Slots liegt
+spaltenweise in NumPy-Arrays, ein update() rechnet alle übergebenen Slots in einem Schritt
+(O(1) Zustand und Arbeit je Slot und Kerze, unabhängig von der Historie).
+
+Die laufende Kerze kommt bei Bitget mit jedem Trade neu (gleiche ts). Deshalb gibt es je
+Indikator einen Stand *vor* der laufenden Kerze (prev) und einen *mit* ihr (cur): gleiche ts
+rechnet cur aus prev neu, eine neue ts übernimmt cur als prev. So stimmt der Wert jederzeit mit
+einer Berechnung über die abgeschlossenen Kerzen plus den aktuellen Stand der laufenden überein.
+
+    EMA:   Startwert = erster Schlusskurs, danach alpha = 2 / (n + 1) (wie pandas ewm(adjust=False)).
+    ATR:   Wilder; die ersten n True Ranges werden gemittelt, danach (n-1)/n-Glättung.
+    RSI:   Wilder wie ATR auf Gewinne/Verluste der Schlusskurse.
+    VWAP:  über die letzten ``vwap_window`` Kerzen (wie data.calculate_vwap_last_60), Bänder = VWAP ± k·σ
+           mit der volumengewichteten Standardabweichung des typischen Preises.
+    OFI:   Order-Flow-Imbalance nach Cont/Kukanov/Stoikov aus bestem Bid/Ask (ticker-Kanal), als EMA
+           über ``ofi_span`` Ticks und normiert auf die mittlere Tiefe am besten Preis.
+
+``python indicators.py`` prüft die Werte gegen pandas/vwap.py und misst den Durchsatz.
+"""
+import argparse
+import threading
+import time
+import numpy as np
+
+EMA_PERIODS = (9, 21)
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+VWAP_WINDOW = 60
+BAND_MULTIPLIERS = (1.0, 2.0)
+OFI_SPAN = 50  # Ticks
+INITIAL_SLOTS = 16
+
+# Schwellen für confirm()/size_factor()
+RSI_OVERBOUGHT = 70.0
+RSI_OVERSOLD = 30.0
+OFI_AGAINST = -0.5  # normierte OFI deutlich gegen die Richtung -> nicht bestätigen
+TARGET_ATR_FRACTION = 0.002  # bei ATR = 0,2 % des Preises volle Größe, darüber proportional kleiner
+MIN_SIZE_FACTOR = 0.25
+
+class IndicatorEngine:
+    """
+    Indikatoren je (Symbol, Granularität) mit spaltenweisem NumPy-Zustand.
+
+    Schreiben: on_candle()/on_tick() für einzelne Nachrichten (market_feed), update()/update_ticks()
+    für viele Slots auf einmal. Lesen: snapshot(), confirm(), size_factor().
+    """
+
+    def __init__(self, ema_periods=EMA_PERIODS, atr_period=ATR_PERIOD, rsi_period=RSI_PERIOD,
+                 vwap_window=VWAP_WINDOW, band_multipliers=BAND_MULTIPLIERS, ofi_span=OFI_SPAN,
+                 capacity=INITIAL_SLOTS):
+        self.ema_periods = tuple(ema_periods)
+        self.alphas = np.array([2.0 / (p + 1) for p in self.ema_periods])[:, None]
+        self.atr_period = atr_period
+        self.rsi_period = rsi_period
+        self.vwap_window = vwap_window
+        self.band_multipliers = tuple(band_multipliers)
+        self.ofi_alpha = 2.0 / (ofi_span + 1)
+        self.slots = {}  # (symbol, granularity) -> Index
+        self.tick_slots = {}  # symbol -> Index
+        self.lock = threading.Lock()
+        self.capacity = 0
+        self.tick_capacity = 0
+        self._grow(capacity)
+        self._grow_ticks(capacity)
+
+    # --- Zustand ---
+
+    def _grow(self, capacity):
+        if self.capacity == 0:
+            p, w = len(self.ema_periods), self.vwap_window
+            self.last_ts = np.full(capacity, -1, dtype=np.int64)
+            self.count = np.zeros(capacity, dtype=np.int64)  # Kerzen inkl. laufender
+            self.close = np.zeros(capacity)
+            self.prev_close = np.zeros(capacity)  # Schlusskurs der Vorkerze
+            self.ema_prev = np.zeros((p, capacity))
+            self.ema = np.zeros((p, capacity))
+            self.atr_prev = np.zeros(capacity)
+            self.atr = np.zeros(capacity)
+            self.gain_prev = np.zeros(capacity)
+            self.gain = np.zeros(capacity)
+            self.loss_prev = np.zeros(capacity)
+            self.loss = np.zeros(capacity)
+            self.head = np.zeros(capacity, dtype=np.int64)  # nächste Position im VWAP-Ring
+            self.ring_tpv = np.zeros((capacity, w))
+            self.ring_vol = np.zeros((capacity, w))
+            self.ring_tp2v = np.zeros((capacity, w))
+            self.sum_tpv = np.zeros(capacity)
+            self.sum_vol = np.zeros(capacity)
+            self.sum_tp2v = np.zeros(capacity)
+        else:
+            extra = capacity - self.capacity
+            self.last_ts = np.concatenate((self.last_ts, np.full(extra, -1, dtype=np.int64)))
+            for name in ("count", "head"):
+                setattr(self, name, np.concatenate((getattr(self, name), np.zeros(extra, dtype=np.int64))))
+            for name in ("close", "prev_close", "atr_prev", "atr", "gain_prev", "gain", "loss_prev", "loss",
+                         "sum_tpv", "sum_vol", "sum_tp2v"):
+                setattr(self, name, np.concatenate((getattr(self, name), np.zeros(extra))))
+            for name in ("ema_prev", "ema"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate((array, np.zeros((array.shape[0], extra))), axis=1))
+            for name in ("ring_tpv", "ring_vol", "ring_tp2v"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate((array, np.zeros((extra, array.shape[1])))))
+        self.capacity = capacity
+
+    def _grow_ticks(self, capacity):
+        extra = capacity - self.tick_capacity
+        if self.tick_capacity == 0:
+            self.bid = np.zeros(capacity)
+            self.ask = np.zeros(capacity)
+            self.bid_size = np.zeros(capacity)
+            self.ask_size = np.zeros(capacity)
+            self.ticks = np.zeros(capacity, dtype=np.int64)
+            self.ofi = np.zeros(capacity)  # EMA der OFI-Ereignisse
+            self.depth = np.zeros(capacity)  # EMA der mittleren Tiefe am besten Preis
+            self.imbalance = np.zeros(capacity)  # EMA von (bidSz - askSz) / (bidSz + askSz)
+        else:
+            for name in ("bid", "ask", "bid_size", "ask_size", "ofi", "depth", "imbalance"):
+                setattr(self, name, np.concatenate((getattr(self, name), np.zeros(extra))))
+            self.ticks = np.concatenate((self.ticks, np.zeros(extra, dtype=np.int64)))
+        self.tick_capacity = capacity
+
+    def slot(self, symbol, granularity="1m"):
+        """Index des Slots für (symbol, granularity); legt ihn bei Bedarf an."""
+        key = (symbol, granularity)
+        index = self.slots.get(key)
+        if index is None:
+            with self.lock:
+                index = self.slots.get(key)
+                if index is None:
+                    index = len(self.slots)
+                    if index >= self.capacity:
+                        self._grow(self.capacity * 2)
+                    self.slots[key] = index
+        return index
+
+    def tick_slot(self, symbol):
+        index = self.tick_slots.get(symbol)
+        if index is None:
+            with self.lock:
+                index = self.tick_slots.get(symbol)
+                if index is None:
+                    index = len(self.tick_slots)
+                    if index >= self.tick_capacity:
+                        self._grow_ticks(self.tick_capacity * 2)
+                    self.tick_slots[symbol] = index
+        return index
+
+    # --- Kerzen ---
+
+    def update(self, slots, ts, high, low, close, volume):
+        """
+        Übernimmt je Slot eine Kerze (neue ts) oder den neuen Stand der laufenden Kerze (gleiche ts).
+
+        Args:
+            slots (np.ndarray): Slot-Indizes (aus slot()); jeder Slot höchstens einmal pro Aufruf.
+            ts, high, low, close, volume (np.ndarray): Kerzenwerte je Slot (ts in ms).
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        ts = np.asarray(ts, dtype=np.int64)
+        high, low, close, volume = (np.asarray(x, dtype=np.float64) for x in (high, low, close, volume))
+        with self.lock:
+            last = self.last_ts[slots]
+            valid = ts >= last  # ältere Kerzen (überholt) ignorieren
+            if not valid.all():
+                slots, ts, high, low, close, volume = (x[valid] for x in (slots, ts, high, low, close, volume))
+                last = last[valid]
+            new = ts > last
+            self._commit(slots[new], ts[new])
+            n = self.count[slots]
+            first = n == 1
+            prev_close = self.prev_close[slots]
+            self.close[slots] = close
+
+            # EMA
+            ema_prev = self.ema_prev[:, slots]
+            self.ema[:, slots] = np.where(first, close, ema_prev + self.alphas * (close - ema_prev))
+
+            # ATR (Wilder, Start als Mittelwert der ersten atr_period True Ranges)
+            tr = np.where(first, high - low, np.maximum(high - low, np.maximum(np.abs(high - prev_close),
+                                                                                   np.abs(low - prev_close))))
+            atr_prev = self.atr_prev[slots]
+            self.atr[slots] = atr_prev + (tr - atr_prev) / np.minimum(n, self.atr_period)
+
+            # RSI (Wilder auf Schlusskursänderungen; die erste Kerze hat keine)
+            change = np.where(first, 0.0, close - prev_close)
+            k = np.maximum(np.minimum(n - 1, self.rsi_period), 1)
+            gain_prev, loss_prev = self.gain_prev[slots], self.loss_prev[slots]
+            self.gain[slots] = np.where(first, 0.0, gain_prev + (np.maximum(change, 0.0) - gain_prev) / k)
+            self.loss[slots] = np.where(first, 0.0, loss_prev + (np.maximum(-change, 0.0) - loss_prev) / k)
+
+            # VWAP-Ring: neue Kerze an head, laufende Kerze ersetzt head - 1
+            pos = (self.head[slots] - 1) % self.vwap_window
+            tp = (high + low + close) / 3.0
+            tpv, tp2v = tp * volume, tp * tp * volume
+            self.sum_tpv[slots] += tpv - self.ring_tpv[slots, pos]
+            self.sum_vol[slots] += volume - self.ring_vol[slots, pos]
+            self.sum_tp2v[slots] += tp2v - self.ring_tp2v[slots, pos]
+            self.ring_tpv[slots, pos] = tpv
+            self.ring_vol[slots, pos] = volume
+            self.ring_tp2v[slots, pos] = tp2v
+
+    def _commit(self, slots, ts):
+        """Neue Kerze: laufenden Stand als abgeschlossen übernehmen und den Ring-Platz freimachen."""
+        if not len(slots):
+            return
+        started = self.count[slots] > 0
+        self.prev_close[slots] = np.where(started, self.close[slots], 0.0)
+        self.ema_prev[:, slots] = self.ema[:, slots]
+        self.atr_prev[slots] = self.atr[slots]
+        self.gain_prev[slots] = self.gain[slots]
+        self.loss_prev[slots] = self.loss[slots]
+        self.last_ts[slots] = ts
+        self.count[slots] += 1
+        pos = self.head[slots]
+        self.sum_tpv[slots] -= self.ring_tpv[slots, pos]
+        self.sum_vol[slots] -= self.ring_vol[slots, pos]
+        self.sum_tp2v[slots] -= self.ring_tp2v[slots, pos]
+        self.ring_tpv[slots, pos] = 0.0
+        self.ring_vol[slots, pos] = 0.0
+        self.ring_tp2v[slots, pos] = 0.0
+        self.head[slots] = (pos + 1) % self.vwap_window
+        # Laufende Summen sammeln Rundungsfehler: einmal pro Fensterumlauf exakt neu summieren
+        resync = slots[pos == 0]
+        if len(resync):
+            self.sum_tpv[resync] = self.ring_tpv[resync].sum(axis=1)
+            self.sum_vol[resync] = self.ring_vol[resync].sum(axis=1)
+            self.sum_tp2v[resync] = self.ring_tp2v[resync].sum(axis=1)
+
+    def on_candle(self, symbol, granularity, ts, o, h, l, c, v):
+        """Eine Kerze aus dem candle-Kanal (market_feed)."""
+        self.update(np.array([self.slot(symbol, granularity)]), np.array([ts]), np.array([h]), np.array([l]),
+                    np.array([c]), np.array([v]))
+
+    def load(self, symbol, granularity, rows):
+        """Historie (z.B. data.fetch_bitget_candles oder market_store-Fenster) einspielen: Zeilen (ts, o, h, l, c, v)."""
+        slot = np.array([self.slot(symbol, granularity)])
+        for ts, o, h, l, c, v in sorted(rows):
+            self.update(slot, np.array([ts]), np.array([h]), np.array([l]), np.array([c]), np.array([v]))
+
+    # --- Ticks (Order-Flow) ---
+
+    def update_ticks(self, slots, bid, bid_size, ask, ask_size):
+        """Bestes Bid/Ask je Tick-Slot (aus tick_slot()); jeder Slot höchstens einmal pro Aufruf."""
+        slots = np.asarray(slots, dtype=np.int64)
+        bid, bid_size, ask, ask_size = (np.asarray(x, dtype=np.float64) for x in (bid, bid_size, ask, ask_size))
+        with self.lock:
+            first = self.ticks[slots] == 0
+            pb, pbs = self.bid[slots], self.bid_size[slots]
+            pa, pas = self.ask[slots], self.ask_size[slots]
+            event = ((bid >= pb) * bid_size - (bid <= pb) * pbs
+                     - (ask <= pa) * ask_size + (ask >= pa) * pas)
+            event = np.where(first, 0.0, event)
+            depth = (bid_size + ask_size) / 2.0
+            total = bid_size + ask_size
+            book = np.divide(bid_size - ask_size, total, out=np.zeros_like(total), where=total > 0)
+            a = self.ofi_alpha
+            self.ofi[slots] = np.where(first, 0.0, self.ofi[slots] + a * (event - self.ofi[slots]))
+            self.depth[slots] = np.where(first, depth, self.depth[slots] + a * (depth - self.depth[slots]))
+            self.imbalance[slots] = np.where(first, book, self.imbalance[slots] + a * (book - self.imbalance[slots]))
+            self.bid[slots], self.bid_size[slots] = bid, bid_size
+            self.ask[slots], self.ask_size[slots] = ask, ask_size
+            self.ticks[slots] += 1
+
+    def on_tick(self, symbol, bid, bid_size, ask, ask_size):
+        """Ein Eintrag aus dem ticker-Kanal (bidPr/bidSz/askPr/askSz)."""
+        self.update_ticks(np.array([self.tick_slot(symbol)]), np.array([bid]), np.array([bid_size]),
+                          np.array([ask]), np.array([ask_size]))
+
+    # --- Abfragen ---
+
+    def ready(self, symbol, granularity="1m"):
+        """True, sobald alle Kerzen-Indikatoren ihre Einschwingphase hinter sich haben."""
+        index = self.slots.get((symbol, granularity))
+        warmup = max(max(self.ema_periods), self.atr_period, self.rsi_period + 1, self.vwap_window)
+        return index is not None and int(self.count[index]) >= warmup
+
+    def snapshot(self, symbol, granularity="1m"):
+        """
+        Aktuelle Werte für (symbol, granularity).
+
+        Returns:
+            dict: close, ema_<n>, atr, rsi, vwap, vwap_upper_<k>/vwap_lower_<k>, ofi, imbalance, candles, ready;
+            None, wenn für das Symbol noch keine Kerze vorliegt.
+        """
+        index = self.slots.get((symbol, granularity))
+        if index is None or not self.count[index]:
+            return None
+        with self.lock:
+            close = float(self.close[index])
+            result = {"close": close, "candles": int(self.count[index]), "atr": float(self.atr[index])}
+            for period, value in zip(self.ema_periods, self.ema[:, index]):
+                result[f"ema_{period}"] = float(value)
+            gain, loss = float(self.gain[index]), float(self.loss[index])
+            result["rsi"] = 100.0 - 100.0 / (1.0 + gain / loss) if loss > 0 else (100.0 if gain > 0 else 50.0)
+            volume = float(self.sum_vol[index])
+            vwap = float(self.sum_tpv[index]) / volume if volume > 0 else None
+            result["vwap"] = vwap
+            if vwap is not None:
+                sigma = max(float(self.sum_tp2v[index]) / volume - vwap * vwap, 0.0) ** 0.5
+                for k in self.band_multipliers:
+                    result[f"vwap_upper_{k:g}"] = vwap + k * sigma
+                    result[f"vwap_lower_{k:g}"] = vwap - k * sigma
+            tick = self.tick_slots.get(symbol)
+            if tick is not None and self.ticks[tick]:
+                depth = float(self.depth[tick])
+                result["ofi"] = float(self.ofi[tick]) / depth if depth > 0 else 0.0
+                result["imbalance"] = float(self.imbalance[tick])
+            else:
+                result["ofi"] = result["imbalance"] = None
+        result["ready"] = self.ready(symbol, granularity)
+        return result
+
+    def confirm(self, direction, symbol, granularity="1m"):
+        """
+        Prüft, ob die Indikatoren einen Alert stützen.
+
+        LONG braucht EMA schnell ≥ EMA langsam, RSI unter RSI_OVERBOUGHT, Kurs nicht über dem oberen
+        äußeren VWAP-Band und keine deutlich negative OFI; SHORT spiegelbildlich.
+
+        Returns:
+            tuple: (bestätigt, Grund). Ohne eingeschwungene Daten (True, "keine Daten"), damit fehlende
+            Marktdaten keinen Trade blockieren.
+        """
+        values = self.snapshot(symbol, granularity)
+        if values is None or not values["ready"]:
+            return True, "keine Daten"
+        sign = 1.0 if direction == "LONG" else -1.0
+        fast, slow = values[f"ema_{self.ema_periods[0]}"], values[f"ema_{self.ema_periods[-1]}"]
+        if sign * (fast - slow) < 0:
+            return False, f"Trend dagegen (EMA {fast:.2f} / {slow:.2f})"
+        if (direction == "LONG" and values["rsi"] > RSI_OVERBOUGHT) or \
+                (direction == "SHORT" and values["rsi"] < RSI_OVERSOLD):
+            return False, f"RSI {values['rsi']:.1f} ausgereizt"
+        k = max(self.band_multipliers)
+        band = values.get(f"vwap_upper_{k:g}" if direction == "LONG" else f"vwap_lower_{k:g}")
+        if band is not None and sign * (values["close"] - band) > 0:
+            return False, f"Kurs {values['close']:.2f} außerhalb des VWAP-Bands {band:.2f}"
+        if values["ofi"] is not None and sign * values["ofi"] < OFI_AGAINST:
+            return False, f"Order-Flow dagegen (OFI {values['ofi']:.2f})"
+        return True, "bestätigt"
+
+    def size_factor(self, symbol, granularity="1m"):
+        """
+        Faktor für die Ordergröße aus der Volatilität: 1 bis ATR = TARGET_ATR_FRACTION des Preises,
+        darüber proportional kleiner (mindestens MIN_SIZE_FACTOR). Ohne Daten 1.
+        """
+        values = self.snapshot(symbol, granularity)
+        if values is None or not values["ready"] or values["close"] <= 0:
+            return 1.0
+        fraction = values["atr"] / values["close"]
+        if fraction <= TARGET_ATR_FRACTION:
+            return 1.0
+        return max(MIN_SIZE_FACTOR, TARGET_ATR_FRACTION / fraction)
+
+# Prozessweite Instanz, die market_feed füttert und logik abfragt
+indicator_engine = IndicatorEngine()
+
+def _random_walk(steps, streams, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 80000 * np.exp(np.cumsum(rng.normal(0, 0.001, (steps, streams)), axis=0))
+    high = close * (1 + rng.uniform(0, 0.001, (steps, streams)))
+    low = close * (1 - rng.uniform(0, 0.001, (steps, streams)))
+    volume = rng.uniform(0.1, 50, (steps, streams))
+    return high, low, close, volume
+
+def verify(candles=500):
+    """Vergleicht mit pandas (EMA), vwap.vwap_numpy (VWAP) und einer Schleife (ATR/RSI, Wilder)."""
+    import pandas as pd
+    from vwap import vwap_numpy
+
+    high, low, close, volume = (x[:, 0] for x in _random_walk(candles, 1))
+    engine = IndicatorEngine()
+    slot = np.array([engine.slot("TEST", "1m")])
+    ema, vwap, atr, rsi = [], [], [], []
+    for i in range(candles):
+        # laufende Kerze dreimal senden (Zwischenstände), dann der Endstand
+        for part in (0.3, 0.7):
+            engine.update(slot, [i * 60_000], [high[i]], [low[i]], [close[i] * (1 + part * 1e-4)],
+                          [volume[i] * part])
+        engine.update(slot, [i * 60_000], [high[i]], [low[i]], [close[i]], [volume[i]])
+        values = engine.snapshot("TEST", "1m")
+        ema.append(values["ema_21"])
+        vwap.append(values["vwap"])
+        atr.append(values["atr"])
+        rsi.append(values["rsi"])
+    expected_ema = pd.Series(close).ewm(span=21, adjust=False).mean().to_numpy()
+    expected_vwap = vwap_numpy(high, low, close, volume, VWAP_WINDOW)
+    tr = np.maximum(high[1:] - low[1:], np.maximum(abs(high[1:] - close[:-1]), abs(low[1:] - close[:-1])))
+    tr = np.concatenate(([high[0] - low[0]], tr))
+    expected_atr, value = [], 0.0
+    for i, t in enumerate(tr):
+        value += (t - value) / min(i + 1, ATR_PERIOD)
+        expected_atr.append(value)
+    change = np.diff(close)
+    gain = loss = 0.0
+    expected_rsi = [50.0]
+    for i, c in enumerate(change):
+        k = min(i + 1, RSI_PERIOD)
+        gain += (max(c, 0) - gain) / k
+        loss += (max(-c, 0) - loss) / k
+        expected_rsi.append(100 - 100 / (1 + gain / loss) if loss else 100.0)
+    ready = slice(VWAP_WINDOW - 1, None)
+    return {
+        "ema": float(np.max(np.abs(np.array(ema) - expected_ema) / expected_ema)),
+        "vwap": float(np.max(np.abs(np.array(vwap)[ready] - expected_vwap[ready]) / expected_vwap[ready])),
+        "atr": float(np.max(np.abs(np.array(atr) - expected_atr) / np.array(expected_atr))),
+        "rsi": float(np.max(np.abs(np.array(rsi) - expected_rsi))),
+    }
+
+def benchmark(streams=(1, 64, 512), steps=2000, pushes_per_candle=4):
+    """
+    Durchsatz: ``streams`` Slots (Symbol × Zeitebene) werden je Schritt gemeinsam aktualisiert, jede Kerze
+    kommt ``pushes_per_candle``-mal (laufende Kerze). Gezählt wird jede Indikator-Aktualisierung
+    (EMA×2, ATR, RSI, VWAP-Bänder = 5 je Kerzen-Update, OFI = 1 je Tick).
+    """
+    deviations = verify()
+    print("Abweichung zur Referenz: " + ", ".join(f"{name} {value:.1e}" for name, value in deviations.items()))
+    per_update = len(EMA_PERIODS) + 3
+    print(f"{'Slots':>6} {'Kerzen-Updates/s':>17} {'Indikator-Updates/s':>20} {'µs/Aufruf':>10}")
+    for n in streams:
+        high, low, close, volume = _random_walk(steps, n)
+        engine = IndicatorEngine()
+        slots = np.array([engine.slot(f"S{i // 2}", ("1m", "5m")[i % 2]) for i in range(n)])
+        calls = 0
+        start = time.perf_counter()
+        for step in range(steps):
+            ts = np.full(n, (step // pushes_per_candle) * 60_000, dtype=np.int64)
+            engine.update(slots, ts, high[step], low[step], close[step], volume[step])
+            calls += 1
+        elapsed = time.perf_counter() - start
+        updates = steps * n
+        print(f"{n:>6} {updates / elapsed:>17,.0f} {updates * per_update / elapsed:>20,.0f} "
+              f"{elapsed / calls * 1e6:>10.1f}")
+    engine = IndicatorEngine()
+    for n in streams:
+        rng = np.random.default_rng(2)
+        tick_slots = np.array([engine.tick_slot(f"T{n}-{i}") for i in range(n)])
+        bid = 80000 + np.cumsum(rng.choice([-0.1, 0, 0.1], (steps, n)), axis=0)
+        sizes = rng.uniform(0.1, 5, (steps, n, 2))
+        start = time.perf_counter()
+        for step in range(steps):
+            engine.update_ticks(tick_slots, bid[step], sizes[step, :, 0], bid[step] + 0.1, sizes[step, :, 1])
+        elapsed = time.perf_counter() - start
+        print(f"{n:>6} Ticks (OFI): {steps * n / elapsed:>12,.0f}/s, {elapsed / steps * 1e6:.1f} µs/Aufruf")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming-Indikatoren: Prüfung und Durchsatz.")
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--streams", type=int, action="append", default=None)
+    args = parser.parse_args()
+    benchmark(tuple(args.streams or (1, 64, 512)), args.steps)
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from array import array
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+JOURNAL_DIR = "journal"
+FLUSH_INTERVAL = 0.5  # Sekunden, die der Schreiber höchstens sammelt
+BATCH_SIZE = 8192  # Einträge pro Schreibvorgang
+
+KINDS = ("alert", "order", "fill", "tpsl", "latency")
+ALERT, ORDER, FILL, TPSL, LATENCY = range(len(KINDS))
+
+# Eine Datei pro Spalte (<name>.bin, little-endian, NumPy-dtype), nur angehängt. Texte (Quelle, Symbol,
+# Label) stehen als Index in strings.jsonl. "ts" wird je Block zuletzt geschrieben: beim Öffnen zählt die
+# kürzeste Spalte. Gelesen und ausgewertet wird in journal_cli.py.
+COLUMNS = (
+    ("kind", "<u1"),     # Index in KINDS
+    ("source", "<i4"),   # Alert-Quelle (mail, webhook, ...) bzw. Auslöser
+    ("symbol", "<i4"),
+    ("side", "<i1"),     # +1 buy/LONG, -1 sell/SHORT, 0 unbekannt
+    ("ref", "<i8"),      # Hash der clientOid (verbindet Order und Fill)
+    ("price", "<f8"),    # Alert-/Referenz-/Fill-Preis bzw. TP
+    ("size", "<f8"),
+    ("pnl", "<f8"),      # realisierter PnL (Fill)
+    ("fee", "<f8"),
+    ("value", "<f8"),    # Latenz in Sekunden bzw. SL
+    ("label", "<i4"),    # Stufe (Latenz), Art der TP/SL-Änderung, "close" bei schließenden Fills
+    ("ts", "<i8"),       # ms seit Epoch
+)
+NAN = float("nan")
+_TYPECODES = {"<u1": "B", "<i1": "b", "<i4": "i", "<i8": "q", "<f8": "d"}  # dtype -> array-Typcode
+
+def width(dtype):
+    """Bytes pro Wert einer Spalte."""
+    return array(_TYPECODES[dtype]).itemsize
+
+def ref_of(client_oid):
+    """Stabiler 64-Bit-Hash einer clientOid (0 = keine)."""
+    if not client_oid:
+        return 0
+    return int.from_bytes(hashlib.blake2b(str(client_oid).encode(), digest_size=8).digest(), "little", signed=True)
+
+def side_of(value):
+    """"buy"/"LONG"/"long" -> 1, "sell"/"SHORT"/"short" -> -1."""
+    value = str(value or "").lower()
+    return 1 if value in ("buy", "long") else -1 if value in ("sell", "short") else 0
+
+class Journal:
+    """
+    Nur anhängendes Journal für Alerts, Orders, Fills, TP/SL-Änderungen und Latenzen.
+
+    Der aufrufende Thread legt nur ein Tupel in eine Queue (~1 µs); ein Hintergrund-Thread sammelt
+    bis zu ``batch_size`` Einträge bzw. ``flush_interval`` Sekunden, kodiert Texte als Index und hängt
+    je Spalte einen Block an die Spaltendatei an. Ohne NumPy (wie market_store mit ``array``), damit
+    trade.py leicht bleibt; journal_cli.load() liest die Spalten als np.memmap und wertet vektorisiert aus.
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.events = queue.SimpleQueue()
+        self.written = 0
+        self.ledgers = []
+        os.makedirs(directory, exist_ok=True)
+        self.rows = _recover(directory)
+        self.strings = read_strings(directory)
+        self.codes = {text: i for i, text in enumerate(self.strings)}
+        self.thread = threading.Thread(target=self._run, name="JournalWriter", daemon=True)
+        self.thread.start()
+
+    def add(self, kind, source=None, symbol=None, side=0, client_oid=None, price=NAN, size=NAN, pnl=NAN,
+            fee=NAN, value=NAN, label=None, ts=None):
+        self.events.put((kind, source, symbol, side, client_oid, price, size, pnl, fee, value, label,
+                         int(time.time() * 1000) if ts is None else ts))
+
+    def _code(self, text, new):
+        if text is None:
+            return -1
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.strings)
+            self.strings.append(text)
+            new.append(text)
+        return code
+
+    def _write(self, batch):
+        new = []
+        strings_path = os.path.join(self.directory, "strings.jsonl")
+        strings_size = os.path.getsize(strings_path) if os.path.exists(strings_path) else 0
+        try:
+            self._append(batch, new, strings_path)
+        except Exception:
+            self._rollback(new, strings_path, strings_size)
+            raise
+        self.rows += len(batch)
+        self.written += len(batch)
+
+    def _rollback(self, new, strings_path, strings_size):
+        """Macht einen halb geschriebenen Block rückgängig, damit alle Spalten zeilengleich bleiben."""
+        for text in new:
+            del self.codes[text]
+        del self.strings[len(self.strings) - len(new):]
+        if os.path.exists(strings_path):
+            with open(strings_path, "ab") as f:
+                f.truncate(strings_size)
+        for name, dtype in COLUMNS:
+            path = os.path.join(self.directory, f"{name}.bin")
+            if os.path.isfile(path):
+                with open(path, "ab") as f:
+                    f.truncate(self.rows * width(dtype))
+
+    def _append(self, batch, new, strings_path):
+        columns = {name: [] for name, _ in COLUMNS}
+        for kind, source, symbol, side, client_oid, price, size, pnl, fee, value, label, ts in batch:
+            columns["kind"].append(kind)
+            columns["source"].append(self._code(source, new))
+            columns["symbol"].append(self._code(symbol, new))
+            columns["side"].append(side)
+            columns["ref"].append(ref_of(client_oid))
+            columns["price"].append(NAN if price is None else float(price))
+            columns["size"].append(NAN if size is None else float(size))
+            columns["pnl"].append(NAN if pnl is None else float(pnl))
+            columns["fee"].append(NAN if fee is None else float(fee))
+            columns["value"].append(NAN if value is None else float(value))
+            columns["label"].append(self._code(label, new))
+            columns["ts"].append(ts)
+        if new:
+            with open(strings_path, "a") as f:
+                f.write("".join(json.dumps(text) + "\n" for text in new))
+        for name, dtype in COLUMNS:  # "ts" zuletzt: erst damit zählt der Block als geschrieben
+            values = array(_TYPECODES[dtype], columns[name])
+            if sys.byteorder != "little":
+                values.byteswap()
+            with open(os.path.join(self.directory, f"{name}.bin"), "ab") as f:
+                f.write(values.tobytes())
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            try:
+                batch = [self.events.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:  # close(): Rest noch schreiben, dann beenden
+                stopped = True
+                batch = [event for event in batch if event is not None]
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logging.error(f"Journal: {len(batch)} Einträge nicht geschrieben: {e}")
+
+    def close(self):
+        """Schreibt alles Ausstehende und beendet den Schreiber."""
+        self.events.put(None)
+        self.thread.join(30)
+
+    # --- Quellen ---
+
+    def attach(self, ledger):
+        """Fills aus dem privaten orders-Kanal des Ledgers übernehmen."""
+        ledger.order_listeners.append(self.on_order)
+        self.ledgers.append(ledger)
+        return self
+
+    def detach(self):
+        for ledger in self.ledgers:
+            if self.on_order in ledger.order_listeners:
+                ledger.order_listeners.remove(self.on_order)
+        self.ledgers = []
+
+    def on_order(self, raw):
+        if raw.get("status") != "filled":
+            return
+        pnl = raw.get("totalProfits") or raw.get("pnl")
+        closing = raw.get("reduceOnly") == "YES" or raw.get("tradeSide") == "close" or bool(pnl and float(pnl))
+        fee = raw.get("fee") or raw.get("fillFee")
+        self.add(FILL, None, raw.get("instId") or raw.get("symbol"), side_of(raw.get("side")), raw.get("clientOid"),
+                 price=float(raw.get("priceAvg") or raw.get("fillPrice") or "nan"),
+                 size=float(raw.get("accBaseVolume") or raw.get("baseVolume") or "nan"),
+                 pnl=float(pnl or 0), fee=abs(float(fee)) if fee else 0.0, label="close" if closing else "open",
+                 ts=int(raw.get("uTime") or time.time() * 1000))
+
+_journal = None
+
+def enable_journal(directory=JOURNAL_DIR, ledger=None):
+    """Schaltet das Journal ein (ersetzt ein laufendes); ``ledger`` liefert die Fills."""
+    global _journal
+    disable_journal()
+    _journal = Journal(directory)
+    if ledger is not None:
+        _journal.attach(ledger)
+    from metrics import add_sink
+    add_sink(record_latency)
+    logging.info(f"📒 Journal nach {directory}/ ({_journal.rows} Einträge vorhanden)")
+    return _journal
+
+def disable_journal():
+    global _journal
+    if _journal is not None:
+        from metrics import remove_sink
+        remove_sink(record_latency)
+        _journal.detach()
+        _journal.close()
+        _journal = None
+
+# --- Aufzeichnen (ohne eingeschaltetes Journal wirkungslos) ---
+
+def record_alert(source, symbol, direction, price=None, received_at=None):
+    """Alert aus ``source``; ``received_at`` ist perf_counter beim Eingang, ``price`` sonst der Marktpreis."""
+    if _journal is None:
+        return
+    if price is None:
+        from market_store import market_store
+        price = market_store.last_price(symbol)
+    ts = time.time() if received_at is None else time.time() - (time.perf_counter() - received_at)
+    _journal.add(ALERT, source, symbol, side_of(direction), price=price, ts=int(ts * 1000))
+
+def record_order(symbol, side, size, price=None, client_oid=None, source=None):
+    if _journal is not None:
+        _journal.add(ORDER, source, symbol, side_of(side), client_oid, price=price, size=size)
+
+def record_fill(symbol, side, size, price, pnl=0.0, fee=0.0, client_oid=None, closing=False):
+    if _journal is not None:
+        _journal.add(FILL, None, symbol, side_of(side), client_oid, price=price, size=size, pnl=pnl, fee=fee,
+                     label="close" if closing else "open")
+
+def record_tpsl(symbol, hold_side, tp=None, sl=None, label="update"):
+    if _journal is not None:
+        _journal.add(TPSL, None, symbol, side_of(hold_side), price=tp, value=sl, label=label)
+
+def record_latency(stage, seconds):
+    if _journal is not None:
+        _journal.add(LATENCY, value=seconds, label=stage)
+
+# --- Wiederherstellen ---
+
+def _recover(directory):
+    """
+    Kürzt alle Spalten auf die vollständig geschriebenen Zeilen (nach einem Absturz) und gibt deren Zahl zurück.
+    Eine angerissene letzte Zeile in strings.jsonl wird abgeschnitten; ihr Text wird beim nächsten Block neu angelegt.
+    """
+    path = os.path.join(directory, "strings.jsonl")
+    if os.path.exists(path):
+        with open(path, "rb+") as f:
+            end = f.read().rfind(b"\n") + 1
+            if end < f.tell():
+                logging.warning(f"Journal: angerissene Zeile in {path} verworfen")
+                f.truncate(end)
+    sizes = {}
+    for name, dtype in COLUMNS:
+        path = os.path.join(directory, f"{name}.bin")
+        sizes[name] = os.path.getsize(path) // width(dtype) if os.path.exists(path) else 0
+    rows = sizes["ts"] if all(sizes[name] >= sizes["ts"] for name in sizes) else min(sizes.values())
+    for name, dtype in COLUMNS:
+        path = os.path.join(directory, f"{name}.bin")
+        if sizes[name] != rows:
+            with open(path, "ab") as f:
+                f.truncate(rows * width(dtype))
+    return rows
+
+def read_strings(directory):
+    path = os.path.join(directory, "strings.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        # Nur vollständige Zeilen: die letzte kann gerade geschrieben werden (journal_cli neben dem Bot)
+        return [json.loads(line) for line in f if line.endswith("\n") and line.strip()]
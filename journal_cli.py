@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+from journal import (Journal, COLUMNS, KINDS, ALERT, ORDER, FILL, TPSL, LATENCY, JOURNAL_DIR, NAN, width,
+                     read_strings)
+
+class JournalData:
+    """Spalten als np.memmap (gleich lang) plus Texttabelle; Filter liefern neue JournalData mit Kopien."""
+
+    def __init__(self, columns, strings):
+        self.columns = columns
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.columns["ts"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def code(self, text):
+        """Index eines Textes oder -2 (trifft nichts), wenn er nie geschrieben wurde."""
+        try:
+            return self.strings.index(text)
+        except ValueError:
+            return -2
+
+    def text(self, codes):
+        """Index-Array -> Liste von Texten ("-" für keinen)."""
+        lookup = np.array(self.strings + ["-"], dtype=object)
+        return lookup[np.where(np.asarray(codes) < 0, len(self.strings), codes)]
+
+    def where(self, mask):
+        return JournalData({name: column[mask] for name, column in self.columns.items()}, self.strings)
+
+    def filter(self, since=None, until=None, symbol=None):
+        mask = np.ones(len(self), dtype=bool)
+        if since is not None:
+            mask &= self["ts"] >= since
+        if until is not None:
+            mask &= self["ts"] < until
+        if symbol is not None:
+            mask &= self["symbol"] == self.code(symbol)
+        return self if mask.all() else self.where(mask)
+
+    def to_dataframe(self):
+        """DataFrame mit aufgelösten Texten (pandas erst hier importiert)."""
+        import pandas as pd
+
+        df = pd.DataFrame({name: self.columns[name] for name, _ in COLUMNS}, copy=False)
+        df["kind"] = np.array(KINDS, dtype=object)[self.columns["kind"]]
+        for name in ("source", "symbol", "label"):
+            df[name] = self.text(self.columns[name])
+        df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
+        return df
+
+def load(directory=JOURNAL_DIR):
+    """Liest das Journal (auch während geschrieben wird: nur vollständige Zeilen)."""
+    strings = read_strings(directory)
+    sizes = []
+    for name, dtype in COLUMNS:
+        path = os.path.join(directory, f"{name}.bin")
+        sizes.append(os.path.getsize(path) // width(dtype) if os.path.exists(path) else 0)
+    rows = min(sizes)
+    columns = {}
+    for name, dtype in COLUMNS:
+        path = os.path.join(directory, f"{name}.bin")
+        columns[name] = (np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows
+                         else np.empty(0, dtype=dtype))
+    return JournalData(columns, strings)
+
+def attribute_fills(data):
+    """
+    Ordnet jedem Fill den letzten Alert davor mit gleichem Symbol und gleicher Positionsrichtung zu
+    (öffnender Fill: seine Seite, schließender Fill: die Gegenseite). Vektorisiert über searchsorted
+    auf einem zusammengesetzten Schlüssel (Symbol, Richtung, Zeit).
+
+    Returns:
+        tuple: (Fill-Indizes, Alert-Indizes; -1 wo kein Alert davor liegt).
+    """
+    kind, ts, symbol, side = data["kind"], data["ts"], data["symbol"], data["side"].astype(np.int64)
+    alerts = np.flatnonzero(kind == ALERT)
+    fills = np.flatnonzero(kind == FILL)
+    direction = np.where(data["label"][fills] == data.code("close"), -side[fills], side[fills])
+
+    def key(rows, sides):
+        return ((symbol[rows].astype(np.int64) + 1) * 4 + sides + 1) << 42 | ts[rows]
+
+    alert_keys = key(alerts, side[alerts])
+    order = np.argsort(alert_keys, kind="stable")
+    alert_keys, alerts = alert_keys[order], alerts[order]
+    fill_keys = key(fills, direction)
+    pos = np.searchsorted(alert_keys, fill_keys, side="right") - 1
+    valid = pos >= 0
+    matched = np.full(len(fills), -1, dtype=np.int64)
+    matched[valid] = alerts[pos[valid]]
+    same = np.zeros(len(fills), dtype=bool)
+    same[valid] = (alert_keys[pos[valid]] >> 42) == (fill_keys[valid] >> 42)
+    matched[~same] = -1
+    return fills, matched
+
+def pnl_by_source(data):
+    """
+    Realisierter PnL und Gebühren je Alert-Quelle.
+
+    Returns:
+        list: Dicts {source, alerts, fills, pnl, fees, net, win_rate} nach Netto absteigend.
+    """
+    fills, alerts = attribute_fills(data)
+    source = np.where(alerts >= 0, data["source"][np.maximum(alerts, 0)], -1)
+    pnl = np.nan_to_num(data["pnl"][fills])
+    fee = np.nan_to_num(data["fee"][fills])
+    closing = data["label"][fills] == data.code("close")
+    codes, inverse = np.unique(source, return_inverse=True)
+    alert_sources = data["source"][data["kind"] == ALERT]
+    result = []
+    for i, code in enumerate(codes):
+        mask = inverse == i
+        closes = pnl[mask & closing]
+        result.append({
+            "source": data.text([code])[0] if code >= 0 else "(ohne Alert)",
+            "alerts": int(np.count_nonzero(alert_sources == code)) if code >= 0 else 0,
+            "fills": int(mask.sum()),
+            "pnl": float(pnl[mask].sum()),
+            "fees": float(fee[mask].sum()),
+            "net": float(pnl[mask].sum() - fee[mask].sum()),
+            "win_rate": float((closes > 0).mean()) if len(closes) else NAN,
+        })
+    return sorted(result, key=lambda row: -row["net"])
+
+def slippage(data):
+    """
+    Slippage öffnender Fills gegen den Preis beim Alert in Basispunkten (positiv = schlechter).
+
+    Returns:
+        list: Dicts {source, fills, mean_bps, p50_bps, p90_bps, p99_bps} je Alert-Quelle.
+    """
+    fills, alerts = attribute_fills(data)
+    keep = (alerts >= 0) & (data["label"][fills] != data.code("close"))
+    fills, alerts = fills[keep], alerts[keep]
+    reference = data["price"][alerts]
+    valid = np.isfinite(reference) & (reference > 0) & np.isfinite(data["price"][fills])
+    fills, alerts, reference = fills[valid], alerts[valid], reference[valid]
+    bps = data["side"][fills] * (data["price"][fills] - reference) / reference * 1e4
+    source = data["source"][alerts]
+    result = []
+    for code in np.unique(source):
+        values = bps[source == code]
+        p50, p90, p99 = np.percentile(values, (50, 90, 99))
+        result.append({"source": data.text([code])[0], "fills": len(values), "mean_bps": float(values.mean()),
+                       "p50_bps": float(p50), "p90_bps": float(p90), "p99_bps": float(p99)})
+    return result
+
+def latency_percentiles(data, quantiles=(50, 90, 99)):
+    """
+    Perzentile je Stufe (Latenz-Einträge) in Millisekunden.
+
+    Returns:
+        list: Dicts {stage, count, p<q>..., max} nach Stufe sortiert.
+    """
+    rows = np.flatnonzero(data["kind"] == LATENCY)
+    labels, values = data["label"][rows], data["value"][rows]
+    order = np.lexsort((values, labels))  # nach Stufe, darin nach Wert: ein Sortiervorgang für alle
+    labels, values = labels[order], values[order] * 1000
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if len(labels) else np.empty(0, dtype=int)
+    ends = np.r_[starts[1:], len(labels)]
+    result = []
+    for start, end in zip(starts, ends):
+        group = values[start:end]
+        row = {"stage": data.text([labels[start]])[0], "count": int(end - start)}
+        for q in quantiles:
+            row[f"p{q}"] = float(group[min(len(group) - 1, int(q / 100 * len(group)))])
+        row["max"] = float(group[-1])
+        result.append(row)
+    return sorted(result, key=lambda row: row["stage"])
+
+def summary(data):
+    counts = np.bincount(data["kind"], minlength=len(KINDS)) if len(data) else np.zeros(len(KINDS), dtype=int)
+    ts = data["ts"]
+    return {"rows": len(data), **{kind: int(count) for kind, count in zip(KINDS, counts)},
+            "first": int(ts[0]) if len(ts) else None, "last": int(ts[-1]) if len(ts) else None}
+
+def synthetic(directory, alerts=250000, latencies_per_alert=4, seed=1):
+    """
+    Schreibt ein künstliches Journal direkt in die Spaltendateien (für den Benchmark):
+    je Alert eine Order, ein öffnender und ein schließender Fill, eine TP/SL-Änderung und Latenzen.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    strings = ["mail", "webhook", "manual", "BTCUSDT", "ETHUSDT", "close", "open", "update",
+               "order", "ticker", "alert_to_wire", "balance"]
+    with open(os.path.join(directory, "strings.jsonl"), "w") as f:
+        f.write("".join(json.dumps(text) + "\n" for text in strings))
+    per_alert = 5 + latencies_per_alert
+    n = alerts * per_alert
+    t0 = int(time.time() * 1000) - alerts * 2000
+    alert_ts = t0 + np.arange(alerts, dtype=np.int64) * 2000
+    side = rng.choice(np.array([-1, 1], dtype=np.int8), alerts)
+    symbol = rng.integers(3, 5, alerts).astype(np.int32)
+    price = np.where(symbol == 3, 80000.0, 3000.0) * (1 + rng.normal(0, 0.01, alerts))
+    fill_price = price * (1 + side * rng.normal(1.5, 2.0, alerts) / 1e4)
+    exit_price = fill_price * (1 + rng.normal(0, 0.002, alerts))
+    size = np.round(100 / price, 4)
+    columns = {name: np.empty(n, dtype=dtype) for name, dtype in COLUMNS}
+    for name, value in (("price", NAN), ("size", NAN), ("pnl", NAN), ("fee", NAN), ("value", NAN)):
+        columns[name][:] = value
+    columns["source"][:] = -1
+    columns["label"][:] = -1
+    columns["ref"][:] = 0
+
+    def put(offset, kind, ts, **values):
+        rows = slice(offset, n, per_alert)
+        columns["kind"][rows] = kind
+        columns["ts"][rows] = ts
+        columns["symbol"][rows] = values.pop("symbol", symbol)
+        columns["side"][rows] = values.pop("side", side)
+        for name, value in values.items():
+            columns[name][rows] = value
+
+    put(0, ALERT, alert_ts, source=rng.integers(0, 3, alerts), price=price)
+    put(1, ORDER, alert_ts + 1, price=price, size=size, ref=np.arange(alerts))
+    put(2, FILL, alert_ts + 25, price=fill_price, size=size, pnl=0.0, fee=fill_price * size * 0.0006,
+        label=6, ref=np.arange(alerts))
+    put(3, FILL, alert_ts + 1500, side=-side, price=exit_price, size=size, pnl=(exit_price - fill_price) * size * side,
+        fee=exit_price * size * 0.0006, label=5)
+    put(4, TPSL, alert_ts + 600, price=fill_price * (1 + side * 0.003), value=fill_price * (1 - side * 0.002),
+        label=7)
+    for i in range(latencies_per_alert):
+        put(5 + i, LATENCY, alert_ts + 2, symbol=-1, side=0, value=rng.lognormal(-7 + i, 0.5, alerts),
+            label=8 + i)
+    for name, _ in COLUMNS:
+        columns[name].tofile(os.path.join(directory, f"{name}.bin"))
+    return n
+
+def benchmark(alerts=250000):
+    """Schreib-Overhead im aufrufenden Thread, Durchsatz des Schreibers und Dauer der Auswertungen."""
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp(prefix="journal_bench_")
+    try:
+        journal = Journal(os.path.join(directory, "live"))
+        n = 200000
+        start = time.perf_counter()
+        for _ in range(n):
+            journal.add(LATENCY, value=0.0001, label="order")
+        enqueue = (time.perf_counter() - start) / n
+        journal.close()
+        written = time.perf_counter() - start
+        print(f"Journal.add(): {enqueue * 1e6:.2f} µs pro Eintrag im aufrufenden Thread; "
+              f"Schreiber: {n:,} Einträge in {written:.2f} s ({n / written:,.0f}/s)")
+
+        path = os.path.join(directory, "synthetic")
+        rows = synthetic(path, alerts)
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        start = time.perf_counter()
+        data = load(path)
+        results = {}
+        for name, func in (("pnl_by_source", pnl_by_source), ("slippage", slippage),
+                           ("latency_percentiles", latency_percentiles)):
+            t = time.perf_counter()
+            results[name] = func(data)
+            print(f"{name:<20} {time.perf_counter() - t:6.2f} s")
+        print(f"{rows:,} Einträge ({size / 1e6:.0f} MB), alle Auswertungen zusammen "
+              f"{time.perf_counter() - start:.2f} s")
+        print_rows(results["pnl_by_source"])
+    finally:
+        shutil.rmtree(directory)
+
+def parse_time(value):
+    """ISO-Zeitpunkt (UTC) oder relativ wie "90m", "24h", "7d" -> ms seit Epoch."""
+    if value is None:
+        return None
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return int((time.time() - float(value[:-1]) * units[value[-1]]) * 1000)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+def print_rows(rows):
+    """Liste gleichartiger Dicts als Tabelle."""
+    if not rows:
+        print("(keine Einträge)")
+        return
+    keys = list(rows[0])
+    cells = [[f"{row[k]:.4f}" if isinstance(row[k], float) else str(row[k]) for k in keys] for row in rows]
+    widths = [max(len(k), *(len(c[i]) for c in cells)) for i, k in enumerate(keys)]
+    print("  ".join(k.rjust(w) for k, w in zip(keys, widths)))
+    for c in cells:
+        print("  ".join(v.rjust(w) for v, w in zip(c, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Auswertung des Trade-Journals (journal.py).")
+    parser.add_argument("command", choices=("summary", "pnl", "slippage", "latency", "tail", "export", "benchmark"),
+                        help="pnl: PnL je Alert-Quelle, slippage: Fill gegen Alert-Preis, latency: Perzentile je Stufe")
+    parser.add_argument("--dir", default=JOURNAL_DIR, help="Journal-Verzeichnis")
+    parser.add_argument("--since", help='Ab Zeitpunkt (ISO, UTC) oder relativ, z.B. "24h", "7d"')
+    parser.add_argument("--until", help="Bis Zeitpunkt (exklusiv)")
+    parser.add_argument("--symbol", help="Nur dieses Symbol (Latenzen haben keins und fallen dann weg)")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    parser.add_argument("-n", type=int, default=20, help="Zeilen für tail")
+    parser.add_argument("--out", help="Zieldatei für export (.csv oder .parquet, Letzteres braucht pyarrow)")
+    parser.add_argument("--alerts", type=int, default=250000, help="Alerts im synthetischen Journal (benchmark)")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        benchmark(args.alerts)
+        return
+    if not os.path.exists(os.path.join(args.dir, "ts.bin")):
+        print(f"Error: Kein Journal in {args.dir}/ (main.py --journal {args.dir})")
+        exit(1)
+    data = load(args.dir).filter(parse_time(args.since), parse_time(args.until), args.symbol)
+
+    if args.command in ("tail", "export"):
+        df = data.to_dataframe()
+        if args.command == "tail":
+            print(df.tail(args.n).to_string(index=False))
+        elif not args.out:
+            print("Error: --out fehlt.")
+            exit(1)
+        elif args.out.endswith(".parquet"):
+            df.to_parquet(args.out, index=False)  # pyarrow oder fastparquet nötig
+            print(f"{len(df):,} Einträge nach {args.out}")
+        else:
+            df.to_csv(args.out, index=False)
+            print(f"{len(df):,} Einträge nach {args.out}")
+        return
+
+    start = time.perf_counter()
+    result = {"summary": summary, "pnl": pnl_by_source, "slippage": slippage,
+              "latency": latency_percentiles}[args.command](data)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(result, default=str))
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            if key in ("first", "last") and value is not None:
+                value = datetime.fromtimestamp(value / 1000, timezone.utc).isoformat()
+            print(f"{key:>8}: {value}")
+    else:
+        print_rows(result)
+        print(f"({len(data):,} Einträge in {elapsed * 1000:.0f} ms ausgewertet)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import threading
+import time
+from decimal import Decimal
+import websockets
+from config import ws_private_url
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+PRIVATE_WS_URL = ws_private_url
+INST_TYPE = "USDT-FUTURES"
+PING_INTERVAL = 25
+RECONCILE_INTERVAL = 60  # Sekunden zwischen zwei REST-Abgleichen
+FINAL_ORDER_STATES = ("filled", "canceled", "cancelled", "closed", "fail")
+
+class Ledger:
+    """
+    Lokales Abbild von Positionen, Orders und verfügbarer Margin.
+
+    Wird einmal per REST befüllt (seed) und danach über die privaten WebSocket-Kanäle
+    positions, orders und account aktuell gehalten. Die Vorabprüfungen in logik.py
+    werden damit zu reinen Speicherzugriffen.
+    """
+
+    def __init__(self, margin_coin="USDT"):
+        self.margin_coin = margin_coin
+        self.positions = {}  # (symbol, "long"|"short") -> Rohdaten der Position
+        self.orders = {}  # orderId -> Rohdaten der Order
+        self.available = None  # Decimal
+        self.equity = None
+        self.updated_at = None  # monotonic des letzten Updates
+        self.ready = threading.Event()
+        self.order_listeners = []  # callback(order_dict) bei jedem Order-Update
+        self.position_listeners = []  # callback({(symbol, hold_side): raw | None}, snapshot); None = geschlossen
+        self.account_listeners = []  # callback(available, equity) bei jedem Saldo-Update
+        self.lock = threading.Lock()
+
+    # --- Lesen (Hot Path) ---
+
+    def open_positions_count(self, symbol, direction):
+        hold_side = 'long' if direction == 'LONG' else 'short'
+        position = self.positions.get((symbol, hold_side))
+        return 1 if position and Decimal(str(position.get('total', '0'))) > 0 else 0
+
+    def available_usdt(self):
+        return self.available
+
+    # --- Schreiben ---
+
+    def apply_positions(self, data, snapshot=True):
+        """
+        Übernimmt Positionen (WebSocket "positions" oder REST all-position).
+
+        Im Snapshot fehlen geschlossene Positionen einfach; ein inkrementelles Update meldet sie mit
+        total 0, sie werden dann entfernt und den Listenern als None gemeldet.
+        """
+        positions = {}
+        for raw in data:
+            symbol = raw.get('instId') or raw.get('symbol')
+            hold_side = raw.get('holdSide')
+            if symbol and hold_side:
+                positions[(symbol, hold_side)] = raw if Decimal(str(raw.get('total', '0'))) > 0 else None
+        with self.lock:
+            if snapshot:
+                positions = {key: raw for key, raw in positions.items() if raw is not None}
+                self.positions = positions
+            else:
+                for key, raw in positions.items():
+                    if raw is None:
+                        self.positions.pop(key, None)
+                    else:
+                        self.positions[key] = raw
+            self.updated_at = time.monotonic()
+        self._notify(self.position_listeners, positions, snapshot)
+
+    def apply_orders(self, data):
+        for raw in data:
+            order_id = raw.get('orderId')
+            with self.lock:
+                if raw.get('status') in FINAL_ORDER_STATES:
+                    self.orders.pop(order_id, None)
+                else:
+                    self.orders[order_id] = raw
+                self.updated_at = time.monotonic()
+            self._notify(self.order_listeners, raw)
+
+    def apply_account(self, data):
+        for raw in data:
+            if raw.get('marginCoin', '').upper() != self.margin_coin:
+                continue
+            with self.lock:
+                self.available = Decimal(str(raw['available']))
+                if raw.get('usdtEquity') or raw.get('accountEquity'):
+                    self.equity = Decimal(str(raw.get('usdtEquity') or raw.get('accountEquity')))
+                self.updated_at = time.monotonic()
+            self._notify(self.account_listeners, self.available, self.equity)
+
+    def _notify(self, listeners, *args):
+        for listener in list(listeners):
+            try:
+                listener(*args)
+            except Exception as e:
+                logging.error(f"Fehler im Ledger-Listener: {e}")
+
+    def handle_message(self, message):
+        if message == "pong":
+            return
+        payload = json.loads(message)
+        if "event" in payload:
+            if payload["event"] == "error":
+                logging.error(f"Privater WebSocket-Fehler: {payload}")
+            return
+        channel = payload.get("arg", {}).get("channel")
+        data = payload.get("data", [])
+        if channel == "positions":
+            self.apply_positions(data, snapshot=payload.get("action", "snapshot") == "snapshot")
+        elif channel == "orders":
+            self.apply_orders(data)
+        elif channel == "account":
+            self.apply_account(data)
+
+    def seed(self, symbol=None, exchange=None, balance_client=None, mark_ready=True):
+        """
+        Befüllt das Ledger per REST (Positionen über ccxt, Saldo über Balance) und meldet
+        Abweichungen zum bisherigen Stand.
+
+        ``exchange`` (ccxt) und ``balance_client`` (bitget_client.BitgetClient) gehören zum Konto
+        dieses Ledgers; ohne Angabe gelten die Clients aus api.py (trade.get_exchange, get_client).
+        Mit ``mark_ready=False`` setzt der Aufrufer ``ready`` selbst (PrivateStream, nur solange verbunden).
+        """
+        from trade import get_exchange, record_rate_limit
+        from Balance import get_usdt_account, account_equity
+        from rate_limiter import scheduler
+
+        params = {'productType': INST_TYPE}
+        path = '/api/v2/mix/position/all-position'
+        scheduler.acquire(path)
+        try:
+            positions = (exchange or get_exchange()).fetch_positions([symbol] if symbol else None, params=params)
+        except Exception as e:
+            record_rate_limit(path, e)
+            raise
+        record_rate_limit(path)
+        raw_positions = [p['info'] for p in positions if float(p.get('contracts') or 0) > 0]
+        account = get_usdt_account(balance_client, symbol, self.margin_coin)
+        available = Decimal(str(account['available'])) if account is not None else None
+        before = (dict(self.positions), self.available)
+        self.apply_positions(raw_positions)
+        if available is not None:
+            with self.lock:
+                self.available = available
+                self.equity = account_equity(account) or self.equity
+            self._notify(self.account_listeners, self.available, self.equity)
+        if self.ready.is_set() and before != (self.positions, self.available):
+            logging.warning(f"Ledger-Abgleich: lokaler Stand wich ab, korrigiert "
+                            f"(Positionen {len(before[0])} -> {len(self.positions)}, "
+                            f"verfügbar {before[1]} -> {self.available})")
+        if mark_ready:
+            self.ready.set()
+
+def login_message(api_key, api_secret, passphrase):
+    """Login für den privaten Kanal: Signatur über timestamp + "GET" + "/user/verify" (Base64)."""
+    from bitget_client import sign as bitget_sign
+
+    timestamp = str(int(time.time()))
+    sign = bitget_sign(api_secret, timestamp, "GET", "/user/verify")
+    return {"op": "login", "args": [{"apiKey": api_key, "passphrase": passphrase, "timestamp": timestamp,
+                                     "sign": sign}]}
+
+class PrivateStream:
+    """
+    Hält die private WebSocket-Verbindung (positions, orders, account) und das Ledger aktuell.
+
+    Nach jedem (Re-)Connect und alle ``reconcile_interval`` Sekunden wird per REST abgeglichen,
+    damit verpasste Nachrichten den lokalen Stand nicht dauerhaft verfälschen. Für ein anderes
+    Konto als api.py müssen ``exchange`` (ccxt) und ``balance_client`` mit dessen Zugang übergeben
+    werden, sonst überschreibt der Abgleich das Ledger mit dem Hauptkonto.
+    """
+
+    def __init__(self, ledger, api_key, api_secret, passphrase, url=PRIVATE_WS_URL,
+                 reconcile_interval=RECONCILE_INTERVAL, seed=True, min_backoff=1, max_backoff=30,
+                 exchange=None, balance_client=None):
+        self.ledger = ledger
+        self.exchange = exchange
+        self.balance_client = balance_client
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.passphrase = passphrase
+        self.url = url
+        self.reconcile_interval = reconcile_interval
+        self.seed = seed  # False für Tests gegen einen Replay-Server ohne REST
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connected = threading.Event()
+        self._stopped = False
+
+    def subscription(self):
+        return {"op": "subscribe", "args": [
+            {"instType": INST_TYPE, "channel": "positions", "instId": "default"},
+            {"instType": INST_TYPE, "channel": "orders", "instId": "default"},
+            {"instType": INST_TYPE, "channel": "account", "coin": "default"},
+        ]}
+
+    async def _reconcile(self):
+        loop = asyncio.get_running_loop()
+        seed = functools.partial(self.ledger.seed, None, self.exchange, self.balance_client, mark_ready=False)
+        while True:
+            try:
+                await loop.run_in_executor(None, seed)
+                # erst nach dem Abgleich gilt das Ledger (wieder) als aktuell; ein beim Trennen noch
+                # laufender Abgleich kommt hier nicht mehr an (Task abgebrochen)
+                self.ledger.ready.set()
+            except Exception as e:
+                logging.error(f"Ledger-Abgleich fehlgeschlagen: {e}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send("ping")
+
+    async def _session(self):
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            await ws.send(json.dumps(login_message(self.api_key, self.api_secret, self.passphrase)))
+            response = json.loads(await ws.recv())
+            if response.get("event") != "login" or str(response.get("code")) != "0":
+                raise ConnectionError(f"Login fehlgeschlagen: {response}")
+            await ws.send(json.dumps(self.subscription()))
+            self.connected.set()
+            logging.info("✅ Privater Kanal verbunden (positions, orders, account)")
+            tasks = [asyncio.create_task(self._ping(ws))]
+            if self.seed:
+                tasks.append(asyncio.create_task(self._reconcile()))
+            else:
+                self.ledger.ready.set()
+            try:
+                async for message in ws:
+                    self.ledger.handle_message(message)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def run(self):
+        backoff = self.min_backoff
+        while not self._stopped:
+            try:
+                await self._session()
+                backoff = self.min_backoff
+            except (OSError, ConnectionError, websockets.WebSocketException) as e:
+                logging.error(f"Privater Kanal getrennt: {e} – neuer Versuch in {backoff}s")
+            # Ohne Kanal veraltet das Ledger: Leser fallen bis zum nächsten Abgleich auf REST zurück
+            self.connected.clear()
+            self.ledger.ready.clear()
+            if self._stopped:
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self):
+        self._stopped = True
+
+    def start_in_thread(self):
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="PrivateStream", daemon=True)
+        thread.start()
+        return thread
+
+# Prozessweites Ledger, das logik.py liest
+ledger = Ledger()
+
+def start_private_stream(url=PRIVATE_WS_URL, seed=True):
+    from api import api_key, api_secret, api_passphrase
+    stream = PrivateStream(ledger, api_key, api_secret, api_passphrase, url=url, seed=seed)
+    stream.start_in_thread()
+    return stream
+
+def demo_records(symbol="BTCUSDT"):
+    """Synthetische Nachrichten der privaten Kanäle im Format von ws_replay (t, roher_text)."""
+    def push(channel, data, action="snapshot"):
+        key = "coin" if channel == "account" else "instId"
+        return json.dumps({"action": action, "arg": {"instType": INST_TYPE, "channel": channel, key: "default"},
+                           "data": data, "ts": int(time.time() * 1000)})
+
+    long_position = {"instId": symbol, "holdSide": "long", "total": "0.002", "averageOpenPrice": "80000",
+                     "marginSize": "1.6", "leverage": "100"}
+    return [(i, message) for i, message in enumerate([
+        push("account", [{"marginCoin": "USDT", "available": "1000", "usdtEquity": "1000"}]),
+        push("orders", [{"orderId": "1", "instId": symbol, "side": "buy", "status": "live", "size": "0.002"}]),
+        push("orders", [{"orderId": "1", "instId": symbol, "side": "buy", "status": "filled", "size": "0.002"}]),
+        push("positions", [long_position]),
+        push("account", [{"marginCoin": "USDT", "available": "998.4", "usdtEquity": "1000"}]),
+    ])]
+
+def run_demo():
+    """Spielt demo_records() über ws_replay ab und prüft den Ledger-Stand sowie die Lookup-Zeit."""
+    from ws_replay import ReplayServer
+
+    async def scenario():
+        server = ReplayServer(demo_records())
+        await server.start()
+        demo_ledger = Ledger()
+        stream = PrivateStream(demo_ledger, "key", "secret", "pass", url=server.url, seed=False)
+        task = asyncio.create_task(stream.run())
+        for _ in range(200):
+            if demo_ledger.positions and demo_ledger.available == Decimal("998.4"):
+                break
+            await asyncio.sleep(0.01)
+        stream.stop()
+        task.cancel()
+        await server.close()
+        return demo_ledger
+
+    demo_ledger = asyncio.run(scenario())
+    assert demo_ledger.open_positions_count("BTCUSDT", "LONG") == 1
+    assert demo_ledger.open_positions_count("BTCUSDT", "SHORT") == 0
+    assert demo_ledger.available_usdt() == Decimal("998.4") and not demo_ledger.orders
+    rounds = 100_000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        demo_ledger.open_positions_count("BTCUSDT", "LONG")
+        demo_ledger.available_usdt()
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"✅ Ledger nach Replay korrekt: {list(demo_ledger.positions)}, verfügbar {demo_ledger.available}")
+    print(f"⏱️ Vorabprüfung aus dem Ledger: {elapsed * 1e6:.2f} µs (statt zwei REST-Aufrufen)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Privaten Bitget-Kanal ins lokale Ledger spiegeln.")
+    parser.add_argument("--url", default=PRIVATE_WS_URL, help="z.B. ws://127.0.0.1:8765 für ws_replay")
+    parser.add_argument("--no-seed", action="store_true", help="Ohne REST-Abgleich (Replay-Tests)")
+    parser.add_argument("--demo", action="store_true", help="Synthetische Nachrichten über ws_replay abspielen")
+    args = parser.parse_args()
+
+    if args.demo:
+        run_demo()
+        raise SystemExit
+    stream = start_private_stream(args.url, seed=not args.no_seed)
+    try:
+        while True:
+            time.sleep(5)
+            logging.info(f"Positionen: {list(ledger.positions)}, offene Orders: {len(ledger.orders)}, "
+                         f"verfügbar: {ledger.available}")
+    except KeyboardInterrupt:
+        stream.stop()
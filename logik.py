@@ -1,12 +1,22 @@
 import logging
 from decimal import Decimal
 from config import symbol  # Symbol aus config.py (z. B. "BTCUSDT")
-from balance import get_usdt_balance  # Funktion aus balance.py
-from trade import place_market_order, client  # Funktion und Client aus trade.py
+from Balance import get_usdt_account, account_equity  # Kontodaten aus Balance.py
+from trade import place_market_order, get_exchange, record_rate_limit  # Funktion und Client aus trade.py (ccxt erst bei Bedarf)
+from ledger import ledger  # lokales Abbild von Positionen/Saldo (privater WebSocket)
+from rate_limiter import scheduler
+from risk import risk_engine  # Vorab-Prüfungen aus dem Speicher (Exposure, Margin, Tagesverlust, Kill-Switch)
+from metrics import timed
 
 # Logging-Konfiguration
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 
+MAX_POSITIONS_PER_SIDE = 3      # maximal 3 offene Positionen je Richtung
+RISK_FRACTION = Decimal('0.01')  # 1% des verfügbaren Kapitals pro Trade
+CONFIRM_WITH_INDICATORS = False  # Alerts nur handeln, wenn indicators.indicator_engine sie stützt (braucht Markt-Feed)
+INDICATOR_GRANULARITY = "1m"
+
+@timed("position_check")
 def get_open_positions_count(symbol, direction):
     """
     Prüft die Anzahl offener Positionen für die angegebene Richtung (LONG oder SHORT).
@@ -18,53 +28,113 @@ def get_open_positions_count(symbol, direction):
     Returns:
         int: Anzahl offener Positionen für die Richtung.
     """
+    if ledger.ready.is_set():
+        return ledger.open_positions_count(symbol, direction)
+    path = '/api/v2/mix/position/all-position'
     try:
-        positions = client.fetch_positions([symbol], params={'productType': 'USDT-FUTURES'})
-        count = 0
-        side = 'long' if direction == 'LONG' else 'short'
-        for position in positions:
-            if position['side'] == side and float(position['contracts']) > 0:
-                count += 1
+        scheduler.acquire(path)
+        try:
+            positions = get_exchange().fetch_positions([symbol], params={'productType': 'USDT-FUTURES'})
+        except Exception as e:
+            record_rate_limit(path, e)
+            raise
+        record_rate_limit(path)
+        count = count_positions(positions, direction)
         logging.info(f"Anzahl offener {direction}-Positionen für {symbol}: {count}")
         return count
     except Exception as e:
         logging.error(f"Fehler beim Abrufen offener Positionen: {e}")
         raise
 
-def execute_trade(direction):
+def count_positions(positions, direction):
+    """Zählt die offenen Positionen (ccxt-Format) der angegebenen Richtung."""
+    side = 'long' if direction == 'LONG' else 'short'
+    return sum(1 for position in positions if position['side'] == side and float(position['contracts']) > 0)
+
+def calculate_trade_amount(direction, open_positions, available_usdt, max_positions=None, risk_fraction=None):
+    """
+    Entscheidet anhand der offenen Positionen und des Saldos, ob und mit wie viel USDT gehandelt wird.
+
+    ``max_positions``/``risk_fraction`` überschreiben MAX_POSITIONS_PER_SIDE/RISK_FRACTION
+    (z.B. für den Backtest).
+
+    Returns:
+        Decimal: USDT-Betrag für die Order oder None, wenn das Positionslimit erreicht ist.
+
+    Raises:
+        ValueError: Wenn der berechnete Betrag 0 oder negativ ist.
+    """
+    max_positions = MAX_POSITIONS_PER_SIDE if max_positions is None else max_positions
+    risk_fraction = RISK_FRACTION if risk_fraction is None else Decimal(str(risk_fraction))
+    if open_positions >= max_positions:
+        logging.warning(f"Maximal {max_positions} {direction}-Positionen erlaubt. Trade wird übersprungen.")
+        return None
+
+    # 1% des Kapitals berechnen
+    usdt_amount = available_usdt * risk_fraction
+    logging.info(f"Trade-Menge: {usdt_amount} USDT ({risk_fraction * 100}% des Kapitals)")
+
+    # Prüfen, ob genügend USDT verfügbar ist
+    if usdt_amount <= 0:
+        logging.error("USDT-Menge ist 0 oder negativ.")
+        raise ValueError("Ungültige USDT-Menge für den Trade")
+    return usdt_amount
+
+@timed("execute_trade")
+def execute_trade(direction, client_oid=None):
     """
     Führt einen Trade (LONG oder SHORT) aus, wenn weniger als 3 Positionen offen sind.
     Nutzt 1% des USDT-Saldos aus balance.py.
+
+    Returns:
+        dict: Die platzierte Order oder None, wenn nicht gehandelt wurde.
     """
     try:
         logging.info(f"Starte Trade-Ausführung: {direction}")
         
         # Prüfen, ob maximale Anzahl an Positionen pro Seite erreicht ist
         open_positions = get_open_positions_count(symbol, direction)
-        if open_positions >= 3:
-            logging.warning(f"Maximal 3 {direction}-Positionen erlaubt. Trade wird übersprungen.")
+        if open_positions >= MAX_POSITIONS_PER_SIDE:
+            logging.warning(f"Maximal {MAX_POSITIONS_PER_SIDE} {direction}-Positionen erlaubt. Trade wird übersprungen.")
             return
 
-        # USDT-Saldo aus balance.py abrufen
-        available_usdt = get_usdt_balance()
+        # USDT-Saldo aus dem Ledger, sonst über balance.py abrufen
+        available_usdt = ledger.available_usdt() if ledger.ready.is_set() else None
+        if available_usdt is None:
+            account = get_usdt_account()
+            if account is not None:
+                available_usdt = Decimal(str(account['available']))
+                # ohne privaten Kanal kennt die Risiko-Engine sonst weder Saldo noch Equity
+                risk_engine.on_account(available_usdt, account_equity(account))
         logging.info(f"Verfügbares USDT: {available_usdt}")
 
-        # 1% des Kapitals berechnen
-        usdt_amount = available_usdt * Decimal('0.01')
-        logging.info(f"Trade-Menge: {usdt_amount} USDT (1% des Kapitals)")
+        usdt_amount = calculate_trade_amount(direction, open_positions, available_usdt)
+        if usdt_amount is None:
+            return
+
+        if CONFIRM_WITH_INDICATORS:
+            from indicators import indicator_engine
 
-        # Prüfen, ob genügend USDT verfügbar ist
-        if usdt_amount <= 0:
-            logging.error("USDT-Menge ist 0 oder negativ.")
-            raise ValueError("Ungültige USDT-Menge für den Trade")
+            confirmed, reason = indicator_engine.confirm(direction, symbol, INDICATOR_GRANULARITY)
+            if not confirmed:
+                logging.warning(f"{direction}-Alert nicht bestätigt: {reason}. Trade wird übersprungen.")
+                return
+            usdt_amount *= Decimal(str(indicator_engine.size_factor(symbol, INDICATOR_GRANULARITY)))
+
+        allowed, reason = risk_engine.check(symbol, direction, usdt_amount)
+        if not allowed:
+            logging.warning(f"Risiko-Check: {reason}. Trade wird übersprungen.")
+            return
 
         # Seite bestimmen (buy für LONG, sell für SHORT)
         side = 'buy' if direction == 'LONG' else 'sell'
 
         # Marktorder über trade.py platzieren
         logging.info(f"Platzieren einer {direction}-Marktorder für {usdt_amount} USDT")
-        order = place_market_order(symbol, side, usdt_amount)
+        order = place_market_order(symbol, side, usdt_amount, client_oid=client_oid)
+        risk_engine.commit(symbol, direction, usdt_amount)
         logging.info(f"Order platziert: {order}")
+        return order
 
     except Exception as e:
         logging.error(f"Fehler bei der Trade-Ausführung: {e}")
@@ -1,14 +1,41 @@
+import asyncio
 import time
 import re
 from decimal import Decimal, InvalidOperation
 from gmail_alert_reader import check_email_for_alerts
-from logik import execute_trade
+from alert_listener import IdleAlertListener
 from datetime import datetime
 
 def log(message):
     timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
     print(f"{timestamp} {message}")
 
+def convert_alert(alert):
+    """Wandelt Zahlenfelder eines Alerts in Decimal um; None bei ungültigen Werten."""
+    new_alert = alert.copy()
+    for field in ("amount", "size", "tp", "sl", "price"):
+        if field in alert:
+            try:
+                new_alert[field] = Decimal(str(alert[field]))
+            except InvalidOperation:
+                log(f"⚠️ Ungültiger Dezimalwert für {field}: {alert[field]}")
+                return None
+    return new_alert
+
+def direction_of(alert):
+    """Gibt "LONG"/"SHORT" zurück, egal ob der Alert ein Dict oder ein String ist."""
+    return alert["action"] if isinstance(alert, dict) else alert
+
+def record_alert(source, alert, received_at, price=None):
+    """Alert ins Journal (journal.py; ohne --journal wirkungslos): Quelle, Symbol, Richtung, Preis beim Eingang."""
+    from config import symbol
+    import journal
+
+    target = alert.get("symbol", symbol) if isinstance(alert, dict) else symbol
+    if isinstance(alert, dict) and alert.get("price") is not None:
+        price = alert["price"]
+    journal.record_alert(source, target, direction_of(alert), price, received_at)
+
 def extract_trade_signal_from_email():
     """Gibt Liste der Alerts zurück, ggf. mit umgewandelten Zahlen als Decimal."""
     try:
@@ -17,15 +44,11 @@ def extract_trade_signal_from_email():
         # Optional: Falls die Alerts Zahlen enthalten, in Decimal umwandeln
         converted_alerts = []
         for alert in alerts:
-            # Beispielhafte Annahme: alert = {"direction": "BUY", "amount": "0.01"}
+            # alert = {"action": "LONG", "symbol": "BTCUSDT", "size": "0.01", "tp": "...", "sl": "..."}
             if isinstance(alert, dict):
-                new_alert = alert.copy()
-                if "amount" in alert:
-                    try:
-                        new_alert["amount"] = Decimal(str(alert["amount"]))
-                    except InvalidOperation:
-                        log(f"⚠️ Ungültiger Dezimalwert: {alert['amount']}")
-                        continue
+                new_alert = convert_alert(alert)
+                if new_alert is None:
+                    continue
                 converted_alerts.append(new_alert)
             else:
                 # Falls der Alert kein dict ist, einfach übernehmen
@@ -36,19 +59,217 @@ def extract_trade_signal_from_email():
         log(f"Fehler beim Extrahieren des Signals: {e}")
         return None
 
+def webhook_enabled():
+    """Der Webhook läuft nur mit gesetztem WEBHOOK_SECRET; sonst kommen Alerts nur per E-Mail."""
+    from webhook_server import WEBHOOK_SECRET
+
+    if not WEBHOOK_SECRET:
+        log("⚠️ WEBHOOK_SECRET nicht gesetzt: Webhook bleibt aus, Alerts nur per E-Mail")
+    return bool(WEBHOOK_SECRET)
+
 def main_loop():
+    """Alerts aus E-Mail und Webhook landen zuerst in der dauerhaften alert_queue, Worker handeln sie ab."""
+    from alert_queue import AlertQueue, AlertWorkers, make_order_lookup
+    from config import symbol
+    from ledger import start_private_stream
+    from startup import Startup
+    from tpsl import start_trailing
+    from trade import ATTACH_TPSL
+    from webhook_server import WebhookServer
+    from logik import execute_trade
+
+    log("🔁 Starte Hauptschleife zum E-Mail-Check und Trading...")
+    start_private_stream()  # Positionen/Saldo/Equity für logik, Risiko-Engine und Trailing wie in hot_loop
+    startup = Startup([symbol]).start()  # Märkte, Hebel, Verbindungen parallel zum Aufbau der Alert-Quellen
+    queue = AlertQueue()
+
+    def execute(alert, client_oid):
+        converted = convert_alert(alert)
+        if converted is None:
+            raise ValueError(f"Ungültiger Alert: {alert}")
+        log(f"📨 Signal erkannt: {converted}")
+        return execute_trade(direction_of(converted), client_oid=client_oid)
+
+    # execute_trade handelt immer config.symbol, also dort nach der clientOid suchen
+    workers = AlertWorkers(queue, execute, lookup=make_order_lookup(symbol=symbol))
+
+    def ingest(alert, received_at, source="mail"):
+        _, _, new = queue.put(alert)  # erst nach dem Commit zurück; Duplikate (gleiche ID) ignoriert die Queue
+        workers.notify()
+        if new:
+            record_alert(source, alert, received_at)
+
+    listener = IdleAlertListener(handler=ingest)
+    listener.start()
+    # E-Mail bleibt als Rückfallebene aktiv
+    webhook = (WebhookServer(lambda alert, received_at: ingest(alert, received_at, "webhook")).start_in_thread()
+               if webhook_enabled() else None)
+    startup.wait()  # bis dahin eingegangene Alerts liegen sicher in der Queue
+    trailing = start_trailing() if ATTACH_TPSL else None  # SL offener Positionen nachziehen
+    workers.start()
+    try:
+        while listener.is_alive():
+            listener.join(60)
+    finally:
+        listener.stop()
+        if webhook is not None:
+            webhook.stop()
+        if trailing is not None:
+            trailing.stop()
+        workers.stop()
+
+async def async_main_loop():
+    """
+    Asyncio-Variante: IDLE-Listener im Hintergrund-Thread, alle Konten/Symbole aus config.accounts in einer Engine.
+    Alerts landen wie in main_loop zuerst in der dauerhaften alert_queue; die Engine arbeitet sie mit clientOid ab.
+    """
+    from alert_queue import AlertQueue
+    from engine import TradingEngine
+    from webhook_server import WebhookServer, AlertDeduplicator
+
+    log("🔁 Starte asynchrone Hauptschleife...")
+    loop = asyncio.get_running_loop()
+    engine = TradingEngine.from_config()  # Markt-Feed und private Kanäle je Konto startet die Engine
+    queue = AlertQueue()
+    wake = asyncio.Event()
+
+    def forward(alert, received_at, source="mail"):
+        if convert_alert(alert) is None:
+            return
+        # Erst nach dem Commit zurück: Mail-UID bzw. Webhook-Antwort gelten dann als angenommen.
+        # Derselbe Alert über Webhook und E-Mail (gleiche ID) wird von der Queue ignoriert.
+        _, _, new = queue.put(alert)
+        if new:
+            log(f"📨 Signal erkannt: {alert}")
+            loop.call_soon_threadsafe(wake.set)
+            record_alert(source, alert, received_at)
+
+    webhook = None
+    if webhook_enabled():
+        webhook = await WebhookServer(lambda alert, received_at: forward(alert, received_at, "webhook"),
+                                      dedup=AlertDeduplicator()).start()
+    listener = IdleAlertListener(handler=forward)
+    listener.start()
+    try:
+        await engine.run_queue(queue, wake)
+    finally:
+        listener.stop()
+        if webhook is not None:
+            await webhook.close()
+
+def hot_loop():
+    """
+    Schnellste Variante für ein Konto: der IDLE-Thread sendet direkt eine vorbereitete Order (hot_order).
+    Solange für das Symbol noch keine Größe vorberechnet ist, läuft der normale execute_trade-Pfad.
+    """
+    from config import symbol
+    from hot_order import HotOrderBook
+    from ledger import start_private_stream
+    from logik import execute_trade, CONFIRM_WITH_INDICATORS, INDICATOR_GRANULARITY
+    from market_feed import BitgetMarketFeed
+    from market_store import market_store
+    from startup import Startup
+    from tpsl import start_trailing
+    from trade import api_credentials, ATTACH_TPSL
+    from webhook_server import WebhookServer, AlertDeduplicator
+
+    log("🔁 Starte Hauptschleife mit vorbereiteten Orders...")
+    indicators = None
+    if CONFIRM_WITH_INDICATORS:
+        from indicators import indicator_engine as indicators
+    BitgetMarketFeed([symbol], [INDICATOR_GRANULARITY], indicators=indicators).start_in_thread()
+    start_private_stream()
+    Startup([symbol]).run()  # HotOrderBook.start findet danach Präzision und Hebel im Cache
+    book = HotOrderBook([symbol], *api_credentials(), indicators=indicators).start()
+    trailing = start_trailing(engine=indicators) if ATTACH_TPSL else None  # SL offener Positionen nachziehen
+
+    dedup = AlertDeduplicator()
+
+    def fire(alert, received_at, source="mail"):
+        alert = convert_alert(alert)
+        if alert is None or dedup.seen(alert):
+            return
+        direction = direction_of(alert)
+        target = alert.get("symbol", symbol) if isinstance(alert, dict) else symbol
+        price = market_store.last_price(target)  # Preis beim Eingang, ins Journal erst nach dem Senden
+        try:
+            if target != symbol:
+                log(f"⚠️ Symbol {target} wird im Hot-Modus nicht gehandelt")
+                return
+            if indicators is not None:
+                confirmed, reason = indicators.confirm(direction, target, INDICATOR_GRANULARITY)
+                if not confirmed:
+                    log(f"⏭️ {direction}-Alert nicht bestätigt: {reason}")
+                    return
+            try:
+                if book.ready(target):
+                    book.fire(direction, target, received_at)
+                else:
+                    execute_trade(direction)
+            except Exception as e:
+                log(f"❗ Trade fehlgeschlagen: {e}")
+            log(f"📨 Signal verarbeitet: {alert}")
+        finally:
+            record_alert(source, alert, received_at, price)
+
+    listener = IdleAlertListener(handler=fire)
+    listener.start()
+    webhook = (WebhookServer(lambda alert, received_at: fire(alert, received_at, "webhook"),
+                             dedup=AlertDeduplicator()).start_in_thread() if webhook_enabled() else None)
+    try:
+        while True:
+            time.sleep(60)
+            log(f"⏱️ Alert→Wire: {book.timer.report().get('alert_to_wire')}")
+    finally:
+        listener.stop()
+        if webhook is not None:
+            webhook.stop()
+        if trailing is not None:
+            trailing.stop()
+        book.stop()
+
+def poll_loop():
+    """Alte Variante: alle 5 Sekunden neu verbinden und nach ungelesenen Mails suchen."""
+    from logik import execute_trade
+
     log("🔁 Starte Hauptschleife zum E-Mail-Check und Trading...")
     while True:
         directions = extract_trade_signal_from_email()
 
         if directions:
-            for direction in directions:
-                log(f"📨 Signal erkannt: {direction}")
-                execute_trade(direction)
+            for alert in directions:
+                log(f"📨 Signal erkannt: {alert}")
+                execute_trade(direction_of(alert))
         else:
             log("⏳ Keine neuen Signale gefunden.")
 
         time.sleep(5)
 
 if __name__ == "__main__":
-    main_loop()
+    import argparse
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Scalping-Bot")
+    parser.add_argument("--hot", action="store_true", help="Vorbereitete Orders direkt aus dem Alert-Thread senden")
+    parser.add_argument("--sync", action="store_true", help="Synchrone Schleife mit dauerhafter Alert-Queue")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT, help="0 schaltet /metrics ab")
+    parser.add_argument("--trace", help="Spans im Chrome-Trace-Format in diese Datei schreiben")
+    parser.add_argument("--journal", default="journal", help="Verzeichnis des Trade-Journals; leer schaltet es ab")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+    if args.trace:
+        metrics.enable_trace(args.trace)
+    from risk import install_kill_signal
+    install_kill_signal()  # kill -USR1 <pid> sperrt neue Trades
+    if args.journal:
+        from journal import enable_journal
+        from ledger import ledger
+        enable_journal(args.journal, ledger)  # Fills kommen über den privaten orders-Kanal
+    if args.hot:
+        hot_loop()
+    elif args.sync:
+        main_loop()
+    else:
+        asyncio.run(async_main_loop())
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+import websockets
+from config import ws_public_url
+from data import fetch_bitget_candles
+from market_store import market_store, GRANULARITY_MS
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+PUBLIC_WS_URL = ws_public_url
+INST_TYPE = "USDT-FUTURES"
+PING_INTERVAL = 25  # Bitget trennt nach 30s ohne "ping"
+
+class BitgetMarketFeed:
+    """
+    Abonniert die öffentlichen Bitget-Kanäle ticker und candle<granularity> und hält
+    market_store aktuell. Fehlende Kerzen (Lücken im Stream oder nach einem Reconnect)
+    werden per REST nachgeladen.
+    """
+
+    def __init__(self, symbols, granularities=("1m",), store=market_store, url=PUBLIC_WS_URL,
+                 backfill=fetch_bitget_candles, min_backoff=1, max_backoff=30, recorder=None, persist=False,
+                 indicators=None):
+        self.symbols = list(symbols)
+        self.granularities = list(granularities)
+        self.store = store
+        self.url = url
+        self.backfill = backfill  # None schaltet REST-Backfill ab (z.B. für Replay-Tests)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.recorder = recorder  # Datei, in die alle Nachrichten als JSON-Zeilen geschrieben werden
+        self.indicators = indicators  # indicators.IndicatorEngine, wird mit jedem Tick/jeder Kerze aktualisiert
+        self.connected = threading.Event()
+        self.messages = 0
+        self._stopped = False
+        self._tasks = set()  # laufende Backfills, damit sie nicht vom GC eingesammelt werden
+        self.candle_stores = {}
+        if persist:
+            # Abgeschlossene Kerzen auf die Platte schreiben und das Fenster beim Start von dort füllen
+            from candle_store import CandleStore
+            for symbol in self.symbols:
+                for granularity in self.granularities:
+                    candle_store = CandleStore(symbol, granularity)
+                    candle_store.warm(self.store.candles(symbol, granularity))
+                    self.candle_stores[(symbol, granularity)] = candle_store
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def subscription(self):
+        args = []
+        for symbol in self.symbols:
+            args.append({"instType": INST_TYPE, "channel": "ticker", "instId": symbol})
+            for granularity in self.granularities:
+                args.append({"instType": INST_TYPE, "channel": f"candle{granularity}", "instId": symbol})
+        return {"op": "subscribe", "args": args}
+
+    async def _fill_gap(self, symbol, granularity, start, end):
+        """Lädt die Kerzen zwischen ``start`` und ``end`` (ms, inklusive) per REST nach."""
+        if self.backfill is None:
+            return
+        window = self.store.candles(symbol, granularity)
+        limit = min(window.capacity, (end - start) // GRANULARITY_MS[granularity] + 1)
+        logging.info(f"Lücke in {symbol} {granularity}: {limit} Kerze(n), lade per REST nach")
+        loop = asyncio.get_running_loop()
+        try:
+            rows = await loop.run_in_executor(
+                None, lambda: self.backfill(symbol, granularity, limit, start, end + GRANULARITY_MS[granularity]))
+        except Exception as e:
+            logging.error(f"Backfill fehlgeschlagen für {symbol} {granularity}: {e}")
+            return
+        rows = [row for row in rows if start <= row[0] <= end]
+        window.merge(rows)
+        if self.indicators is not None:
+            self.indicators.load(symbol, granularity, rows)  # Kerzen vor der jüngsten ignoriert die Engine
+        candle_store = self.candle_stores.get((symbol, granularity))
+        if candle_store is not None and rows:
+            candle_store.append(rows)
+
+    async def _backfill_after_reconnect(self):
+        """Füllt die Zeit seit der letzten bekannten Kerze bis jetzt auf (bzw. das ganze Fenster beim Start)."""
+        now = int(time.time() * 1000)
+        for symbol in self.symbols:
+            for granularity in self.granularities:
+                window = self.store.candles(symbol, granularity)
+                interval = GRANULARITY_MS[granularity]
+                start = window.last_ts + interval if window.last_ts else now - window.capacity * interval
+                if now - start >= interval:
+                    await self._fill_gap(symbol, granularity, start, now - now % interval)
+
+    def handle_message(self, message):
+        if message == "pong":
+            return
+        payload = json.loads(message)
+        if "event" in payload:
+            if payload["event"] == "error":
+                logging.error(f"WebSocket-Fehler: {payload}")
+            return
+        arg = payload.get("arg", {})
+        channel = arg.get("channel", "")
+        symbol = arg.get("instId")
+        self.messages += 1
+        if channel == "ticker":
+            for tick in payload.get("data", []):
+                self.store.set_price(symbol, float(tick["lastPr"]), int(tick.get("ts", 0)))
+                if self.indicators is not None and tick.get("bidSz"):
+                    self.indicators.on_tick(symbol, float(tick["bidPr"]), float(tick["bidSz"]),
+                                            float(tick["askPr"]), float(tick["askSz"]))
+        elif channel.startswith("candle"):
+            granularity = channel[len("candle"):]
+            window = self.store.candles(symbol, granularity)
+            candle_store = self.candle_stores.get((symbol, granularity))
+            for k in payload.get("data", []):
+                if candle_store is not None and window.last_ts is not None and int(k[0]) > window.last_ts:
+                    candle_store.append(window.rows()[-1:])  # vorherige Kerze ist abgeschlossen
+                gap = window.update(int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]))
+                if self.indicators is not None:
+                    self.indicators.on_candle(symbol, granularity, int(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                                              float(k[4]), float(k[5]))
+                if gap:
+                    self._spawn(self._fill_gap(symbol, granularity, *gap))
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send("ping")
+
+    async def _session(self):
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            await ws.send(json.dumps(self.subscription()))
+            self.connected.set()
+            logging.info(f"✅ Markt-Feed verbunden: {', '.join(self.symbols)}")
+            self._spawn(self._backfill_after_reconnect())
+            pinger = asyncio.create_task(self._ping(ws))
+            try:
+                async for message in ws:
+                    if self.recorder:
+                        self.recorder.write(json.dumps({"t": time.time(), "msg": message}) + "\n")
+                    self.handle_message(message)
+            finally:
+                pinger.cancel()
+
+    async def run(self):
+        backoff = self.min_backoff
+        while not self._stopped:
+            try:
+                await self._session()
+                backoff = self.min_backoff
+            except (OSError, websockets.WebSocketException) as e:
+                logging.error(f"Markt-Feed getrennt: {e} – neuer Versuch in {backoff}s")
+            self.connected.clear()
+            if self._stopped:
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self):
+        self._stopped = True
+
+    def start_in_thread(self):
+        """Startet den Feed in einem eigenen Event-Loop-Thread (für den synchronen Bot)."""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="BitgetMarketFeed", daemon=True)
+        thread.start()
+        return thread
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bitget Markt-Feed (ticker + Kerzen) in den Speicher laden.")
+    parser.add_argument("--symbol", action="append", default=None, help="Symbol, mehrfach möglich (Standard BTCUSDT)")
+    parser.add_argument("--granularity", action="append", default=None, help="z.B. 1m, mehrfach möglich")
+    parser.add_argument("--url", default=PUBLIC_WS_URL, help="WebSocket-URL (z.B. ws://127.0.0.1:8765 für ws_replay)")
+    parser.add_argument("--record", help="Alle Nachrichten als JSON-Zeilen in diese Datei schreiben")
+    parser.add_argument("--persist", action="store_true", help="Abgeschlossene Kerzen in candle_store sichern")
+    args = parser.parse_args()
+
+    recorder = open(args.record, "a") if args.record else None
+    feed = BitgetMarketFeed(args.symbol or ["BTCUSDT"], args.granularity or ["1m"], url=args.url, recorder=recorder,
+                            persist=args.persist)
+    feed.start_in_thread()
+    try:
+        while True:
+            time.sleep(10)
+            for symbol in feed.symbols:
+                window = market_store.candles(symbol, feed.granularities[0])
+                logging.info(f"{symbol}: Preis {market_store.last_price(symbol)}, {len(window)} Kerzen, "
+                             f"{feed.messages} Nachrichten")
+    except KeyboardInterrupt:
+        feed.stop()
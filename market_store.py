@@ -0,0 +1,131 @@
+import threading
+import time
+from array import array
+
+# Kerzenlänge in Millisekunden je Bitget-Granularität
+GRANULARITY_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1H": 3_600_000, "4H": 14_400_000, "6H": 21_600_000, "12H": 43_200_000, "1D": 86_400_000,
+}
+
+class CandleWindow:
+    """
+    Rollierendes Kerzenfenster fester Größe für ein Symbol/eine Granularität.
+
+    Die Spalten liegen als array('q')/array('d') vor (Ringpuffer, ~48 Byte pro Kerze).
+    Die jüngste Kerze darf beliebig oft aktualisiert werden, solange sie nicht
+    abgeschlossen ist (Bitget schickt die laufende Kerze bei jedem Trade neu).
+    """
+
+    def __init__(self, granularity="1m", capacity=500):
+        self.granularity = granularity
+        self.interval = GRANULARITY_MS[granularity]
+        self.capacity = capacity
+        self.ts = array("q", [0] * capacity)
+        self.open = array("d", [0.0] * capacity)
+        self.high = array("d", [0.0] * capacity)
+        self.low = array("d", [0.0] * capacity)
+        self.close = array("d", [0.0] * capacity)
+        self.volume = array("d", [0.0] * capacity)
+        self.size = 0
+        self.head = 0  # Index der nächsten Schreibposition
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_ts(self):
+        return self.ts[(self.head - 1) % self.capacity] if self.size else None
+
+    def _write(self, index, ts, o, h, l, c, v):
+        self.ts[index] = ts
+        self.open[index] = o
+        self.high[index] = h
+        self.low[index] = l
+        self.close[index] = c
+        self.volume[index] = v
+
+    def update(self, ts, o, h, l, c, v):
+        """
+        Übernimmt eine Kerze aus dem Stream.
+
+        Returns:
+            tuple: (erste_fehlende_ts, letzte_fehlende_ts), wenn zwischen der letzten
+            bekannten und dieser Kerze welche fehlen, sonst None.
+        """
+        with self.lock:
+            last_ts = self.last_ts
+            if last_ts is not None and ts < last_ts:
+                return None  # veraltet, schon überholt
+            if last_ts == ts:
+                self._write((self.head - 1) % self.capacity, ts, o, h, l, c, v)
+                return None
+            self._write(self.head, ts, o, h, l, c, v)
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            if last_ts is not None and ts - last_ts > self.interval:
+                return last_ts + self.interval, ts - self.interval
+            return None
+
+    def rows(self):
+        """Alle Kerzen in zeitlicher Reihenfolge als Liste von Tupeln (ts, o, h, l, c, v)."""
+        with self.lock:
+            start = (self.head - self.size) % self.capacity
+            indices = [(start + i) % self.capacity for i in range(self.size)]
+            return [(self.ts[i], self.open[i], self.high[i], self.low[i], self.close[i], self.volume[i])
+                    for i in indices]
+
+    def merge(self, rows):
+        """Fügt nachgeladene Kerzen ein (z.B. REST-Backfill), dedupliziert nach Zeitstempel."""
+        merged = {row[0]: row for row in rows}
+        merged.update({row[0]: row for row in self.rows()})  # Stream-Daten sind aktueller
+        ordered = sorted(merged.values())[-self.capacity:]
+        with self.lock:
+            for i, row in enumerate(ordered):
+                self._write(i, *row)
+            self.size = len(ordered)
+            self.head = self.size % self.capacity
+
+    def to_dataframe(self, last=None):
+        """DataFrame im Format von data.fetch_bitget_klines (Timestamp-Index, Open..Volume)."""
+        import pandas as pd
+
+        rows = self.rows()
+        if last:
+            rows = rows[-last:]
+        df = pd.DataFrame(rows, columns=["Timestamp", "Open", "High", "Low", "Close", "Volume"])
+        df["Timestamp"] = pd.to_datetime(df["Timestamp"], unit="ms", utc=True)
+        return df.set_index("Timestamp")
+
+class MarketStore:
+    """Letzter Preis und Kerzenfenster je Symbol, befüllt vom WebSocket-Feed (market_feed)."""
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.prices = {}  # symbol -> (preis, börsen_ts_ms, empfangen_monotonic)
+        self.windows = {}  # (symbol, granularity) -> CandleWindow
+        self.lock = threading.Lock()
+
+    def set_price(self, symbol, price, ts=None):
+        self.prices[symbol] = (price, ts, time.monotonic())
+
+    def last_price(self, symbol, max_age=5.0):
+        """
+        Letzter Preis aus dem Stream oder None, wenn keiner vorliegt bzw. er älter als ``max_age`` Sekunden ist.
+        """
+        entry = self.prices.get(symbol)
+        if entry is None or time.monotonic() - entry[2] > max_age:
+            return None
+        return entry[0]
+
+    def candles(self, symbol, granularity="1m"):
+        key = (symbol, granularity)
+        window = self.windows.get(key)
+        if window is None:
+            with self.lock:
+                window = self.windows.setdefault(key, CandleWindow(granularity, self.capacity))
+        return window
+
+# Prozessweiter Speicher, den trade.py und data.py lesen
+market_store = MarketStore()
@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import bisect
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+TRACE_ENV = "SCALPING_TRACE"  # Pfad für den Trace-Export, z.B. SCALPING_TRACE=trace.json
+
+# Bucket-Grenzen in Sekunden: 50 µs (Parser) bis 30 s (E-Mail-Abruf)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = "scalping_stage_seconds"
+STAGE_ERRORS = "scalping_stage_errors_total"
+REST_SECONDS = "scalping_rest_request_seconds"
+REST_ERRORS = "scalping_rest_errors_total"
+RATE_LIMIT_HITS = "scalping_rate_limit_hits_total"
+ALERT_TO_WIRE = "scalping_alert_to_wire_seconds"
+
+HELP = {
+    STAGE_SECONDS: "Dauer je Stufe (mail_fetch, parse, position_check, balance, leverage, market_load, ticker, "
+                   "order, ...)",
+    STAGE_ERRORS: "Ausnahmen je Stufe und Fehlerklasse",
+    REST_SECONDS: "Round-Trip der Bitget-REST-Aufrufe je Pfad",
+    REST_ERRORS: "Bitget-Fehlerantworten je Pfad und Code",
+    RATE_LIMIT_HITS: "429/Rate-Limit-Antworten je Endpunkt",
+    ALERT_TO_WIRE: "Alert-Eingang bis Order im Socket (hot_order)",
+}
+
+class Histogram:
+    """Kumulatives Histogramm mit festen Grenzen wie bei Prometheus."""
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # letzter Eintrag: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Schätzt ein Quantil durch lineare Interpolation innerhalb des Buckets."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+class Registry:
+    """Alle Histogramme und Zähler des Prozesses, Schlüssel (Name, Labels)."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name, labels=()):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def render(self):
+        """Textformat für Prometheus (/metrics)."""
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        for (name, labels), histogram in histograms:
+            describe(name, "histogram")
+            with histogram.lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, n in zip(list(histogram.bounds) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{fmt(labels)} {total}")
+            lines.append(f"{name}_count{fmt(labels)} {count}")
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Returns:
+            dict: "name{labels}" -> count, p50/p99 (ms, aus den Buckets geschätzt) bzw. Zählerstand.
+        """
+        result = {}
+        for (name, labels), histogram in list(self.histograms.items()):
+            key = name + "".join(f"[{v}]" for _, v in labels)
+            result[key] = {"count": histogram.count, "p50_ms": histogram.quantile(0.5) * 1000,
+                           "p99_ms": histogram.quantile(0.99) * 1000}
+        for (name, labels), value in list(self.counters.items()):
+            result[name + "".join(f"[{v}]" for _, v in labels)] = value
+        return result
+
+registry = Registry()
+
+class TraceWriter:
+    """
+    Schreibt Spans im Chrome-Trace-Format (chrome://tracing, Perfetto) in eine Datei.
+
+    Die Datei wird von einem Hintergrund-Thread geschrieben; der heiße Pfad legt nur ein
+    Tupel in eine Queue. Die schließende Klammer fehlt absichtlich, das Format erlaubt das
+    und die Datei bleibt nach einem Absturz lesbar.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.events = queue.SimpleQueue()
+        self.pid = os.getpid()
+        self.file = open(path, "w")
+        self.file.write("[\n")
+        self.thread = threading.Thread(target=self._run, name="TraceWriter", daemon=True)
+        self.thread.start()
+
+    def add(self, name, start_ns, duration_ns, labels, error):
+        self.events.put((name, start_ns, duration_ns, threading.get_ident(), labels, error))
+
+    def _run(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            name, start_ns, duration_ns, tid, labels, error = event
+            args = dict(labels)
+            if error:
+                args["error"] = error
+            self.file.write(json.dumps({"name": name, "ph": "X", "ts": start_ns / 1000, "dur": duration_ns / 1000,
+                                        "pid": self.pid, "tid": tid, "args": args}) + ",\n")
+            if self.events.empty():
+                self.file.flush()
+
+    def close(self):
+        self.events.put(None)
+        self.thread.join(5)
+        self.file.close()
+
+_trace = None
+_sinks = []  # callback(stage, sekunden) für jede Messung, z.B. journal.record_latency
+
+def add_sink(sink):
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+def enable_trace(path):
+    """Schaltet den Trace-Export nach ``path`` ein (ersetzt einen laufenden)."""
+    global _trace
+    disable_trace()
+    _trace = TraceWriter(path)
+    logging.info(f"🧵 Trace-Export nach {path}")
+    return _trace
+
+def disable_trace():
+    global _trace
+    if _trace is not None:
+        _trace.close()
+        _trace = None
+
+def _stage_histogram(stage, labels):
+    return registry.histogram(STAGE_SECONDS, (("stage", stage),) + labels)
+
+def _finish(histogram, stage, labels, start, error):
+    duration = time.perf_counter_ns() - start
+    histogram.observe(duration / 1e9)
+    if error is not None:
+        registry.inc(STAGE_ERRORS, (("stage", stage),) + labels + (("error", error),))
+    if _trace is not None:
+        _trace.add(stage, start, duration, labels, error)
+    for sink in _sinks:
+        sink(stage, duration / 1e9)
+
+class span:
+    """
+    Misst eine Stufe: ``with span("balance"):`` bzw. ``@span.timed("balance")``.
+
+    Die Dauer landet in scalping_stage_seconds{stage=...}, Ausnahmen zusätzlich in
+    scalping_stage_errors_total{stage=..., error=Klasse} (die Ausnahme wird weitergereicht).
+    Ist ein Trace aktiv, wird der Span auch dorthin geschrieben.
+    """
+
+    __slots__ = ("stage", "labels", "histogram", "start")
+
+    def __init__(self, stage, **labels):
+        self.stage = stage
+        self.labels = tuple(sorted(labels.items())) if labels else ()
+        self.histogram = _stage_histogram(stage, self.labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _finish(self.histogram, self.stage, self.labels, self.start, exc_type.__name__ if exc_type else None)
+        return False
+
+    @staticmethod
+    def timed(stage, **labels):
+        """Dekorator: misst jeden Aufruf der (auch asynchronen) Funktion als Stufe ``stage``."""
+        labels = tuple(sorted(labels.items()))
+        histogram = _stage_histogram(stage, labels)  # einmal auflösen, nicht je Aufruf
+
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start, error = time.perf_counter_ns(), None
+                    try:
+                        return await func(*args, **kwargs)
+                    except BaseException as e:
+                        error = type(e).__name__
+                        raise
+                    finally:
+                        _finish(histogram, stage, labels, start, error)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start, error = time.perf_counter_ns(), None
+                try:
+                    return func(*args, **kwargs)
+                except BaseException as e:
+                    error = type(e).__name__
+                    raise
+                finally:
+                    _finish(histogram, stage, labels, start, error)
+            return wrapper
+        return decorator
+
+timed = span.timed
+
+def observe(name, seconds, **labels):
+    registry.histogram(name, tuple(sorted(labels.items()))).observe(seconds)
+    for sink in _sinks:
+        sink(name, seconds)
+
+def inc(name, value=1, **labels):
+    registry.inc(name, tuple(sorted(labels.items())), value)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Startet /metrics (Prometheus-Textformat) in einem Hintergrund-Thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    logging.info(f"📊 Metriken unter http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+if os.environ.get(TRACE_ENV):
+    enable_trace(os.environ[TRACE_ENV])
+
+def benchmark(rounds=200_000):
+    """Overhead eines Spans ohne und mit Trace-Export."""
+    import tempfile
+
+    @timed("bench")
+    def work():
+        pass
+
+    def run(label):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            with span("bench"):
+                pass
+        per_span = (time.perf_counter() - start) / rounds * 1e9
+        start = time.perf_counter()
+        for _ in range(rounds):
+            work()
+        per_call = (time.perf_counter() - start) / rounds * 1e9
+        print(f"{label:<24} {per_span:6.0f} ns je with-Span, {per_call:6.0f} ns je @timed-Aufruf")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        pass
+    print(f"{'leere Schleife':<24} {(time.perf_counter() - start) / rounds * 1e9:6.0f} ns")
+    run("Span")
+    path = os.path.join(tempfile.mkdtemp(), "trace.json")
+    enable_trace(path)
+    run("Span + Trace-Export")
+    disable_trace()
+    print(f"Trace: {os.path.getsize(path) / 1e6:.1f} MB in {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metriken: Overhead messen oder /metrics eines laufenden Bots lesen.")
+    parser.add_argument("--benchmark", action="store_true", help="Overhead je Span messen")
+    parser.add_argument("--url", default=f"http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+    else:
+        from urllib.request import urlopen
+        print(urlopen(args.url, timeout=5).read().decode())
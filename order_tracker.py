@@ -0,0 +1,250 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import OrderedDict
+from config import product_type
+from ledger import ledger as default_ledger, FINAL_ORDER_STATES
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+ORDERS_PENDING_PATH = "/api/v2/mix/order/orders-pending"
+ORDER_DETAIL_PATH = "/api/v2/mix/order/detail"
+POLL_INTERVAL = 2.0  # REST-Fallback, solange der private Kanal nicht verbunden ist
+SAFETY_INTERVAL = 30.0  # Abgleich trotz WebSocket, falls eine Nachricht verloren ging
+FINISHED_CACHE = 1000  # zuletzt abgeschlossene Orders (Push kann vor track() ankommen)
+
+def order_status(raw):
+    """Status aus WebSocket ("status") oder REST-Detail ("state")."""
+    return (raw.get("status") or raw.get("state") or "unknown").lower()
+
+class _Watch:
+    def __init__(self, symbol, order_id, client_oid):
+        self.symbol = symbol
+        self.order_id = order_id
+        self.client_oid = client_oid
+        self.future = concurrent.futures.Future()
+        self.callbacks = []
+        self.created = time.monotonic()
+
+class OrderTracker:
+    """
+    Überwacht beliebig viele offene Orders gleichzeitig.
+
+    Abschlüsse (filled/canceled/...) kommen über den privaten orders-Kanal des Ledgers und
+    lösen Callbacks und Futures sofort im Thread des WebSockets aus. Ist der Kanal nicht
+    verbunden, fragt ein Hintergrund-Thread alle offenen Orders mit einem einzigen
+    orders-pending-Aufruf ab und holt nur für verschwundene Orders das Detail.
+    """
+
+    def __init__(self, ledger=default_ledger, stream=None, client=None, poll_interval=POLL_INTERVAL,
+                 safety_interval=SAFETY_INTERVAL):
+        self.ledger = ledger
+        self.stream = stream  # ledger.PrivateStream; None = immer per REST abfragen
+        self.client = client  # bitget_client.BitgetClient; None = get_client() beim ersten Abgleich
+        self.poll_interval = poll_interval
+        self.safety_interval = safety_interval
+        self.watches = {}  # orderId bzw. "c:" + clientOid -> _Watch
+        self.finished = OrderedDict()  # gleiche Schlüssel -> letzte Rohdaten
+        self.lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._poller = None
+        ledger.order_listeners.append(self.on_order_update)
+
+    @staticmethod
+    def _keys(order_id, client_oid):
+        return [key for key in (order_id and str(order_id), client_oid and "c:" + client_oid) if key]
+
+    def track(self, symbol, order_id=None, client_oid=None, callback=None):
+        """
+        Beobachtet eine Order bis zum Abschluss.
+
+        Args:
+            symbol (str): Handelspaar, z.B. "BTCUSDT".
+            order_id (str): Order-ID der Börse.
+            client_oid (str): Eigene Order-ID (clientOid).
+            callback (callable): callback(order_dict) beim Abschluss.
+
+        Returns:
+            concurrent.futures.Future: Liefert die Rohdaten der Order im Endzustand
+            (in asyncio mit ``await tracker.wait(...)`` bzw. asyncio.wrap_future).
+
+        Raises:
+            ValueError: Wenn weder order_id noch client_oid angegeben ist.
+        """
+        keys = self._keys(order_id, client_oid)
+        if not keys:
+            raise ValueError("order_id oder client_oid erforderlich")
+        with self.lock:
+            done = next((self.finished[key] for key in keys if key in self.finished), None)
+            watch = next((self.watches[key] for key in keys if key in self.watches), None)
+            if watch is None:
+                watch = _Watch(symbol, order_id, client_oid)
+            if callback:
+                watch.callbacks.append(callback)
+            if done is None:
+                for key in keys:
+                    self.watches[key] = watch
+        if done is not None:
+            self._resolve(watch, done)
+        else:
+            self._ensure_poller()
+        return watch.future
+
+    async def wait(self, symbol, order_id=None, client_oid=None, timeout=None):
+        """Wartet in asyncio auf den Abschluss und liefert die Rohdaten der Order."""
+        future = asyncio.wrap_future(self.track(symbol, order_id, client_oid))
+        return await asyncio.wait_for(future, timeout)
+
+    def on_order_update(self, raw):
+        """Listener für den orders-Kanal (wird vom Ledger bei jeder Order-Nachricht aufgerufen)."""
+        if order_status(raw) not in FINAL_ORDER_STATES:
+            return
+        keys = self._keys(raw.get("orderId"), raw.get("clientOid"))
+        with self.lock:
+            for key in keys:
+                self.finished[key] = raw
+            while len(self.finished) > FINISHED_CACHE:
+                self.finished.popitem(last=False)
+            watch = next((self.watches[key] for key in keys if key in self.watches), None)
+            if watch is not None:
+                for key in self._keys(watch.order_id, watch.client_oid):
+                    self.watches.pop(key, None)
+        if watch is not None:
+            self._resolve(watch, raw)
+
+    def _resolve(self, watch, raw):
+        if watch.future.done():
+            return
+        watch.future.set_result(raw)
+        for callback in watch.callbacks:
+            try:
+                callback(raw)
+            except Exception as e:
+                logging.error(f"Fehler im Order-Callback: {e}")
+
+    def pending(self):
+        with self.lock:
+            return list({id(w): w for w in self.watches.values()}.values())
+
+    # --- REST-Fallback ---
+
+    def _ensure_poller(self):
+        if self._poller is None or not self._poller.is_alive():
+            self._poller = threading.Thread(target=self._poll_loop, name="OrderTracker", daemon=True)
+            self._poller.start()
+        self._wake.set()
+
+    def _stream_connected(self):
+        return self.stream is not None and self.stream.connected.is_set()
+
+    def reconcile(self):
+        """
+        Ein Abgleich per REST: ein orders-pending-Aufruf für alle Symbole, danach Detail nur für
+        beobachtete Orders, die dort fehlen (also abgeschlossen sind).
+        """
+        watches = self.pending()
+        if not watches:
+            return 0
+        if self.client is None:
+            from bitget_client import get_client
+            self.client = get_client()
+        response = self.client.get(ORDERS_PENDING_PATH, {"productType": product_type})
+        open_orders = (response.data or {}).get("entrustedList") or []
+        open_keys = {key for o in open_orders for key in self._keys(o.get("orderId"), o.get("clientOid"))}
+        resolved = 0
+        for watch in watches:
+            if any(key in open_keys for key in self._keys(watch.order_id, watch.client_oid)):
+                continue
+            params = {"symbol": watch.symbol, "productType": product_type}
+            if watch.order_id:
+                params["orderId"] = watch.order_id
+            else:
+                params["clientOid"] = watch.client_oid
+            detail = self.client.get(ORDER_DETAIL_PATH, params).data
+            if order_status(detail) in FINAL_ORDER_STATES:
+                self.on_order_update(detail)
+                resolved += 1
+        return resolved
+
+    def _poll_loop(self):
+        last = 0.0
+        while not self._stopped:
+            interval = self.safety_interval if self._stream_connected() else self.poll_interval
+            self._wake.wait(max(0.0, last + interval - time.monotonic()))
+            self._wake.clear()
+            if self._stopped:
+                break
+            if time.monotonic() - last < interval:
+                continue
+            last = time.monotonic()
+            if not self.pending():
+                continue
+            try:
+                self.reconcile()
+            except Exception as e:
+                logging.error(f"Order-Abgleich per REST fehlgeschlagen: {e}")
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self.on_order_update in self.ledger.order_listeners:
+            self.ledger.order_listeners.remove(self.on_order_update)
+
+_tracker = None
+
+def get_tracker(stream=None):
+    """Prozessweiter OrderTracker am globalen Ledger."""
+    global _tracker
+    if _tracker is None:
+        _tracker = OrderTracker(stream=stream)
+    elif stream is not None:
+        _tracker.stream = stream
+    return _tracker
+
+def benchmark(orders=500):
+    """Misst die Zeit vom Senden einer Order-Nachricht (ws_replay) bis zum Callback."""
+    import json
+    import statistics
+    from ledger import Ledger, PrivateStream, INST_TYPE
+    from ws_replay import ReplayServer
+
+    def push(i, status):
+        return json.dumps({"action": "snapshot", "arg": {"instType": INST_TYPE, "channel": "orders", "instId": "default"},
+                           "data": [{"orderId": str(i), "clientOid": f"bench-{i}", "instId": "BTCUSDT",
+                                     "status": status}]})
+
+    # 2 ms Abstand zwischen den Nachrichten, damit einzelne Latenzen und nicht der Burst gemessen werden
+    messages = [push(i, "live") for i in range(orders)] + [push(i, "filled") for i in range(orders)]
+    records = [(n * 0.002, message) for n, message in enumerate(messages)]
+    latencies = []
+
+    async def scenario():
+        server = await ReplayServer(records, speed=1.0, start_delay=0.2).start()
+        bench_ledger = Ledger()
+        stream = PrivateStream(bench_ledger, "key", "secret", "pass", url=server.url, seed=False)
+        tracker = OrderTracker(bench_ledger, stream=stream, poll_interval=3600)  # nur WebSocket messen
+        fill_messages = {str(i): records[orders + i][1] for i in range(orders)}
+        done = []
+        for i in range(orders):
+            def on_done(raw, message=fill_messages[str(i)]):
+                latencies.append((time.perf_counter() - server.sent[message]) * 1000)
+            done.append(asyncio.wrap_future(tracker.track("BTCUSDT", order_id=str(i), callback=on_done)))
+        task = asyncio.create_task(stream.run())
+        await asyncio.wait_for(asyncio.gather(*done), 30)
+        stream.stop()
+        tracker.stop()
+        task.cancel()
+        await server.close()
+
+    asyncio.run(scenario())
+    latencies.sort()
+    print(f"✅ {len(latencies)} Orders gleichzeitig überwacht, Abschluss-Callback nach p50 "
+          f"{statistics.median(latencies):.2f} ms, p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms "
+          f"(vorher: bis zu 10 s Polling je Order)")
+
+if __name__ == "__main__":
+    benchmark()
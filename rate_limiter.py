@@ -0,0 +1,278 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from metrics import inc, RATE_LIMIT_HITS
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+# Spuren in Prioritätsreihenfolge: Orders vor Konto-Abfragen vor Status-Polling/Marktdaten
+ORDER = "order"
+ACCOUNT = "account"
+POLL = "poll"
+LANE_PRIORITY = {ORDER: 0, ACCOUNT: 1, POLL: 2}
+
+# Veröffentlichte Bitget-Limits (Anfragen pro Sekunde) und Standard-Spur je Endpunkt
+ENDPOINT_LIMITS = {
+    "/api/v2/mix/order/place-order": (10, ORDER),
+    "/api/v2/mix/order/cancel-order": (10, ORDER),
+    "/api/v2/mix/order/modify-order": (10, ORDER),
+    "/api/v2/mix/order/batch-place-order": (5, ORDER),
+    "/api/v2/mix/order/batch-cancel-orders": (5, ORDER),
+    "/api/v2/mix/order/place-tpsl-order": (10, ORDER),
+    "/api/v2/mix/order/place-pos-tpsl": (10, ORDER),
+    "/api/v2/mix/order/modify-tpsl-order": (10, ORDER),
+    "/api/v2/mix/order/close-positions": (1, ORDER),
+    "/api/v2/mix/account/set-leverage": (5, ACCOUNT),
+    "/api/v2/mix/account/account": (10, ACCOUNT),
+    "/api/v2/mix/position/all-position": (5, ACCOUNT),
+    "/api/v2/mix/position/single-position": (10, ACCOUNT),
+    "/api/v2/mix/order/detail": (10, POLL),
+    "/api/v2/mix/order/orders-pending": (10, POLL),
+    "/api/v2/mix/order/orders-plan-pending": (10, POLL),
+    "/api/v2/mix/market/ticker": (20, POLL),
+    "/api/v2/mix/market/candles": (20, POLL),
+    "/api/v2/mix/market/history-candles": (20, POLL),
+    "/api/v2/mix/market/contracts": (20, POLL),
+    "/api/v2/public/time": (20, POLL),
+}
+DEFAULT_LIMIT = (10, POLL)
+GLOBAL_RATE = 50  # Gesamtbudget aller Endpunkte pro Sekunde (Reserve unter dem IP-Limit)
+RATE_LIMIT_CODES = ("429", "40429")  # HTTP 429 bzw. Bitget-Code "Too Many Requests"
+MIN_BACKOFF = 0.25
+MAX_BACKOFF = 10.0
+WAIT_SAMPLES = 2048
+
+class TokenBucket:
+    """
+    Token-Bucket mit adaptiver Rate (AIMD).
+
+    Nach einem 429 wird die Rate halbiert und der Bucket exponentiell wachsend gesperrt;
+    jede erfolgreiche Anfrage hebt die Rate wieder schrittweise bis zum veröffentlichten Limit an.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.throttled = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Sekunden bis ein Token frei ist (0 = sofort)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def throttle(self, now):
+        self.throttled += 1
+        self.backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, self.backoff * 2))
+        self.blocked_until = now + self.backoff
+        self.rate = max(self.base_rate * 0.2, self.rate * 0.5)
+        self.tokens = 0.0
+
+    def relax(self):
+        self.backoff = 0.0
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+class LaneStats:
+    """Wartezeiten einer Spur (Sekunden), für metrics()."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=WAIT_SAMPLES)
+
+    def add(self, wait):
+        self.count += 1
+        self.total += wait
+        self.max = max(self.max, wait)
+        self.samples.append(wait)
+
+    def snapshot(self, queued):
+        samples = sorted(self.samples)
+
+        def pct(p):
+            return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000 if samples else 0.0
+
+        return {"count": self.count, "queued": queued, "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+                "p50_ms": pct(0.5), "p99_ms": pct(0.99), "max_ms": self.max * 1000}
+
+class RateLimiter:
+    """
+    Zentraler Scheduler für alle REST-Anfragen.
+
+    Jede Anfrage braucht ein Token aus dem Bucket ihres Endpunkts und eines aus dem
+    Gesamtbudget. Warten mehrere Anfragen auf denselben Bucket, kommt die Spur mit der
+    höheren Priorität zuerst dran (ORDER vor ACCOUNT vor POLL), innerhalb einer Spur
+    gilt die Eingangsreihenfolge.
+    """
+
+    def __init__(self, limits=None, default_limit=DEFAULT_LIMIT, global_rate=GLOBAL_RATE):
+        self.limits = dict(ENDPOINT_LIMITS, **(limits or {}))
+        self.default_limit = default_limit
+        self.global_bucket = TokenBucket(global_rate)
+        self.buckets = {}
+        self.stats = {lane: LaneStats() for lane in LANE_PRIORITY}
+        self.waiting = []  # sortiert nach (Priorität, Reihenfolge)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def lane_for(self, path):
+        return self.limits.get(path, self.default_limit)[1]
+
+    def _bucket(self, path):
+        bucket = self.buckets.get(path)
+        if bucket is None:
+            bucket = self.buckets[path] = TokenBucket(self.limits.get(path, self.default_limit)[0])
+        return bucket
+
+    def _ticket(self, path, lane):
+        lane = lane or self.lane_for(path)
+        ticket = (LANE_PRIORITY[lane], next(self._seq), lane, (self._bucket(path), self.global_bucket))
+        bisect.insort(self.waiting, ticket, key=lambda t: t[:2])
+        return ticket
+
+    def _try(self, ticket, now):
+        """Gibt 0 zurück und verbraucht die Tokens, wenn ``ticket`` jetzt drankommt, sonst die Wartezeit."""
+        buckets = ticket[3]
+        for other in self.waiting:
+            if other is ticket:
+                break
+            if any(bucket in other[3] for bucket in buckets):
+                # Vorrangige Anfrage wartet auf denselben Bucket
+                return max(MIN_BACKOFF / 50, max(bucket.delay(now) for bucket in other[3]))
+        delay = max(bucket.delay(now) for bucket in buckets)
+        if delay > 0:
+            return delay
+        for bucket in buckets:
+            bucket.take()
+        self.waiting.remove(ticket)
+        return 0.0
+
+    def _granted(self, ticket, started):
+        wait = time.monotonic() - started
+        self.stats[ticket[2]].add(wait)
+        self._cond.notify_all()
+        return wait
+
+    def _abandon(self, ticket):
+        """Entfernt ein nicht bedientes Ticket (Abbruch, Timeout); sonst blockiert es alle nachrangigen."""
+        if ticket in self.waiting:
+            self.waiting.remove(ticket)
+            self._cond.notify_all()
+
+    def acquire(self, path, lane=None):
+        """
+        Blockiert, bis die Anfrage an ``path`` gesendet werden darf.
+
+        Returns:
+            float: Wartezeit in Sekunden.
+        """
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._ticket(path, lane)
+            try:
+                while True:
+                    delay = self._try(ticket, time.monotonic())
+                    if delay == 0:
+                        return self._granted(ticket, started)
+                    self._cond.wait(delay)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+
+    async def acquire_async(self, path, lane=None):
+        """Wie acquire(), aber ohne den Event-Loop zu blockieren."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._ticket(path, lane)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try(ticket, time.monotonic())
+                    if delay == 0:
+                        return self._granted(ticket, started)
+                await asyncio.sleep(delay)
+        except BaseException:  # auch CancelledError, z.B. asyncio.wait_for oder beim Beenden der Worker
+            with self._cond:
+                self._abandon(ticket)
+            raise
+
+    def record(self, path, status=200, code=None):
+        """Meldet das Ergebnis einer Anfrage; 429/Rate-Limit-Codes bremsen den Endpunkt adaptiv."""
+        with self._cond:
+            bucket = self._bucket(path)
+            if status == 429 or str(code) in RATE_LIMIT_CODES:
+                bucket.throttle(time.monotonic())
+                inc(RATE_LIMIT_HITS, path=path)
+                logging.warning(f"⏳ Rate-Limit bei {path}: Pause {bucket.backoff:.2f}s, Rate {bucket.rate:.1f}/s")
+            else:
+                bucket.relax()
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Je Spur Anzahl, aktuell wartende Anfragen und Wartezeiten (mean/p50/p99/max in ms),
+            unter "throttled" die 429-Treffer je Endpunkt.
+        """
+        with self._cond:
+            queued = {lane: 0 for lane in LANE_PRIORITY}
+            for ticket in self.waiting:
+                queued[ticket[2]] += 1
+            result = {lane: stats.snapshot(queued[lane]) for lane, stats in self.stats.items()}
+            result["throttled"] = {path: b.throttled for path, b in self.buckets.items() if b.throttled}
+            return result
+
+# Prozessweiter Scheduler (Bitget zählt pro UID bzw. IP, nicht pro Client-Objekt)
+scheduler = RateLimiter()
+
+def benchmark(duration=3.0, pollers=8):
+    """
+    Lastprobe ohne Netzwerk: ``pollers`` Threads fragen Order-Status und Kerzen so schnell wie möglich ab,
+    parallel kommt alle 100 ms eine Order. Zeigt die Wartezeiten je Spur.
+    """
+    limiter = RateLimiter(global_rate=20)
+    stop = time.monotonic() + duration
+
+    def poll(path):
+        while time.monotonic() < stop:
+            limiter.acquire(path)
+
+    def orders():
+        while time.monotonic() < stop:
+            limiter.acquire("/api/v2/mix/order/place-order")
+            time.sleep(0.1)
+
+    paths = ["/api/v2/mix/order/detail", "/api/v2/mix/market/candles"]
+    threads = [threading.Thread(target=poll, args=(paths[i % 2],), daemon=True) for i in range(pollers)]
+    threads.append(threading.Thread(target=orders, daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + 5)
+    metrics = limiter.metrics()
+    for lane in LANE_PRIORITY:
+        m = metrics[lane]
+        print(f"{lane:<8} {m['count']:>5} Anfragen  Wartezeit p50 {m['p50_ms']:8.2f} ms  p99 {m['p99_ms']:8.2f} ms  "
+              f"max {m['max_ms']:8.2f} ms")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+import requests
+from bitget_client import BitgetClient, AsyncBitgetClient, sign
+
+STUB_KEY = "stub-key"
+STUB_SECRET = "stub-secret"
+STUB_PASSPHRASE = "stub-pass"
+
+def make_certificate(directory=None):
+    """
+    Erzeugt ein selbstsigniertes Zertifikat für 127.0.0.1 mit openssl.
+
+    Returns:
+        tuple: (cert_pfad, key_pfad); das Zertifikat dient dem Client gleichzeitig als CA.
+    """
+    directory = directory or tempfile.mkdtemp(prefix="rest_stub_")
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                    "-days", "1", "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+                   check=True, capture_output=True)
+    return cert, key
+
+def _account(params, body):
+    return {"marginCoin": params.get("marginCoin", "usdt"), "available": "1000.0", "usdtEquity": "1000.0"}
+
+def _order_detail(params, body):
+    return {"symbol": params.get("symbol"), "orderId": params.get("orderId", "1"),
+            "clientOid": params.get("clientOid", ""), "status": "filled"}
+
+def _modify_order(params, body):
+    return {"orderId": body.get("orderId", "1"), "clientOid": body.get("newClientOid") or str(uuid.uuid4())}
+
+def _place_pos_tpsl(params, body):
+    return [{"orderId": str(uuid.uuid4().int)[:18], "clientOid": str(uuid.uuid4())}]
+
+def _orders_pending(params, body):
+    return {"entrustedList": None, "endId": None}
+
+class StubError(Exception):
+    """Von einer Route geworfen: Antwort mit HTTP-Status und Bitget-Fehlercode."""
+
+    def __init__(self, status, code, msg):
+        super().__init__(msg)
+        self.status = status
+        self.code = code
+        self.msg = msg
+
+class StubOrders:
+    """Merkt sich platzierte Orders je clientOid: doppelte clientOid wird wie bei Bitget abgelehnt."""
+
+    def __init__(self):
+        self.orders = {}  # clientOid -> Order
+        self.lock = threading.Lock()
+
+    def place(self, params, body):
+        client_oid = body.get("clientOid") or str(uuid.uuid4())
+        with self.lock:
+            if client_oid in self.orders:
+                raise StubError(400, "40786", "Duplicate clientOid")
+            order = self.orders[client_oid] = {"orderId": str(uuid.uuid4().int)[:18], "clientOid": client_oid,
+                                               "symbol": body.get("symbol"), "side": body.get("side"),
+                                               "size": body.get("size"), "status": "filled"}
+        return {"orderId": order["orderId"], "clientOid": client_oid}
+
+    def detail(self, params, body):
+        client_oid = params.get("clientOid")
+        if client_oid and "orderId" not in params:
+            order = self.orders.get(client_oid)
+            if order is None:
+                raise StubError(400, "40768", "Order does not exist")
+            return order
+        return _order_detail(params, body)
+
+# Pfad -> handler(params, body) -> data; weitere Endpunkte über RestStubServer(routes=...)
+DEFAULT_ROUTES = {
+    ("GET", "/api/v2/mix/account/account"): _account,
+    ("GET", "/api/v2/mix/order/detail"): _order_detail,
+    ("POST", "/api/v2/mix/order/modify-order"): _modify_order,
+    ("POST", "/api/v2/mix/order/place-pos-tpsl"): _place_pos_tpsl,
+    ("GET", "/api/v2/mix/order/orders-pending"): _orders_pending,
+}
+
+class RestStubHandler(BaseHTTPRequestHandler):
+    """Beantwortet Bitget-REST-Anfragen und prüft dabei Signatur und Zeitstempel wie die Börse."""
+
+    protocol_version = "HTTP/1.1"  # Keep-Alive, damit Connection-Pooling messbar ist
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, msg):
+        self._reply(status, {"code": code, "msg": msg, "requestTime": int(time.time() * 1000), "data": None})
+
+    def _handle(self, method):
+        server = self.server
+        split = urlsplit(self.path)
+        body_str = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+        server.requests += 1
+        if split.path == "/api/v2/public/time":
+            now = int(time.time() * 1000) + server.clock_skew_ms
+            return self._reply(200, {"code": "00000", "msg": "success", "requestTime": now,
+                                     "data": {"serverTime": str(now)}})
+        route = server.routes.get((method, split.path))
+        if route is None:
+            return self._error(404, "40404", "Request URL NOT FOUND")
+        if split.path not in server.public:
+            timestamp = self.headers.get("ACCESS-TIMESTAMP", "0")
+            if abs(int(timestamp) - (time.time() * 1000 + server.clock_skew_ms)) > 30_000:
+                return self._error(400, "40008", "Request timestamp expired")
+            expected = sign(server.secret, timestamp, method, split.path, split.query, body_str)
+            if self.headers.get("ACCESS-KEY") != server.api_key or self.headers.get("ACCESS-SIGN") != expected:
+                return self._error(400, "40009", "sign signature error")
+        body = json.loads(body_str) if body_str else {}
+        server.calls.append((method, split.path, body))
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)  # simulierte Netzwerk-/Börsenlatenz
+        try:
+            data = route(dict(parse_qsl(split.query)), body)
+        except StubError as e:
+            return self._error(e.status, e.code, e.msg)
+        self._reply(200, {"code": "00000", "msg": "success", "requestTime": int(time.time() * 1000), "data": data})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Standard 5 verwirft parallele Verbindungsaufbauten (SYN-Retry nach 1 s)
+
+class RestStubServer:
+    """
+    Lokaler HTTPS-Ersatz für die Bitget-REST-API (selbstsigniertes Zertifikat).
+
+    ``clock_skew_ms`` verschiebt die Serveruhr, um den Zeitabgleich des Clients zu prüfen,
+    ``latency_ms`` verzögert jede Antwort einer Route. Alle angenommenen Aufrufe landen in ``calls``;
+    Pfade in ``public`` (Marktdaten) werden ohne Signatur beantwortet.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, routes=None, api_key=STUB_KEY, secret=STUB_SECRET,
+                 clock_skew_ms=0, cert=None, latency_ms=0, public=()):
+        self.cert, self.key = cert or make_certificate()
+        self.httpd = _StubHTTPServer((host, port), RestStubHandler)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(self.cert, self.key)
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.orders = StubOrders()
+        self.httpd.routes = {**DEFAULT_ROUTES, ("POST", "/api/v2/mix/order/place-order"): self.orders.place,
+                             ("GET", "/api/v2/mix/order/detail"): self.orders.detail, **(routes or {})}
+        self.httpd.public = set(public)
+        self.httpd.api_key = api_key
+        self.httpd.secret = secret
+        self.httpd.clock_skew_ms = clock_skew_ms
+        self.httpd.requests = 0
+        self.httpd.calls = []  # (Methode, Pfad, Body)
+        self.httpd.latency_ms = latency_ms
+        self.host = host
+        self.port = self.httpd.server_address[1]
+
+    @property
+    def calls(self):
+        return self.httpd.calls
+
+    @property
+    def url(self):
+        return f"https://{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="RestStubServer", daemon=True).start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def client(self, **kwargs):
+        kwargs.setdefault("limiter", None)  # Latenzmessung ohne Drosselung
+        return BitgetClient(STUB_KEY, STUB_SECRET, STUB_PASSPHRASE, base_url=self.url, verify=self.cert, **kwargs)
+
+    def async_client(self, **kwargs):
+        kwargs.setdefault("limiter", None)
+        return AsyncBitgetClient(STUB_KEY, STUB_SECRET, STUB_PASSPHRASE, base_url=self.url, verify=self.cert,
+                                 **kwargs)
+
+def _stats(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<34} p50 {statistics.median(samples):7.2f} ms   p99 {p99:7.2f} ms")
+
+def benchmark(rounds=200, concurrency=20):
+    """Vergleicht einzelne requests.get-Aufrufe (neuer Handshake je Anfrage) mit dem gepoolten Client."""
+    server = RestStubServer().start()
+    path = "/api/v2/mix/account/account"
+    params = {"symbol": "BTCUSDT", "productType": "USDT-FUTURES", "marginCoin": "usdt"}
+    client = server.client()
+
+    # Alt: pro Anfrage neue Verbindung (TCP + TLS), wie vorher in Balance/change_tp/oder_information
+    samples = []
+    for _ in range(rounds):
+        url, headers, _ = client._prepare("GET", path, params, None, True)
+        start = time.perf_counter()
+        requests.get(url, headers=headers, verify=server.cert).json()
+        samples.append((time.perf_counter() - start) * 1000)
+    _stats("requests.get (ohne Session)", samples)
+
+    client.get(path, params)  # Verbindung aufbauen
+    samples = [client.get(path, params).elapsed_ms for _ in range(rounds)]
+    _stats("BitgetClient (Keep-Alive)", samples)
+
+    async def run_async():
+        async with server.async_client(pool_size=concurrency) as async_client:
+            await async_client.get(path, params)
+            sequential = [(await async_client.get(path, params)).elapsed_ms for _ in range(rounds)]
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(async_client.get(path, params) for _ in range(rounds)))
+            wall = (time.perf_counter() - start) * 1000
+            return sequential, [r.elapsed_ms for r in responses], wall
+
+    sequential, concurrent, wall = asyncio.run(run_async())
+    _stats("AsyncBitgetClient (nacheinander)", sequential)
+    _stats(f"AsyncBitgetClient ({concurrency} parallel)", concurrent)
+    print(f"{rounds} parallele Anfragen gesamt: {wall:.1f} ms")
+
+    # Zeitabgleich: Serveruhr 45 s voraus -> erster Aufruf scheitert mit 40008, Client gleicht ab
+    skewed = RestStubServer(clock_skew_ms=45_000, cert=(server.cert, server.key)).start()
+    skewed_client = skewed.client()
+    skewed_client.get(path, params)
+    print(f"✅ Zeitabgleich: Offset {skewed_client.time_offset} ms nach Fehler 40008")
+    skewed.close()
+    server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler HTTPS-Ersatz für die Bitget-REST-API mit Latenzmessung.")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Nur den Stub auf PORT starten")
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        stub = RestStubServer(port=args.serve).start()
+        print(f"Stub läuft auf {stub.url} (Zertifikat: {stub.cert})")
+        threading.Event().wait()
+    else:
+        benchmark(args.rounds, args.concurrency)
@@ -0,0 +1,269 @@
+import argparse
+import logging
+import signal
+import threading
+import time
+from decimal import Decimal
+from ledger import ledger as default_ledger
+from trade import LEVERAGE
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+MAX_POSITIONS_PER_SIDE = 3  # wie logik.MAX_POSITIONS_PER_SIDE
+MAX_SYMBOL_EXPOSURE = 0.25  # Notional je Symbol höchstens 25 % der Equity
+MAX_MARGIN_USAGE = 0.5  # gebundene Margin höchstens 50 % der Equity
+DAILY_LOSS_LIMIT = 0.05  # 5 % Equity-Verlust seit Tagesbeginn (UTC) löst den Kill-Switch aus
+MIN_NOTIONAL = 5.0  # Bitget-Minimum in USDT
+MIN_LIQUIDATION_DISTANCE = 0.003  # Liquidation mindestens 0,3 % vom Einstieg entfernt
+MAINTENANCE_MARGIN_RATE = 0.004  # Standard, falls die Position keine keepMarginRate mitliefert
+PENDING_TTL = 5.0  # Sekunden, die eine gesendete Order ohne Positions-Update mitgezählt wird
+
+class _Position:
+    __slots__ = ("notional", "margin", "mmr", "liquidation", "mark")
+
+    def __init__(self, raw):
+        total = float(raw.get("total") or 0)
+        price = float(raw.get("openPriceAvg") or 0)
+        self.notional = total * price
+        leverage = float(raw.get("leverage") or LEVERAGE)
+        self.margin = float(raw.get("marginSize") or 0) or self.notional / leverage
+        self.mmr = float(raw.get("keepMarginRate") or 0) or MAINTENANCE_MARGIN_RATE
+        self.liquidation = float(raw.get("liquidationPrice") or 0)
+        self.mark = float(raw.get("markPrice") or 0) or price
+
+    def liquidation_distance(self):
+        """Relativer Abstand Mark → Liquidation; ohne Börsenwert geschätzt als Margin/Notional − MMR."""
+        if self.liquidation > 0 and self.mark > 0:
+            return abs(self.mark - self.liquidation) / self.mark
+        if self.notional <= 0:
+            return None
+        return self.margin / self.notional - self.mmr
+
+class RiskEngine:
+    """
+    Vorab-Risikoprüfung als reiner Speicherzugriff.
+
+    Exposure, gebundene Margin und Positionszahl je Symbol/Seite werden inkrementell aus den
+    Positions- und Saldo-Updates des Ledgers (privater WebSocket) nachgeführt; die Grenzen in USDT
+    (Margin, Exposure je Symbol, Tagesverlust) werden bei jeder Equity-Änderung einmal neu berechnet.
+    check() vergleicht danach nur noch ein paar Zahlen – O(1), unabhängig von der Zahl der Positionen.
+
+    Gesendete, noch nicht im Positionskanal bestätigte Orders zählen bis zu ``pending_ttl`` Sekunden
+    mit (commit()), damit schnelle Alert-Folgen die Grenzen nicht überholen. Der Kill-Switch
+    (kill(), SIGUSR1 über install_kill_signal oder Tagesverlust) sperrt alle neuen Trades bis resume().
+    """
+
+    def __init__(self, max_positions_per_side=MAX_POSITIONS_PER_SIDE, max_symbol_exposure=MAX_SYMBOL_EXPOSURE,
+                 max_margin_usage=MAX_MARGIN_USAGE, daily_loss_limit=DAILY_LOSS_LIMIT, min_notional=MIN_NOTIONAL,
+                 min_liquidation_distance=MIN_LIQUIDATION_DISTANCE, leverage=LEVERAGE, pending_ttl=PENDING_TTL):
+        self.max_positions_per_side = max_positions_per_side
+        self.max_symbol_exposure = max_symbol_exposure
+        self.max_margin_usage = max_margin_usage
+        self.daily_loss_limit = daily_loss_limit
+        self.min_notional = min_notional
+        self.min_liquidation_distance = min_liquidation_distance
+        self.leverage = leverage
+        self.pending_ttl = pending_ttl
+        self.positions = {}  # (symbol, hold_side) -> _Position
+        self.counts = {}  # (symbol, hold_side) -> offene Positionen
+        self.symbol_notional = {}  # symbol -> Notional aller Seiten
+        self.pending = {}  # (symbol, hold_side) -> (Notional, Margin, monotonic)
+        self.total_notional = 0.0
+        self.total_margin = 0.0
+        self.available = None
+        self.equity = None
+        self.day = None  # UTC-Tag (Tage seit Epoch) von day_start_equity
+        self.day_start_equity = None
+        # Vorberechnete Grenzen in USDT (None = noch kein Saldo bekannt, Prüfung entfällt)
+        self.margin_cap = None
+        self.symbol_cap = None
+        self.loss_floor = None
+        self.killed = None  # Grund, solange der Kill-Switch aktiv ist
+        self.stats = {"checks": 0, "rejected": 0}
+        self.lock = threading.Lock()
+
+    # --- Nachführen (Ledger-Listener) ---
+
+    def attach(self, ledger=default_ledger):
+        """Übernimmt den aktuellen Ledger-Stand und hängt sich an dessen Updates."""
+        ledger.position_listeners.append(self.on_positions)
+        ledger.account_listeners.append(self.on_account)
+        self.on_positions(dict(ledger.positions), True)
+        if ledger.available is not None:
+            self.on_account(ledger.available, ledger.equity)
+        return self
+
+    def _set(self, key, position):
+        """Ersetzt eine Position und verrechnet nur die Differenz in den Summen."""
+        old = self.positions.pop(key, None)
+        if old is not None:
+            self.total_notional -= old.notional
+            self.total_margin -= old.margin
+            self.symbol_notional[key[0]] -= old.notional
+            self.counts[key] = 0
+        if position is not None:
+            self.positions[key] = position
+            self.total_notional += position.notional
+            self.total_margin += position.margin
+            self.symbol_notional[key[0]] = self.symbol_notional.get(key[0], 0.0) + position.notional
+            self.counts[key] = 1  # Bitget führt je Symbol/Seite eine zusammengefasste Position
+        self.pending.pop(key, None)
+
+    def on_positions(self, positions, snapshot=True):
+        with self.lock:
+            if snapshot:
+                for key in [key for key in self.positions if key not in positions]:
+                    self._set(key, None)
+            for key, raw in positions.items():
+                self._set(key, _Position(raw) if raw is not None else None)  # None: geschlossen
+
+    def on_account(self, available, equity=None):
+        with self.lock:
+            self.available = float(available) if available is not None else None
+            if equity is not None:
+                self.equity = float(equity)
+            elif self.available is not None:
+                self.equity = self.available + self.total_margin  # Schätzung, solange keine Equity gemeldet wird
+            if self.equity is None:
+                return
+            day = int(time.time() // 86400)
+            if day != self.day:
+                self.day = day
+                self.day_start_equity = self.equity
+            self.margin_cap = self.equity * self.max_margin_usage
+            self.symbol_cap = self.equity * self.max_symbol_exposure
+            self.loss_floor = self.day_start_equity * (1 - self.daily_loss_limit)
+            tripped = self.equity <= self.loss_floor and self.killed is None
+        if tripped:
+            self.kill(f"Tagesverlust {self.day_start_equity - self.equity:.2f} USDT "
+                      f"(Grenze {self.daily_loss_limit:.0%} von {self.day_start_equity:.2f})")
+
+    # --- Kill-Switch ---
+
+    def kill(self, reason="manuell"):
+        self.killed = reason
+        logging.error(f"🛑 Kill-Switch aktiv: {reason} – keine neuen Trades")
+
+    def resume(self):
+        """Hebt den Kill-Switch auf; ein Tagesverlust-Stopp gilt bis zum nächsten UTC-Tag als neuer Startwert."""
+        with self.lock:
+            self.killed = None
+            if self.equity is not None:
+                self.day_start_equity = self.equity
+                self.loss_floor = self.equity * (1 - self.daily_loss_limit)
+        logging.warning("Kill-Switch aufgehoben")
+
+    # --- Prüfen (Hot Path) ---
+
+    def check(self, symbol, direction, notional, leverage=None):
+        """
+        Vorab-Prüfung einer Einstiegsorder, ohne Netzwerk und ohne Schleifen.
+
+        Args:
+            symbol (str): Handelspaar.
+            direction (str): "LONG" oder "SHORT".
+            notional (float): Orderwert in USDT (Kontrakte × Preis).
+            leverage (int): Hebel der Order; Standard ``self.leverage``.
+
+        Returns:
+            tuple: (erlaubt, Grund) – Grund ist "" bei erlaubten Orders.
+        """
+        self.stats["checks"] += 1
+        reason = self._reject_reason(symbol, 'long' if direction == 'LONG' else 'short', float(notional),
+                                     leverage or self.leverage)
+        if reason:
+            self.stats["rejected"] += 1
+            return False, reason
+        return True, ""
+
+    def _reject_reason(self, symbol, hold_side, notional, leverage):
+        if self.killed is not None:
+            return f"Kill-Switch: {self.killed}"
+        if notional < self.min_notional:
+            return f"Orderwert {notional:.2f} USDT unter dem Minimum von {self.min_notional} USDT"
+        key = (symbol, hold_side)
+        margin = notional / leverage
+        pending = self.pending.get(key)
+        if pending is not None and time.monotonic() - pending[2] > self.pending_ttl:
+            pending = None
+        pending_notional, pending_margin = (pending[0], pending[1]) if pending else (0.0, 0.0)
+        count = self.counts.get(key, 0) + (1 if pending else 0)
+        if count >= self.max_positions_per_side:
+            return f"Maximal {self.max_positions_per_side} {hold_side}-Positionen für {symbol}"
+        if self.available is not None and margin > self.available - pending_margin:
+            return f"Margin {margin:.2f} USDT über dem verfügbaren Saldo {self.available:.2f}"
+        if self.margin_cap is not None and self.total_margin + pending_margin + margin > self.margin_cap:
+            return f"Gebundene Margin über {self.max_margin_usage:.0%} der Equity"
+        exposure = self.symbol_notional.get(symbol, 0.0) + pending_notional + notional
+        if self.symbol_cap is not None and exposure > self.symbol_cap:
+            return f"Exposure {symbol} {exposure:.2f} USDT über {self.max_symbol_exposure:.0%} der Equity"
+        position = self.positions.get(key)
+        if position is not None:
+            mmr = position.mmr
+            distance = (position.margin + pending_margin + margin) / (position.notional + pending_notional + notional) - mmr
+        else:
+            distance = 1.0 / leverage - MAINTENANCE_MARGIN_RATE
+        if distance < self.min_liquidation_distance:
+            return f"Liquidation nur {distance:.2%} entfernt (mindestens {self.min_liquidation_distance:.2%})"
+        return ""
+
+    def commit(self, symbol, direction, notional, leverage=None):
+        """Gesendete Order vormerken, bis das Positions-Update sie bestätigt (oder ``pending_ttl`` abläuft)."""
+        key = (symbol, 'long' if direction == 'LONG' else 'short')
+        margin = float(notional) / (leverage or self.leverage)
+        with self.lock:
+            previous = self.pending.get(key)
+            if previous is not None and time.monotonic() - previous[2] <= self.pending_ttl:
+                self.pending[key] = (previous[0] + float(notional), previous[1] + margin, time.monotonic())
+            else:
+                self.pending[key] = (float(notional), margin, time.monotonic())
+
+    def liquidation_distance(self, symbol, hold_side):
+        position = self.positions.get((symbol, hold_side))
+        return position.liquidation_distance() if position is not None else None
+
+    def snapshot(self):
+        """Aktueller Stand für Logs/Metriken."""
+        return {"killed": self.killed, "equity": self.equity, "available": self.available,
+                "total_notional": self.total_notional, "total_margin": self.total_margin,
+                "margin_cap": self.margin_cap, "symbol_cap": self.symbol_cap, "loss_floor": self.loss_floor,
+                "liquidation_distance": {f"{s} {side}": p.liquidation_distance()
+                                         for (s, side), p in self.positions.items()},
+                **self.stats}
+
+risk_engine = RiskEngine().attach(default_ledger)
+
+def install_kill_signal(engine=risk_engine, signum=getattr(signal, "SIGUSR1", None)):
+    """``kill -USR1 <pid>`` löst den Kill-Switch aus (nur im Haupt-Thread aufrufbar)."""
+    if signum is not None:
+        signal.signal(signum, lambda *_: engine.kill(f"Signal {signum}"))
+
+def benchmark(rounds=200000, positions=50):
+    """Latenz von check() mit ``positions`` offenen Positionen (konstant, unabhängig von der Anzahl)."""
+    engine = RiskEngine()
+    symbols = [f"SYM{i}USDT" for i in range(positions)]
+    engine.on_positions({(s, "long"): {"total": "1", "openPriceAvg": "100", "leverage": "100"} for s in symbols})
+    engine.on_account(Decimal("100000"), Decimal("100000"))
+    start = time.perf_counter()
+    for i in range(rounds):
+        engine.check(symbols[i % positions], "SHORT", 50.0)
+    per_check = (time.perf_counter() - start) / rounds
+    samples = []
+    for i in range(2000):
+        t0 = time.perf_counter()
+        engine.check(symbols[i % positions], "LONG" if i % 2 else "SHORT", 50.0)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    print(f"check() mit {positions} Positionen: Mittel {per_check * 1e6:.2f} µs, "
+          f"p50 {samples[1000] * 1e6:.2f} µs, p99 {samples[1980] * 1e6:.2f} µs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Risiko-Engine: Vorab-Prüfungen und Kill-Switch.")
+    parser.add_argument("--benchmark", action="store_true", help="Latenz von check() messen")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        print(risk_engine.snapshot())
@@ -0,0 +1,208 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import symbol as default_symbol
+from market_store import market_store
+from metrics import span
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+WARMUP_TIMEOUT = 30  # Sekunden; danach gilt der Bot trotzdem als bereit (kalter Pfad als Rückfall)
+TICKER_PATH = "/api/v2/mix/market/ticker"
+
+# Prozessweites Bereitschaftssignal: gesetzt, sobald das Warm-up durch ist
+ready = threading.Event()
+
+def _warm_exchange(symbols, leverage):
+    """ccxt laden, Märkte (Präzision) in market_cache und Hebel einmal setzen – nacheinander, gleicher Client."""
+    from trade import fetch_market_precision, ensure_leverage
+
+    for symbol in symbols:
+        fetch_market_precision(symbol)
+    if leverage is not None:
+        for symbol in symbols:
+            ensure_leverage(leverage, symbol)
+
+def _warm_rest():
+    """Geteilten BitgetClient anlegen: TLS-Verbindung öffnen und Uhr mit der Börse abgleichen."""
+    from bitget_client import get_client
+
+    get_client().sync_time()
+
+def _warm_balance():
+    """Saldo einmal abfragen: prüft die Zugangsdaten, bevor der erste Alert kommt."""
+    from Balance import get_usdt_balance
+
+    if get_usdt_balance() is None:
+        raise RuntimeError("Saldo nicht abrufbar (Zugangsdaten?)")
+
+def _warm_prices(symbols):
+    """Letzten Preis je Symbol in market_store legen, falls der Markt-Feed noch keinen geliefert hat."""
+    from bitget_client import get_client
+
+    for symbol in symbols:
+        if market_store.last_price(symbol) is None:
+            ticker = get_client().get(TICKER_PATH, {"symbol": symbol, "productType": "USDT-FUTURES"},
+                                      signed=False).data[0]
+            market_store.set_price(symbol, float(ticker["lastPr"]))
+
+def default_steps(symbols, leverage, preload=()):
+    """Warm-up-Schritte: Name -> Funktion ohne Argumente. Alle laufen parallel."""
+    steps = {
+        "exchange": lambda: _warm_exchange(symbols, leverage),
+        "rest": _warm_rest,
+        "balance": _warm_balance,
+        "prices": lambda: _warm_prices(symbols),
+    }
+    for module in preload:
+        steps[f"import {module}"] = lambda module=module: importlib.import_module(module)
+    return steps
+
+class Startup:
+    """
+    Warm-up vor dem ersten Alert: lädt schwere Module, Märkte und Hebel, öffnet die REST-Verbindung
+    und füllt Caches – alles parallel, damit die Netzwerk-Roundtrips sich überlappen.
+
+    Danach wird ``event`` (Standard: startup.ready) gesetzt. Fehlgeschlagene Schritte werden nur
+    protokolliert; der erste Trade holt das dann auf dem normalen (kalten) Pfad nach.
+    """
+
+    def __init__(self, symbols=None, leverage=None, steps=None, preload=(), event=ready, timeout=WARMUP_TIMEOUT):
+        if leverage is None:
+            from trade import LEVERAGE as leverage
+        self.symbols = list(symbols or [default_symbol])
+        self.steps = steps if steps is not None else default_steps(self.symbols, leverage, preload)
+        self.event = event
+        self.timeout = timeout
+        self.timings = {}  # Schritt -> Sekunden
+        self.errors = {}  # Schritt -> Ausnahme
+        self.elapsed = None
+
+    def _run_step(self, name, step):
+        start = time.perf_counter()
+        try:
+            with span(f"warmup {name}"):
+                step()
+        except Exception as e:
+            self.errors[name] = e
+            logging.warning(f"⚠️ Warm-up-Schritt {name} fehlgeschlagen: {e}")
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def run(self):
+        """Führt alle Schritte aus und setzt danach das Bereitschaftssignal."""
+        start = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=max(1, len(self.steps)), thread_name_prefix="warmup")
+        futures = [pool.submit(self._run_step, name, step) for name, step in self.steps.items()]
+        _, pending = wait(futures, timeout=self.timeout)
+        pool.shutdown(wait=False)
+        for name in self.steps:
+            if name not in self.timings:
+                logging.warning(f"⚠️ Warm-up-Schritt {name} nach {self.timeout}s nicht fertig")
+        self.elapsed = time.perf_counter() - start
+        self.event.set()
+        steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.timings.items())
+        logging.info(f"✅ Bereit nach {self.elapsed * 1000:.0f} ms ({steps})")
+        return self
+
+    def start(self):
+        """Warm-up im Hintergrund; mit wait() auf die Bereitschaft warten."""
+        threading.Thread(target=self.run, name="Startup", daemon=True).start()
+        return self
+
+    def wait(self, timeout=None):
+        return self.event.wait(timeout)
+
+    @property
+    def ok(self):
+        return self.event.is_set() and not self.errors and len(self.timings) == len(self.steps)
+
+def first_order(mode, launched_at):
+    """
+    Kindprozess des Benchmarks: misst Import, Warm-up und die erste Order und gibt sie als JSON aus.
+    """
+    result = {"process_start": time.time() - launched_at}
+    start = time.perf_counter()
+    import main  # noqa: F401  (Einstiegspunkt des Bots, wie beim echten Start)
+    from logik import execute_trade
+    result["import"] = time.perf_counter() - start
+    result["modules"] = sorted(m for m in ("ccxt", "pandas", "bs4", "aiohttp") if m in sys.modules)
+    if mode == "warm":
+        startup = Startup(preload=("webhook_server", "alert_listener")).run()
+        result["warmup"] = startup.elapsed
+        result["steps"] = startup.timings
+        result["errors"] = {name: str(e) for name, e in startup.errors.items()}
+    start = time.perf_counter()
+    order = execute_trade("LONG")
+    result["first_order"] = time.perf_counter() - start
+    result["order_id"] = order["id"] if order else None
+    result["total"] = time.time() - launched_at
+    print(json.dumps(result))
+
+def benchmark(rounds=3):
+    """
+    Startzeit gegen exchange_sim (ohne Netzwerk, 20 ms simulierte REST-Latenz): je ``rounds`` frische
+    Prozesse mit und ohne Warm-up; gemessen werden Import, Warm-up und die erste Order.
+    """
+    from exchange_sim import ExchangeSim
+    from rest_stub import STUB_KEY, STUB_SECRET, STUB_PASSPHRASE
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print("Importzeit schwerer Abhängigkeiten (je frischer Prozess):")
+    for module in ("ccxt", "pandas", "aiohttp", "bs4", "requests"):
+        out = subprocess.run([sys.executable, "-c", f"import time; t = time.perf_counter(); import {module}; "
+                              f"print(time.perf_counter() - t)"], capture_output=True, text=True)
+        print(f"  {module:<10} {float(out.stdout) * 1000:6.0f} ms")
+
+    sim = ExchangeSim(latency_ms=20, jitter_ms=2, seed=1).start()
+    sim.wait_for_price(default_symbol)
+    credentials = tempfile.mkdtemp(prefix="startup_bench_")
+    with open(os.path.join(credentials, "api.py"), "w") as f:
+        f.write(f"api_key = {STUB_KEY!r}\napi_secret = {STUB_SECRET!r}\napi_passphrase = {STUB_PASSPHRASE!r}\n")
+    env = dict(os.environ, **sim.env(), PYTHONPATH=os.pathsep.join([credentials, os.environ.get("PYTHONPATH", "")]))
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        for mode in ("cold", "warm"):
+            runs = []
+            for _ in range(rounds):
+                launched_at = time.time()
+                out = subprocess.run([sys.executable, "startup.py", "--first-order", mode, str(launched_at)],
+                                     capture_output=True, text=True, env=env, cwd=here, timeout=120)
+                lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+                if not lines:
+                    print(out.stdout[-2000:], out.stderr[-2000:])
+                    raise RuntimeError(f"Kindprozess ({mode}) ohne Ergebnis")
+                runs.append(json.loads(lines[-1]))
+            best = min(runs, key=lambda r: r["total"])
+            label = "ohne Warm-up" if mode == "cold" else "mit Warm-up "
+            warmup = f"Warm-up {best['warmup'] * 1000:5.0f} ms, " if mode == "warm" else ""
+            print(f"{label}: Interpreter {best['process_start'] * 1000:4.0f} ms, Import {best['import'] * 1000:4.0f} ms "
+                  f"(geladen: {', '.join(best['modules']) or '-'}), {warmup}erste Order "
+                  f"{best['first_order'] * 1000:5.0f} ms, Start→Order {best['total'] * 1000:5.0f} ms")
+            if mode == "warm":
+                print("  Schritte: " + ", ".join(f"{n} {s * 1000:.0f} ms" for n, s in best["steps"].items())
+                      + (f"  Fehler: {best['errors']}" if best["errors"] else ""))
+    finally:
+        sim.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm-up und Startzeit-Messung.")
+    parser.add_argument("--benchmark", action="store_true", help="Startzeit gegen exchange_sim messen")
+    parser.add_argument("--first-order", nargs=2, metavar=("MODE", "LAUNCHED_AT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.first_order:
+        first_order(args.first_order[0], float(args.first_order[1]))
+    elif args.benchmark:
+        benchmark()
+    else:
+        Startup().run()
@@ -0,0 +1,76 @@
+import time
+
+import imap_stub
+from alert_listener import IdleAlertListener
+from gmail_alert_reader import connect_imap, load_uid_state
+
+def _server(monkeypatch, idle_reply):
+    def _idle(self, tag):
+        self.notify(idle_reply)
+        self.rfile.readline()  # DONE
+        self.send(f"{tag} OK IDLE terminated")
+
+    monkeypatch.setattr(imap_stub.IMAPStubHandler, "_idle", _idle)
+    server = imap_stub.IMAPStubServer()
+    server.start()
+    return server
+
+def test_idle_sees_exists_buffered_with_continuation(monkeypatch):
+    # "+ idling" und "* n EXISTS" in einem Paket: die zweite Zeile liegt schon im Reader von imaplib
+    server = _server(monkeypatch, b"+ idling\r\n* 7 EXISTS\r\n")
+    try:
+        listener = IdleAlertListener(host="127.0.0.1", port=server.port, use_ssl=False, state_path=None)
+        imap = connect_imap("127.0.0.1", server.port, "user", "password", False)
+        start = time.monotonic()
+        assert listener._idle_wait(imap, 5)
+        assert time.monotonic() - start < 1
+    finally:
+        server.shutdown()
+
+def test_idle_times_out_without_mail(monkeypatch):
+    server = _server(monkeypatch, b"+ idling\r\n")
+    try:
+        listener = IdleAlertListener(host="127.0.0.1", port=server.port, use_ssl=False, state_path=None,
+                                     poll_interval=0.1)
+        imap = connect_imap("127.0.0.1", server.port, "user", "password", False)
+        assert not listener._idle_wait(imap, 0.3)
+    finally:
+        server.shutdown()
+
+def test_alerts_queue_only_without_handler():
+    received = []
+    with_handler = IdleAlertListener(handler=lambda alert, _: received.append(alert), state_path=None)
+    with_handler._dispatch([{"action": "LONG"}])
+    assert received == [{"action": "LONG"}]
+    assert with_handler.alerts.empty()
+
+    without = IdleAlertListener(state_path=None)
+    without._dispatch([{"action": "SHORT"}])
+    assert without.alerts.get_nowait() == {"action": "SHORT"}
+
+def test_failed_handler_does_not_advance_uid_state(tmp_path):
+    server = imap_stub.IMAPStubServer()
+    server.start()
+    try:
+        for action in ("LONG", "SHORT"):
+            server.mailbox.deliver(imap_stub.make_alert_mail(action))
+        received, failures = [], ["disk full"]
+
+        def handler(alert, _received_at):
+            if failures:
+                raise OSError(failures.pop())
+            received.append(alert["action"])
+
+        state_path = str(tmp_path / "uid_state.json")
+        listener = IdleAlertListener(handler=handler, host="127.0.0.1", port=server.port, use_ssl=False,
+                                     state_path=state_path)
+        listener._imap = connect_imap("127.0.0.1", server.port, "user", "password", False)
+        assert not listener._fetch_and_dispatch()
+        assert load_uid_state(state_path)["last_uid"] == 0
+        assert not any(msg["seen"] for msg in server.mailbox.messages)  # erster Abruf sucht UNSEEN
+
+        assert listener._fetch_and_dispatch()
+        assert received == ["LONG", "SHORT"]
+        assert load_uid_state(state_path)["last_uid"] == 2
+    finally:
+        server.shutdown()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from alert_queue import AlertQueue, AlertWorkers, crash_test
+from engine import Account, TradingEngine
+
+def alert(i, action="LONG"):
+    return {"action": action, "symbol": "BTCUSDT", "id": f"test-{i}"}
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "alerts.db")
+
+def test_accepted_alert_survives_reopen(path):
+    seq, client_oid, new = AlertQueue(path).put(alert(1))
+    assert new
+    item = AlertQueue(path).claim()
+    assert (item.seq, item.client_oid, item.alert) == (seq, client_oid, alert(1))
+
+def test_duplicate_id_is_ignored(path):
+    queue = AlertQueue(path)
+    first = queue.put(alert(1))
+    assert queue.put(alert(1, "SHORT")) == (first[0], first[1], False)
+    assert queue.counts() == {"pending": 1}
+
+def test_inflight_alert_is_recovered_with_same_client_oid(path):
+    queue = AlertQueue(path)
+    queue.put(alert(1))
+    claimed = queue.claim()  # Absturz während der Ausführung
+    restarted = AlertQueue(path)
+    assert restarted.recover() == 1
+    again = restarted.claim()
+    assert (again.seq, again.client_oid, again.attempts) == (claimed.seq, claimed.client_oid, 2)
+
+def test_retry_finds_existing_order_instead_of_resending(path):
+    queue = AlertQueue(path)
+    queue.put(alert(1))
+    sent = []
+
+    def execute(alert, client_oid):
+        sent.append(client_oid)
+        raise TimeoutError("Antwort verloren")  # Order ist aber angekommen
+
+    workers = AlertWorkers(queue, execute, lookup=lambda alert, client_oid: {"clientOid": client_oid} if sent else None,
+                           retry_backoff=0.01)
+    workers.process(queue.claim())
+    assert queue.counts() == {"pending": 1}
+    item = None
+    while item is None:
+        item = queue.claim()
+    workers.process(item)
+    assert queue.counts() == {"done": 1}
+    assert len(sent) == 1
+
+def test_invalid_alert_is_not_retried(path):
+    queue = AlertQueue(path)
+    queue.put(alert(1))
+
+    def execute(alert, client_oid):
+        raise ValueError("Orderwert unter dem Minimum")
+
+    AlertWorkers(queue, execute).process(queue.claim())
+    assert queue.counts() == {"failed": 1}
+
+def test_hard_crashes_place_exactly_one_order_per_alert(tmp_path):
+    result = crash_test(alerts=40, crash_rate=0.1, directory=str(tmp_path))
+    assert result["counts"] == {"done": 40}
+    assert len(result["orders"]) == 40
+    assert result["restarts"] > 0
+
+def test_engine_drains_queue_with_client_oids(path):
+    queue = AlertQueue(path)
+    oids = [queue.put(alert(i, "LONG" if i % 2 else "SHORT"))[1] for i in range(6)]
+    queue.put({"action": "LONG", "symbol": "ETHUSDT", "id": "test-unrouted"})
+    queue.claim()  # "Absturz": erster Alert hängt inflight
+
+    async def scenario():
+        engine = TradingEngine([Account("dry", symbols={"BTCUSDT": {"max_positions": 100}}, dry_run=True)],
+                               market_feed=False)
+        wake = asyncio.Event()
+        task = asyncio.create_task(engine.run_queue(queue, wake, idle_wait=0.01))
+        for _ in range(500):
+            await asyncio.sleep(0.01)
+            if not {"pending", "inflight"} & set(queue.counts()):
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return engine
+
+    engine = asyncio.run(scenario())
+    assert queue.counts() == {"done": 6, "failed": 1}
+    assert engine.accounts["dry"].executed == 6
+    rows = queue._conn().execute("SELECT client_oid, result FROM alerts WHERE state = 'done' ORDER BY seq").fetchall()
+    assert [oid for oid, _ in rows] == oids
+    assert all(oid in result for oid, result in rows)
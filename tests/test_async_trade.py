@@ -0,0 +1,62 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+import tpsl
+from async_trade import async_execute_trade
+from ledger import Ledger
+from risk import RiskEngine
+from trade import LeverageState, market_cache
+
+SYMBOL = "BTCUSDT"
+
+class FakeExchange:
+    """Antwortet wie ccxt.async_support.bitget, merkt sich die gesendeten Orders."""
+
+    def __init__(self):
+        self.orders = []
+
+    async def set_leverage(self, leverage, symbol, params=None):
+        pass
+
+    async def create_order(self, symbol, order_type, side, amount, params=None):
+        self.orders.append(params)
+        return {"id": str(len(self.orders)), "clientOrderId": params.get("clientOid")}
+
+class FakeTrailing:
+    def __init__(self):
+        self.tracked = []
+
+    def track(self, *args):
+        self.tracked.append(args)
+
+@pytest.fixture
+def account():
+    market_cache.update({SYMBOL: {"id": SYMBOL, "info": {"pricePlace": "1", "volumePlace": "3",
+                                                         "sizeMultiplier": "0.001"}}})
+    ledger = Ledger()
+    ledger.available = Decimal("1000")
+    ledger.ready.set()
+    return ledger, RiskEngine().attach(ledger)
+
+@pytest.mark.parametrize("direction, side, hold_side", [("LONG", "buy", "long"), ("SHORT", "sell", "short")])
+def test_order_carries_preset_tpsl_and_registers_for_trailing(account, monkeypatch, direction, side, hold_side):
+    ledger, risk = account
+    monkeypatch.setattr("async_trade.async_get_price", lambda client, symbol: asyncio.sleep(0, 80000.0))
+    exchange, trailing = FakeExchange(), FakeTrailing()
+    order = asyncio.run(async_execute_trade(exchange, None, direction, SYMBOL, ledger, LeverageState(), 10,
+                                            risk=risk, client_oid="oid-1", trailing=trailing))
+    params = exchange.orders[0]
+    assert order["clientOrderId"] == params["clientOid"] == "oid-1"
+    tp, sl = float(params["presetStopSurplusPrice"]), float(params["presetStopLossPrice"])
+    assert (tp > 80000 > sl) if direction == "LONG" else (tp < 80000 < sl)
+    assert trailing.tracked == [(SYMBOL, hold_side, 80000.0, params["presetStopSurplusPrice"],
+                                 params["presetStopLossPrice"])]
+    assert side == params["side"]
+
+def test_without_manager_the_running_one_is_used(monkeypatch):
+    trailing = FakeTrailing()
+    monkeypatch.setattr(tpsl, "trailing_manager", trailing)
+    tpsl.track_entry(SYMBOL, "buy", 100.0, {"presetStopSurplusPrice": "101", "presetStopLossPrice": "99"})
+    assert trailing.tracked == [(SYMBOL, "long", 100.0, "101", "99")]
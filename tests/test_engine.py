@@ -0,0 +1,42 @@
+import pytest
+
+from engine import ShardedEngine, split_accounts
+
+def accounts(*specs):
+    return [{"name": name, "credentials": credentials, "symbols": {s: {} for s in symbols}}
+            for name, credentials, symbols in specs]
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 4])
+def test_each_account_runs_in_exactly_one_shard(shards):
+    cfg = accounts(("a", "cred_a", ["BTCUSDT", "ETHUSDT", "SOLUSDT"]), ("b", "cred_b", ["BTCUSDT", "XRPUSDT"]),
+                   ("c", "cred_c", ["ETHUSDT"]), ("d", "cred_d", ["DOGEUSDT", "BTCUSDT"]))
+    parts = split_accounts(cfg, shards)
+    placed = [account["name"] for part in parts for account in part]
+    assert sorted(placed) == ["a", "b", "c", "d"]
+    for part in parts:
+        for account in part:
+            assert account["symbols"] == next(c for c in cfg if c["name"] == account["name"])["symbols"]
+
+def test_accounts_with_same_credentials_share_a_shard():
+    cfg = accounts(("a", "main", ["BTCUSDT"]), ("b", "sub", ["ETHUSDT"]), ("c", "main", ["SOLUSDT"]))
+    parts = split_accounts(cfg, 2)
+    shard_of = {account["name"]: i for i, part in enumerate(parts) for account in part}
+    assert shard_of["a"] == shard_of["c"] != shard_of["b"]
+
+def test_duplicate_account_names_are_rejected():
+    with pytest.raises(ValueError):
+        split_accounts(accounts(("a", "x", ["BTCUSDT"]), ("a", "y", ["ETHUSDT"])), 2)
+
+def test_alerts_go_to_the_shards_of_the_trading_accounts():
+    cfg = accounts(("a", "cred_a", ["BTCUSDT", "ETHUSDT"]), ("b", "cred_b", ["BTCUSDT"]))
+    engine = ShardedEngine(cfg, processes=4, dry_run=True, market_feed=False)
+    assert engine.processes == 2  # nicht mehr Prozesse als Konten
+    engine._buffers = [[] for _ in range(engine.processes)]
+    engine.submit({"action": "LONG", "symbol": "BTCUSDT"}, flush=False)
+    engine.submit({"action": "LONG", "symbol": "ETHUSDT"}, flush=False)
+    engine.submit({"action": "SHORT", "symbol": "BTCUSDT", "account": "b"}, flush=False)
+    engine.submit({"action": "SHORT", "symbol": "XRPUSDT"}, flush=False)
+    a, b = engine.account_shard["a"], engine.account_shard["b"]
+    assert [alert["symbol"] for alert in engine._buffers[a]] == ["BTCUSDT", "ETHUSDT"]
+    assert [(alert["symbol"], alert["action"]) for alert in engine._buffers[b]] == [("BTCUSDT", "LONG"),
+                                                                                     ("BTCUSDT", "SHORT")]
@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+import journal
+from hot_order import HotOrderBook
+from ledger import Ledger
+from market_store import MarketStore
+from rest_stub import RestStubServer, STUB_KEY, STUB_SECRET, STUB_PASSPHRASE
+
+PRECISION = {'price_precision': 1, 'amount_precision': 3, 'size_multiplier': 0.001}
+
+def test_sent_order_is_not_reported_as_failed_when_the_journal_breaks(monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "record_order", broken)
+    stub = RestStubServer().start()
+    book_ledger = Ledger()
+    book_ledger.available = Decimal("10000")
+    store = MarketStore()
+    store.set_price("BTCUSDT", 80000.0)
+    book = HotOrderBook(["BTCUSDT"], STUB_KEY, STUB_SECRET, STUB_PASSPHRASE, base_url=stub.url, verify=stub.cert,
+                        ledger=book_ledger, store=store, precision_source=lambda s: PRECISION, leverage=None,
+                        limiter=None, risk=None).start()
+    try:
+        response = book.fire("LONG", "BTCUSDT", client_oid="hot-1")
+        assert response.data["clientOid"] == "hot-1"
+    finally:
+        book.stop()
+        stub.close()
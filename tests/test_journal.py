@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+import journal
+import trade
+from journal import Journal, read_strings
+
+def write(directory, *symbols):
+    book = Journal(str(directory), flush_interval=0.01)
+    for symbol in symbols:
+        book.add(journal.ORDER, "mail", symbol, 1, "oid", price=1.0, size=1.0)
+    book.close()
+    return book
+
+@pytest.mark.parametrize("torn", ['"ETHU', '"ETHUSDT"'])  # abgerissen mitten im Text bzw. vor dem Zeilenende
+def test_torn_last_string_is_dropped_on_restart(tmp_path, torn):
+    write(tmp_path, "BTCUSDT")
+    with open(os.path.join(tmp_path, "strings.jsonl"), "a") as f:
+        f.write(torn)
+    assert read_strings(str(tmp_path)) == ["mail", "BTCUSDT"]  # Leser neben dem Bot überspringt die Zeile
+    book = write(tmp_path, "ETHUSDT")
+    assert book.rows == 2
+    assert read_strings(str(tmp_path)) == book.strings
+    assert book.strings.count("ETHUSDT") == 1
+
+def test_entry_bookkeeping_errors_do_not_fail_a_sent_order(monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "record_order", broken)
+    trade.record_entry("BTCUSDT", "buy", 0.001, 80000.0, {}, "oid-1")  # nur geloggt
+
+def test_failed_block_is_rolled_back(tmp_path):
+    book = write(tmp_path, "BTCUSDT")
+    blocker = tmp_path / "price.bin"
+    os.rename(blocker, tmp_path / "price.keep")
+    blocker.mkdir()  # Spalte "price" lässt sich nicht öffnen: Block bricht nach kind..ref ab
+    event = (journal.ORDER, "webhook", "SOLUSDT", 1, "oid", 1.0, 1.0, 0.0, 0.0, 0.0, None, 1)
+    with pytest.raises(OSError):
+        book._write([event])
+    blocker.rmdir()
+    os.rename(tmp_path / "price.keep", blocker)
+    assert "SOLUSDT" not in book.strings and "SOLUSDT" not in book.codes
+    assert read_strings(str(tmp_path)) == book.strings
+    book._write([event])
+    for name, dtype in journal.COLUMNS:
+        assert os.path.getsize(tmp_path / f"{name}.bin") == 2 * journal.width(dtype)
+    assert read_strings(str(tmp_path)) == book.strings == ["mail", "BTCUSDT", "webhook", "SOLUSDT"]
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+from ledger import Ledger
+
+class FakeExchange:
+    def __init__(self, positions):
+        self.positions = positions
+
+    def fetch_positions(self, symbols=None, params=None):
+        return [{"contracts": raw["total"], "info": raw} for raw in self.positions]
+
+class FakeBalanceClient:
+    class Response:
+        def __init__(self, available):
+            self.data = {"available": available}
+
+    def __init__(self, available):
+        self.available = available
+
+    def get(self, path, params=None):
+        return self.Response(self.available)
+
+def test_seed_uses_the_clients_of_its_account():
+    sub = Ledger()
+    position = {"instId": "ETHUSDT", "holdSide": "short", "total": "0.5"}
+    sub.seed(exchange=FakeExchange([position]), balance_client=FakeBalanceClient("42.5"))
+    assert sub.positions == {("ETHUSDT", "short"): position}
+    assert sub.available_usdt() == Decimal("42.5")
+    assert sub.ready.is_set()
+
+def test_incremental_close_removes_the_position():
+    from risk import RiskEngine
+
+    book = Ledger()
+    risk = RiskEngine().attach(book)
+    book.apply_positions([{"instId": "BTCUSDT", "holdSide": "long", "total": "0.01", "openPriceAvg": "80000"},
+                          {"instId": "ETHUSDT", "holdSide": "short", "total": "1", "openPriceAvg": "3000"}])
+    book.apply_positions([{"instId": "BTCUSDT", "holdSide": "long", "total": "0"}], snapshot=False)
+    assert list(book.positions) == [("ETHUSDT", "short")]
+    assert book.open_positions_count("BTCUSDT", "LONG") == 0
+    assert risk.counts.get(("BTCUSDT", "long"), 0) == 0
+    assert risk.total_notional == 3000.0
+
+def test_ledger_is_not_ready_while_the_private_channel_is_down():
+    import asyncio
+    import json
+
+    import websockets
+
+    from ledger import PrivateStream
+
+    async def scenario():
+        drop = asyncio.Event()
+
+        async def handler(ws, *_):
+            await ws.recv()  # Login
+            await ws.send(json.dumps({"event": "login", "code": "0"}))
+            await ws.recv()  # Subscribe
+            await drop.wait()
+
+        server = await websockets.serve(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        book = Ledger()
+        position = {"instId": "ETHUSDT", "holdSide": "short", "total": "0.5"}
+        stream = PrivateStream(book, "k", "s", "p", url=f"ws://127.0.0.1:{port}", min_backoff=60,
+                               exchange=FakeExchange([position]), balance_client=FakeBalanceClient("10"))
+        task = asyncio.create_task(stream.run())
+        try:
+            await asyncio.wait_for(asyncio.to_thread(book.ready.wait, 5), 6)
+            assert book.ready.is_set() and book.positions
+            drop.set()
+            server.close()
+            for _ in range(100):
+                if not stream.connected.is_set():
+                    break
+                await asyncio.sleep(0.02)
+            assert not stream.connected.is_set()
+            assert not book.ready.is_set()  # bis zum nächsten Abgleich wieder per REST
+        finally:
+            stream.stop()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+
+def test_seed_queries_the_balance_with_the_ledgers_settings():
+    import config
+
+    client = FakeBalanceClient("1")
+    requests = []
+    client.get = lambda path, params=None: requests.append(params) or FakeBalanceClient.Response("1")
+    Ledger(margin_coin="USDC").seed("ETHUSDT", exchange=FakeExchange([]), balance_client=client)
+    Ledger().seed(exchange=FakeExchange([]), balance_client=client)
+    assert requests == [
+        {"symbol": "ETHUSDT", "productType": config.product_type, "marginCoin": "USDC"},
+        {"symbol": config.symbol, "productType": config.product_type, "marginCoin": config.margin_coin},
+    ]
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+
+from rate_limiter import RateLimiter
+
+DETAIL = "/api/v2/mix/order/detail"
+CANDLES = "/api/v2/mix/market/candles"
+
+def drained_limiter():
+    """Gesamtbudget 5/s, das einzige Token ist schon verbraucht."""
+    limiter = RateLimiter(global_rate=5)
+    limiter.global_bucket.capacity = 1
+    limiter.global_bucket.tokens = 0
+    return limiter
+
+def test_cancelled_async_acquire_releases_its_ticket():
+    limiter = drained_limiter()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire_async(DETAIL), 0.05)
+        assert limiter.waiting == []
+        # ohne Aufräumen wartet das hier hinter dem verwaisten Ticket für immer
+        await asyncio.wait_for(limiter.acquire_async(CANDLES), 2)
+
+    asyncio.run(scenario())
+    assert limiter.waiting == []
+
+def test_cancelled_task_releases_its_ticket():
+    limiter = drained_limiter()
+
+    async def scenario():
+        task = asyncio.create_task(limiter.acquire_async(DETAIL))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.waiting == []
+
+    asyncio.run(scenario())
+
+def test_interrupted_sync_acquire_releases_its_ticket():
+    limiter = drained_limiter()
+    wait = limiter._cond.wait
+
+    def interrupted(timeout=None):
+        limiter._cond.wait = wait
+        raise KeyboardInterrupt
+
+    limiter._cond.wait = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        limiter.acquire(DETAIL)
+    assert limiter.waiting == []
+    start = time.monotonic()
+    limiter.acquire(CANDLES)
+    assert time.monotonic() - start < 2
+
+def test_order_lane_goes_first():
+    limiter = drained_limiter()
+    granted = []
+
+    async def acquire(path):
+        await limiter.acquire_async(path)
+        granted.append(path)
+
+    async def scenario():
+        poll = asyncio.create_task(acquire(DETAIL))
+        await asyncio.sleep(0)
+        order = asyncio.create_task(acquire("/api/v2/mix/order/place-order"))
+        await asyncio.gather(poll, order)
+
+    asyncio.run(scenario())
+    assert granted == ["/api/v2/mix/order/place-order", DETAIL]
+
+class FakeExchange:
+    """ccxt-Ersatz: ``fail`` nennt die Methode, die mit RateLimitExceeded (429) abbricht."""
+
+    def __init__(self, fail=None):
+        self.fail = fail
+
+    def _call(self, name, result):
+        if name == self.fail:
+            import ccxt
+
+            raise ccxt.RateLimitExceeded("429")
+        return result
+
+    def set_leverage(self, *args, **kwargs):
+        return self._call("set_leverage", {})
+
+    def fetch_ticker(self, symbol):
+        return self._call("fetch_ticker", {"last": 80000.0})
+
+    def create_order(self, *args, **kwargs):
+        return self._call("create_order", {"id": "1"})
+
+@pytest.fixture
+def ccxt_trade(monkeypatch):
+    import trade
+
+    pytest.importorskip("ccxt")
+    limiter = RateLimiter()
+    monkeypatch.setattr(trade, "scheduler", limiter)
+    monkeypatch.setattr(trade, "ATTACH_TPSL", False)
+    monkeypatch.setattr(trade, "record_entry", lambda *args: None)
+    trade.market_cache.update({"BTCUSDT": {"id": "BTCUSDT", "info": {"pricePlace": "1", "volumePlace": "3",
+                                                                     "sizeMultiplier": "0.001"}}})
+    trade.leverage_state.mark("BTCUSDT", trade.LEVERAGE)
+    return trade, limiter
+
+def test_ccxt_success_relaxes_a_throttled_endpoint(ccxt_trade, monkeypatch):
+    trade, limiter = ccxt_trade
+    monkeypatch.setattr(trade, "get_exchange", lambda: FakeExchange())
+    limiter.record(trade.PLACE_ORDER_PATH, 429)
+    bucket = limiter._bucket(trade.PLACE_ORDER_PATH)
+    throttled, bucket.blocked_until = bucket.rate, 0.0
+    trade.place_market_order("BTCUSDT", "buy", 100, price=80000.0)
+    assert bucket.backoff == 0.0
+    assert bucket.rate > throttled
+
+def test_ticker_429_is_charged_to_the_ticker_endpoint(ccxt_trade, monkeypatch):
+    trade, limiter = ccxt_trade
+    monkeypatch.setattr(trade, "get_exchange", lambda: FakeExchange(fail="fetch_ticker"))
+    monkeypatch.setattr(trade.market_store, "last_price", lambda symbol: None)
+    with pytest.raises(Exception):
+        trade.place_market_order("BTCUSDT", "buy", 100)
+    assert limiter._bucket(trade.TICKER_PATH).throttled == 1
+    assert limiter._bucket(trade.PLACE_ORDER_PATH).throttled == 0
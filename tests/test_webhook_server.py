@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from webhook_server import WebhookServer, WEBHOOK_HOST
+
+ALERT = {"action": "LONG", "symbol": "BTCUSDT", "id": "a1"}
+
+def post(server, body, query="", headers=None):
+    """Startet ``server`` (Port 0), sendet ``body`` und gibt den HTTP-Status zurück."""
+    async def scenario():
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(server.url + query, data=json.dumps(body), headers=headers) as response:
+                    return response.status
+        finally:
+            await server.close()
+
+    return asyncio.run(scenario())
+
+@pytest.mark.parametrize("secret", [None, ""])
+def test_server_refuses_to_start_without_secret(secret):
+    with pytest.raises(ValueError):
+        WebhookServer(secret=secret)
+
+def test_binds_to_localhost_by_default():
+    assert WEBHOOK_HOST == "127.0.0.1"
+
+@pytest.mark.parametrize("where, status", [("body", 200), ("header", 200), ("query", 401), (None, 401)])
+def test_secret_is_only_accepted_in_body_or_header(where, status):
+    received = []
+    server = WebhookServer(lambda alert, _: received.append(alert), secret="s3cret", host="127.0.0.1", port=0)
+    body = dict(ALERT, secret="s3cret") if where == "body" else ALERT
+    headers = {"X-Webhook-Secret": "s3cret"} if where == "header" else None
+    query = "?secret=s3cret" if where == "query" else ""
+    assert post(server, body, query, headers) == status
+    assert len(received) == (status == 200)
+
+def test_slow_handler_does_not_block_the_event_loop():
+    import threading
+    import time
+
+    threads = []
+
+    def slow(alert, _):
+        threads.append(threading.current_thread())
+        time.sleep(0.5)  # wie ein SQLite-Commit oder Order-Versand
+
+    server = WebhookServer(slow, secret="s3cret", host="127.0.0.1", port=0)
+
+    async def scenario():
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                alert = asyncio.create_task(session.post(server.url, data=json.dumps(dict(ALERT, secret="s3cret"))))
+                await asyncio.sleep(0.1)
+                begin = time.perf_counter()
+                async with session.get(server.url.replace("/webhook", "/health")) as response:
+                    assert response.status == 200
+                health = time.perf_counter() - begin
+                async with await alert as response:
+                    assert response.status == 200
+                return health, threading.current_thread()
+        finally:
+            await server.close()
+
+    health, loop_thread = asyncio.run(scenario())
+    assert health < 0.3
+    assert threads and threads[0] is not loop_thread
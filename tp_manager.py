@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from config import product_type as default_product_type, margin_coin as default_margin_coin
+from change_tp import build_modify_body, MODIFY_ORDER_PATH
+import journal
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+PLACE_POS_TPSL_PATH = "/api/v2/mix/order/place-pos-tpsl"
+COALESCE_WINDOW = 0.05  # Sekunden, in denen Updates derselben Order zusammengefasst werden
+MAX_CONCURRENCY = 10  # gleichzeitige Anfragen über den gepoolten Client
+TRIGGER_TYPE = "mark_price"
+
+class _Pending:
+    """Neuester Zielstand einer Order/Position; alle überholten Aufrufer teilen sich das Future."""
+
+    def __init__(self, kind, symbol, ref, future):
+        self.kind = kind  # "order" (modify-order) oder "position" (place-pos-tpsl)
+        self.symbol = symbol
+        self.ref = ref  # (order_id, client_oid) bzw. hold_side
+        self.tp = None
+        self.sl = None
+        self.future = future
+        self.updates = 0
+
+class TPSLManager:
+    """
+    Nimmt TP/SL-Änderungen für viele Orders und Positionen an und sendet nur den jeweils neuesten Stand.
+
+    Updates werden ``coalesce_window`` Sekunden gesammelt; für dieselbe Order bzw. Position
+    gewinnt der letzte Wert (TP und SL werden getrennt übernommen, ein reines TP-Update lässt
+    ein noch ausstehendes SL stehen). Bitget hat keinen Batch-Endpunkt für modify-order;
+    Positions-TP und -SL gehen aber gemeinsam in einem place-pos-tpsl-Aufruf. Alle Aufrufe
+    laufen parallel (höchstens ``max_concurrency``) über einen AsyncBitgetClient. Solange für
+    einen Schlüssel eine Anfrage unterwegs ist, wartet der nächste Stand, damit die Börse die
+    Änderungen in Reihenfolge sieht.
+    """
+
+    def __init__(self, client=None, coalesce_window=COALESCE_WINDOW, max_concurrency=MAX_CONCURRENCY,
+                 product_type=default_product_type, margin_coin=default_margin_coin):
+        self.client = client  # bitget_client.AsyncBitgetClient; None = create_async_client()
+        self.coalesce_window = coalesce_window
+        self.product_type = product_type
+        self.margin_coin = margin_coin
+        self.pending = {}  # Schlüssel -> _Pending
+        self.inflight = set()
+        self.stats = {"submitted": 0, "coalesced": 0, "sent": 0, "failed": 0}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._wake = asyncio.Event()
+        self._runner = None
+        self._flushes = set()  # laufende flush-Tasks, damit sie nicht vom GC eingesammelt werden
+
+    def _submit(self, kind, symbol, ref, tp, sl):
+        if tp is None and sl is None:
+            raise ValueError("tp oder sl erforderlich")
+        key = (kind, symbol, ref)
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = self.pending[key] = _Pending(kind, symbol, ref, asyncio.get_running_loop().create_future())
+        else:
+            self.stats["coalesced"] += 1
+        if tp is not None:
+            entry.tp = tp
+        if sl is not None:
+            entry.sl = sl
+        entry.updates += 1
+        self.stats["submitted"] += 1
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run(), name="TPSLManager")
+        self._wake.set()
+        return entry.future
+
+    async def update_order(self, symbol, order_id=None, client_oid=None, tp=None, sl=None):
+        """
+        Setzt Preset-TP/SL einer offenen Order (modify-order).
+
+        Returns:
+            BitgetResponse: Antwort auf die Anfrage, die diesen (oder einen neueren) Stand gesendet hat.
+        """
+        if order_id is None and client_oid is None:
+            raise ValueError("order_id oder client_oid erforderlich")
+        return await self._submit("order", symbol, (order_id, client_oid), tp, sl)
+
+    async def update_position(self, symbol, hold_side, tp=None, sl=None):
+        """Setzt TP/SL einer Position ("long"/"short") über place-pos-tpsl."""
+        return await self._submit("position", symbol, hold_side, tp, sl)
+
+    def _request(self, entry):
+        if entry.kind == "order":
+            order_id, client_oid = entry.ref
+            return MODIFY_ORDER_PATH, build_modify_body(order_id, client_oid, entry.symbol, self.product_type,
+                                                        entry.tp, entry.sl)
+        body = {"symbol": entry.symbol, "productType": self.product_type, "marginCoin": self.margin_coin,
+                "holdSide": entry.ref}
+        if entry.tp is not None:
+            body.update({"stopSurplusTriggerPrice": str(entry.tp), "stopSurplusTriggerType": TRIGGER_TYPE})
+        if entry.sl is not None:
+            body.update({"stopLossTriggerPrice": str(entry.sl), "stopLossTriggerType": TRIGGER_TYPE})
+        return PLACE_POS_TPSL_PATH, body
+
+    async def _send(self, key, entry):
+        path, body = self._request(entry)
+        try:
+            async with self._semaphore:
+                response = await self.client.post(path, body)
+            self.stats["sent"] += 1
+            journal.record_tpsl(entry.symbol, entry.ref if entry.kind == "position" else None, entry.tp, entry.sl,
+                                entry.kind)
+            if not entry.future.done():
+                entry.future.set_result(response)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logging.error(f"TP/SL-Update für {entry.symbol} {entry.ref} fehlgeschlagen: {e}")
+            if not entry.future.done():
+                entry.future.set_exception(e)
+        finally:
+            self.inflight.discard(key)
+            if key in self.pending:
+                self._wake.set()
+
+    async def flush(self):
+        """Sendet alle ausstehenden Stände sofort und wartet auf die Antworten."""
+        if self.client is None:
+            from bitget_client import create_async_client
+            self.client = create_async_client()
+        ready = [key for key in self.pending if key not in self.inflight]
+        tasks = []
+        for key in ready:
+            entry = self.pending.pop(key)
+            self.inflight.add(key)
+            tasks.append(self._send(key, entry))
+        await asyncio.gather(*tasks)
+        return len(tasks)
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await asyncio.sleep(self.coalesce_window)  # weitere Updates derselben Order abwarten
+            # flush als eigener Task: neue Updates werden gesammelt, während Antworten ausstehen
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def close(self):
+        while self.pending or self.inflight:
+            await self.flush()
+            await asyncio.sleep(0.005)
+        if self._runner is not None:
+            self._runner.cancel()
+        if self.client is not None:
+            await self.client.close()
+
+class TPSLService:
+    """
+    TPSLManager in einem eigenen Event-Loop-Thread, für synchronen Code (z.B. Trailing aus logik).
+
+    update_order/update_position sind thread-sicher und liefern concurrent.futures.Future.
+    """
+
+    def __init__(self, client_factory=None, **kwargs):
+        self.client_factory = client_factory  # Callable -> AsyncBitgetClient (z.B. rest_stub für Dry-Run)
+        self.kwargs = kwargs
+        self.loop = asyncio.new_event_loop()
+        self.manager = None
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._main, name="TPSLService", daemon=True)
+
+    def _main(self):
+        asyncio.set_event_loop(self.loop)
+
+        async def setup():
+            client = self.client_factory() if self.client_factory else None
+            self.manager = TPSLManager(client=client, **self.kwargs)
+
+        self.loop.run_until_complete(setup())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+        self._ready.wait()
+        return self
+
+    def update_order(self, symbol, order_id=None, client_oid=None, tp=None, sl=None):
+        return asyncio.run_coroutine_threadsafe(
+            self.manager.update_order(symbol, order_id, client_oid, tp, sl), self.loop)
+
+    def update_position(self, symbol, hold_side, tp=None, sl=None):
+        return asyncio.run_coroutine_threadsafe(self.manager.update_position(symbol, hold_side, tp, sl), self.loop)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.manager.close(), self.loop).result(30)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+def _parse_update(line):
+    """JSON-Zeile {"symbol", "orderId"|"clientOid"|"holdSide", "tp", "sl"} -> Argumente."""
+    update = json.loads(line)
+    return update["symbol"], update.get("orderId"), update.get("clientOid"), update.get("holdSide"), \
+        update.get("tp"), update.get("sl")
+
+def serve(lines, service, callback=None):
+    """Liest Updates zeilenweise (z.B. von stdin) und übergibt sie an den Service; callback(future) bei Antwort."""
+    futures = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            symbol, order_id, client_oid, hold_side, tp, sl = _parse_update(line)
+        except (ValueError, KeyError) as e:
+            logging.error(f"Ungültiges Update {line.strip()!r}: {e}")
+            continue
+        if hold_side:
+            future = service.update_position(symbol, hold_side, tp, sl)
+        else:
+            future = service.update_order(symbol, order_id, client_oid, tp, sl)
+        if callback:
+            future.add_done_callback(callback)
+        futures.append(future)
+    return futures
+
+def benchmark(positions=5, updates=20, latency_ms=30):
+    """
+    Trailing-Szenario gegen rest_stub: ``positions`` Orders bekommen je ``updates`` TP-Änderungen.
+    Vergleicht einzelne modify_order-Aufrufe nacheinander mit dem TPSLManager.
+    """
+    from change_tp import modify_order
+    from rest_stub import RestStubServer
+
+    stub = RestStubServer(latency_ms=latency_ms).start()
+    sync_client = stub.client()
+    start = time.perf_counter()
+    for step in range(updates):
+        for i in range(positions):
+            modify_order(None, None, None, order_id=str(i), symbol="BTCUSDT", product_type=default_product_type,
+                         new_tp=90000 + step, client=sync_client)
+    sequential = time.perf_counter() - start
+    sent_before = len(stub.calls)
+
+    async def run():
+        manager = TPSLManager(client=stub.async_client())
+        begin = time.perf_counter()
+        futures = []
+        for step in range(updates):
+            for i in range(positions):
+                futures.append(asyncio.ensure_future(manager.update_order("BTCUSDT", order_id=str(i), tp=90000 + step)))
+            await asyncio.sleep(0.001)  # Updates treffen verteilt ein, wie beim Trailing
+        await asyncio.gather(*futures)
+        elapsed = time.perf_counter() - begin
+        await manager.close()
+        return elapsed, manager.stats
+
+    batched, stats = asyncio.run(run())
+    last_tp = {call[2]["orderId"]: call[2]["newPresetStopSurplusPrice"] for call in stub.calls[sent_before:]}
+    assert all(tp == str(90000 + updates - 1) for tp in last_tp.values())
+    print(f"modify_order nacheinander: {positions * updates} Anfragen in {sequential * 1000:.0f} ms")
+    print(f"TPSLManager:               {stats['sent']} Anfragen in {batched * 1000:.0f} ms "
+          f"({stats['coalesced']} Updates zusammengefasst, letzter TP je Order korrekt)")
+    stub.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TP/SL-Service: liest JSON-Zeilen von stdin und sendet gebündelt.")
+    parser.add_argument("--dry-run", action="store_true", help="An einen lokalen HTTPS-Stub statt an Bitget senden")
+    parser.add_argument("--benchmark", action="store_true", help="Trailing-Szenario gegen den Stub messen")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        raise SystemExit
+    stub = None
+    factory = None
+    if args.dry_run:
+        from rest_stub import RestStubServer
+        stub = RestStubServer().start()
+        factory = stub.async_client
+    service = TPSLService(client_factory=factory).start()
+    print("📥 Erwarte Updates als JSON-Zeilen, z.B. "
+          '{"symbol": "BTCUSDT", "holdSide": "long", "tp": "90000", "sl": "80000"}')
+
+    def report(future):
+        if future.exception():
+            print(f"❌ {future.exception()}")
+        else:
+            print(f"✅ {future.result()}")
+
+    for future in serve(sys.stdin, service, report):
+        try:
+            future.result(30)
+        except Exception:
+            pass
+    service.stop()
+    if stub is not None:
+        for method, path, body in stub.calls:
+            print(f"Dry run: {method} {path} {body}")
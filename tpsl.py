@@ -0,0 +1,341 @@
+import argparse
+import logging
+import threading
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from ledger import ledger as default_ledger
+from market_store import market_store
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+TP_ATR_MULT = 1.5  # TP-Abstand in ATR
+SL_ATR_MULT = 1.0  # SL-Abstand in ATR
+MIN_TP_ATR = 0.5  # ein VWAP-Band näher als das gilt nicht als TP-Ziel
+DEFAULT_TP_FRACTION = 0.003  # ohne ATR: 0,3 % / 0,2 % vom Einstieg
+DEFAULT_SL_FRACTION = 0.002
+MAX_SL_LIQUIDATION_SHARE = 0.5  # SL höchstens beim halben Weg zur Liquidation (1/Hebel)
+ATR_PERIOD = 14
+VOLATILITY_TTL = 1.0  # Sekunden, die ATR/Band aus market_store zwischengespeichert werden
+TRAIL_INTERVAL = 0.25
+TRAIL_ACTIVATE_ATR = 0.5  # Nachziehen erst, wenn der Kurs so weit im Gewinn war
+TRAIL_ATR_MULT = 1.0  # Abstand des nachgezogenen SL zum besten Kurs
+TRAIL_MIN_STEP_TICKS = 2  # kleinere Verbesserungen werden nicht gesendet
+
+def _round(value, price_place, rounding):
+    return Decimal(repr(value)).quantize(Decimal(1).scaleb(-price_place), rounding=rounding)
+
+def round_level(value, price_place, direction, kind):
+    """
+    Rundet TP/SL auf ``pricePlace`` Nachkommastellen, immer vom Einstieg weg.
+
+    Damit liegt ein LONG-TP sicher über und ein LONG-SL sicher unter dem Kurs (Bitget lehnt
+    Presets auf der falschen Seite ab); der Fehler ist höchstens ein Tick.
+
+    Returns:
+        str: Preis mit genau ``price_place`` Nachkommastellen.
+    """
+    up = (direction == "LONG") == (kind == "tp")
+    return str(_round(value, price_place, ROUND_CEILING if up else ROUND_FLOOR))
+
+def _store_volatility(symbol, store, granularity):
+    """ATR (Wilder) und äußere VWAP-Bänder aus dem Kerzenfenster von market_store."""
+    import numpy as np
+
+    window = store.candles(symbol, granularity)
+    if len(window) <= ATR_PERIOD:
+        return None
+    rows = np.array(window.rows(), dtype=np.float64)
+    high, low, close, volume = rows[:, 2], rows[:, 3], rows[:, 4], rows[:, 5]
+    tr = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
+    atr = float(tr[:ATR_PERIOD].mean())
+    for value in tr[ATR_PERIOD:].tolist():
+        atr += (value - atr) / ATR_PERIOD
+    tail = slice(-60, None)
+    tp = (high[tail] + low[tail] + close[tail]) / 3.0
+    vol = volume[tail]
+    if vol.sum() <= 0:
+        return {"atr": atr}
+    vwap = float(np.dot(tp, vol) / vol.sum())
+    sigma = float(np.sqrt(max(np.dot(tp * tp, vol) / vol.sum() - vwap * vwap, 0.0)))
+    return {"atr": atr, "upper": vwap + 2 * sigma, "lower": vwap - 2 * sigma}
+
+_volatility_cache = {}  # (symbol, granularity) -> (monotonic, Werte)
+
+def volatility(symbol, engine=None, store=market_store, granularity="1m"):
+    """
+    ATR und äußere VWAP-Bänder (±2σ) für ``symbol``.
+
+    Quelle: indicators.IndicatorEngine, wenn eingeschwungen, sonst das Kerzenfenster von market_store
+    (für ``VOLATILITY_TTL`` Sekunden zwischengespeichert).
+
+    Returns:
+        dict: {"atr", optional "upper"/"lower"} oder None, wenn keine Kerzen vorliegen.
+    """
+    if engine is not None:
+        values = engine.snapshot(symbol, granularity)
+        if values is not None and values["ready"]:
+            k = max(engine.band_multipliers)
+            return {"atr": values["atr"], "upper": values.get(f"vwap_upper_{k:g}"),
+                    "lower": values.get(f"vwap_lower_{k:g}")}
+    key = (symbol, granularity)
+    cached = _volatility_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < VOLATILITY_TTL:
+        return cached[1]
+    values = _store_volatility(symbol, store, granularity)
+    _volatility_cache[key] = (time.monotonic(), values)
+    return values
+
+def entry_levels(direction, price, price_place, leverage, vol=None):
+    """
+    TP und SL für eine Marktorder.
+
+    Abstände: TP_ATR_MULT/SL_ATR_MULT × ATR, ohne ATR feste Anteile vom Preis. Liegt das äußere
+    VWAP-Band in Handelsrichtung näher als der ATR-TP (aber weiter als MIN_TP_ATR × ATR), wird es
+    zum TP (Rückkehr zum Mittelwert wahrscheinlicher als ein Durchbruch). Der SL bleibt innerhalb
+    von MAX_SL_LIQUIDATION_SHARE des Wegs zur Liquidation (≈ 1/Hebel).
+
+    Args:
+        direction (str): "LONG" oder "SHORT".
+        price (float): Erwarteter Einstiegskurs.
+        price_place (int): pricePlace des Kontrakts (Nachkommastellen).
+        leverage (int): Hebel der Position.
+        vol (dict): Ergebnis von volatility() oder None.
+
+    Returns:
+        tuple: (tp, sl) als Strings mit ``price_place`` Nachkommastellen.
+    """
+    sign = 1 if direction == "LONG" else -1
+    atr = vol.get("atr") if vol else None
+    if atr:
+        tp_distance, sl_distance = TP_ATR_MULT * atr, SL_ATR_MULT * atr
+        band = vol.get("upper" if sign > 0 else "lower")
+        if band is not None and MIN_TP_ATR * atr <= sign * (band - price) < tp_distance:
+            tp_distance = sign * (band - price)
+    else:
+        tp_distance, sl_distance = price * DEFAULT_TP_FRACTION, price * DEFAULT_SL_FRACTION
+    sl_distance = min(sl_distance, price * MAX_SL_LIQUIDATION_SHARE / leverage)
+    tick = 10.0 ** -price_place
+    tp_distance, sl_distance = max(tp_distance, tick), max(sl_distance, tick)
+    return (round_level(price + sign * tp_distance, price_place, direction, "tp"),
+            round_level(price - sign * sl_distance, price_place, direction, "sl"))
+
+def preset_params(direction, symbol, price, precision, leverage, engine=None, store=market_store):
+    """Bitget-Parameter presetStopSurplusPrice/presetStopLossPrice für eine Einstiegsorder."""
+    tp, sl = entry_levels(direction, price, precision["price_precision"], leverage,
+                          volatility(symbol, engine, store))
+    return {"presetStopSurplusPrice": tp, "presetStopLossPrice": sl}
+
+class _Trail:
+    def __init__(self, symbol, hold_side, entry, tp, sl, atr):
+        self.symbol = symbol
+        self.hold_side = hold_side
+        self.entry = float(entry)
+        self.tp = float(tp) if tp else None
+        self.sl = float(sl) if sl else None
+        self.atr = atr
+        self.best = self.entry  # bester Kurs seit Einstieg
+
+class TrailingManager:
+    """
+    Zieht den SL offener Positionen hinter dem besten Kurs her und sendet nur geänderte Stände.
+
+    Positionen kommen über track() (nach einer Order aus trade.place_market_order) oder werden aus
+    dem Ledger übernommen, sobald der private Kanal sie meldet. Ein Hintergrund-Thread prüft alle
+    ``interval`` Sekunden den letzten Preis aus market_store: liegt die Position TRAIL_ACTIVATE_ATR
+    im Gewinn, wandert der SL auf bester Kurs − TRAIL_ATR_MULT × ATR – nur nach vorne, gerundet auf
+    pricePlace und erst ab TRAIL_MIN_STEP_TICKS Verbesserung. Gesendet wird nur der SL über
+    tp_manager (place-pos-tpsl, zusammengefasst), der TP bleibt unverändert.
+    """
+
+    def __init__(self, service=None, ledger=default_ledger, store=market_store, engine=None,
+                 precision_source=None, interval=TRAIL_INTERVAL, granularity="1m"):
+        if precision_source is None:
+            from trade import fetch_market_precision as precision_source
+        self.service = service  # tp_manager.TPSLService; None = beim Start anlegen
+        self.ledger = ledger
+        self.store = store
+        self.engine = engine
+        self.precision_source = precision_source
+        self.interval = interval
+        self.granularity = granularity
+        self.trails = {}  # (symbol, hold_side) -> _Trail
+        self.stats = {"tracked": 0, "updates": 0, "skipped": 0}
+        self.lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._own_service = False
+
+    def track(self, symbol, hold_side, entry, tp=None, sl=None, atr=None):
+        with self.lock:
+            self.trails[(symbol, hold_side)] = _Trail(symbol, hold_side, entry, tp, sl, atr)
+        self.stats["tracked"] += 1
+
+    def _sync_ledger(self):
+        """Neue Positionen aus dem Ledger übernehmen, geschlossene vergessen."""
+        if not self.ledger.ready.is_set():
+            return
+        positions = dict(self.ledger.positions)
+        with self.lock:
+            for key in [key for key in self.trails if key not in positions]:
+                del self.trails[key]
+            for (symbol, hold_side), raw in positions.items():
+                if (symbol, hold_side) not in self.trails and raw.get("openPriceAvg"):
+                    self.trails[(symbol, hold_side)] = _Trail(symbol, hold_side, raw["openPriceAvg"],
+                                                              raw.get("takeProfit"), raw.get("stopLoss"), None)
+                    self.stats["tracked"] += 1
+
+    def step(self):
+        """Einmal alle Positionen prüfen. Returns: Liste der gesendeten (symbol, hold_side, sl)."""
+        self._sync_ledger()
+        sent = []
+        for trail in list(self.trails.values()):
+            price = self.store.last_price(trail.symbol)
+            if price is None:
+                continue
+            atr = trail.atr
+            if atr is None:
+                vol = volatility(trail.symbol, self.engine, self.store, self.granularity)
+                atr = trail.atr = vol["atr"] if vol else None
+            if not atr:
+                continue
+            sign = 1 if trail.hold_side == "long" else -1
+            trail.best = max(trail.best, price) if sign > 0 else min(trail.best, price)
+            if sign * (trail.best - trail.entry) < TRAIL_ACTIVATE_ATR * atr:
+                continue
+            price_place = self.precision_source(trail.symbol)["price_precision"]
+            direction = "LONG" if sign > 0 else "SHORT"
+            target = float(round_level(trail.best - sign * TRAIL_ATR_MULT * atr, price_place, direction, "sl"))
+            step = TRAIL_MIN_STEP_TICKS * 10.0 ** -price_place
+            if trail.sl is not None and sign * (target - trail.sl) < step:
+                self.stats["skipped"] += 1
+                continue
+            if sign * (price - target) <= 0:
+                continue  # Kurs schon dahinter: SL würde sofort auslösen, das macht der bestehende SL
+            sl = round_level(target, price_place, direction, "sl")
+            self.service.update_position(trail.symbol, trail.hold_side, sl=sl)
+            trail.sl = target
+            self.stats["updates"] += 1
+            sent.append((trail.symbol, trail.hold_side, sl))
+        return sent
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                logging.error(f"Trailing fehlgeschlagen: {e}")
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        if self.service is None:
+            from tp_manager import TPSLService
+            self.service = TPSLService().start()
+            self._own_service = True
+        threading.Thread(target=self._loop, name="TrailingManager", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._own_service:
+            self.service.stop()
+
+# Laufender Manager (start_trailing); trade.place_market_order meldet neue Positionen hier an
+trailing_manager = None
+
+def start_trailing(**kwargs):
+    global trailing_manager
+    trailing_manager = TrailingManager(**kwargs).start()
+    return trailing_manager
+
+def track_entry(symbol, side, price, params, manager=None):
+    """Neue Position beim TrailingManager anmelden (Standard: der laufende; no-op ohne Manager)."""
+    manager = manager or trailing_manager
+    if manager is not None:
+        manager.track(symbol, "long" if side == "buy" else "short", price,
+                      params.get("presetStopSurplusPrice"), params.get("presetStopLossPrice"))
+
+def benchmark(minutes=120):
+    """
+    Gegen exchange_sim: Einstieg mit Preset-TP/SL (ccxt wie trade.place_market_order), danach Trailing.
+    Vergleicht Roundtrips/Zeit mit dem alten Ablauf (nackte Order, TP/SL danach per place-pos-tpsl).
+    """
+    from exchange_sim import ExchangeSim, synthetic_records
+    from market_store import MarketStore
+    from tp_manager import TPSLService
+
+    logging.getLogger().setLevel(logging.WARNING)
+    sim = ExchangeSim(synthetic_records(seconds=minutes * 60, ticks_per_second=2, volatility=0.0003, seed=3),
+                      speed=60, latency_ms=20, rate_limits=False).start()
+    sim.wait_for_price("BTCUSDT")
+    client = sim.client()
+    precision = {"price_precision": 1, "amount_precision": 3, "size_multiplier": 0.001}
+    store = MarketStore()
+    # Kerzen wie ein REST-Backfill laden, bis die ATR eingeschwungen ist (Replay: 1 Minute pro Sekunde)
+    while len(store.candles("BTCUSDT")) <= ATR_PERIOD + 1:
+        time.sleep(1)
+        rows = client.get("/api/v2/mix/market/candles", {"symbol": "BTCUSDT", "granularity": "1m",
+                                                         "limit": "100"}, signed=False).data
+        store.candles("BTCUSDT").merge([(int(row[0]), *(float(x) for x in row[1:6])) for row in rows])
+    vol = volatility("BTCUSDT", store=store)
+    body = {"symbol": "BTCUSDT", "productType": "USDT-FUTURES", "marginMode": "isolated", "marginCoin": "USDT",
+            "side": "buy", "orderType": "market", "size": "0.01"}
+
+    start = time.perf_counter()
+    client.post("/api/v2/mix/order/place-order", dict(body, clientOid="bare"))
+    tp, sl = entry_levels("LONG", sim.engine.prices["BTCUSDT"], 1, 100, vol)
+    client.post("/api/v2/mix/order/place-pos-tpsl", {"symbol": "BTCUSDT", "productType": "USDT-FUTURES",
+                                                     "marginCoin": "USDT", "holdSide": "long",
+                                                     "stopSurplusTriggerPrice": tp, "stopLossTriggerPrice": sl})
+    separate = time.perf_counter() - start
+    client.post("/api/v2/mix/order/place-order", dict(body, side="sell", clientOid="close", reduceOnly="YES"))
+
+    price = sim.engine.prices["BTCUSDT"]
+    start = time.perf_counter()
+    params = preset_params("LONG", "BTCUSDT", price, precision, 100, store=store)
+    client.post("/api/v2/mix/order/place-order", dict(body, clientOid="preset", **params))
+    attached = time.perf_counter() - start
+    position = sim.engine.positions["BTCUSDT"]
+    print(f"ATR {vol['atr']:.1f}, Einstieg {price:.1f}: TP {params['presetStopSurplusPrice']}, "
+          f"SL {params['presetStopLossPrice']} (Position: tp {position['tp']}, sl {position['sl']})")
+    print(f"Nackte Order + place-pos-tpsl: 2 Roundtrips, {separate * 1000:.0f} ms ungeschützt; "
+          f"mit Presets: 1 Roundtrip, {attached * 1000:.0f} ms")
+
+    service = TPSLService(client_factory=sim.async_client).start()
+    store.set_price("BTCUSDT", price)
+    manager = TrailingManager(service=service, store=store, precision_source=lambda s: precision, interval=0.05)
+    manager.track("BTCUSDT", "long", position["entry"], params["presetStopSurplusPrice"],
+                  params["presetStopLossPrice"], vol["atr"])
+    manager.start()
+    # Kurs des Simulators in den Store spiegeln (statt Markt-Feed) und auf Auslösung warten
+    deadline = time.monotonic() + 60
+    history = []
+    while time.monotonic() < deadline and "BTCUSDT" in sim.engine.positions:
+        store.set_price("BTCUSDT", sim.engine.prices["BTCUSDT"])
+        sl = sim.engine.positions.get("BTCUSDT", {}).get("sl")
+        if sl and (not history or history[-1] != sl):
+            history.append(sl)
+        time.sleep(0.02)
+    manager.stop()
+    service.stop()
+    outcome = "geschlossen" if "BTCUSDT" not in sim.engine.positions else "noch offen"
+    print(f"Trailing: {manager.stats['updates']} SL-Updates gesendet, {manager.stats['skipped']} zu kleine "
+          f"ausgelassen; SL-Verlauf an der Börse {history}; Position {outcome}, "
+          f"Konto {sim.engine.account()['usdtEquity']} USDT")
+    sim.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TP/SL beim Einstieg und Trailing-Stop.")
+    parser.add_argument("--benchmark", action="store_true", help="Ablauf gegen exchange_sim durchspielen")
+    parser.add_argument("--price", type=float, help="Levels für diesen Kurs ausgeben")
+    parser.add_argument("--atr", type=float)
+    parser.add_argument("--price-place", type=int, default=1)
+    parser.add_argument("--leverage", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    elif args.price:
+        vol = {"atr": args.atr} if args.atr else None
+        for direction in ("LONG", "SHORT"):
+            tp, sl = entry_levels(direction, args.price, args.price_place, args.leverage, vol)
+            print(f"{direction}: TP {tp}, SL {sl}")
@@ -1,20 +1,164 @@
-import ccxt
 import logging
 import math
-from config import symbol, product_type, margin_coin
-from api import api_key, api_secret, api_passphrase
+import sys
+import threading
+import time
+from config import symbol, product_type, margin_coin, rest_base_url, ca_file
+from market_store import market_store
+from rate_limiter import scheduler
+from metrics import span, timed
+import tpsl
+import journal
 
 # Logging-Konfiguration
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 
-# Bitget-Client initialisieren
-client = ccxt.bitget({
-    'apiKey': api_key,           # API-Schlüssel
-    'secret': api_secret,        # Secret
-    'password': api_passphrase,  # Passphrase
-    'enableRateLimit': True,
-    'options': {'defaultType': 'future'},  # Standardmäßig Futures
-})
+_client = None
+_client_lock = threading.Lock()
+
+def api_credentials():
+    """
+    Liest api_key, api_secret und api_passphrase aus api.py (erst beim ersten Bedarf).
+
+    Raises:
+        RuntimeError: Wenn api.py fehlt oder unvollständig ist.
+    """
+    try:
+        from api import api_key, api_secret, api_passphrase
+    except ImportError as e:
+        raise RuntimeError(f"Zugangsdaten fehlen: api.py mit api_key/api_secret/api_passphrase anlegen ({e})") from e
+    return api_key, api_secret, api_passphrase
+
+def get_exchange():
+    """
+    Gibt den ccxt.bitget-Client zurück; ccxt (~0,3 s Import) wird erst beim ersten Aufruf geladen.
+
+    ``trade.client`` bzw. ``from trade import client`` funktioniert weiterhin (Modul-__getattr__).
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            _client = create_exchange(*api_credentials())
+    return _client
+
+def create_exchange(api_key, api_secret, api_passphrase):
+    """Neuer ccxt.bitget-Client mit den Einstellungen des Bots (z.B. je Konto in engine.py)."""
+    import ccxt
+
+    # Bitget-Client initialisieren
+    exchange = ccxt.bitget({
+        'apiKey': api_key,           # API-Schlüssel
+        'secret': api_secret,        # Secret
+        'password': api_passphrase,  # Passphrase
+        # Drosselung übernimmt rate_limiter.scheduler; ccxts eigener Throttle würde nach
+        # load_markets beim ersten Trade noch einmal ~0,2 s schlafen
+        'enableRateLimit': False,
+        # Standardmäßig Futures; Spot-Märkte nicht mitladen (spart Roundtrips in load_markets)
+        'options': {'defaultType': 'future', 'fetchMarkets': {'types': ['swap']}},
+    })
+    exchange.urls['api'] = {name: rest_base_url for name in exchange.urls['api']}  # z.B. exchange_sim
+    if ca_file:
+        # ccxt übergibt ``verify and validateServerSsl`` an requests, so kommt der Zertifikatspfad an
+        exchange.validateServerSsl = ca_file
+    return exchange
+
+def __getattr__(name):
+    if name == 'client':
+        return get_exchange()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+LEVERAGE = 100
+MARGIN_MODE = 'isolated'
+ATTACH_TPSL = True  # TP/SL (tpsl.entry_levels) als presetStopSurplusPrice/presetStopLossPrice mitsenden
+
+class MarketCache:
+    """
+    Hält pricePlace, volumePlace und sizeMultiplier je Symbol im Speicher.
+
+    Die Werte ändern sich praktisch nie; nach ``ttl`` Sekunden oder nach
+    invalidate() wird beim nächsten Zugriff neu geladen.
+    """
+
+    def __init__(self, ttl=6 * 3600):
+        self.ttl = ttl
+        self._entries = {}  # symbol -> (geladen_um, precision-dict)
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        """Gibt die Präzision zurück oder None, wenn nichts (Frisches) im Cache liegt."""
+        entry = self._entries.get(symbol)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def update(self, markets):
+        """Übernimmt alle Märkte aus einem load_markets()-Ergebnis."""
+        now = time.monotonic()
+        with self._lock:
+            for market_symbol, market in markets.items():
+                info = market.get('info') or {}
+                if 'pricePlace' not in info:
+                    continue
+                self._entries[market_symbol] = (now, {
+                    'price_precision': int(info['pricePlace']),  # z.B. 1 für BTCUSDT
+                    'amount_precision': int(info['volumePlace']),  # z.B. 3 für BTCUSDT
+                    'size_multiplier': float(info['sizeMultiplier'])  # z.B. 0.001 für BTCUSDT
+                })
+                if market.get('id'):
+                    self._entries[market['id']] = self._entries[market_symbol]
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+class LeverageState:
+    """
+    Merkt sich den zuletzt gesetzten Hebel und Margin-Modus je Symbol, damit
+    set_leverage nur aufgerufen wird, wenn sich die gewünschte Einstellung ändert.
+    """
+
+    def __init__(self):
+        self._known = {}  # symbol -> (leverage, margin_mode)
+        self._lock = threading.Lock()
+
+    def needs_update(self, symbol, leverage, margin_mode=MARGIN_MODE):
+        return self._known.get(symbol) != (leverage, margin_mode)
+
+    def mark(self, symbol, leverage, margin_mode=MARGIN_MODE):
+        with self._lock:
+            self._known[symbol] = (leverage, margin_mode)
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._known.clear()
+            else:
+                self._known.pop(symbol, None)
+
+market_cache = MarketCache()
+leverage_state = LeverageState()
+
+# REST-Pfade der ccxt-Aufrufe, damit sie im zentralen Rate-Limiter mitgezählt werden
+PLACE_ORDER_PATH = '/api/v2/mix/order/place-order'
+SET_LEVERAGE_PATH = '/api/v2/mix/account/set-leverage'
+TICKER_PATH = '/api/v2/mix/market/ticker'
+
+def record_rate_limit(path, error=None):
+    """
+    Meldet das Ergebnis eines ccxt-Aufrufs an den Rate-Limiter: ohne ``error`` als Erfolg (200, der
+    Endpunkt wird nach einer Drosselung wieder schneller), RateLimitExceeded/DDoSProtection als 429.
+    """
+    if error is None:
+        scheduler.record(path, 200)
+        return
+    ccxt = sys.modules.get('ccxt')  # ohne geladenes ccxt kann es keine ccxt-Ausnahme sein
+    if ccxt is not None and isinstance(error, (ccxt.RateLimitExceeded, ccxt.DDoSProtection)):
+        scheduler.record(path, 429)
 
 def truncate_decimal(value, decimals):
     """
@@ -30,6 +174,7 @@ def truncate_decimal(value, decimals):
     factor = 10 ** decimals
     return math.floor(value * factor) / factor
 
+@timed("market_load")
 def fetch_market_precision(symbol):
     """
     Fragt die Präzision für das angegebene Symbol ab.
@@ -39,18 +184,26 @@ def fetch_market_precision(symbol):
     
     Returns:
         dict: Präzisionsinformationen (price_precision, amount_precision, size_multiplier).
+        Kommt aus market_cache; nur bei leerem/abgelaufenem Cache wird load_markets aufgerufen.
     """
+    precision = market_cache.get(symbol)
+    if precision is not None:
+        return precision
+    path = '/api/v2/mix/market/contracts'
     try:
-        markets = client.load_markets()
-        market = markets[symbol]
-        price_precision = int(market['info']['pricePlace'])  # z.B. 1 für BTCUSDT
-        amount_precision = int(market['info']['volumePlace'])  # z.B. 3 für BTCUSDT
-        size_multiplier = float(market['info']['sizeMultiplier'])  # z.B. 0.001 für BTCUSDT
-        return {
-            'price_precision': price_precision,
-            'amount_precision': amount_precision,
-            'size_multiplier': size_multiplier
-        }
+        # reload=True, sonst liefert ccxt nach Ablauf der TTL nur seinen eigenen alten Stand
+        scheduler.acquire(path)
+        try:
+            markets = get_exchange().load_markets(reload=True)
+        except Exception as e:
+            record_rate_limit(path, e)
+            raise
+        record_rate_limit(path)
+        market_cache.update(markets)
+        precision = market_cache.get(symbol)
+        if precision is None:
+            raise KeyError(f"Keine Marktdaten für {symbol}")
+        return precision
     except Exception as e:
         logging.error(f"Fehler beim Abrufen der Marktpräzision: {e}")
         raise
@@ -61,63 +214,154 @@ def set_leverage(leverage, symbol):
     """
     try:
         logging.info(f"Setze Hebel auf {leverage}x für {symbol}")
-        client.set_leverage(leverage, symbol, params={'marginMode': 'isolated'})
+        scheduler.acquire(SET_LEVERAGE_PATH)
+        get_exchange().set_leverage(leverage, symbol, params={'marginMode': MARGIN_MODE})
+        record_rate_limit(SET_LEVERAGE_PATH)
+        leverage_state.mark(symbol, leverage, MARGIN_MODE)
     except Exception as e:
+        leverage_state.invalidate(symbol)
+        record_rate_limit(SET_LEVERAGE_PATH, e)
         logging.error(f"Fehler beim Setzen des Hebels: {e}")
         raise
 
-def place_market_order(symbol, side, amount):
+@timed("leverage")
+def ensure_leverage(leverage, symbol):
+    """
+    Setzt den Hebel nur, wenn er vom zuletzt bekannten Stand abweicht.
+
+    Returns:
+        bool: True, wenn die Börse aufgerufen wurde.
+    """
+    if not leverage_state.needs_update(symbol, leverage, MARGIN_MODE):
+        return False
+    set_leverage(leverage, symbol)
+    return True
+
+def calculate_contracts(amount, price, precision):
+    """
+    Rechnet einen USDT-Betrag in Kontrakte um (Abschneiden statt Runden) und prüft den Mindestwert.
+
+    Args:
+        amount (Decimal | float): Menge in USDT.
+        price (float): Aktueller Preis.
+        precision (dict): Ergebnis von fetch_market_precision.
+
+    Returns:
+        float: Anzahl der Kontrakte.
+
+    Raises:
+        ValueError: Wenn der Notionalwert unter 5 USDT liegt.
+    """
+    size_multiplier = precision['size_multiplier']
+    price = truncate_decimal(price, precision['price_precision'])  # Preis abschneiden, z.B. 84725.43 -> 84725.4
+
+    # Berechne die Anzahl der Kontrakte: amount / price = Menge in Base-Währung (z.B. BTC)
+    # Dann auf size_multiplier anpassen
+    base_amount = float(amount) / price  # Menge in BTC
+    contracts = base_amount / size_multiplier  # Anzahl der Kontrakte
+    contracts = truncate_decimal(contracts, precision['amount_precision'])  # Abschneiden auf amount_precision, z.B. 0.123456 -> 0.123
+
+    # Prüfen, ob der Notionalwert (amount) den Mindestanforderungen entspricht (min. 5 USDT)
+    notional_value = contracts * size_multiplier * price
+    if notional_value < 5:
+        logging.error(f"Notionalwert {notional_value} USDT ist unter dem Minimum von 5 USDT.")
+        raise ValueError("Orderwert unter dem Minimum von 5 USDT.")
+    return contracts
+
+def build_order_params(side, contracts, tp=None, sl=None):
+    """Baut die Bitget-spezifischen Parameter für eine Marktorder (optional mit Preset-TP/SL als String)."""
+    params = {
+        'productType': product_type,  # z.B. "USDT-FUTURES"
+        'marginMode': MARGIN_MODE,    # Isolierten Margin-Modus
+        'marginCoin': margin_coin,    # z.B. "USDT"
+        'size': str(contracts),       # Anzahl der Kontrakte
+        'side': side,                 # "buy" oder "sell"
+        'orderType': 'market',        # Marktorder
+    }
+    if tp is not None:
+        params['presetStopSurplusPrice'] = tp  # TP der entstehenden Position
+    if sl is not None:
+        params['presetStopLossPrice'] = sl
+    return params
+
+def fetch_last_price(symbol):
+    """Letzter Preis über den ccxt-Ticker (429 und Erfolg zählen beim Ticker-Endpunkt, nicht bei der Order)."""
+    scheduler.acquire(TICKER_PATH)
+    try:
+        price = get_exchange().fetch_ticker(symbol)['last']
+    except Exception as e:
+        record_rate_limit(TICKER_PATH, e)
+        raise
+    record_rate_limit(TICKER_PATH)
+    return price
+
+def place_market_order(symbol, side, amount, price=None, client_oid=None):
     """
     Platziert eine Marktorder auf Bitget mit Berücksichtigung der Präzision (Abschneiden statt Runden).
+
+    Hebel und Präzision kommen aus leverage_state/market_cache; ist ``price`` bekannt,
+    bleibt nur noch der create_order-Aufruf als Netzwerk-Roundtrip. Mit ATTACH_TPSL trägt die Order
+    TP/SL aus ATR/VWAP (tpsl.preset_params), die Position ist also ab der Füllung geschützt.
     
     Args:
         symbol (str): Handelspaar, z.B. "BTCUSDT".
         side (str): "buy" oder "sell".
         amount (float): Menge in USDT (Quote-Währung).
+        price (float): Aktueller Preis; None nimmt market_store bzw. fragt den Ticker ab.
+        client_oid (str): Eigene Order-ID; bei Wiederholungen dieselbe, damit Bitget keine zweite Order anlegt.
     
     Returns:
         dict: Details der platzierten Order.
     """
     try:
-        # Hebel auf 100 setzen
-        set_leverage(100, symbol)
+        # Hebel auf 100 setzen (nur wenn noch nicht bekannt)
+        ensure_leverage(LEVERAGE, symbol)
 
         # Marktpräzision abfragen
         precision = fetch_market_precision(symbol)
-        price_precision = precision['price_precision']
-        amount_precision = precision['amount_precision']
-        size_multiplier = precision['size_multiplier']
 
         # Aktuellen Preis abrufen, um die Menge in Kontrakten zu berechnen
-        ticker = client.fetch_ticker(symbol)
-        price = ticker['last']
-        price = truncate_decimal(price, price_precision)  # Preis abschneiden, z.B. 84725.43 -> 84725.4
-
-        # Berechne die Anzahl der Kontrakte: amount / price = Menge in Base-Währung (z.B. BTC)
-        # Dann auf size_multiplier anpassen
-        base_amount = amount / price  # Menge in BTC
-        contracts = base_amount / size_multiplier  # Anzahl der Kontrakte
-        contracts = truncate_decimal(contracts, amount_precision)  # Abschneiden auf amount_precision, z.B. 0.123456 -> 0.123
-
-        # Prüfen, ob der Notionalwert (amount) den Mindestanforderungen entspricht (min. 5 USDT)
-        notional_value = contracts * size_multiplier * price
-        if notional_value < 5:
-            logging.error(f"Notionalwert {notional_value} USDT ist unter dem Minimum von 5 USDT.")
-            raise ValueError("Orderwert unter dem Minimum von 5 USDT.")
-
-        params = {
-            'productType': product_type,  # z.B. "USDT-FUTURES"
-            'marginMode': 'isolated',     # Isolierten Margin-Modus
-            'marginCoin': margin_coin,    # z.B. "USDT"
-            'size': str(contracts),       # Anzahl der Kontrakte
-            'side': side,                 # "buy" oder "sell"
-            'orderType': 'market',        # Marktorder
-        }
-        order = client.create_order(symbol, 'market', side, contracts, params=params)
+        if price is None:
+            price = market_store.last_price(symbol)  # vom WebSocket-Feed, ohne Netzwerk
+        if price is None:
+            with span("ticker"):
+                price = fetch_last_price(symbol)
+        contracts = calculate_contracts(amount, price, precision)
+        params = build_order_params(side, contracts)
+        if ATTACH_TPSL:
+            params.update(tpsl.preset_params("LONG" if side == "buy" else "SHORT", symbol, price, precision, LEVERAGE))
+        if client_oid:
+            params['clientOid'] = client_oid
+        scheduler.acquire(PLACE_ORDER_PATH)  # Spur ORDER: vor Status-Polling und Kerzen
+        with span("order"):
+            try:
+                order = get_exchange().create_order(symbol, 'market', side, contracts, params=params)
+            except Exception as e:
+                record_rate_limit(PLACE_ORDER_PATH, e)
+                raise
+        record_rate_limit(PLACE_ORDER_PATH)
         logging.info(f"Marktorder erfolgreich platziert: {order}")
-        return order
     except Exception as e:
+        # Hebel könnte außerhalb des Bots geändert worden sein: beim nächsten Mal neu setzen
+        leverage_state.invalidate(symbol)
         logging.error(f"Fehler beim Platzieren der Marktorder: {e}")
         raise
+    record_entry(symbol, side, contracts, price, params, client_oid)
+    return order
+
+def record_entry(symbol, side, contracts, price, params, client_oid=None, trailing=None):
+    """
+    Journal und Trailing für eine gesendete Einstiegsorder.
+
+    Die Order ist zu diesem Zeitpunkt schon bei der Börse: ein Fehler hier wird nur geloggt,
+    sonst würde der Aufrufer einen Fehlschlag melden (und die alert_queue erneut senden).
+    """
+    try:
+        journal.record_order(symbol, side, contracts, price, client_oid)
+        if 'presetStopSurplusPrice' in params:
+            journal.record_tpsl(symbol, side, params['presetStopSurplusPrice'], params['presetStopLossPrice'], "preset")
+        tpsl.track_entry(symbol, side, price, params, trailing)
+    except Exception as e:
+        logging.error(f"Order {client_oid or symbol} gesendet, Journal/Trailing fehlgeschlagen: {e}")
 
 
